@@ -18,6 +18,7 @@ from app.agents.clients import (
     BaseAIClient,
     ClientType,
     OpenAIClient,
+    client_pool,
     create_client,
 )
 from app.agents.core import (
@@ -67,6 +68,7 @@ __all__ = [
     "ArkClient",
     "AzureHttpClient",
     "create_client",
+    "client_pool",
     # Infra
     "ModelBuilder",
     "get_prompt",
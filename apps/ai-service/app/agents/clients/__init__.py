@@ -5,15 +5,23 @@
 
 from app.agents.clients.ark_client import ArkClient
 from app.agents.clients.azure_http_client import AzureHttpClient
-from app.agents.clients.base import BaseAIClient, ClientType
+from app.agents.clients.base import BaseAIClient, ClientType, EmbeddingRequest
+from app.agents.clients.embedding_batcher import EmbeddingBatcher
+from app.agents.clients.embedding_cache import EmbeddingCache
 from app.agents.clients.factory import create_client
 from app.agents.clients.openai_client import OpenAIClient
+from app.agents.clients.pool import ClientPool, client_pool
 
 __all__ = [
     "BaseAIClient",
     "ClientType",
+    "EmbeddingRequest",
     "OpenAIClient",
     "ArkClient",
     "AzureHttpClient",
     "create_client",
+    "EmbeddingBatcher",
+    "EmbeddingCache",
+    "ClientPool",
+    "client_pool",
 ]
@@ -1,5 +1,6 @@
 """Ark 客户端实现（火山引擎）"""
 
+import asyncio
 from typing import Any
 
 from volcenginesdkarkruntime import AsyncArk
@@ -102,7 +103,7 @@ class ArkClient(BaseAIClient[AsyncArk]):
 
         对于包含图片的消息：
         - Dense 向量：多模态（文本+图片）
-        - Sparse 向量：纯文本（需要额外请求）
+        - Sparse 向量：纯文本（需要额外请求，与 Dense 请求并发）
 
         对于纯文本消息：
         - 一次请求同时获取 Dense 和 Sparse
@@ -139,8 +140,8 @@ class ArkClient(BaseAIClient[AsyncArk]):
             dense_vector = resp.data.embedding
             sparse_data: Any = resp.data.sparse_embedding or []
         else:
-            # 有图片：需要两次请求
-            # 第一次：多模态获取 Dense
+            # 有图片：需要两次请求，两者互不依赖，并发发出
+            # Dense：多模态（文本 + 图片）
             dense_input: list[EmbeddingInputParam] = []
             if text:
                 dense_input.append({"type": "text", "text": text})
@@ -148,33 +149,37 @@ class ArkClient(BaseAIClient[AsyncArk]):
                 dense_input.append(
                     {"type": "image_url", "image_url": {"url": image_base64}}
                 )
-
-            dense_resp = await client.multimodal_embeddings.create(
+            dense_request = client.multimodal_embeddings.create(
                 model=self.model_name,
                 input=dense_input,
                 dimensions=dimensions,
                 encoding_format="float",
                 extra_body={"instructions": instructions or ""},
             )
-            dense_vector = dense_resp.data.embedding
 
-            # 第二次：纯文本获取 Sparse（如果有文本）
-            sparse_data = []
             if text:
+                # Sparse：纯文本
                 sparse_input: list[EmbeddingInputParam] = [
                     {"type": "text", "text": text}
                 ]
-                sparse_resp = await client.multimodal_embeddings.create(
-                    model=self.model_name,
-                    input=sparse_input,
-                    dimensions=dimensions,
-                    encoding_format="float",
-                    extra_body={
-                        "instructions": instructions or "",
-                        "sparse_embedding": {"type": "enabled"},
-                    },
+                dense_resp, sparse_resp = await asyncio.gather(
+                    dense_request,
+                    client.multimodal_embeddings.create(
+                        model=self.model_name,
+                        input=sparse_input,
+                        dimensions=dimensions,
+                        encoding_format="float",
+                        extra_body={
+                            "instructions": instructions or "",
+                            "sparse_embedding": {"type": "enabled"},
+                        },
+                    ),
                 )
                 sparse_data = sparse_resp.data.sparse_embedding or []
+            else:
+                dense_resp = await dense_request
+                sparse_data = []
+            dense_vector = dense_resp.data.embedding
 
         # 转换 Sparse 格式：SparseEmbedding -> SparseVector
         # 火山引擎返回的 sparse_embedding 是 SparseEmbedding 对象，有 index 和 value 属性
@@ -1,5 +1,6 @@
 """AI 客户端抽象基类"""
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -25,6 +26,25 @@ class HybridEmbedding:
     sparse: SparseVector
 
 
+@dataclass(frozen=True)
+class EmbeddingRequest:
+    """一次 embedding 调用的入参（可哈希，批处理时用于去重）
+
+    Attributes:
+        hybrid: True 调用 embed_hybrid（Dense + Sparse），False 调用 embed
+        text: 文本内容
+        images: Base64 图片
+        instructions: 向量化指令
+        dimensions: Dense 向量维度
+    """
+
+    hybrid: bool
+    text: str | None = None
+    images: tuple[str, ...] = ()
+    instructions: str | None = None
+    dimensions: int = 1024
+
+
 class ClientType:
     """底层客户端类型枚举。
 
@@ -44,6 +64,9 @@ class ClientType:
 class BaseAIClient(ABC, Generic[ClientT]):
     """AI客户端抽象基类，提供通用的生命周期管理。"""
 
+    # embed_batch 是否为供应商原生批量请求（否则为并发逐条调用）
+    native_batch_embed: bool = False
+
     def __init__(self, model_id: str) -> None:
         self._client: ClientT | None = None
         self.model_id = model_id
@@ -146,3 +169,27 @@ class BaseAIClient(ABC, Generic[ClientT]):
             dimensions: Dense 向量维度
         """
         raise RuntimeError(f"{self.__class__.__name__} 不支持 embed_hybrid 能力")
+
+    async def embed_batch(
+        self, requests: list[EmbeddingRequest]
+    ) -> list[list[float] | HybridEmbedding | BaseException]:
+        """批量 embedding，结果与 requests 一一对应，单条失败以异常对象返回。
+
+        默认实现并发逐条调用 embed / embed_hybrid；
+        供应商提供批量接口时子类可覆盖为单次请求。
+        """
+
+        async def _one(req: EmbeddingRequest) -> list[float] | HybridEmbedding:
+            kwargs = {
+                "text": req.text,
+                "image_base64_list": list(req.images) or None,
+                "instructions": req.instructions,
+                "dimensions": req.dimensions,
+            }
+            if req.hybrid:
+                return await self.embed_hybrid(**kwargs)
+            return await self.embed(**kwargs)
+
+        return await asyncio.gather(
+            *(_one(req) for req in requests), return_exceptions=True
+        )
@@ -0,0 +1,184 @@
+"""Embedding 微批处理
+
+位于调用方（如向量化 worker）与 embedding 客户端之间：并发到达的请求在
+一个短时间窗口内（或攒满 max_batch_size 条）合并为一批，整批共用一次客户端
+租借，通过 BaseAIClient.embed_batch 发出，再把结果按请求分发回各调用方。
+
+- 同一批内完全相同的请求（文本 / 图片 / 指令 / 维度均相同）只请求一次
+- 发出前先查内容寻址的 embedding 缓存（见 embedding_cache），只请求未命中的部分
+- 供应商支持批量接口时（如 OpenAI 兼容 embeddings）一批只发一次请求；
+  Ark 多模态 embedding 接口每次只返回一个向量，批内并发逐条请求，
+  每条完成即返回给调用方，不等待整批
+- 客户端不支持原生批量时等待窗口没有收益，第一批之后不再等待：
+  只合并同一轮事件循环内到达的请求（仍做去重和缓存查询）
+- 整批失败（如取不到客户端）时每个调用方都收到同一个异常
+
+Usage:
+    batcher = EmbeddingBatcher("embedding-model")
+    hybrid, dense = await asyncio.gather(
+        batcher.embed_hybrid(text=text, instructions=a),
+        batcher.embed(text=text, instructions=b),
+    )
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from app.agents.clients.base import EmbeddingRequest, HybridEmbedding
+from app.agents.clients.embedding_cache import EmbeddingCache, embedding_cache
+from app.agents.clients.pool import ClientPool, client_pool
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(future: asyncio.Future, result: Any) -> None:
+    if future.done():
+        return
+    if isinstance(result, BaseException):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+class EmbeddingBatcher:
+    """按时间窗口 / 批大小合并 embedding 请求"""
+
+    def __init__(
+        self,
+        model_id: str = "embedding-model",
+        max_batch_size: int | None = None,
+        window_ms: float | None = None,
+        pool: ClientPool = client_pool,
+        cache: EmbeddingCache | None = embedding_cache,
+    ):
+        self.model_id = model_id
+        self.max_batch_size = max_batch_size or settings.embedding_batch_max_size
+        self.window = (
+            window_ms if window_ms is not None else settings.embedding_batch_window_ms
+        ) / 1000
+        self._pool = pool
+        self._cache = cache
+        self._pending: dict[EmbeddingRequest, asyncio.Future] = {}
+        # 客户端是否支持原生批量，第一批租借到客户端后确定
+        self._native_batch: bool | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"submitted": 0, "deduplicated": 0, "batches": 0, "requests": 0}
+
+    async def embed(
+        self,
+        text: str | None = None,
+        image_base64_list: list[str] | None = None,
+        instructions: str | None = None,
+        dimensions: int = 1024,
+    ) -> list[float]:
+        """同 BaseAIClient.embed，经批处理发出"""
+        return await self._submit(
+            EmbeddingRequest(
+                hybrid=False,
+                text=text,
+                images=tuple(image_base64_list or ()),
+                instructions=instructions,
+                dimensions=dimensions,
+            )
+        )
+
+    async def embed_hybrid(
+        self,
+        text: str | None = None,
+        image_base64_list: list[str] | None = None,
+        instructions: str | None = None,
+        dimensions: int = 1024,
+    ) -> HybridEmbedding:
+        """同 BaseAIClient.embed_hybrid，经批处理发出"""
+        return await self._submit(
+            EmbeddingRequest(
+                hybrid=True,
+                text=text,
+                images=tuple(image_base64_list or ()),
+                instructions=instructions,
+                dimensions=dimensions,
+            )
+        )
+
+    async def _submit(self, request: EmbeddingRequest) -> Any:
+        self.stats["submitted"] += 1
+        future = self._pending.get(request)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._pending[request] = loop.create_future()
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                window = 0 if self._native_batch is False else self.window
+                self._timer = loop.call_later(window, self._flush)
+        # 多个调用方共享同一 future，单个调用方取消不影响其他人
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: dict[EmbeddingRequest, asyncio.Future]) -> None:
+        self.stats["batches"] += 1
+        try:
+            async with self._pool.acquire(self.model_id) as client:
+                self._native_batch = client.native_batch_embed
+                cached = {}
+                if self._cache is not None:
+                    cached = await self._cache.get_many(client.model_name, list(batch))
+                    for request, result in cached.items():
+                        _resolve(batch[request], result)
+
+                requests = [req for req in batch if req not in cached]
+                self.stats["requests"] += len(requests)
+                if client.native_batch_embed:
+                    results = await client.embed_batch(requests) if requests else []
+                    for request, result in zip(requests, results, strict=True):
+                        _resolve(batch[request], result)
+                else:
+                    results = await asyncio.gather(
+                        *(self._run_one(client, req, batch[req]) for req in requests)
+                    )
+
+                if self._cache is not None:
+                    await self._cache.put_many(
+                        client.model_name,
+                        {
+                            req: res
+                            for req, res in zip(requests, results, strict=True)
+                            if not isinstance(res, BaseException)
+                        },
+                    )
+        except Exception as e:
+            logger.error(f"embedding 批处理失败: size={len(batch)}, error={e}")
+            for future in batch.values():
+                _resolve(future, e)
+
+    @staticmethod
+    async def _run_one(
+        client, request: EmbeddingRequest, future: asyncio.Future
+    ) -> Any:
+        try:
+            [result] = await client.embed_batch([request])
+        except Exception as e:
+            result = e
+        _resolve(future, result)
+        return result
+
+    async def drain(self) -> None:
+        """立即发出未满的批次并等待全部批次完成（退出前调用）"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
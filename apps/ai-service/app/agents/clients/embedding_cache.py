@@ -0,0 +1,195 @@
+"""内容寻址的 embedding 缓存
+
+群聊里大量重复的短消息（"收到"、"哈哈哈"、"+1"、表情包渲染成的 "[表情包]"）
+以及重复转发的图片，每次都按全价请求供应商。此缓存以
+(模型名, 指令, 维度, 是否混合向量, 归一化内容哈希) 为 key，
+把 Dense + Sparse 结果存入 Redis，命中时不再请求供应商。
+
+存储格式（二进制，约为 JSON 列表的 1/8）：
+    header  <BHI: 版本号, dense 维度, sparse 非零项数
+    dense   float16 × dim
+    sparse  uint32 indices × nnz + float16 values × nnz
+
+容量：每个 key 带滑动 TTL，另用 sorted set 记录最近访问时间，
+条目数超过上限时淘汰最久未访问的（近似 LRU）。Redis 异常时直接放行（视为未命中）。
+"""
+
+import hashlib
+import logging
+import struct
+import time
+import unicodedata
+from typing import Any
+
+import numpy as np
+
+from app.agents.clients.base import EmbeddingRequest, HybridEmbedding, SparseVector
+from app.clients.redis import AsyncRedisClient
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "emb:v1:"
+_LRU_KEY = "emb:v1:lru"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BHI")
+
+
+def _normalize_text(text: str | None) -> str:
+    return unicodedata.normalize("NFC", text or "").strip()
+
+
+def cache_key(model_name: str, request: EmbeddingRequest) -> str:
+    """同一模型 / 指令 / 维度 / 内容的请求得到相同的 key"""
+    digest = hashlib.sha256()
+    for part in (
+        model_name,
+        request.instructions or "",
+        str(request.dimensions),
+        "hybrid" if request.hybrid else "dense",
+        _normalize_text(request.text),
+        *(hashlib.sha256(image.encode()).hexdigest() for image in request.images),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    return _KEY_PREFIX + digest.hexdigest()
+
+
+def encode(result: list[float] | HybridEmbedding) -> bytes:
+    """把 embed / embed_hybrid 结果编码为紧凑二进制"""
+    if isinstance(result, list):
+        dense, indices, values = result, [], []
+    else:
+        dense = result.dense
+        indices, values = result.sparse.indices, result.sparse.values
+    return b"".join(
+        (
+            _HEADER.pack(_FORMAT_VERSION, len(dense), len(indices)),
+            np.asarray(dense, dtype="<f2").tobytes(),
+            np.asarray(indices, dtype="<u4").tobytes(),
+            np.asarray(values, dtype="<f2").tobytes(),
+        )
+    )
+
+
+def decode(data: bytes, hybrid: bool) -> list[float] | HybridEmbedding:
+    """encode 的逆过程；版本号不符时抛 ValueError"""
+    version, dim, nnz = _HEADER.unpack_from(data)
+    if version != _FORMAT_VERSION:
+        raise ValueError(f"未知的 embedding 缓存版本: {version}")
+    offset = _HEADER.size
+    dense = np.frombuffer(data, dtype="<f2", count=dim, offset=offset)
+    offset += dim * 2
+    indices = np.frombuffer(data, dtype="<u4", count=nnz, offset=offset)
+    offset += nnz * 4
+    values = np.frombuffer(data, dtype="<f2", count=nnz, offset=offset)
+
+    dense_list = dense.astype(np.float32).tolist()
+    if not hybrid:
+        return dense_list
+    return HybridEmbedding(
+        dense=dense_list,
+        sparse=SparseVector(
+            indices=indices.astype(int).tolist(),
+            values=values.astype(np.float32).tolist(),
+        ),
+    )
+
+
+class EmbeddingCache:
+    """Redis 中的 embedding 结果缓存"""
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: int | None = None,
+    ):
+        self.max_entries = max_entries or settings.embedding_cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.embedding_cache_ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0, "errors": 0}
+
+    async def get_many(
+        self, model_name: str, requests: list[EmbeddingRequest]
+    ) -> dict[EmbeddingRequest, Any]:
+        """批量查询，返回命中的 {request: result}"""
+        if not requests:
+            return {}
+        keys = [cache_key(model_name, req) for req in requests]
+        try:
+            redis = AsyncRedisClient.get_binary_instance()
+            values = await redis.mget(keys)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"读取 embedding 缓存失败: {e}")
+            self.stats["misses"] += len(requests)
+            return {}
+
+        hits: dict[EmbeddingRequest, Any] = {}
+        hit_keys: list[str] = []
+        for req, key, value in zip(requests, keys, values, strict=True):
+            if value is None:
+                continue
+            try:
+                hits[req] = decode(value, req.hybrid)
+                hit_keys.append(key)
+            except Exception as e:
+                logger.warning(f"embedding 缓存条目损坏，忽略: {key}, {e}")
+
+        self.stats["hits"] += len(hits)
+        self.stats["misses"] += len(requests) - len(hits)
+        if hit_keys:
+            await self._touch(hit_keys)
+        return hits
+
+    async def _touch(self, keys: list[str]) -> None:
+        """刷新命中条目的 TTL 与访问时间"""
+        now = time.time()
+        try:
+            redis = AsyncRedisClient.get_binary_instance()
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.expire(key, self.ttl_seconds)
+                pipe.zadd(_LRU_KEY, dict.fromkeys(keys, now))
+                await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"刷新 embedding 缓存访问时间失败: {e}")
+
+    async def put_many(
+        self, model_name: str, results: dict[EmbeddingRequest, Any]
+    ) -> None:
+        """写入结果，条目数超过上限时淘汰最久未访问的"""
+        if not results:
+            return
+        now = time.time()
+        entries = {
+            cache_key(model_name, req): encode(res) for req, res in results.items()
+        }
+        try:
+            redis = AsyncRedisClient.get_binary_instance()
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, value in entries.items():
+                    pipe.set(key, value, ex=self.ttl_seconds)
+                pipe.zadd(_LRU_KEY, dict.fromkeys(entries, now))
+                pipe.zcard(_LRU_KEY)
+                size = (await pipe.execute())[-1]
+            self.stats["writes"] += len(entries)
+            if size > self.max_entries:
+                await self._evict(redis, size - self.max_entries)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"写入 embedding 缓存失败: {e}")
+
+    async def _evict(self, redis, count: int) -> None:
+        oldest = await redis.zrange(_LRU_KEY, 0, count - 1)
+        if not oldest:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*oldest)
+            pipe.zrem(_LRU_KEY, *oldest)
+            await pipe.execute()
+        self.stats["evicted"] += len(oldest)
+
+
+# 全局单例
+embedding_cache = EmbeddingCache()
@@ -4,12 +4,14 @@ from typing import Any
 
 from openai import AsyncOpenAI
 
-from app.agents.clients.base import BaseAIClient
+from app.agents.clients.base import BaseAIClient, EmbeddingRequest, HybridEmbedding
 
 
 class OpenAIClient(BaseAIClient[AsyncOpenAI]):
     """Async OpenAI API client wrapper."""
 
+    native_batch_embed = True
+
     async def _create_client(self, model_info: dict) -> AsyncOpenAI:
         """创建 AsyncOpenAI 客户端实例。"""
         return AsyncOpenAI(
@@ -41,6 +43,23 @@ class OpenAIClient(BaseAIClient[AsyncOpenAI]):
         resp = await client.embeddings.create(model=self.model_name, input=text)
         return list(resp.data[0].embedding)
 
+    async def embed_batch(
+        self, requests: list[EmbeddingRequest]
+    ) -> list[list[float] | HybridEmbedding | BaseException]:
+        """纯文本请求合并为一次 embeddings.create（input 为列表）"""
+        if any(req.hybrid or req.images or not req.text for req in requests):
+            return await super().embed_batch(requests)
+
+        client = self._ensure_connected()
+        try:
+            resp = await client.embeddings.create(
+                model=self.model_name, input=[req.text or "" for req in requests]
+            )
+        except Exception as e:
+            return [e] * len(requests)
+        data = sorted(resp.data, key=lambda d: d.index)
+        return [list(d.embedding) for d in data]
+
     async def generate_image(
         self,
         prompt: str,
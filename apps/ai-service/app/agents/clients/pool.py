@@ -0,0 +1,165 @@
+"""进程级 AI 客户端池
+
+按 model_id 持有长生命周期的 BaseAIClient（底层 AsyncArk / AsyncOpenAI 自带连接池），
+替代每次调用 `async with await create_client(...)` 新建、用完即关的模式。
+
+- 同一 model_id 只创建一次，多个协程并发共享（底层 SDK 客户端协程安全）
+- 每次取用时比对模型配置指纹（model_info 本身有 TTL 缓存，开销为一次字典查找），
+  配置变化（换 key / base_url / 模型）时创建新客户端替换旧的
+- 被替换的旧客户端在最后一个使用者归还后才关闭，不打断进行中的请求
+- 模型配置查询失败时沿用已有客户端
+
+Usage:
+    from app.agents.clients import client_pool
+
+    async with client_pool.acquire("embedding-model") as client:
+        embedding = await client.embed_hybrid(text=text)
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from app.agents.clients.base import BaseAIClient
+from app.agents.clients.factory import create_client
+from app.agents.infra.model_builder import ModelBuilder, model_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledClient:
+    client: BaseAIClient[Any]
+    fingerprint: tuple
+    leases: int = 0
+    retired: bool = False
+
+
+@dataclass
+class ClientPoolStats:
+    """单个 model_id 的客户端池统计"""
+
+    created: int = 0
+    refreshed: int = 0  # 因模型配置变化而替换
+    acquired: int = 0
+    in_use: int = 0
+    retired_pending: int = 0  # 已被替换、等待使用者归还后关闭
+    errors: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "acquired": self.acquired,
+            "in_use": self.in_use,
+            "retired_pending": self.retired_pending,
+            "errors": self.errors,
+        }
+
+
+class ClientPool:
+    """按 model_id 复用已连接的 AI 客户端"""
+
+    def __init__(self):
+        self._entries: dict[str, _PooledClient] = {}
+        self._retired: list[_PooledClient] = []
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._stats: dict[str, ClientPoolStats] = {}
+
+    def _stat(self, model_id: str) -> ClientPoolStats:
+        return self._stats.setdefault(model_id, ClientPoolStats())
+
+    async def _get_entry(self, model_id: str) -> _PooledClient:
+        model_info = await ModelBuilder._get_model_and_provider_info(model_id)
+        entry = self._entries.get(model_id)
+
+        # 查询失败（返回 None）时沿用已有客户端
+        if entry is not None and (
+            model_info is None or entry.fingerprint == model_fingerprint(model_info)
+        ):
+            return entry
+
+        lock = self._locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            # 等锁期间可能已被其他协程创建
+            entry = self._entries.get(model_id)
+            fingerprint = model_fingerprint(model_info)
+            if entry is not None and entry.fingerprint == fingerprint:
+                return entry
+
+            stats = self._stat(model_id)
+            try:
+                client = await create_client(model_id)
+                await client.connect()
+            except Exception:
+                stats.errors += 1
+                raise
+
+            new_entry = _PooledClient(client=client, fingerprint=fingerprint)
+            self._entries[model_id] = new_entry
+            stats.created += 1
+
+            if entry is not None:
+                stats.refreshed += 1
+                logger.info(f"模型配置已变化，替换客户端: {model_id}")
+                await self._retire(model_id, entry)
+            return new_entry
+
+    async def _retire(self, model_id: str, entry: _PooledClient) -> None:
+        entry.retired = True
+        if entry.leases == 0:
+            await self._close_client(model_id, entry)
+        else:
+            self._retired.append(entry)
+            self._stat(model_id).retired_pending += 1
+
+    async def _close_client(self, model_id: str, entry: _PooledClient) -> None:
+        try:
+            await entry.client.disconnect()
+        except Exception as e:
+            logger.warning(f"关闭客户端 {model_id} 失败: {e}")
+
+    @asynccontextmanager
+    async def acquire(self, model_id: str) -> AsyncIterator[BaseAIClient[Any]]:
+        """取用 model_id 对应的共享客户端，退出上下文时归还（不关闭）
+
+        Raises:
+            ValueError: 模型配置不存在或未激活且池中没有可用客户端
+        """
+        entry = await self._get_entry(model_id)
+        stats = self._stat(model_id)
+        entry.leases += 1
+        stats.acquired += 1
+        stats.in_use += 1
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            stats.in_use -= 1
+            if entry.retired and entry.leases == 0 and entry in self._retired:
+                self._retired.remove(entry)
+                stats.retired_pending -= 1
+                await self._close_client(model_id, entry)
+
+    async def close(self) -> None:
+        """关闭全部客户端（进程退出时调用）"""
+        entries, self._entries = self._entries, {}
+        retired, self._retired = self._retired, []
+        for model_id, entry in entries.items():
+            await self._close_client(model_id, entry)
+        for entry in retired:
+            await self._close_client(entry.client.model_id, entry)
+        for stats in self._stats.values():
+            stats.retired_pending = 0
+        logger.info("AI 客户端池已关闭")
+
+    def stats(self) -> dict[str, dict]:
+        """各 model_id 的客户端池统计"""
+        return {model_id: s.to_dict() for model_id, s in self._stats.items()}
+
+
+# 全局单例
+client_pool = ClientPool()
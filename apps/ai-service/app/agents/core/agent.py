@@ -4,11 +4,15 @@
 """
 
 import asyncio
+import dataclasses
 import logging
+import time
 from collections.abc import AsyncGenerator
 from datetime import datetime
+from typing import Any
 
 from langchain.agents import create_agent
+from langchain.agents.middleware import ModelRequest, dynamic_prompt
 from langchain.messages import AIMessage, AIMessageChunk, ToolMessage
 from langchain_core.runnables import RunnableConfig
 from langfuse.langchain import CallbackHandler
@@ -20,8 +24,12 @@ from openai import (
 )
 
 from app.agents.core.context import ContextSchema
-from app.agents.infra.langfuse_client import get_prompt
-from app.agents.infra.model_builder import ModelBuilder
+from app.agents.infra.langfuse_client import _PROMPT_CACHE_TTL_SECONDS, get_prompt
+from app.agents.infra.model_builder import (
+    _CACHE_TTL_SECONDS,
+    ModelBuilder,
+    model_fingerprint,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +46,43 @@ _DEFAULT_MAX_RETRIES = 2
 _BACKOFF_BASE = 2  # 秒
 _BACKOFF_MAX = 8  # 秒
 
+# ---------------------------------------------------------------------------
+# 进程级 agent 缓存（asyncio 单线程安全，无需锁）
+#
+# key 包含 prompt 版本和模型配置指纹：prompt / model_info 缓存过期后若内容变化，
+# key 随之变化，自然构建新 agent；TTL 取两者较小值，保证旧条目按时淘汰。
+# ---------------------------------------------------------------------------
+_AGENT_CACHE_TTL_SECONDS: int = min(_PROMPT_CACHE_TTL_SECONDS, _CACHE_TTL_SECONDS)
+
+# { cache_key: (agent, expire_at) }
+_agent_cache: dict[tuple, tuple[Any, float]] = {}
+
+
+def clear_agent_cache() -> None:
+    """清空 agent 缓存（供测试和 admin 接口使用）"""
+    _agent_cache.clear()
+
+
+def _build_prompt_middleware(langfuse_prompt):
+    """构建动态 system prompt 中间件
+
+    currDate/currTime 及调用方 prompt_vars 在每次模型调用时注入，
+    不再固化在编译好的 agent 中，使 agent 可以跨请求复用。
+    """
+
+    @dynamic_prompt
+    def inject_prompt_vars(request: ModelRequest) -> str:
+        context = request.runtime.context if request.runtime else None
+        prompt_vars = getattr(context, "prompt_vars", None) or {}
+        now = datetime.now()
+        return langfuse_prompt.get_langchain_prompt(
+            currDate=now.strftime("%Y-%m-%d"),
+            currTime=now.strftime("%H:%M:%S"),
+            **prompt_vars,
+        )
+
+    return inject_prompt_vars
+
 
 class ChatAgent:
     """核心聊天代理
@@ -51,29 +96,65 @@ class ChatAgent:
         tools: list,
         model_id: str | None = None,
         trace_name: str | None = None,
+        model_kwargs: dict[str, Any] | None = None,
     ):
         self.model_id = model_id
         self.prompt_id = prompt_id
         self.tools = tools
         self.trace_name = trace_name
+        self.model_kwargs = model_kwargs or {}
         self._agent = None  # 缓存agent实例
 
-    async def _init_agent(self, **prompt_vars):
-        """初始化 Agent（延迟初始化）"""
+    def _cache_key(self, prompt_version: Any, model_info: dict | None) -> tuple:
+        return (
+            self.prompt_id,
+            prompt_version,
+            self.model_id,
+            model_fingerprint(model_info),
+            tuple(getattr(t, "name", repr(t)) for t in self.tools),
+            tuple(sorted((k, repr(v)) for k, v in self.model_kwargs.items())),
+        )
+
+    async def _init_agent(self):
+        """获取编译好的 Agent（进程级缓存，未命中时构建）"""
         langfuse_prompt = get_prompt(self.prompt_id)
 
         assert self.model_id is not None, "Model ID must be specified"
 
-        model = await ModelBuilder.build_chat_model(self.model_id)
+        model_info = await ModelBuilder._get_model_and_provider_info(self.model_id)
+        key = self._cache_key(getattr(langfuse_prompt, "version", None), model_info)
 
-        prompt = langfuse_prompt.get_langchain_prompt(
-            currDate=datetime.now().strftime("%Y-%m-%d"),
-            currTime=datetime.now().strftime("%H:%M:%S"),
-            **prompt_vars,
-        )
+        now = time.monotonic()
+        cached = _agent_cache.get(key)
+        if cached is not None and now < cached[1]:
+            self._agent = cached[0]
+            return
+
+        model = await ModelBuilder.build_chat_model(self.model_id, **self.model_kwargs)
 
         self._agent = create_agent(
-            model, self.tools, system_prompt=prompt, context_schema=ContextSchema
+            model,
+            self.tools,
+            middleware=[_build_prompt_middleware(langfuse_prompt)],
+            context_schema=ContextSchema,
+        )
+
+        # 顺带淘汰过期条目（prompt 版本 / 模型配置变化后遗留的旧 key）
+        for stale in [k for k, (_, exp) in _agent_cache.items() if exp <= now]:
+            del _agent_cache[stale]
+        _agent_cache[key] = (self._agent, now + _AGENT_CACHE_TTL_SECONDS)
+
+    async def warmup(self) -> None:
+        """预先构建（或命中缓存）Agent，可与上下文构建等阶段并发执行"""
+        await self._init_agent()
+
+    @staticmethod
+    def _with_prompt_vars(
+        context: ContextSchema | None, prompt_vars: dict | None
+    ) -> ContextSchema:
+        """将本次调用的 prompt 变量挂到上下文，由 prompt 中间件在调用时注入"""
+        return dataclasses.replace(
+            context or ContextSchema(), prompt_vars=prompt_vars or {}
         )
 
     def _build_config(self, parent_config: RunnableConfig | None = None) -> dict:
@@ -110,7 +191,8 @@ class ChatAgent:
         Yields:
             AIMessageChunk 或 ToolMessage
         """
-        await self._init_agent(**(prompt_vars or {}))
+        await self._init_agent()
+        context = self._with_prompt_vars(context, prompt_vars)
 
         run_config = self._build_config(config)
 
@@ -164,7 +246,8 @@ class ChatAgent:
         Returns:
             最终的 AI 响应消息
         """
-        await self._init_agent(**(prompt_vars or {}))
+        await self._init_agent()
+        context = self._with_prompt_vars(context, prompt_vars)
 
         run_config = self._build_config(config)
 
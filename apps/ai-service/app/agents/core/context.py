@@ -78,6 +78,8 @@ class ContextSchema:
     image_url_list: list[str] | None = None
     user_id_map: bidict[str, str] | None = None
     gray_config: dict[str, str] | None = None
+    # Prompt 模板变量（由 ChatAgent 在调用时填充，供动态 system prompt 注入）
+    prompt_vars: dict[str, Any] | None = None
 
     def to_agent_context(self) -> AgentContext | None:
         """转换为新的 AgentContext 格式"""
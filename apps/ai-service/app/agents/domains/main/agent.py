@@ -1,7 +1,6 @@
 """主聊天 Agent"""
 
 import asyncio
-import copy
 import logging
 import uuid
 from collections.abc import AsyncGenerator
@@ -15,16 +14,14 @@ from app.agents.core import ChatAgent, ContextSchema
 from app.agents.domains.main.context_builder import build_chat_context
 from app.agents.domains.main.tools import ALL_TOOLS
 from app.agents.graphs.pre import Complexity, run_pre
-from app.orm.crud import get_gray_config, get_message_content
+from app.services.chat_context_loader import ChatContextSnapshot, load_chat_context
 from app.types.chat import ChatStreamChunk
-from app.utils.async_interval import AsyncIntervalChecker
 from app.utils.content_parser import parse_content
+from app.utils.stage_timer import StageTimer
 from app.utils.status_processor import AIMessageChunkProcessor
 
 logger = logging.getLogger(__name__)
 
-YIELD_INTERVAL = 0.5
-
 # 统一的拒绝响应
 GUARD_REJECT_MESSAGE = "你发了一些赤尾不想讨论的话题呢~"
 
@@ -52,58 +49,84 @@ async def stream_chat(
     langfuse = get_langfuse()
     request_id = session_id or str(uuid.uuid4())
 
+    # 各阶段耗时 / 首 token 时间点，请求结束时写入日志和 trace metadata
+    timer = StageTimer()
+
     with langfuse.start_as_current_observation(as_type="span", name="chat-request"):
         with propagate_attributes(session_id=request_id):
-            # 1. 获取消息内容
-            raw_content = await get_message_content(message_id)
-            if not raw_content:
-                logger.warning(f"No message found for message_id: {message_id}")
-                yield ChatStreamChunk(content="抱歉，未找到相关消息记录")
-                return
+            try:
+                async for chunk in _run_pipeline(message_id, request_id, timer):
+                    timer.mark("first_yield")
+                    yield chunk
+            finally:
+                _report_ttft(message_id, timer)
 
-            # 解析 v2 内容，提取纯文本供 pre 使用
-            parsed = parse_content(raw_content)
 
-            # 2. 获取 gray_config（需要提前获取以决定 pre 模式）
-            gray_config = (await get_gray_config(message_id)) or {}
-            pre_blocking = gray_config.get("pre_blocking", "false")
+async def _run_pipeline(
+    message_id: str, request_id: str, timer: StageTimer
+) -> AsyncGenerator[ChatStreamChunk, None]:
+    """分阶段执行一轮对话：上下文加载 → pre（阻塞/并行）→ 构建并流式生成"""
+    # 1. 一次性加载触发消息、灰度配置、历史与画像
+    snapshot = await timer.measure("context_load", load_chat_context(message_id))
+    if snapshot is None or not snapshot.trigger.content:
+        logger.warning(f"No message found for message_id: {message_id}")
+        yield ChatStreamChunk(content="抱歉，未找到相关消息记录", replace=True)
+        return
 
-            # 3. 启动 pre task（create_task 复制当前 context，继承父 trace）
-            pre_task = asyncio.create_task(run_pre(parsed.render()))
+    # 解析 v2 内容，提取纯文本供 pre 使用
+    parsed = parse_content(snapshot.trigger.content)
 
-            if pre_blocking != "false":
-                # === 保守模式：等 pre 完成再继续 ===
-                pre_result = await pre_task
+    # 2. gray_config 决定 pre 模式
+    gray_config = snapshot.gray_config
+    pre_blocking = gray_config.get("pre_blocking", "false")
+    pre_fused = gray_config.get("pre_fused_guard", "false") != "false"
 
-                if pre_result["is_blocked"]:
-                    logger.info(
-                        f"消息被拦截: message_id={message_id}, "
-                        f"reason={pre_result['block_reason']}"
-                    )
-                    yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE)
-                    return
+    # 3. 启动 pre task（create_task 复制当前 context，继承父 trace）
+    pre_task = asyncio.create_task(run_pre(parsed.render(), fused=pre_fused))
+    pre_task.add_done_callback(lambda _: timer.mark("pre_done"))
 
-                complexity_result = pre_result["complexity_result"]
-                complexity = (
-                    complexity_result.complexity
-                    if complexity_result
-                    else Complexity.SIMPLE
-                )
-                logger.info(f"复杂度路由: complexity={complexity.value}")
-
-                async for chunk in _build_and_stream(
-                    message_id, complexity, gray_config, request_id
-                ):
-                    yield chunk
-            else:
-                # === 并行模式：pre 在后台运行，主模型同时流式生成 ===
-                logger.info(f"并行模式启动: message_id={message_id}")
-                raw_stream = _build_and_stream(
-                    message_id, Complexity.SIMPLE, gray_config, request_id
-                )
+    if pre_blocking != "false":
+        # === 保守模式：等 pre 完成再继续 ===
+        pre_result = await timer.measure("pre", pre_task)
 
-                async for chunk in _buffer_until_pre(raw_stream, pre_task, message_id):
-                    yield chunk
+        if pre_result["is_blocked"]:
+            logger.info(
+                f"消息被拦截: message_id={message_id}, "
+                f"reason={pre_result['block_reason']}"
+            )
+            yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE, replace=True)
+            return
+
+        complexity_result = pre_result["complexity_result"]
+        complexity = (
+            complexity_result.complexity if complexity_result else Complexity.SIMPLE
+        )
+        logger.info(f"复杂度路由: complexity={complexity.value}")
+
+        async for chunk in _build_and_stream(snapshot, complexity, request_id, timer):
+            yield chunk
+    else:
+        # === 并行模式：pre 在后台运行，主模型同时流式生成 ===
+        logger.info(f"并行模式启动: message_id={message_id}")
+        raw_stream = _build_and_stream(snapshot, Complexity.SIMPLE, request_id, timer)
+
+        async for chunk in _buffer_until_pre(raw_stream, pre_task, message_id):
+            yield chunk
+
+
+def _report_ttft(message_id: str, timer: StageTimer) -> None:
+    """输出 TTFT 分解：JSON 日志字段 + 当前 Langfuse span metadata"""
+    report = timer.report()
+    logger.info(
+        f"chat ttft: message_id={message_id}, "
+        f"first_token={report['marks_ms'].get('first_token')}ms, "
+        f"stages={report['stages_ms']}",
+        extra={"ttft": report, "message_id": message_id},
+    )
+    try:
+        get_langfuse().update_current_span(metadata={"ttft": report})
+    except Exception as e:
+        logger.warning(f"写入 ttft metadata 失败: {e}")
 
 
 async def _buffer_until_pre(
@@ -133,7 +156,7 @@ async def _buffer_until_pre(
                         f"并行模式拦截: message_id={message_id}, "
                         f"reason={pre_result['block_reason']}"
                     )
-                    yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE)
+                    yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE, replace=True)
                     return
 
                 # pre 通过，释放 buffer
@@ -144,9 +167,8 @@ async def _buffer_until_pre(
             if pre_resolved:
                 yield chunk
             else:
-                # copy: accumulate_chunk 是同一个可变对象被反复 yield，
-                # 需要快照当前状态（content 是 str，浅拷贝即可）
-                buffer.append(copy.copy(chunk))
+                # chunk 为增量，缓冲占用随回复长度线性增长
+                buffer.append(chunk)
     except Exception:
         # 确保 pre_task 不会悬空
         if not pre_task.done():
@@ -169,7 +191,7 @@ async def _buffer_until_pre(
                 f"并行模式拦截（流结束后）: message_id={message_id}, "
                 f"reason={pre_result['block_reason']}"
             )
-            yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE)
+            yield ChatStreamChunk(content=GUARD_REJECT_MESSAGE, replace=True)
             return
 
         for buffered in buffer:
@@ -177,12 +199,18 @@ async def _buffer_until_pre(
 
 
 async def _build_and_stream(
-    message_id: str,
+    snapshot: ChatContextSnapshot,
     complexity: Complexity,
-    gray_config: dict,
-    session_id: str | None = None,
+    session_id: str | None,
+    timer: StageTimer,
 ) -> AsyncGenerator[ChatStreamChunk, None]:
-    """构建 agent + 上下文，执行流式生成（两种模式共用）"""
+    """构建 agent + 上下文，执行流式生成（两种模式共用）
+
+    agent 构建与上下文构建（图片处理有独立预算）并发执行。
+    """
+    message_id = snapshot.message_id
+    gray_config = snapshot.gray_config
+
     # 构建 prompt 变量（注入复杂度引导）
     now = datetime.now()
     prompt_vars = {
@@ -204,33 +232,42 @@ async def _build_and_stream(
         trace_name="main",
     )
 
-    # 构建上下文
+    # agent 构建与上下文构建并发
+    warmup, built = await asyncio.gather(
+        timer.measure("agent_init", agent.warmup()),
+        timer.measure("context_build", build_chat_context(snapshot)),
+        return_exceptions=True,
+    )
+    if isinstance(built, BaseException):
+        raise built
+    if isinstance(warmup, BaseException):
+        # 构建失败交由下方 agent.stream 重新构建，异常统一在 try 中降级
+        logger.warning(f"agent warmup failed: {warmup}")
+
     (
         messages,
         image_urls,
         chat_id,
         trigger_username,
         chat_type,
-    ) = await build_chat_context(message_id)
+    ) = built
 
     if not messages:
         logger.warning(f"No results found for message_id: {message_id}")
-        yield ChatStreamChunk(content="抱歉，未找到相关消息记录")
+        yield ChatStreamChunk(content="抱歉，未找到相关消息记录", replace=True)
         return
 
     # 私聊时注入用户信息，帮助模型了解对话对象
     if chat_type == "p2p" and trigger_username:
         prompt_vars["user_info"] = f"你正在和 {trigger_username} 私聊。"
 
-    accumulate_chunk = ChatStreamChunk(
-        content="",
-        reason_content="",
-    )
-
-    interval_checker = AsyncIntervalChecker(YIELD_INTERVAL)
+    # 只保存增量片段，由 SSE 层按推送模式决定推送完整内容还是增量
+    parts: list[str] = []
+    notice_sent = False
     processor = AIMessageChunkProcessor()
     should_continue = True
 
+    timer.mark("llm_start")
     try:
         async for token in agent.stream(
             messages,
@@ -243,16 +280,20 @@ async def _build_and_stream(
             prompt_vars=prompt_vars,
         ):
             if isinstance(token, AIMessageChunk):
+                if token.text:
+                    timer.mark("first_token")
                 finish_reason = token.response_metadata.get("finish_reason")
 
-                if finish_reason == "stop":
-                    yield accumulate_chunk
-                elif finish_reason == "content_filter":
-                    yield ChatStreamChunk(content="小尾有点不想讨论这个话题呢~")
+                if finish_reason == "content_filter":
+                    yield ChatStreamChunk(
+                        content="小尾有点不想讨论这个话题呢~", replace=True
+                    )
                     should_continue = False
+                    notice_sent = True
                 elif finish_reason == "length":
-                    yield ChatStreamChunk(content="(后续内容被截断)")
+                    yield ChatStreamChunk(content="(后续内容被截断)", replace=True)
                     should_continue = False
+                    notice_sent = True
 
                 if not should_continue:
                     continue
@@ -261,15 +302,16 @@ async def _build_and_stream(
                 if status_message:
                     yield ChatStreamChunk(status_message=status_message)
 
-                accumulate_chunk.content += token.text or ""
-
-                if interval_checker.check():
-                    yield accumulate_chunk
+                if token.text:
+                    parts.append(token.text)
+                    yield ChatStreamChunk(content=token.text)
 
-        yield accumulate_chunk
+        full_response = "".join(parts)
+        # 与原先一致：提示之后以已生成的内容收尾
+        if notice_sent and full_response:
+            yield ChatStreamChunk(content=full_response, replace=True)
 
         # Fire-and-forget: publish to post safety check queue
-        full_response = accumulate_chunk.content or ""
         if full_response and session_id:
             asyncio.create_task(
                 _publish_post_check(session_id, full_response, chat_id, message_id)
@@ -279,7 +321,7 @@ async def _build_and_stream(
         import traceback
 
         logger.error(f"stream_chat error: {str(e)}\n{traceback.format_exc()}")
-        yield ChatStreamChunk(content="赤尾好像遇到了一些问题呢QAQ")
+        yield ChatStreamChunk(content="赤尾好像遇到了一些问题呢QAQ", replace=True)
 
 
 async def _publish_post_check(
@@ -3,7 +3,6 @@
 负责构建聊天上下文，包括历史消息获取、格式化和结构化。
 """
 
-import asyncio
 import logging
 from dataclasses import dataclass
 
@@ -11,15 +10,17 @@ from langchain.messages import AIMessage, HumanMessage
 
 from app.agents.infra.langfuse_client import get_prompt
 from app.clients.image_client import image_client
-from app.orm.crud import fetch_group_profile, fetch_user_profiles
-from app.services.quick_search import QuickSearchResult, quick_search
+from app.config.config import settings
+from app.services.chat_context_loader import ChatContextSnapshot
+from app.services.quick_search import QuickSearchResult
 from app.utils.content_parser import parse_content
 
 logger = logging.getLogger(__name__)
 
 
 async def build_chat_context(
-    message_id: str, limit: int = 10
+    snapshot: ChatContextSnapshot,
+    image_budget: float | None = None,
 ) -> tuple[list[HumanMessage | AIMessage], list[str], str, str, str]:
     """构建聊天上下文，支持私聊和群聊使用不同组装策略
 
@@ -29,17 +30,17 @@ async def build_chat_context(
     注意: banned_word 检测已移至 guard graph，此处不再检测
 
     Args:
-        message_id: 触发消息的ID
-        limit: 获取的历史消息数量限制
+        snapshot: load_chat_context 返回的上下文快照（历史消息、画像等已一次取回）
+        image_budget: 图片处理总预算（秒），超时未完成的图片直接丢弃，默认取配置
 
     Returns:
         tuple: (消息列表, 图片URL列表, chat_id, 触发用户名, 聊天类型)
     """
-    # L1: 使用 quick_search 拉取近期历史
-    l1_results = await quick_search(message_id=message_id, limit=limit)
+    # L1: 快照中的近期历史
+    l1_results = snapshot.history
 
     if not l1_results:
-        logger.warning(f"No results found for message_id: {message_id}")
+        logger.warning(f"No results found for message_id: {snapshot.message_id}")
         return [], [], "", "", "p2p"
 
     chat_type = l1_results[-1].chat_type or "p2p"  # 默认私聊
@@ -54,26 +55,15 @@ async def build_chat_context(
             all_image_keys.append((key, msg.message_id, msg.role))
 
     # 批量处理所有图片，建立key到URL的映射
-    image_key_to_url: dict[str, str] = {}
-    if all_image_keys:
-        image_tasks = [
-            image_client.process_image(key, msg_id if role == "user" else None)
-            for key, msg_id, role in all_image_keys
-        ]
-        image_results = await asyncio.gather(*image_tasks, return_exceptions=True)
-
-        # 建立映射关系，失败的图片不加入映射
-        for i, result in enumerate(image_results):
-            key, msg_id, _ = all_image_keys[i]
-            if isinstance(result, str) and result:
-                image_key_to_url[key] = result
-            else:
-                logger.warning(f"图片处理失败: key={key}, message_id={msg_id}")
+    image_key_to_url = await _resolve_images(
+        all_image_keys,
+        settings.chat_image_budget_seconds if image_budget is None else image_budget,
+    )
 
     # 2. 根据chat_type使用不同策略组装消息列表
     if chat_type == "group":
         # 群聊：使用prompt模板组装成一条HumanMessage
-        messages = await _build_group_messages(l1_results, message_id, image_key_to_url)
+        messages = _build_group_messages(snapshot, image_key_to_url)
     else:
         # 私聊：直接组装成HumanMessage和AIMessage列表
         messages = await _build_p2p_messages(l1_results, image_key_to_url)
@@ -93,9 +83,37 @@ async def build_chat_context(
     )
 
 
-async def _build_group_messages(
-    messages: list[QuickSearchResult],
-    trigger_id: str,
+async def _resolve_images(
+    all_image_keys: list[tuple[str, str, str]], budget: float
+) -> dict[str, str]:
+    """在时间预算内批量解析图片，返回 key 到 URL 的映射
+
+    单张图片慢（process_image 超时 10s）不应拖住整轮回复：
+    预算耗尽时只取已解析的部分，其余图片按处理失败降级（不加入映射），
+    未完成的解析在后台继续并写入缓存，下一轮对话可直接命中。
+    """
+    if not all_image_keys:
+        return {}
+
+    image_key_to_url = await image_client.resolve_images(
+        [
+            (key, msg_id if role == "user" else None)
+            for key, msg_id, role in all_image_keys
+        ],
+        timeout=budget,
+    )
+
+    missing = {key for key, _, _ in all_image_keys} - image_key_to_url.keys()
+    if missing:
+        logger.warning(
+            f"图片处理失败或超出预算 {budget}s，丢弃 {len(missing)} 张图片: "
+            f"{sorted(missing)}"
+        )
+    return image_key_to_url
+
+
+def _build_group_messages(
+    snapshot: ChatContextSnapshot,
     image_key_to_url: dict[str, str],
 ) -> list[HumanMessage | AIMessage]:
     """构建群聊消息列表
@@ -103,15 +121,19 @@ async def _build_group_messages(
     使用 prompt 模板将历史组装成一条 HumanMessage
 
     Args:
-        messages: 消息列表
-        trigger_id: 触发消息的ID
+        snapshot: 上下文快照
         image_key_to_url: 图片key到URL的映射
 
     Returns:
         包含一条 HumanMessage 的列表
     """
     # 复用现有的 context 构建逻辑
-    context = await _build_context_from_messages(messages, trigger_id)
+    context = _build_context_from_messages(
+        snapshot.history,
+        snapshot.message_id,
+        group_profile=snapshot.group_profile,
+        user_profiles=snapshot.user_profiles,
+    )
 
     # 使用 langfuse prompt 模板
     user_content = get_prompt("context_builder").compile(
@@ -276,14 +298,19 @@ def _format_chat_message(
     return formatted_text, image_keys
 
 
-async def _build_context_from_messages(
-    messages: list[QuickSearchResult], trigger_id: str
+def _build_context_from_messages(
+    messages: list[QuickSearchResult],
+    trigger_id: str,
+    group_profile: str | None = None,
+    user_profiles: dict[str, str | None] | None = None,
 ) -> ChatContext:
     """从消息列表构建聊天上下文
 
     Args:
         messages: 消息列表
         trigger_id: 触发消息的ID
+        group_profile: 群聊画像
+        user_profiles: 用户ID到画像的映射
 
     Returns:
         ChatContext对象
@@ -292,7 +319,6 @@ async def _build_context_from_messages(
     trigger_username = "未知用户"
     trigger_formatted = "（未找到触发消息）"
     chat_name = None
-    chat_id = None
     user_ids = {}
 
     # 初始化图片计数器（用于【图片N】标记）
@@ -313,7 +339,6 @@ async def _build_context_from_messages(
         if msg.message_id == trigger_id:
             trigger_username = msg.username or "未知用户"
             chat_name = msg.chat_name
-            chat_id = msg.chat_id
             trigger_formatted = formatted_text
         else:
             history_messages.append(formatted_text)
@@ -322,24 +347,12 @@ async def _build_context_from_messages(
         "\n".join(history_messages) if history_messages else "（暂无历史记录）"
     )
 
-    group_task = None
-    user_task = None
-
-    async with asyncio.TaskGroup() as tg:
-        if chat_id:
-            group_task = tg.create_task(fetch_group_profile(chat_id))
-        if user_ids:
-            user_task = tg.create_task(fetch_user_profiles(list(user_ids.keys())))
-
-    group_profile = group_task.result() if group_task else None
-    user_profiles = user_task.result() if user_task else None
-
     after_reduce_user_profiles = (
         "\n------------------\n".join(
             [
                 f"{user_ids[user_id]}: {profile}"
                 for user_id, profile in user_profiles.items()
-                if profile
+                if profile and user_id in user_ids
             ]
         )
         if user_profiles
@@ -0,0 +1,239 @@
+"""Pre 结果缓存与快速通道
+
+Pre 图对每条消息发起 3 次（融合模式 1 次）LLM 调用（注入 / 政治 / 复杂度），
+但大量消息是表情、纯图片或"哈哈""+1"之类在各群反复出现的短文本：
+
+1. 快速通道：渲染后为空或为极短的无害文本，直接给出放行 + SIMPLE，不调用 LLM
+2. 结果缓存：按 (prompt 版本, 消息内容) 哈希缓存 LLM 结论，进程内 LRU + Redis 两级
+
+封禁词检测不走缓存（词表随时变化，且本身无 LLM 开销），每次都重新执行。
+"""
+
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+
+from app.agents.graphs.pre.nodes.fused import FUSED_PROMPT_ID
+from app.agents.graphs.pre.state import (
+    BlockReason,
+    Complexity,
+    ComplexityResult,
+    SafetyResult,
+)
+from app.agents.infra.langfuse_client import get_prompt
+from app.clients.redis import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+
+# 参与缓存 key 的 prompt（任一 prompt 发布新版本，旧结论自然失效）
+LLM_PROMPT_IDS = (
+    "guard_prompt_injection",
+    "guard_sensitive_politics",
+    "pre_complexity_classification",
+)
+FUSED_PROMPT_IDS = (FUSED_PROMPT_ID,)
+
+
+def llm_prompt_ids(fused: bool = False) -> tuple[str, ...]:
+    """拆分 / 融合拓扑各自使用的 prompt，其数量即一次完整 pre 的 LLM 调用数"""
+    return FUSED_PROMPT_IDS if fused else LLM_PROMPT_IDS
+
+
+_L1_MAX_SIZE = 4096
+_L1_TTL_SECONDS = 600  # 10 分钟
+_REDIS_TTL_SECONDS = 24 * 3600  # 1 天
+_REDIS_KEY_PREFIX = "pre:result:"
+
+# 快速通道：仅由以下字符与标点/符号/空白组成、且不超过长度上限的文本视为无害
+_FAST_PATH_MAX_LEN = 20
+_BENIGN_CHARS = frozenset(
+    "哈嗯好哦噢喔啊呀嘿嘻呵草笑嗷喵唔呜诶欸哇耶嘛吧啦了对是行棒赞牛强绝"
+    "hkol"  # hhh / ok / lol
+    "1236"  # +1 / 233 / 666
+)
+
+
+# ---------------------------------------------------------------------------
+# LLM 结论
+# ---------------------------------------------------------------------------
+@dataclass
+class LLMVerdict:
+    """Pre 中 LLM 节点的结论（不含封禁词结果）"""
+
+    safety_results: list[SafetyResult] = field(default_factory=list)
+    complexity_result: ComplexityResult = field(default_factory=ComplexityResult)
+
+    @property
+    def degraded(self) -> bool:
+        return self.complexity_result.degraded or any(
+            r.degraded for r in self.safety_results
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "safety_results": [asdict(r) for r in self.safety_results],
+                "complexity_result": asdict(self.complexity_result),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "LLMVerdict":
+        data = json.loads(raw)
+        safety_results = [
+            SafetyResult(
+                blocked=r["blocked"],
+                reason=BlockReason(r["reason"]) if r["reason"] else None,
+                detail=r["detail"],
+            )
+            for r in data["safety_results"]
+        ]
+        complexity = data["complexity_result"]
+        return cls(
+            safety_results=safety_results,
+            complexity_result=ComplexityResult(
+                complexity=Complexity(complexity["complexity"]),
+                confidence=complexity["confidence"],
+            ),
+        )
+
+
+def fast_path_verdict(message_content: str) -> LLMVerdict | None:
+    """确定性快速通道：空文本或极短无害文本直接放行，否则返回 None"""
+    text = "".join(message_content.split()).lower()
+    if len(text) > _FAST_PATH_MAX_LEN:
+        return None
+
+    for ch in text:
+        if ch in _BENIGN_CHARS:
+            continue
+        # 标点(P)、符号(S，含 emoji)
+        if unicodedata.category(ch)[0] in ("P", "S"):
+            continue
+        return None
+
+    return LLMVerdict(complexity_result=ComplexityResult(Complexity.SIMPLE, 1.0))
+
+
+# ---------------------------------------------------------------------------
+# 统计
+# ---------------------------------------------------------------------------
+@dataclass
+class PreCacheStats:
+    """Pre 缓存统计"""
+
+    total: int = 0
+    fast_path: int = 0
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    llm_calls_saved: int = 0
+
+    def to_dict(self) -> dict:
+        skipped = self.fast_path + self.l1_hits + self.l2_hits
+        return {
+            **asdict(self),
+            "hit_rate": round(skipped / self.total, 4) if self.total else 0.0,
+        }
+
+
+_stats = PreCacheStats()
+
+# { cache_key: (verdict, expire_at) }，按访问顺序淘汰
+_l1_cache: OrderedDict[str, tuple[LLMVerdict, float]] = OrderedDict()
+
+
+def get_pre_cache_stats() -> dict:
+    return _stats.to_dict()
+
+
+def clear_pre_cache() -> None:
+    """清空进程内缓存和统计（供测试和 admin 接口使用）"""
+    global _stats
+    _l1_cache.clear()
+    _stats = PreCacheStats()
+
+
+def record_fast_path(fused: bool = False) -> None:
+    _stats.total += 1
+    _stats.fast_path += 1
+    _stats.llm_calls_saved += len(llm_prompt_ids(fused))
+
+
+# ---------------------------------------------------------------------------
+# 两级缓存
+# ---------------------------------------------------------------------------
+def build_cache_key(message_content: str, fused: bool = False) -> str | None:
+    """按 prompt 版本 + 消息内容生成缓存 key，prompt 获取失败时返回 None（不缓存）
+
+    拆分 / 融合拓扑使用不同 prompt，key 自然隔离。
+    """
+    try:
+        versions = ",".join(
+            f"{pid}@{get_prompt(pid).version}" for pid in llm_prompt_ids(fused)
+        )
+    except Exception as e:
+        logger.warning(f"获取 pre prompt 版本失败，跳过缓存: {e}")
+        return None
+    digest = hashlib.sha256(f"{versions}\0{message_content}".encode()).hexdigest()
+    return digest
+
+
+async def get_cached_verdict(key: str, fused: bool = False) -> LLMVerdict | None:
+    """查询缓存（L1 → Redis），命中 Redis 时回填 L1"""
+    _stats.total += 1
+    llm_calls = len(llm_prompt_ids(fused))
+    now = time.monotonic()
+
+    cached = _l1_cache.get(key)
+    if cached is not None:
+        verdict, expire_at = cached
+        if now < expire_at:
+            _l1_cache.move_to_end(key)
+            _stats.l1_hits += 1
+            _stats.llm_calls_saved += llm_calls
+            return verdict
+        del _l1_cache[key]
+
+    try:
+        redis = AsyncRedisClient.get_instance()
+        raw = await redis.get(f"{_REDIS_KEY_PREFIX}{key}")
+    except Exception as e:
+        logger.warning(f"读取 pre 缓存失败: {e}")
+        raw = None
+
+    if raw:
+        verdict = LLMVerdict.from_json(raw)
+        _put_l1(key, verdict, now)
+        _stats.l2_hits += 1
+        _stats.llm_calls_saved += llm_calls
+        return verdict
+
+    _stats.misses += 1
+    return None
+
+
+async def put_cached_verdict(key: str, verdict: LLMVerdict) -> None:
+    """写入两级缓存；降级结果不缓存，避免把一次 LLM 故障固化下来"""
+    if verdict.degraded:
+        return
+
+    _put_l1(key, verdict, time.monotonic())
+    try:
+        redis = AsyncRedisClient.get_instance()
+        await redis.set(
+            f"{_REDIS_KEY_PREFIX}{key}", verdict.to_json(), ex=_REDIS_TTL_SECONDS
+        )
+    except Exception as e:
+        logger.warning(f"写入 pre 缓存失败: {e}")
+
+
+def _put_l1(key: str, verdict: LLMVerdict, now: float) -> None:
+    _l1_cache[key] = (verdict, now + _L1_TTL_SECONDS)
+    _l1_cache.move_to_end(key)
+    while len(_l1_cache) > _L1_MAX_SIZE:
+        _l1_cache.popitem(last=False)
@@ -3,6 +3,13 @@
 前置处理链路，包含：
 1. 安全检测（并行）
 2. 复杂度分类（与安全检测并行）
+
+两种拓扑按请求选择（gray_config.pre_fused_guard）：
+- 拆分：注入 / 政治 / 复杂度各一次 LLM 调用
+- 融合：一次结构化输出同时给出三项结论
+
+run_pre 在进入图之前先走快速通道 / 结果缓存（见 cache.py），
+命中时只执行封禁词检测，跳过全部 LLM 节点。
 """
 
 from functools import lru_cache
@@ -11,14 +18,23 @@ from typing import Literal
 from langfuse.langchain import CallbackHandler
 from langgraph.graph import END, START, StateGraph
 
+from app.agents.graphs.pre.cache import (
+    LLMVerdict,
+    build_cache_key,
+    fast_path_verdict,
+    get_cached_verdict,
+    put_cached_verdict,
+    record_fast_path,
+)
 from app.agents.graphs.pre.nodes import (
     aggregate_results,
     check_banned_word_node,
     check_prompt_injection,
     check_sensitive_politics,
     classify_complexity,
+    classify_fused,
 )
-from app.agents.graphs.pre.state import PreState
+from app.agents.graphs.pre.state import BlockReason, PreState
 
 
 def route_after_aggregate(state: PreState) -> Literal["reject", "pass"]:
@@ -28,9 +44,12 @@ def route_after_aggregate(state: PreState) -> Literal["reject", "pass"]:
     return "pass"
 
 
-def _create_pre_graph() -> StateGraph:
+def _create_pre_graph(fused: bool = False) -> StateGraph:
     """创建 Pre 处理图
 
+    Args:
+        fused: True 时用 classify_fused 单节点替代三个 LLM 节点
+
     图结构：
                         ┌─────────────────┐
                         │     START       │
@@ -63,28 +82,32 @@ def _create_pre_graph() -> StateGraph:
     """
     builder = StateGraph(PreState)
 
-    # 安全检测节点（并行）
+    # 关键词检测（两种拓扑共用，无 LLM）
     builder.add_node("check_banned_word", check_banned_word_node)
-    builder.add_node("check_prompt_injection", check_prompt_injection)
-    builder.add_node("check_sensitive_politics", check_sensitive_politics)
 
-    # 复杂度分类节点（与安全检测并行）
-    builder.add_node("classify_complexity", classify_complexity)
+    if fused:
+        # 融合检测节点：一次调用给出注入 / 政治 / 复杂度
+        builder.add_node("classify_fused", classify_fused)
+        llm_nodes = ["classify_fused"]
+    else:
+        # 安全检测节点（并行）
+        builder.add_node("check_prompt_injection", check_prompt_injection)
+        builder.add_node("check_sensitive_politics", check_sensitive_politics)
+        # 复杂度分类节点（与安全检测并行）
+        builder.add_node("classify_complexity", classify_complexity)
+        llm_nodes = [
+            "check_prompt_injection",
+            "check_sensitive_politics",
+            "classify_complexity",
+        ]
 
     # 聚合节点
     builder.add_node("aggregate", aggregate_results)
 
-    # 从 START 并行分发
-    builder.add_edge(START, "check_banned_word")
-    builder.add_edge(START, "check_prompt_injection")
-    builder.add_edge(START, "check_sensitive_politics")
-    builder.add_edge(START, "classify_complexity")
-
-    # 汇聚到 aggregate
-    builder.add_edge("check_banned_word", "aggregate")
-    builder.add_edge("check_prompt_injection", "aggregate")
-    builder.add_edge("check_sensitive_politics", "aggregate")
-    builder.add_edge("classify_complexity", "aggregate")
+    # 从 START 并行分发，汇聚到 aggregate
+    for node in ["check_banned_word", *llm_nodes]:
+        builder.add_edge(START, node)
+        builder.add_edge(node, "aggregate")
 
     # 条件路由
     builder.add_conditional_edges(
@@ -96,28 +119,25 @@ def _create_pre_graph() -> StateGraph:
     return builder
 
 
-@lru_cache(maxsize=1)
-def get_pre_graph():
-    """获取编译后的 Pre 图（单例）"""
-    return _create_pre_graph().compile()
+@lru_cache(maxsize=2)
+def get_pre_graph(fused: bool = False):
+    """获取编译后的 Pre 图（每种拓扑一个单例）"""
+    return _create_pre_graph(fused).compile()
 
 
-async def run_pre(message_content: str) -> PreState:
-    """运行 Pre 处理图
+async def run_pre(message_content: str, fused: bool = False) -> PreState:
+    """运行 Pre 处理
+
+    快速通道 / 缓存命中时只重新执行封禁词检测，复用 LLM 结论；
+    未命中时运行完整的 Pre 图，并缓存其中的 LLM 结论。
 
     Args:
         message_content: 待处理的消息内容
+        fused: 是否使用融合检测拓扑
 
     Returns:
         PreState: 包含安全检测结果和复杂度分类结果
     """
-    graph = get_pre_graph()
-
-    config = {
-        "callbacks": [CallbackHandler()],
-        "run_name": "pre",
-    }
-
     initial_state: PreState = {
         "message_content": message_content,
         "safety_results": [],
@@ -126,5 +146,45 @@ async def run_pre(message_content: str) -> PreState:
         "block_reason": None,
     }
 
+    verdict = fast_path_verdict(message_content)
+    if verdict is not None:
+        record_fast_path(fused)
+        return await _apply_verdict(initial_state, verdict)
+
+    cache_key = build_cache_key(message_content, fused)
+    if cache_key is not None:
+        verdict = await get_cached_verdict(cache_key, fused)
+        if verdict is not None:
+            return await _apply_verdict(initial_state, verdict)
+
+    graph = get_pre_graph(fused)
+    config = {
+        "callbacks": [CallbackHandler()],
+        "run_name": "pre",
+    }
     result = await graph.ainvoke(initial_state, config=config)
+
+    if cache_key is not None and result.get("complexity_result") is not None:
+        await put_cached_verdict(
+            cache_key,
+            LLMVerdict(
+                safety_results=[
+                    r
+                    for r in result["safety_results"]
+                    if r.reason != BlockReason.BANNED_WORD
+                ],
+                complexity_result=result["complexity_result"],
+            ),
+        )
     return result
+
+
+async def _apply_verdict(state: PreState, verdict: LLMVerdict) -> PreState:
+    """复用 LLM 结论：重新执行封禁词检测后聚合"""
+    banned = await check_banned_word_node(state)
+    state = {
+        **state,
+        "safety_results": banned["safety_results"] + verdict.safety_results,
+        "complexity_result": verdict.complexity_result,
+    }
+    return {**state, **aggregate_results(state)}
@@ -1,6 +1,7 @@
 """Pre Graph 节点"""
 
 from app.agents.graphs.pre.nodes.complexity import classify_complexity
+from app.agents.graphs.pre.nodes.fused import classify_fused
 from app.agents.graphs.pre.nodes.safety import (
     aggregate_results,
     check_banned_word_node,
@@ -10,6 +11,7 @@ from app.agents.graphs.pre.nodes.safety import (
 
 __all__ = [
     "classify_complexity",
+    "classify_fused",
     "check_banned_word_node",
     "check_prompt_injection",
     "check_sensitive_politics",
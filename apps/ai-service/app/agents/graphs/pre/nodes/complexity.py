@@ -73,5 +73,6 @@ async def classify_complexity(state: PreState, config) -> dict:
             "complexity_result": ComplexityResult(
                 complexity=Complexity.SIMPLE,
                 confidence=0.5,
+                degraded=True,
             )
         }
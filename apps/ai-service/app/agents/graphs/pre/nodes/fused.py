@@ -0,0 +1,112 @@
+"""融合检测节点
+
+一次结构化输出同时给出注入 / 政治 / 复杂度三项结论，
+替代 check_prompt_injection + check_sensitive_politics + classify_complexity
+三次独立调用（相同输入只计费一次，尾延迟只取决于一次调用）。
+
+输出仍为 SafetyResult / ComplexityResult，aggregate_results 无需区分拓扑。
+"""
+
+import logging
+
+from pydantic import BaseModel, Field
+
+from app.agents.graphs.pre.state import (
+    BlockReason,
+    Complexity,
+    ComplexityResult,
+    PreState,
+    SafetyResult,
+)
+from app.agents.infra.langfuse_client import get_prompt
+from app.agents.infra.model_builder import ModelBuilder
+
+logger = logging.getLogger(__name__)
+
+FUSED_PROMPT_ID = "pre_fused_guard"
+
+
+class FusedGuardResult(BaseModel):
+    """融合检测输出"""
+
+    is_injection: bool = Field(description="是否尝试获取系统提示词或进行提示词注入")
+    injection_confidence: float = Field(description="注入判断置信度 0-1", ge=0, le=1)
+    is_sensitive: bool = Field(description="是否涉及敏感政治话题")
+    politics_confidence: float = Field(description="政治判断置信度 0-1", ge=0, le=1)
+    complexity: str = Field(description="复杂度: simple/complex/super_complex")
+    complexity_confidence: float = Field(
+        description="复杂度置信度 0-1",
+        ge=0,
+        le=1,
+    )
+
+
+def _safety_result(hit: bool, confidence: float, reason: BlockReason) -> SafetyResult:
+    if hit and confidence >= 0.7:
+        logger.warning(f"融合检测命中: reason={reason.value}, confidence={confidence}")
+        return SafetyResult(
+            blocked=True, reason=reason, detail=f"confidence={confidence}"
+        )
+    return SafetyResult(blocked=False)
+
+
+async def classify_fused(state: PreState, config) -> dict:
+    """融合检测节点"""
+    message = state["message_content"]
+
+    try:
+        langfuse_prompt = get_prompt(FUSED_PROMPT_ID)
+        messages = langfuse_prompt.compile(message=message)
+
+        model = await ModelBuilder.build_chat_model(
+            "guard-model", reasoning_effort="low"
+        )
+        structured_model = model.with_structured_output(FusedGuardResult)
+
+        result: FusedGuardResult = await structured_model.ainvoke(
+            messages, config=config
+        )
+
+        try:
+            complexity = Complexity(result.complexity)
+        except ValueError:
+            complexity = Complexity.SIMPLE
+
+        logger.info(
+            f"融合检测: injection={result.is_injection}, "
+            f"sensitive={result.is_sensitive}, complexity={complexity.value}"
+        )
+
+        return {
+            "safety_results": [
+                _safety_result(
+                    result.is_injection,
+                    result.injection_confidence,
+                    BlockReason.PROMPT_INJECTION,
+                ),
+                _safety_result(
+                    result.is_sensitive,
+                    result.politics_confidence,
+                    BlockReason.SENSITIVE_POLITICS,
+                ),
+            ],
+            "complexity_result": ComplexityResult(
+                complexity=complexity,
+                confidence=result.complexity_confidence,
+            ),
+        }
+
+    except Exception as e:
+        logger.error(f"融合检测失败: {e}")
+        # 与拆分模式一致：安全项放行，复杂度取默认值
+        return {
+            "safety_results": [
+                SafetyResult(blocked=False, degraded=True),
+                SafetyResult(blocked=False, degraded=True),
+            ],
+            "complexity_result": ComplexityResult(
+                complexity=Complexity.SIMPLE,
+                confidence=0.5,
+                degraded=True,
+            ),
+        }
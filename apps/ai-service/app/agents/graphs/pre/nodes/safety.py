@@ -91,7 +91,7 @@ async def check_prompt_injection(state: PreState, config) -> dict:
 
     except Exception as e:
         logger.error(f"提示词注入检测失败: {e}")
-        return {"safety_results": [SafetyResult(blocked=False)]}
+        return {"safety_results": [SafetyResult(blocked=False, degraded=True)]}
 
 
 async def check_sensitive_politics(state: PreState, config) -> dict:
@@ -127,7 +127,7 @@ async def check_sensitive_politics(state: PreState, config) -> dict:
 
     except Exception as e:
         logger.error(f"敏感政治检测失败: {e}")
-        return {"safety_results": [SafetyResult(blocked=False)]}
+        return {"safety_results": [SafetyResult(blocked=False, degraded=True)]}
 
 
 def aggregate_results(state: PreState) -> dict:
@@ -30,6 +30,7 @@ class SafetyResult:
     blocked: bool = False
     reason: BlockReason | None = None
     detail: str | None = None
+    degraded: bool = False  # 检测异常后按放行降级（此类结果不进入缓存）
 
 
 @dataclass
@@ -38,6 +39,7 @@ class ComplexityResult:
 
     complexity: Complexity = Complexity.SIMPLE
     confidence: float = 1.0
+    degraded: bool = False  # 分类异常后使用默认值
 
 
 def merge_safety_results(
@@ -29,6 +29,16 @@ def clear_model_info_cache() -> None:
     _model_info_cache.clear()
 
 
+def model_fingerprint(model_info: dict[str, Any] | None) -> tuple:
+    """模型配置指纹：DB 中模型配置变更后随之变化，供各级缓存判断是否需要重建"""
+    if not model_info:
+        return ()
+    return tuple(
+        model_info.get(field)
+        for field in ("client_type", "base_url", "model_name", "api_key", "is_active")
+    )
+
+
 class ModelBuilder:
     """
     模型构建器
@@ -1,19 +1,26 @@
 """群聊历史混合检索工具"""
 
+import asyncio
 import logging
 from datetime import datetime
 
 from langchain.tools import tool
 from langgraph.runtime import get_runtime
-from qdrant_client.http.models import FieldCondition, Filter, MatchValue
-from sqlalchemy import select
+from sqlalchemy import Select, func, select
 
-from app.agents.clients import create_client
+from app.agents.clients import EmbeddingRequest, client_pool
+from app.agents.clients.base import HybridEmbedding
+from app.agents.clients.embedding_cache import embedding_cache
 from app.agents.core.context import ContextSchema
 from app.agents.infra.embedding import InstructionBuilder, Modality
 from app.orm.base import AsyncSessionLocal
 from app.orm.models import ConversationMessage, LarkUser
+from app.services.history_search_cache import (
+    history_search_cache,
+    normalize_query,
+)
 from app.services.qdrant import qdrant_service
+from app.services.vector_schema import RecallVectorVersion, read_recall_version
 from app.utils.content_parser import parse_content
 
 logger = logging.getLogger(__name__)
@@ -24,6 +31,133 @@ CONTEXT_WINDOW_MS = 5 * 60 * 1000  # 5分钟
 TIME_GAP_THRESHOLD_MS = 10 * 60 * 1000  # 10分钟
 
 
+# 单次调用返回的上下文消息上限
+MAX_CONTEXT_ROWS = 200
+# 上下文查询的最大并发数（每个查询占用一个连接）
+MAX_PARALLEL_QUERIES = 4
+
+
+def merge_windows(
+    timestamps: list[int], window_ms: int = CONTEXT_WINDOW_MS
+) -> list[tuple[int, int]]:
+    """把锚点的 ±window_ms 时间窗口合并为互不重叠的闭区间（升序）"""
+    ranges: list[list[int]] = []
+    for ts in sorted(t for t in timestamps if t):
+        lo, hi = ts - window_ms, ts + window_ms
+        if ranges and lo <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], hi)
+        else:
+            ranges.append([lo, hi])
+    return [(lo, hi) for lo, hi in ranges]
+
+
+def window_query(
+    chat_id: str, lo: int, hi: int, anchors: list[int], limit: int
+) -> Select:
+    """单个区间的查询，走 (chat_id, create_time) 复合索引的范围扫描
+
+    按离区间内最近锚点的时间距离取前 limit 条：区间内靠后的锚点不会因为
+    前面的消息过多被截掉（与 _cap_rows 的全局取舍一致）。
+    """
+    distances = [func.abs(ConversationMessage.create_time - t) for t in anchors]
+    return (
+        select(ConversationMessage)
+        .where(
+            ConversationMessage.chat_id == chat_id,
+            ConversationMessage.create_time.between(lo, hi),
+        )
+        .order_by(func.least(*distances) if len(distances) > 1 else distances[0])
+        .limit(limit)
+    )
+
+
+def _cap_rows(
+    messages: list[ConversationMessage],
+    anchor_ids: set[str],
+    anchor_timestamps: list[int],
+    max_rows: int,
+) -> list[ConversationMessage]:
+    """超过上限时保留锚点，其余按离最近锚点的时间距离取前 max_rows 条"""
+    if len(messages) <= max_rows:
+        return messages
+    anchors = [t for t in anchor_timestamps if t]
+
+    def distance(msg: ConversationMessage) -> float:
+        if msg.message_id in anchor_ids:
+            return -1
+        return min((abs(msg.create_time - t) for t in anchors), default=0)
+
+    return sorted(messages, key=distance)[:max_rows]
+
+
+async def fetch_context_messages(
+    chat_id: str,
+    anchor_message_ids: list[str],
+    anchor_timestamps: list[int],
+    anchor_root_ids: set[str],
+    max_rows: int = MAX_CONTEXT_ROWS,
+) -> list[tuple[ConversationMessage, LarkUser]]:
+    """
+    查询锚点的上下文消息（时间窗口内的消息 + 锚点本身 + 引用链消息）
+
+    重叠的时间窗口先合并为互不重叠的区间，每个区间单独做一次索引范围扫描并发执行，
+    避免一个大 OR 条件让规划器放弃索引；每个区间取离锚点最近的 max_rows 条，
+    结果去重后再全局按距离截断，按时间升序返回，最多 max_rows 条。
+    """
+    statements = [
+        window_query(
+            chat_id, lo, hi, [t for t in anchor_timestamps if lo <= t <= hi], max_rows
+        )
+        for lo, hi in merge_windows(anchor_timestamps)
+    ]
+    statements.append(
+        select(ConversationMessage).where(
+            ConversationMessage.chat_id == chat_id,
+            ConversationMessage.message_id.in_(anchor_message_ids),
+        )
+    )
+    if anchor_root_ids:
+        statements.append(
+            select(ConversationMessage)
+            .where(
+                ConversationMessage.chat_id == chat_id,
+                ConversationMessage.root_message_id.in_(anchor_root_ids),
+            )
+            .order_by(ConversationMessage.create_time)
+            .limit(max_rows)
+        )
+
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_QUERIES)
+
+    async def run(stmt) -> list:
+        async with semaphore, AsyncSessionLocal() as session:
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    batches = await asyncio.gather(*(run(stmt) for stmt in statements))
+    messages = {msg.message_id: msg for batch in batches for msg in batch}
+    selected = _cap_rows(
+        list(messages.values()), set(anchor_message_ids), anchor_timestamps, max_rows
+    )
+    if not selected:
+        return []
+
+    users = {
+        user.union_id: user
+        for user in await run(
+            select(LarkUser).where(
+                LarkUser.union_id.in_({msg.user_id for msg in selected})
+            )
+        )
+    }
+    # 与原先的 inner join 一致：找不到用户的消息不返回
+    return [
+        (msg, users[msg.user_id])
+        for msg in sorted(selected, key=lambda m: m.create_time)
+        if msg.user_id in users
+    ]
+
+
 def _format_timestamp(ts: int) -> str:
     """格式化时间戳"""
     return datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M")
@@ -35,6 +169,108 @@ def _truncate(text: str, max_len: int = 200) -> str:
     return f"{text[:max_len]}..." if len(text) > max_len else text
 
 
+async def _embed_query(query: str, model_id: str) -> HybridEmbedding:
+    """查询的混合向量：进程内 LRU → Redis embedding 缓存 → 供应商"""
+    target_modality = InstructionBuilder.combine_corpus_modalities(
+        Modality.TEXT, Modality.IMAGE, Modality.TEXT_AND_IMAGE
+    )
+    instructions = InstructionBuilder.for_query(
+        target_modality=target_modality,
+        instruction="为这个句子生成表示以用于检索相关消息",
+    )
+    # 相同归一化查询共用一个向量，因此按归一化后的文本生成
+    text = normalize_query(query)
+
+    async with client_pool.acquire(model_id) as client:
+        hybrid_embedding = history_search_cache.get_embedding(client.model_name, text)
+        if hybrid_embedding is not None:
+            return hybrid_embedding
+
+        request = EmbeddingRequest(hybrid=True, text=text, instructions=instructions)
+        cached = await embedding_cache.get_many(client.model_name, [request])
+        hybrid_embedding = cached.get(request)
+        if hybrid_embedding is None:
+            hybrid_embedding = await client.embed_hybrid(
+                text=text,
+                instructions=instructions,
+            )
+            await embedding_cache.put_many(
+                client.model_name, {request: hybrid_embedding}
+            )
+        history_search_cache.put_embedding(client.model_name, text, hybrid_embedding)
+    return hybrid_embedding
+
+
+async def _search(
+    chat_id: str, query: str, limit: int, version: RecallVectorVersion
+) -> str:
+    """执行一次检索并格式化结果（不经过结果缓存）"""
+    # 1. 用当前检索版本的模型生成查询的 Dense + Sparse 向量
+    hybrid_embedding = await _embed_query(query, version.model_id)
+
+    # 2. 执行混合搜索（按 chat_id 路由到本群的租户分区）
+    # 检索失败必须抛出：否则会被当成"未找到相关消息"写入结果缓存
+    results = await qdrant_service.hybrid_search(
+        collection_name="messages_recall",
+        dense_vector=hybrid_embedding.dense,
+        sparse_indices=hybrid_embedding.sparse.indices,
+        sparse_values=hybrid_embedding.sparse.values,
+        chat_id=chat_id,
+        limit=limit,
+        prefetch_limit=limit * 5,
+        dense_using=version.dense,
+        sparse_using=version.sparse,
+        raise_errors=True,
+    )
+
+    if not results:
+        return "未找到相关消息"
+
+    # 3. 提取锚点消息 ID 和时间戳
+    anchor_message_ids = []
+    anchor_timestamps = []
+    anchor_root_ids = set()
+
+    for r in results:
+        payload = r.get("payload", {})
+        anchor_message_ids.append(payload.get("message_id"))
+        anchor_timestamps.append(payload.get("timestamp", 0))
+        if payload.get("root_message_id"):
+            anchor_root_ids.add(payload.get("root_message_id"))
+
+    # 4. 从 PostgreSQL 查询上下文消息（合并时间窗口，按区间并行查询）
+    rows = await fetch_context_messages(
+        chat_id=chat_id,
+        anchor_message_ids=anchor_message_ids,
+        anchor_timestamps=anchor_timestamps,
+        anchor_root_ids=anchor_root_ids,
+    )
+
+    if not rows:
+        return "未找到相关消息"
+
+    # 5. 格式化输出（时间间隔超过10分钟插入分隔符）
+    anchor_set = set(anchor_message_ids)
+    lines = [f"找到 {len(anchor_set)} 条相关消息及其上下文：\n"]
+
+    prev_ts = None
+    for msg, user in rows:
+        # 检查时间间隔
+        if prev_ts and (msg.create_time - prev_ts) > TIME_GAP_THRESHOLD_MS:
+            lines.append("\n--- 时间间隔 ---\n")
+
+        time_str = _format_timestamp(msg.create_time)
+        content = _truncate(parse_content(msg.content).render())
+
+        # 标记锚点消息
+        marker = "→ " if msg.message_id in anchor_set else "  "
+        lines.append(f"{marker}[{time_str}] {user.name}: {content}")
+
+        prev_ts = msg.create_time
+
+    return "\n".join(lines)
+
+
 @tool
 async def search_group_history(
     query: str,
@@ -63,119 +299,23 @@ async def search_group_history(
         - "报错截图"
     """
     context = get_runtime(ContextSchema).context
+    chat_id = context.curr_chat_id or ""
 
     try:
-        # 1. 生成查询的 Dense + Sparse 向量
-        target_modality = InstructionBuilder.combine_corpus_modalities(
-            Modality.TEXT, Modality.IMAGE, Modality.TEXT_AND_IMAGE
-        )
-        instructions = InstructionBuilder.for_query(
-            target_modality=target_modality,
-            instruction="为这个句子生成表示以用于检索相关消息",
-        )
-
-        async with await create_client("embedding-model") as client:
-            hybrid_embedding = await client.embed_hybrid(
-                text=query,
-                instructions=instructions,
-            )
-
-        # 2. 构建 chat_id 过滤条件
-        query_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="chat_id",
-                    match=MatchValue(value=context.curr_chat_id or ""),
-                )
-            ]
-        )
-
-        # 3. 执行混合搜索
-        results = await qdrant_service.hybrid_search(
-            collection_name="messages_recall",
-            dense_vector=hybrid_embedding.dense,
-            sparse_indices=hybrid_embedding.sparse.indices,
-            sparse_values=hybrid_embedding.sparse.values,
-            query_filter=query_filter,
-            limit=limit,
-            prefetch_limit=limit * 5,
+        # 1. 查结果缓存（同一群、同一检索版本、归一化后相同的查询且群内无新向量写入）
+        version = read_recall_version()
+        cached, watermark = await history_search_cache.get(
+            chat_id, version.name, query, limit
         )
+        if cached is not None:
+            return cached
 
-        if not results:
-            return "未找到相关消息"
-
-        # 4. 提取锚点消息 ID 和时间戳
-        anchor_message_ids = []
-        anchor_timestamps = []
-        anchor_root_ids = set()
-
-        for r in results:
-            payload = r.get("payload", {})
-            anchor_message_ids.append(payload.get("message_id"))
-            anchor_timestamps.append(payload.get("timestamp", 0))
-            if payload.get("root_message_id"):
-                anchor_root_ids.add(payload.get("root_message_id"))
-
-        # 5. 从 MySQL 查询上下文消息
-        async with AsyncSessionLocal() as session:
-            # 构建时间窗口条件
-            time_conditions = []
-            for ts in anchor_timestamps:
-                if ts:
-                    time_conditions.append(
-                        ConversationMessage.create_time.between(
-                            ts - CONTEXT_WINDOW_MS, ts + CONTEXT_WINDOW_MS
-                        )
-                    )
-
-            # 查询：时间窗口内的消息 + 引用链消息
-            from sqlalchemy import or_
-
-            or_conditions = [
-                *time_conditions,
-                ConversationMessage.message_id.in_(anchor_message_ids),
-            ]
-            if anchor_root_ids:
-                or_conditions.append(
-                    ConversationMessage.root_message_id.in_(anchor_root_ids)
-                )
-
-            query_obj = (
-                select(ConversationMessage, LarkUser)
-                .join(LarkUser, ConversationMessage.user_id == LarkUser.union_id)
-                .where(
-                    ConversationMessage.chat_id == context.curr_chat_id,
-                    or_(*or_conditions),
-                )
-                .order_by(ConversationMessage.create_time.asc())
+        result = await _search(chat_id, query, limit, version)
+        if watermark is not None:
+            await history_search_cache.put(
+                chat_id, version.name, query, limit, watermark, result
             )
-
-            result = await session.execute(query_obj)
-            rows = result.all()
-
-        if not rows:
-            return "未找到相关消息"
-
-        # 6. 格式化输出（时间间隔超过10分钟插入分隔符）
-        anchor_set = set(anchor_message_ids)
-        lines = [f"找到 {len(anchor_set)} 条相关消息及其上下文：\n"]
-
-        prev_ts = None
-        for msg, user in rows:
-            # 检查时间间隔
-            if prev_ts and (msg.create_time - prev_ts) > TIME_GAP_THRESHOLD_MS:
-                lines.append("\n--- 时间间隔 ---\n")
-
-            time_str = _format_timestamp(msg.create_time)
-            content = _truncate(parse_content(msg.content).render())
-
-            # 标记锚点消息
-            marker = "→ " if msg.message_id in anchor_set else "  "
-            lines.append(f"{marker}[{time_str}] {user.name}: {content}")
-
-            prev_ts = msg.create_time
-
-        return "\n".join(lines)
+        return result
 
     except Exception as e:
         logger.error(f"search_group_history error: {e}", exc_info=True)
@@ -7,6 +7,7 @@ import httpx
 from langchain.tools import tool
 from pydantic import BaseModel, field_validator
 
+from app.clients.http import http_clients
 from app.utils.decorators.log_decorator import log_io
 from app.utils.decorators.serializer import dict_serialize
 
@@ -133,17 +134,17 @@ async def search_donjin_event(
     # 添加重试机制
     data = {}
     max_retries = 3
+    client = http_clients.get("allcpp")
     for attempt in range(max_retries):
         try:
-            async with httpx.AsyncClient(timeout=15, headers=headers) as client:
-                # 添加随机延迟避免频繁请求
-                if attempt > 0:
-                    await asyncio.sleep(random.uniform(1, 3))
-
-                response = await client.get(url, params=payload)
-                response.raise_for_status()
-                data = response.json()
-                break  # 成功则跳出重试循环
+            # 添加随机延迟避免频繁请求
+            if attempt > 0:
+                await asyncio.sleep(random.uniform(1, 3))
+
+            response = await client.get(url, params=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            break  # 成功则跳出重试循环
 
         except (httpx.HTTPStatusError, httpx.RequestError) as e:
             if attempt == max_retries - 1:  # 最后一次尝试失败
@@ -6,7 +6,6 @@ from collections.abc import Callable
 from functools import wraps
 from typing import Any
 
-import httpx
 from langchain.tools import tool
 from pydantic import BaseModel
 
@@ -39,6 +38,7 @@ from app.agents.tools.search.models import (
     SubjectRelation,
     SubjectSearchResult,
 )
+from app.clients.http import http_clients
 from app.config import settings
 from app.utils.decorators import redis_cache
 
@@ -88,16 +88,16 @@ async def send_bangumi_request(
     # 准备请求数据
     json_data = json.dumps(data) if data is not None else None
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        response = await client.request(
-            method=method,
-            url=url,
-            params=params or {},
-            content=json_data,
-            headers=headers,
-        )
-        response.raise_for_status()
-        return response.json()
+    client = http_clients.get("bangumi")
+    response = await client.request(
+        method=method,
+        url=url,
+        params=params or {},
+        content=json_data,
+        headers=headers,
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 def append_element(array, element):
@@ -1,8 +1,8 @@
 """图片搜索工具（内部使用，暂不对外暴露）"""
 
-import httpx
 from langchain.tools import tool
 
+from app.clients.http import http_clients
 from app.config import settings
 from app.utils.decorators import dict_serialize, log_io
 
@@ -43,10 +43,10 @@ async def search_images(
     if page is not None and page > 1:
         params["ijn"] = page - 1
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    client = http_clients.get("search")
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
 
     return data.get("images_results", [])
 
@@ -79,10 +79,10 @@ async def search_by_image(
         "gl": gl,
     }
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    client = http_clients.get("search")
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
 
     return {
         "visual_matches": data.get("visual_matches", []),
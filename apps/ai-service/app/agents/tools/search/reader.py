@@ -1,7 +1,6 @@
 """Jina Reader - 网页转 Markdown 格式"""
 
-import httpx
-
+from app.clients.http import http_clients
 from app.config import settings
 
 
@@ -23,8 +22,8 @@ async def read_webpage(url: str) -> str:
     if settings.search_api_key:
         headers["Authorization"] = f"Bearer {settings.search_api_key}"
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.get(api_url, headers=headers)
-        response.raise_for_status()
+    client = http_clients.get("search")
+    response = await client.get(api_url, headers=headers, timeout=30)
+    response.raise_for_status()
 
     return response.text
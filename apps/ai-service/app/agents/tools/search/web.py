@@ -2,10 +2,10 @@
 
 import asyncio
 
-import httpx
 from langchain.tools import tool
 
 from app.agents.tools.search.reader import read_webpage
+from app.clients.http import http_clients
 from app.config import settings
 from app.utils.decorators import dict_serialize, log_io
 
@@ -57,10 +57,10 @@ async def search_web(
         "num": num,
     }
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    client = http_clients.get("search")
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
 
     # 只保留 organic_results
     organic_results = data.get("organic_results", [])
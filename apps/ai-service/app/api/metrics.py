@@ -0,0 +1,36 @@
+"""
+运行指标 API
+"""
+
+from fastapi import APIRouter
+
+from app.agents.clients import client_pool
+from app.agents.graphs.pre.cache import get_pre_cache_stats
+from app.clients.http import http_clients
+from app.services.history_search_cache import history_search_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics/pre")
+async def pre_metrics():
+    """Pre 快速通道 / 结果缓存命中率与节省的 LLM 调用数"""
+    return get_pre_cache_stats()
+
+
+@router.get("/metrics/history-search")
+async def history_search_metrics():
+    """search_group_history 结果缓存 / 查询向量 LRU 命中率"""
+    return history_search_cache.stats.to_dict()
+
+
+@router.get("/metrics/http")
+async def http_metrics():
+    """共享 HTTP 客户端各服务连接池的使用与饱和情况"""
+    return http_clients.stats()
+
+
+@router.get("/metrics/clients")
+async def client_pool_metrics():
+    """AI 客户端池（embedding 等）各模型的复用与替换情况"""
+    return client_pool.stats()
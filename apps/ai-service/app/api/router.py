@@ -7,6 +7,8 @@ from fastapi import APIRouter
 from app.api.chat import router as chat_router
 from app.api.extraction import router as extraction_router
 from app.api.memory import router as memory_router
+from app.api.metrics import router as metrics_router
+from app.api.vectorize import router as vectorize_router
 
 # 创建主路由
 api_router = APIRouter()
@@ -15,6 +17,8 @@ api_router = APIRouter()
 api_router.include_router(chat_router, tags=["Chat"])
 api_router.include_router(extraction_router, tags=["Extraction"])
 api_router.include_router(memory_router, tags=["Memory"])
+api_router.include_router(metrics_router, tags=["Metrics"])
+api_router.include_router(vectorize_router, tags=["Vectorize"])
 
 
 # 健康检查路由
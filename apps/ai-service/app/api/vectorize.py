@@ -0,0 +1,116 @@
+"""
+向量化队列管理 API
+"""
+
+from dataclasses import asdict
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.clients.redis import AsyncRedisClient
+from app.long_tasks import get_task_status, submit_task
+from app.services.qdrant import qdrant_service
+from app.services.qdrant_schema import declared_collections, sync_collections
+from app.services.vector_schema import get_recall_version
+from app.workers.recall_backfill import TASK_TYPE as BACKFILL_TASK_TYPE
+from app.workers.vectorize_worker import list_dead_letters, replay_dead_letters
+
+router = APIRouter()
+
+
+class RecallBackfillRequest(BaseModel):
+    """召回向量回填请求"""
+
+    version: str = Field(description="目标版本（recall_vector_models 中已配置）")
+    chat_id: str | None = Field(None, description="只回填该群，默认全部")
+    start_time: int | None = Field(None, description="create_time 下界（毫秒，含）")
+    end_time: int | None = Field(None, description="create_time 上界（毫秒，不含）")
+    qps: float | None = Field(None, gt=0, description="embedding 请求速率上限")
+
+
+@router.get("/vectorize/dead-letters")
+async def list_dead_letters_api(count: int = Query(100, ge=1, le=1000)):
+    """查看最早的死信条目（含失败原因与投递次数）"""
+    return await list_dead_letters(AsyncRedisClient.get_instance(), count)
+
+
+@router.post("/vectorize/dead-letters/replay")
+async def replay_dead_letters_api(count: int = Query(100, ge=1, le=1000)):
+    """把最早的 count 条死信重新投递到向量化队列"""
+    replayed = await replay_dead_letters(AsyncRedisClient.get_instance(), count)
+    return {"replayed": replayed}
+
+
+@router.post("/vectorize/backfill")
+async def submit_recall_backfill_api(request: RecallBackfillRequest):
+    """提交召回向量回填任务，返回任务 ID"""
+    try:
+        get_recall_version(request.version)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    task_id = await submit_task(BACKFILL_TASK_TYPE, request.model_dump())
+    return {"task_id": task_id}
+
+
+@router.get("/vectorize/backfill/{task_id}")
+async def recall_backfill_progress_api(task_id: UUID):
+    """查询回填任务状态与进度"""
+    task = await get_task_status(task_id)
+    if task is None or task["task_type"] != BACKFILL_TASK_TYPE:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    result = task["current_result"] or {}
+    total, processed = result.get("total"), result.get("processed", 0)
+    return {
+        "task_id": task["id"],
+        "status": task["status"],
+        "version": result.get("version"),
+        "total": total,
+        "processed": processed,
+        "progress": processed / total if total else None,
+        "updated": result.get("updated", 0),
+        "skipped": result.get("skipped", 0),
+        "failed": result.get("failed", 0),
+        "failed_ids": result.get("failed_ids", []),
+        "cursor": result.get("cursor"),
+        "error": result.get("error"),
+        "error_log": task["error_log"],
+        "updated_at": task["updated_at"],
+    }
+
+
+async def _collection_status() -> dict:
+    """各集合状态：迁移后 Qdrant 后台重新优化期间为 yellow"""
+    status = {}
+    for schema in declared_collections():
+        try:
+            info = await qdrant_service.client.get_collection(schema.name)
+            status[schema.name] = {
+                "status": info.status,
+                "points": info.points_count,
+                "indexed_vectors": info.indexed_vectors_count,
+            }
+        except Exception as e:
+            status[schema.name] = {"error": str(e)}
+    return status
+
+
+@router.get("/vectorize/qdrant-schema")
+async def qdrant_schema_drift_api():
+    """对比声明与线上的 Qdrant 集合配置（只报告，不修改）"""
+    drifts = await sync_collections(qdrant_service.client, migrate=False)
+    return {
+        "in_sync": not drifts,
+        "drifts": [asdict(d) for d in drifts],
+        "collections": await _collection_status(),
+    }
+
+
+@router.post("/vectorize/qdrant-schema/sync")
+async def qdrant_schema_sync_api():
+    """立即按声明迁移 Qdrant 集合（如开启租户分区），不必等服务重启"""
+    drifts = await sync_collections(qdrant_service.client, migrate=True)
+    return {
+        "drifts": [asdict(d) for d in drifts],
+        "collections": await _collection_status(),
+    }
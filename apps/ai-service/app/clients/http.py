@@ -0,0 +1,205 @@
+"""
+共享 HTTP 客户端注册表
+
+每个外部服务（按目标 host 划分）持有一个长生命周期的 httpx.AsyncClient，
+复用 keep-alive 连接、TLS 会话和 DNS 解析结果，而不是每次调用都新建客户端。
+
+- 每个服务独立的连接池上限（即按 host 限流）与默认超时
+- 可选 HTTP/2（需要安装 h2）
+- 连接池饱和度统计：进行中请求数、峰值、排队（超过连接上限）次数
+
+生命周期：FastAPI lifespan / worker 启动时 start()，退出时 close()。
+未 start() 时 get() 会按需创建客户端（脚本、测试场景）。
+
+Usage:
+    from app.clients.http import http_clients
+
+    client = http_clients.get("search")
+    response = await client.get(url, params=params)
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import cast
+
+import httpx
+
+from app.config.config import settings
+
+try:
+    import h2  # noqa: F401
+
+    _H2_AVAILABLE = True
+except ImportError:  # 可选依赖：未安装时退回 HTTP/1.1
+    _H2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HttpServiceConfig:
+    """单个外部服务的客户端配置
+
+    Attributes:
+        timeout: 默认超时（秒），单次请求可通过 timeout= 覆盖
+        max_connections: 连接池上限
+        max_keepalive: 空闲保活连接上限
+        http2: 是否启用 HTTP/2（未安装 h2 时忽略）
+    """
+
+    timeout: float = 15.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    http2: bool = False
+
+
+SERVICES: dict[str, HttpServiceConfig] = {
+    # ai-service → main-server 内部调用（图片处理等）
+    "main_server": HttpServiceConfig(
+        timeout=settings.main_server_timeout, max_connections=50, max_keepalive=20
+    ),
+    # api.302.ai：serpapi 搜索 + jina reader
+    "search": HttpServiceConfig(
+        timeout=15, max_connections=30, http2=settings.http_client_http2
+    ),
+    "bangumi": HttpServiceConfig(timeout=15, http2=settings.http_client_http2),
+    "allcpp": HttpServiceConfig(timeout=15, max_connections=5),
+    # 任意 host（图片下载等）
+    "default": HttpServiceConfig(timeout=30, max_connections=50, max_keepalive=20),
+}
+
+
+@dataclass
+class PoolStats:
+    """连接池使用统计"""
+
+    max_connections: int
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    requests: int = 0
+    saturated: int = 0  # 发起时已达连接上限（需排队等待连接）的请求数
+    errors: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests": self.requests,
+            "saturated": self.saturated,
+            "errors": self.errors,
+            "saturation": round(self.in_flight / self.max_connections, 4),
+        }
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """响应体读取完毕（或关闭）时才释放计数，与连接归还连接池的时机一致"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """包装连接池 transport，统计进行中请求与饱和情况"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    def _release(self) -> None:
+        self._stats.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._stats
+        stats.requests += 1
+        if stats.in_flight >= stats.max_connections:
+            stats.saturated += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            self._release()
+            raise
+
+        # AsyncClient 的 transport 返回的一定是异步流
+        response.stream = _TrackedStream(
+            cast(httpx.AsyncByteStream, response.stream), self._release
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HttpClientRegistry:
+    """按服务名管理共享的 httpx.AsyncClient"""
+
+    def __init__(self, services: dict[str, HttpServiceConfig]):
+        self._services = services
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._stats: dict[str, PoolStats] = {}
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        cfg = self._services[name]
+        stats = self._stats.setdefault(name, PoolStats(cfg.max_connections))
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=cfg.max_connections,
+                max_keepalive_connections=cfg.max_keepalive,
+            ),
+            http2=cfg.http2 and _H2_AVAILABLE,
+        )
+        return httpx.AsyncClient(
+            timeout=cfg.timeout,
+            transport=_InstrumentedTransport(transport, stats),
+        )
+
+    async def start(self) -> None:
+        """预先创建全部客户端"""
+        for name in self._services:
+            if name not in self._clients:
+                self._clients[name] = self._create(name)
+        logger.info(
+            f"HTTP 客户端已启动: {list(self._clients)}, http2_available={_H2_AVAILABLE}"
+        )
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """获取服务对应的共享客户端（未启动时按需创建）"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._create(name)
+        return client
+
+    async def close(self) -> None:
+        """关闭全部客户端，释放连接"""
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端 {name} 失败: {e}")
+        logger.info("HTTP 客户端已关闭")
+
+    def stats(self) -> dict[str, dict]:
+        """各服务连接池使用统计"""
+        return {name: s.to_dict() for name, s in self._stats.items()}
+
+
+# 全局单例
+http_clients = HttpClientRegistry(SERVICES)
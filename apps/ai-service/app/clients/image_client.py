@@ -1,17 +1,36 @@
 """
 Main-server图片处理客户端
+
+file_key → URL 解析带两级缓存（进程内 LRU + Redis）：
+main-server 返回的是 TOS 预签名 URL（有效期 1.5 小时，main-server 侧再缓存 10 分钟），
+因此拿到的 URL 至少还有 80 分钟有效期，这里缓存 1 小时，留出使用余量。
+
+同一 file_key 的并发解析只发起一次请求（single-flight），
+多个未命中的 key 通过 /api/image/process-batch 一次请求处理。
 """
 
+import asyncio
 import base64
+import json
 import logging
+import time
+from collections import OrderedDict
 
 import httpx
 
+from app.clients.http import http_clients
+from app.clients.redis import AsyncRedisClient
 from app.config.config import settings
+from app.utils.image_preprocess import preprocess_image_async
 from app.utils.middlewares.trace import get_app_name, get_trace_id
 
 logger = logging.getLogger(__name__)
 
+_URL_TTL_SECONDS = 3600  # 1 小时，短于预签名 URL 的剩余有效期
+_L1_MAX_SIZE = 2048
+_REDIS_KEY_PREFIX = "image_url:"
+_BATCH_MAX_SIZE = 50  # 与 main-server IMAGE_PROCESS_BATCH_MAX_ITEMS 一致
+
 
 class ImageProcessClient:
     """Main-server图片处理客户端"""
@@ -19,12 +38,25 @@ class ImageProcessClient:
     def __init__(self):
         self.base_url = settings.main_server_base_url
         self.timeout = settings.main_server_timeout
+        # { file_key: (url, expire_at) }，expire_at 为 time.time()，便于与 Redis 共享
+        self._url_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # { file_key: 解析中的 future }
+        self._inflight: dict[str, asyncio.Future[str | None]] = {}
+        # 持有后台解析任务的引用，防止被 GC
+        self._background: set[asyncio.Task] = set()
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "shared": 0, "fetched": 0}
+
+    def clear_cache(self) -> None:
+        """清空进程内 URL 缓存（供测试使用）"""
+        self._url_cache.clear()
+        self._inflight.clear()
+        self.stats = dict.fromkeys(self.stats, 0)
 
     async def process_image(
         self, file_key: str, message_id: str | None, bot_name: str | None = None
     ) -> str | None:
         """
-        处理图片，返回图片URL
+        处理图片，返回图片URL（走缓存与 single-flight）
 
         Args:
             file_key: 图片文件key
@@ -34,37 +66,240 @@ class ImageProcessClient:
         Returns:
             str: 图片URL，如果失败返回None
         """
+        urls = await self.resolve_images([(file_key, message_id)], bot_name)
+        return urls.get(file_key)
+
+    async def resolve_images(
+        self,
+        items: list[tuple[str, str | None]],
+        bot_name: str | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, str]:
+        """
+        批量解析图片URL
+
+        依次查进程内缓存 → Redis → main-server（未命中的 key 合并为批量请求）。
+        解析在后台任务中进行：超过 timeout 时只返回已完成的部分，
+        未完成的解析继续执行并写入缓存，供后续请求使用。
+
+        Args:
+            items: (file_key, message_id) 列表，同一 file_key 只解析一次
+            bot_name: 机器人名称（用于多 bot 场景）
+            timeout: 等待上限（秒），None 表示等待全部完成
+
+        Returns:
+            dict: file_key → URL，按 items 中的顺序排列（调用方按此顺序为图片编号），
+                失败或超时的 key 不在结果中
+        """
+        result: dict[str, str] = {}
+        waiting: dict[str, asyncio.Future[str | None]] = {}
+        to_fetch: list[tuple[str, str | None]] = []
+        now = time.time()
+
+        for file_key, message_id in dict(items).items():
+            cached = self._get_l1(file_key, now)
+            if cached:
+                self.stats["l1_hits"] += 1
+                result[file_key] = cached
+            elif file_key in self._inflight:
+                self.stats["shared"] += 1
+                waiting[file_key] = self._inflight[file_key]
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[file_key] = waiting[file_key] = future
+                to_fetch.append((file_key, message_id))
+
+        if to_fetch:
+            # 优先使用传入的 bot_name，否则从上下文获取
+            app_name = bot_name or get_app_name() or ""
+            task = asyncio.create_task(self._resolve_missing(to_fetch, app_name))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        if waiting:
+            # shield：调用方超时 / 取消不影响共享的解析
+            done, _ = await asyncio.wait(
+                [asyncio.shield(f) for f in waiting.values()], timeout=timeout
+            )
+            for file_key, future in waiting.items():
+                if future.done() and not future.cancelled():
+                    url = future.result()
+                    if url:
+                        result[file_key] = url
+
+        # 缓存命中的 key 先进入 result，这里恢复调用方传入的顺序
+        return {key: result[key] for key in dict(items) if key in result}
+
+    async def _resolve_missing(
+        self, items: list[tuple[str, str | None]], app_name: str
+    ) -> None:
+        """后台解析：Redis → main-server，结果写回缓存并唤醒等待者"""
+        urls: dict[str, str | None] = {}
+        try:
+            urls.update(await self._get_l2([key for key, _ in items]))
+            missing = [(k, m) for k, m in items if not urls.get(k)]
+            if missing:
+                self.stats["fetched"] += len(missing)
+                fetched = await self._fetch_urls(missing, app_name)
+                urls.update(fetched)
+                await self._set_l2({k: v for k, v in fetched.items() if v})
+        except Exception as e:
+            logger.error(f"解析图片URL失败: {e}")
+        finally:
+            for file_key, _ in items:
+                future = self._inflight.pop(file_key, None)
+                if future is not None and not future.done():
+                    future.set_result(urls.get(file_key))
+
+    def _get_l1(self, file_key: str, now: float) -> str | None:
+        cached = self._url_cache.get(file_key)
+        if cached is None:
+            return None
+        url, expire_at = cached
+        if now >= expire_at:
+            del self._url_cache[file_key]
+            return None
+        self._url_cache.move_to_end(file_key)
+        return url
+
+    def _set_l1(self, file_key: str, url: str, expire_at: float) -> None:
+        self._url_cache[file_key] = (url, expire_at)
+        self._url_cache.move_to_end(file_key)
+        while len(self._url_cache) > _L1_MAX_SIZE:
+            self._url_cache.popitem(last=False)
+
+    async def _get_l2(self, file_keys: list[str]) -> dict[str, str]:
+        """从 Redis 批量读取（MGET），命中的 key 回填进程内缓存"""
+        try:
+            redis = AsyncRedisClient.get_instance()
+            raws = await redis.mget([f"{_REDIS_KEY_PREFIX}{k}" for k in file_keys])
+        except Exception as e:
+            logger.warning(f"读取图片URL缓存失败: {e}")
+            return {}
+
+        now = time.time()
+        urls: dict[str, str] = {}
+        for file_key, raw in zip(file_keys, raws, strict=True):
+            if not raw:
+                continue
+            entry = json.loads(raw)
+            if now < entry["expire_at"]:
+                self._set_l1(file_key, entry["url"], entry["expire_at"])
+                urls[file_key] = entry["url"]
+        self.stats["l2_hits"] += len(urls)
+        return urls
+
+    async def _set_l2(self, urls: dict[str, str]) -> None:
+        """写入两级缓存"""
+        if not urls:
+            return
+        expire_at = time.time() + _URL_TTL_SECONDS
+        for file_key, url in urls.items():
+            self._set_l1(file_key, url, expire_at)
+        try:
+            redis = AsyncRedisClient.get_instance()
+            async with redis.pipeline(transaction=False) as pipe:
+                for file_key, url in urls.items():
+                    pipe.set(
+                        f"{_REDIS_KEY_PREFIX}{file_key}",
+                        json.dumps({"url": url, "expire_at": expire_at}),
+                        ex=_URL_TTL_SECONDS,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"写入图片URL缓存失败: {e}")
+
+    async def _fetch_urls(
+        self, items: list[tuple[str, str | None]], app_name: str
+    ) -> dict[str, str | None]:
+        """向 main-server 解析 URL：单个 key 走 /process，多个 key 走 /process-batch"""
+        if len(items) == 1:
+            file_key, message_id = items[0]
+            return {file_key: await self._fetch_url(file_key, message_id, app_name)}
+
+        urls: dict[str, str | None] = {}
+        for i in range(0, len(items), _BATCH_MAX_SIZE):
+            urls.update(
+                await self._fetch_url_batch(items[i : i + _BATCH_MAX_SIZE], app_name)
+            )
+        return urls
+
+    def _headers(self, app_name: str) -> dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.inner_http_secret}",
+            "X-Trace-Id": get_trace_id() or "",
+            "X-App-Name": app_name,
+        }
+
+    async def _fetch_url_batch(
+        self, items: list[tuple[str, str | None]], app_name: str
+    ) -> dict[str, str | None]:
+        """调用 /api/image/process-batch，旧版 main-server（404）时逐个回退"""
         if not self.base_url:
             logger.warning("Main-server base URL未配置")
-            return None
+            return {}
 
-        # 优先使用传入的 bot_name，否则从上下文获取
-        app_name = bot_name or get_app_name() or ""
+        try:
+            request_data = {
+                "items": [{"file_key": k, "message_id": m} for k, m in items]
+            }
+            client = http_clients.get("main_server")
+            response = await client.post(
+                f"{self.base_url}/api/image/process-batch",
+                json=request_data,
+                headers=self._headers(app_name),
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            results = {r["file_key"]: r["url"] for r in data["data"]["results"]}
+            logger.info(
+                f"批量图片处理完成: total={len(items)}, "
+                f"success={sum(1 for url in results.values() if url)}"
+            )
+            return results
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 404:
+                logger.error(f"批量图片处理HTTP错误: {e.response.status_code}")
+                return {}
+        except Exception as e:
+            logger.error(f"调用批量图片处理接口失败: {str(e)}")
+            return {}
+
+        urls = await asyncio.gather(
+            *(self._fetch_url(k, m, app_name) for k, m in items)
+        )
+        return {k: url for (k, _), url in zip(items, urls, strict=True)}
+
+    async def _fetch_url(
+        self, file_key: str, message_id: str | None, app_name: str
+    ) -> str | None:
+        """调用 /api/image/process 解析单张图片"""
+        if not self.base_url:
+            logger.warning("Main-server base URL未配置")
+            return None
 
         try:
             request_data = {"message_id": message_id, "file_key": file_key}
 
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/image/process",
-                    json=request_data,
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {settings.inner_http_secret}",
-                        "X-Trace-Id": get_trace_id() or "",
-                        "X-App-Name": app_name,
-                    },
-                )
+            client = http_clients.get("main_server")
+            response = await client.post(
+                f"{self.base_url}/api/image/process",
+                json=request_data,
+                headers=self._headers(app_name),
+            )
 
-                response.raise_for_status()
-                data = response.json()
+            response.raise_for_status()
+            data = response.json()
 
-                if data.get("success") and data.get("data"):
-                    logger.info(f"图片处理成功: {file_key} -> {data['data']['url']}")
-                    return data["data"]["url"]
-                else:
-                    logger.error(f"图片处理失败: {data.get('message', '未知错误')}")
-                    return None
+            if data.get("success") and data.get("data"):
+                logger.info(f"图片处理成功: {file_key} -> {data['data']['url']}")
+                return data["data"]["url"]
+            else:
+                logger.error(f"图片处理失败: {data.get('message', '未知错误')}")
+                return None
 
         except httpx.TimeoutException:
             logger.warning(f"图片处理超时: {self.timeout}秒")
@@ -102,31 +337,24 @@ class ImageProcessClient:
             # logger.info(f"上传base64图片到飞书，base64_data: {base64_data}")
             request_data = {"base64_data": base64_data}
 
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/image/upload-base64",
-                    json=request_data,
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {settings.inner_http_secret}",
-                        "X-Trace-Id": get_trace_id() or "",
-                        "X-App-Name": app_name,
-                    },
-                )
+            client = http_clients.get("main_server")
+            response = await client.post(
+                f"{self.base_url}/api/image/upload-base64",
+                json=request_data,
+                headers=self._headers(app_name),
+            )
 
-                response.raise_for_status()
-                data = response.json()
+            response.raise_for_status()
+            data = response.json()
 
-                if data.get("success") and data.get("data"):
-                    logger.info(
-                        f"base64图片上传成功，获得image_key: {data['data']['image_key']}"
-                    )
-                    return data["data"]["image_key"]
-                else:
-                    logger.error(
-                        f"base64图片上传失败: {data.get('message', '未知错误')}"
-                    )
-                    return None
+            if data.get("success") and data.get("data"):
+                logger.info(
+                    f"base64图片上传成功，获得image_key: {data['data']['image_key']}"
+                )
+                return data["data"]["image_key"]
+            else:
+                logger.error(f"base64图片上传失败: {data.get('message', '未知错误')}")
+                return None
 
         except httpx.TimeoutException:
             logger.warning(f"base64图片上传超时: {self.timeout}秒")
@@ -141,15 +369,23 @@ class ImageProcessClient:
             return None
 
     async def download_image_as_base64(
-        self, file_key: str, message_id: str | None, bot_name: str | None = None
+        self,
+        file_key: str,
+        message_id: str | None,
+        bot_name: str | None = None,
+        preprocess: bool | None = None,
     ) -> str | None:
         """
         下载图片并转换为Base64格式
 
+        默认先经预处理（缩放 + 去元数据 + 重新编码，见 image_preprocess），
+        解码失败时退回原图。
+
         Args:
             file_key: 图片文件key
             message_id: 消息ID
-            bot_name: 机器人名称（���于多 bot 场景）
+            bot_name: 机器人名称（用于多 bot 场景）
+            preprocess: 是否预处理，默认 image_preprocess_enabled
 
         Returns:
             str: Base64格式图片 data:image/{format};base64,{base64_data}
@@ -163,35 +399,47 @@ class ImageProcessClient:
                 return None
 
             # 2. 下载图片内容
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-
-                # 3. 获取图片格式
-                content_type = response.headers.get("content-type", "image/jpeg")
-                image_format = content_type.split("/")[-1].split(";")[0].lower()
-
-                # 支持的格式映射
-                format_map = {
-                    "jpeg": "jpeg",
-                    "jpg": "jpeg",
-                    "png": "png",
-                    "gif": "gif",
-                    "webp": "webp",
-                    "bmp": "bmp",
-                }
-                image_format = format_map.get(image_format, "jpeg")
-
-                # 4. 转换为Base64
-                image_bytes = response.content
-                base64_str = base64.b64encode(image_bytes).decode("utf-8")
-
-                # 5. 返回完整格式
-                result = f"data:image/{image_format};base64,{base64_str}"
-                logger.info(
-                    f"图片下载并转换为Base64成功: {file_key}, 格式: {image_format}"
-                )
-                return result
+            client = http_clients.get("default")
+            response = await client.get(image_url)
+            response.raise_for_status()
+
+            # 3. 获取图片格式
+            content_type = response.headers.get("content-type", "image/jpeg")
+            image_format = content_type.split("/")[-1].split(";")[0].lower()
+
+            # 支持的格式映射
+            format_map = {
+                "jpeg": "jpeg",
+                "jpg": "jpeg",
+                "png": "png",
+                "gif": "gif",
+                "webp": "webp",
+                "bmp": "bmp",
+            }
+            image_format = format_map.get(image_format, "jpeg")
+
+            # 4. 预处理后转换为Base64
+            image_bytes = response.content
+            if preprocess is None:
+                preprocess = settings.image_preprocess_enabled
+            if preprocess:
+                try:
+                    processed = await preprocess_image_async(image_bytes)
+                    logger.debug(
+                        f"图片预处理: {file_key}, {processed.original_bytes} -> "
+                        f"{len(processed.data)} bytes, "
+                        f"{processed.width}x{processed.height}"
+                    )
+                    image_bytes = processed.data
+                    image_format = processed.mime.split("/")[-1]
+                except Exception as e:
+                    logger.warning(f"图片预处理失败，使用原图: {file_key} - {e}")
+            base64_str = base64.b64encode(image_bytes).decode("utf-8")
+
+            # 5. 返回完整格式
+            result = f"data:image/{image_format};base64,{base64_str}"
+            logger.info(f"图片下载并转换为Base64成功: {file_key}, 格式: {image_format}")
+            return result
 
         except httpx.TimeoutException:
             logger.warning(f"图片下载超时: {file_key}")
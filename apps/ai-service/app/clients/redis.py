@@ -9,6 +9,7 @@ class AsyncRedisClient:
     """
 
     _instance = None
+    _binary_instance = None
 
     @staticmethod
     def get_instance():
@@ -25,3 +26,19 @@ class AsyncRedisClient:
             )
             AsyncRedisClient._instance = Redis(connection_pool=pool)
         return AsyncRedisClient._instance
+
+    @staticmethod
+    def get_binary_instance():
+        """
+        获取不解码响应的 Redis 客户端实例（用于存取二进制值）
+        """
+        if AsyncRedisClient._binary_instance is None:
+            pool = ConnectionPool(
+                host=settings.redis_host,
+                port="6379",
+                password=settings.redis_password,
+                decode_responses=False,
+                max_connections=10,
+            )
+            AsyncRedisClient._binary_instance = Redis(connection_pool=pool)
+        return AsyncRedisClient._binary_instance
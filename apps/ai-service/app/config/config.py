@@ -16,6 +16,22 @@ class Settings(BaseSettings):
     qdrant_service_host: str | None = None
     qdrant_service_port: int = 6333
     qdrant_service_api_key: str | None = None
+    qdrant_service_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = False  # 优先使用 gRPC 传输
+    qdrant_pool_size: int = 20  # HTTP 连接池 / gRPC channel 数量
+    qdrant_timeout: int = 10  # 请求超时（秒）
+
+    # Qdrant 集合 schema（启动时由 qdrant_schema 幂等同步）
+    qdrant_schema_auto_migrate: bool = True  # False 时只报告差异，不修改线上配置
+    qdrant_on_disk_payload: bool = True  # payload（含 original_text）存磁盘
+    qdrant_quantization: str = "scalar"  # none | scalar（int8）| binary
+    qdrant_quantization_always_ram: bool = True  # 量化向量常驻内存
+    qdrant_hnsw_m: int = 16
+    qdrant_hnsw_ef_construct: int = 100
+    # messages_recall 按 chat_id 分租户：chat_id 建 tenant 索引，不建全局 HNSW 图，
+    # 每个群单独建图（payload_m），群内检索只访问该群的数据
+    qdrant_recall_tenant_partition: bool = True
+    qdrant_hnsw_payload_m: int = 16
 
     search_api_key: str | None = None
 
@@ -27,6 +43,50 @@ class Settings(BaseSettings):
     main_server_base_url: str | None = None  # Main-server服务基础URL
     main_server_timeout: int = 10  # 超时时间，默认10秒
 
+    # 共享 HTTP 客户端：对支持的外部服务启用 HTTP/2（需安装 h2）
+    http_client_http2: bool = False
+
+    # 向量化 embedding 微批处理：攒满条数或等待窗口（毫秒）后发出一批
+    embedding_batch_max_size: int = 16
+    embedding_batch_window_ms: int = 10
+
+    # 内容寻址 embedding 缓存（Redis，float16 二进制编码）
+    embedding_cache_max_entries: int = 200_000
+    embedding_cache_ttl_seconds: int = 7 * 24 * 3600
+
+    # 向量化写入缓冲：攒满点数或等待间隔（毫秒）后批量 upsert
+    vectorize_flush_max_points: int = 128
+    vectorize_flush_interval_ms: int = 50
+    vectorize_upsert_wait: bool = True  # False: Qdrant 写入 WAL 后即返回
+
+    # messages_recall 命名向量版本：版本 → embedding 模型
+    # v1 沿用历史命名 dense / sparse，其余版本为 dense_<版本> / sparse_<版本>
+    recall_vector_models: dict[str, str] = {"v1": "embedding-model"}
+    recall_vector_read_version: str = "v1"  # 检索使用的版本
+    recall_vector_write_versions: list[str] = ["v1"]  # 向量化时（双）写入的版本
+
+    # 召回向量回填任务
+    recall_backfill_qps: float = 20  # embedding 供应商请求速率上限
+    recall_backfill_page_size: int = 100
+    recall_backfill_step_seconds: int = 240  # 单步时长，需小于 arq job 超时
+
+    # search_group_history 结果缓存（按群向量水位失效）与查询向量 LRU
+    history_search_cache_ttl_seconds: int = 600
+    history_query_embedding_cache_size: int = 1024
+
+    # 图片 embedding 预处理：解码 → 缩放到最长边 → 去元数据 → 重新编码（线程池执行）
+    image_preprocess_enabled: bool = True
+    image_preprocess_max_edge: int = 1024  # 最长边像素
+    image_preprocess_format: str = "jpeg"  # jpeg | webp
+    image_preprocess_quality: int = 85
+    image_preprocess_max_bytes: int = (
+        300 * 1024
+    )  # 编码后大小上限（超出时降质量 / 尺寸）
+    image_preprocess_workers: int = 4
+
+    # 主聊天流水线阶段预算（秒），超时的图片直接丢弃，不阻塞首 token
+    chat_image_budget_seconds: float = 3.0
+
     # RabbitMQ
     rabbitmq_url: str | None = None
 
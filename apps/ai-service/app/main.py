@@ -6,9 +6,11 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from inner_shared import hello as shared_hello
 
+from app.agents.clients import client_pool
 from app.api.router import api_router
+from app.clients.http import http_clients
 from app.config import settings
-from app.services.qdrant import init_qdrant_collections
+from app.services.qdrant import init_qdrant_collections, qdrant_service
 from app.utils.middlewares import HeaderContextMiddleware
 
 load_dotenv()
@@ -21,6 +23,7 @@ async def lifespan(app: FastAPI):
     """
     应用生命周期管理
     """
+    await http_clients.start()
     await init_qdrant_collections()
     logger.info("shared pkg loaded: %s", shared_hello())
 
@@ -49,6 +52,10 @@ async def lifespan(app: FastAPI):
         client = RabbitMQClient.get_instance()
         await client.close()
 
+    await qdrant_service.close()
+    await client_pool.close()
+    await http_clients.close()
+
 
 app = FastAPI(lifespan=lifespan)
 
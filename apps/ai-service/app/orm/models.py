@@ -7,10 +7,12 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Float,
+    Index,
     Integer,
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -78,6 +80,19 @@ class ConversationMessage(Base):
     # 机器人名称（用于多 bot 场景下载图片等）
     bot_name: Mapped[str | None] = mapped_column(String(50), nullable=True)
 
+    # 与 main-server 实体保持一致：
+    # - pending 扫描按 (create_time, message_id) keyset 分页
+    # - 群聊历史检索按 (chat_id, create_time) 范围查询上下文
+    __table_args__ = (
+        Index(
+            "idx_conversation_messages_pending",
+            "create_time",
+            "message_id",
+            postgresql_where=text("vector_status = 'pending'"),
+        ),
+        Index("idx_conversation_messages_chat_time", "chat_id", "create_time"),
+    )
+
 
 class LarkGroupChatInfo(Base):
     __tablename__ = "lark_group_chat_info"
@@ -1,21 +1,255 @@
-"""封禁词检测服务"""
+"""封禁词检测服务
+
+封禁词集合存放在 Redis set `banned_words` 中。进程内持有一份由全部封禁词
+编译出的 Aho-Corasick 自动机，每条消息只需一次线性扫描。
+
+刷新：至多每 _REFRESH_INTERVAL_SECONDS 秒用一次 pipeline 读取
+`banned_words:version` 与 SCARD，任一变化才重新 SMEMBERS 并重建自动机。
+修改词表请使用 update_banned_words（SADD/SREM 与版本号自增在同一事务中）。
+
+归一化（封禁词与待检文本使用同一流程）：
+NFKC（全角→半角）→ 小写 → 繁→简（OpenCC t2s）→ 去除空白/标点/符号
+去除后为空的封禁词（纯 emoji / 符号，如 "🐷"、"***"）改用不去除符号的形式
+单独建一个自动机匹配。
+"""
+
+import asyncio
+import logging
+import time
+import unicodedata
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from opencc import OpenCC
 
 from app.clients.redis import AsyncRedisClient
+from app.utils.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
 
 BANNED_WORDS_KEY = "banned_words"
+BANNED_WORDS_VERSION_KEY = "banned_words:version"
 
+_REFRESH_INTERVAL_SECONDS = 5.0
 
-async def check_banned_word(text: str) -> str | None:
-    """检查文本是否包含封禁词，返回匹配到的封禁词或None
+# 归一化时丢弃的 Unicode 大类：空白(Z)、标点(P)、符号(S，含 emoji)、控制/格式(C)
+_STRIP_CATEGORIES = frozenset("ZPSC")
 
-    检测时会去除空格并转小写
+_t2s = OpenCC("t2s").convert
+
+
+@dataclass(frozen=True)
+class BannedWordMatch:
+    """封禁词命中
+
+    Attributes:
+        word: 命中的封禁词（Redis 中的原始写法）
+        start: 在原始文本中的起始下标
+        end: 在原始文本中的结束下标（开区间）
     """
-    redis = AsyncRedisClient.get_instance()
-    banned_words = await redis.smembers(BANNED_WORDS_KEY)  # type: ignore
-    if not banned_words:
+
+    word: str
+    start: int
+    end: int
+
+
+@lru_cache(maxsize=8192)
+def _fold_char(ch: str) -> str:
+    return _t2s(unicodedata.normalize("NFKC", ch).lower())
+
+
+@lru_cache(maxsize=8192)
+def _normalize_char(ch: str) -> str:
+    return "".join(
+        c for c in _fold_char(ch) if unicodedata.category(c)[0] not in _STRIP_CATEGORIES
+    )
+
+
+def _map_with_offsets(
+    text: str, convert: Callable[[str], str]
+) -> tuple[str, list[int]]:
+    chars: list[str] = []
+    offsets: list[int] = []
+    for i, ch in enumerate(text):
+        for c in convert(ch):
+            chars.append(c)
+            offsets.append(i)
+    return "".join(chars), offsets
+
+
+def normalize_with_offsets(text: str) -> tuple[str, list[int]]:
+    """归一化文本，同时返回归一化后每个字符对应的原文下标"""
+    return _map_with_offsets(text, _normalize_char)
+
+
+def normalize(text: str) -> str:
+    return "".join(_normalize_char(ch) for ch in text)
+
+
+def fold_with_offsets(text: str) -> tuple[str, list[int]]:
+    """只做 NFKC / 小写 / 繁→简，保留空白与符号（用于纯符号封禁词）"""
+    return _map_with_offsets(text, _fold_char)
+
+
+def fold(text: str) -> str:
+    return "".join(_fold_char(ch) for ch in text)
+
+
+class BannedWordMatcher:
+    """由一组封禁词编译出的只读匹配器"""
+
+    def __init__(self, words: set[str]):
+        # 归一化后的模式 → 原始封禁词（多个原词归一化相同时取任一）
+        self._origin: dict[str, str] = {}
+        # 归一化后为空的词（纯 emoji / 符号）：折叠后的模式 → 原始封禁词
+        self._symbol_origin: dict[str, str] = {}
+        for word in words:
+            key = normalize(word)
+            if key:
+                self._origin.setdefault(key, word)
+            elif folded := fold(word).strip():
+                self._symbol_origin.setdefault(folded, word)
+        self._automaton = AhoCorasick(self._origin)
+        self._symbol_automaton = (
+            AhoCorasick(self._symbol_origin) if self._symbol_origin else None
+        )
+
+    def __len__(self) -> int:
+        return len(self._origin) + len(self._symbol_origin)
+
+    def find_all(self, text: str) -> list[BannedWordMatch]:
+        matches = self._find_all(
+            text, normalize_with_offsets, self._automaton, self._origin
+        )
+        if self._symbol_automaton is not None:
+            matches += self._find_all(
+                text,
+                fold_with_offsets,
+                self._symbol_automaton,
+                self._symbol_origin,
+            )
+            matches.sort(key=lambda m: (m.end, m.start))
+        return matches
+
+    @staticmethod
+    def _find_all(
+        text: str,
+        convert: Callable[[str], tuple[str, list[int]]],
+        automaton: AhoCorasick,
+        origin: dict[str, str],
+    ) -> list[BannedWordMatch]:
+        converted, offsets = convert(text)
+        return [
+            BannedWordMatch(
+                word=origin[pattern],
+                start=offsets[start],
+                end=offsets[end - 1] + 1,
+            )
+            for start, end, pattern in automaton.find_all(converted)
+        ]
+
+    def find_first(self, text: str) -> str | None:
+        match = self._automaton.find_first(normalize(text))
+        if match:
+            return self._origin[match[2]]
+        if self._symbol_automaton is not None:
+            match = self._symbol_automaton.find_first(fold(text))
+            if match:
+                return self._symbol_origin[match[2]]
         return None
-    normalized_text = text.replace(" ", "").lower()
-    for word in banned_words:
-        if word in normalized_text:
-            return word
-    return None
+
+
+class _BannedWordEngine:
+    """持有当前匹配器，按版本号懒刷新"""
+
+    def __init__(self):
+        self._matcher: BannedWordMatcher | None = None
+        self._version: tuple | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def reset(self) -> None:
+        self._matcher = None
+        self._version = None
+        self._checked_at = 0.0
+
+    async def get_matcher(self) -> BannedWordMatcher:
+        if (
+            self._matcher is not None
+            and time.monotonic() - self._checked_at < _REFRESH_INTERVAL_SECONDS
+        ):
+            return self._matcher
+
+        async with self._lock:
+            # 等锁期间可能已被其他协程刷新
+            if (
+                self._matcher is not None
+                and time.monotonic() - self._checked_at < _REFRESH_INTERVAL_SECONDS
+            ):
+                return self._matcher
+            try:
+                return await self._refresh()
+            except Exception as e:
+                if self._matcher is None:
+                    raise
+                # Redis 异常时沿用旧词表，下个周期再试
+                logger.warning(f"刷新封禁词失败，沿用旧词表: {e}")
+                self._checked_at = time.monotonic()
+                return self._matcher
+
+    async def _refresh(self) -> BannedWordMatcher:
+        redis = AsyncRedisClient.get_instance()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(BANNED_WORDS_VERSION_KEY)
+            pipe.scard(BANNED_WORDS_KEY)
+            version = tuple(await pipe.execute())
+
+        matcher = self._matcher
+        if matcher is None or version != self._version:
+            words = await redis.smembers(BANNED_WORDS_KEY)  # type: ignore
+            start = time.perf_counter()
+            matcher = BannedWordMatcher(set(words or ()))
+            logger.info(
+                f"封禁词自动机已重建: words={len(matcher)}, version={version}, "
+                f"build={(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+            self._matcher = matcher
+            self._version = version
+        self._checked_at = time.monotonic()
+        return matcher
+
+
+_engine = _BannedWordEngine()
+
+
+def clear_banned_word_cache() -> None:
+    """丢弃进程内自动机，下次检测时重新加载（供测试使用）"""
+    _engine.reset()
+
+
+async def update_banned_words(
+    add: list[str] | None = None, remove: list[str] | None = None
+) -> None:
+    """修改封禁词集合并自增版本号，各实例在下个刷新周期内生效"""
+    redis = AsyncRedisClient.get_instance()
+    async with redis.pipeline(transaction=True) as pipe:
+        if add:
+            pipe.sadd(BANNED_WORDS_KEY, *add)
+        if remove:
+            pipe.srem(BANNED_WORDS_KEY, *remove)
+        pipe.incr(BANNED_WORDS_VERSION_KEY)
+        await pipe.execute()
+    _engine.reset()
+
+
+async def find_banned_words(text: str) -> list[BannedWordMatch]:
+    """返回文本中的全部封禁词命中（含原文位置）"""
+    matcher = await _engine.get_matcher()
+    return matcher.find_all(text)
+
+
+async def check_banned_word(text: str) -> str | None:
+    """检查文本是否包含封禁词，返回匹配到的封禁词或None"""
+    matcher = await _engine.get_matcher()
+    return matcher.find_first(text)
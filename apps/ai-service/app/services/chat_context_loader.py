@@ -0,0 +1,215 @@
+"""
+聊天上下文加载器 - 单次 round trip 获取一轮对话所需的全部数据
+
+原先一轮对话在首 token 前依次执行：
+get_message_content → get_gray_config → quick_search（3 条 SQL）
+→ fetch_group_profile / fetch_user_profiles，共 6+ 次 PG round trip。
+
+这里用一条 CTE + UNION ALL 语句一次性取回：
+- 触发消息（trg CTE）
+- 同 root 线程历史 + 同 chat 时间窗口补充消息
+- 用户名 / 用户画像（按行 LEFT JOIN）
+- 群名 / 灰度配置 / 群画像（按 chat_id LEFT JOIN）
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_, literal, select, union_all
+
+from app.orm.base import AsyncSessionLocal
+from app.orm.models import (
+    ConversationMessage,
+    GroupProfile,
+    LarkBaseChatInfo,
+    LarkGroupChatInfo,
+    LarkUser,
+    UserProfile,
+)
+from app.services.quick_search import QuickSearchResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatContextSnapshot:
+    """一轮对话的上下文快照
+
+    Attributes:
+        message_id: 触发消息ID
+        trigger: 触发消息（同时也是 history 的最后一条）
+        history: 按时间升序的历史消息（含触发消息）
+        chat_id: 聊天ID
+        chat_type: 聊天类型（p2p/group）
+        chat_name: 群聊名称（私聊时为None）
+        gray_config: 所属 chat 的灰度配置
+        group_profile: 群聊画像
+        user_profiles: 用户ID → 画像（仅 user 角色）
+        query_count: 本次加载执行的 SQL 语句数
+        elapsed_ms: 本次加载的 DB 耗时（毫秒）
+    """
+
+    message_id: str
+    trigger: QuickSearchResult
+    history: list[QuickSearchResult]
+    chat_id: str
+    chat_type: str
+    chat_name: str | None = None
+    gray_config: dict[str, Any] = field(default_factory=dict)
+    group_profile: str | None = None
+    user_profiles: dict[str, str | None] = field(default_factory=dict)
+    query_count: int = 0
+    elapsed_ms: float = 0.0
+
+
+def build_context_statement(
+    message_id: str, limit: int = 10, time_window_minutes: int = 30
+):
+    """构建上下文查询语句
+
+    与 quick_search 语义一致：取同 root 下不晚于触发消息的全部消息，
+    再补充同 chat 内时间窗口中最近的 limit 条其他 root 消息（是否需要由调用方裁剪）。
+    """
+    cm = ConversationMessage
+    trg = (
+        select(cm.root_message_id, cm.chat_id, cm.create_time)
+        .where(cm.message_id == message_id)
+        .cte("trg")
+    )
+    columns = (
+        cm.message_id,
+        cm.content,
+        cm.user_id,
+        cm.create_time,
+        cm.role,
+        cm.chat_type,
+        cm.reply_message_id,
+        cm.chat_id,
+    )
+
+    thread = select(*columns, literal(True).label("in_thread")).join(
+        trg,
+        and_(
+            cm.root_message_id == trg.c.root_message_id,
+            cm.create_time <= trg.c.create_time,
+        ),
+    )
+    window = (
+        select(*columns, literal(False).label("in_thread"))
+        .join(trg, cm.chat_id == trg.c.chat_id)
+        .where(
+            cm.root_message_id != trg.c.root_message_id,
+            cm.create_time >= trg.c.create_time - time_window_minutes * 60 * 1000,
+            cm.create_time < trg.c.create_time,
+        )
+        .order_by(cm.create_time.desc())
+        .limit(limit)
+        .subquery("window")
+    )
+    history = union_all(thread, select(window)).subquery("history")
+
+    return (
+        select(
+            history,
+            LarkUser.name.label("username"),
+            UserProfile.profile.label("user_profile"),
+            LarkGroupChatInfo.name.label("chat_name"),
+            LarkBaseChatInfo.gray_config.label("gray_config"),
+            GroupProfile.profile.label("group_profile"),
+        )
+        .outerjoin(LarkUser, history.c.user_id == LarkUser.union_id)
+        .outerjoin(UserProfile, history.c.user_id == UserProfile.user_id)
+        .outerjoin(LarkGroupChatInfo, history.c.chat_id == LarkGroupChatInfo.chat_id)
+        .outerjoin(LarkBaseChatInfo, history.c.chat_id == LarkBaseChatInfo.chat_id)
+        .outerjoin(GroupProfile, history.c.chat_id == GroupProfile.chat_id)
+        .order_by(history.c.create_time.asc())
+    )
+
+
+def _to_result(row: Any) -> QuickSearchResult:
+    return QuickSearchResult(
+        message_id=str(row["message_id"]),
+        content=str(row["content"]),
+        user_id=str(row["user_id"]),
+        create_time=datetime.fromtimestamp(row["create_time"] / 1000),
+        role=str(row["role"]),
+        username=row["username"] if row["role"] == "user" else "赤尾",
+        chat_type=str(row["chat_type"]),
+        chat_name=row["chat_name"],
+        reply_message_id=(
+            str(row["reply_message_id"]) if row["reply_message_id"] else None
+        ),
+        chat_id=row["chat_id"],
+    )
+
+
+def assemble_snapshot(
+    message_id: str, rows: list[Any], limit: int = 10
+) -> ChatContextSnapshot | None:
+    """将查询结果行（按时间升序）组装为快照；找不到触发消息时返回 None"""
+    trigger_row = next((r for r in rows if r["message_id"] == message_id), None)
+    if trigger_row is None:
+        return None
+
+    thread_rows = [r for r in rows if r["in_thread"]]
+    window_rows = [r for r in rows if not r["in_thread"]]
+    # 线程消息不足 limit 时，用时间窗口内最近的消息补足
+    needed = max(limit - len(thread_rows), 0)
+    kept_window = window_rows[len(window_rows) - needed :] if needed else []
+    kept = sorted(thread_rows + kept_window, key=lambda r: r["create_time"])
+
+    history = [_to_result(r) for r in kept]
+    user_profiles = {
+        str(r["user_id"]): r["user_profile"]
+        for r in kept
+        if r["role"] == "user" and r["user_profile"] is not None
+    }
+
+    return ChatContextSnapshot(
+        message_id=message_id,
+        trigger=next(h for h in history if h.message_id == message_id),
+        history=history,
+        chat_id=trigger_row["chat_id"] or "",
+        chat_type=trigger_row["chat_type"] or "p2p",
+        chat_name=trigger_row["chat_name"],
+        gray_config=trigger_row["gray_config"] or {},
+        group_profile=trigger_row["group_profile"],
+        user_profiles=user_profiles,
+    )
+
+
+async def load_chat_context(
+    message_id: str, limit: int = 10, time_window_minutes: int = 30
+) -> ChatContextSnapshot | None:
+    """单次 round trip 加载聊天上下文
+
+    Args:
+        message_id: 触发消息ID
+        limit: 历史消息数量限制
+        time_window_minutes: 补充消息的时间窗口（分钟）
+
+    Returns:
+        ChatContextSnapshot，触发消息不存在时返回 None
+    """
+    stmt = build_context_statement(message_id, limit, time_window_minutes)
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(stmt)
+        rows = list(result.mappings().all())
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    snapshot = assemble_snapshot(message_id, rows, limit)
+    logger.info(
+        f"load_chat_context: message_id={message_id}, rows={len(rows)}, "
+        f"queries=1, elapsed={elapsed_ms:.1f}ms"
+    )
+    if snapshot is None:
+        return None
+
+    snapshot.query_count = 1
+    snapshot.elapsed_ms = elapsed_ms
+    return snapshot
@@ -9,16 +9,109 @@ from collections.abc import AsyncGenerator
 
 from app.agents import stream_chat
 from app.types.chat import (
+    ChatDeltaResponse,
     ChatNormalResponse,
     ChatProcessResponse,
     ChatRequest,
     ChatStatusResponse,
+    ChatStreamChunk,
     Step,
+    StreamMode,
 )
+from app.utils.async_interval import AdaptiveIntervalChecker, AsyncIntervalChecker
 from app.utils.decorators import auto_json_serialize
 
 logger = logging.getLogger(__name__)
 
+# snapshot 模式：固定间隔推送完整累计内容（与旧版 main-server 行为一致）
+YIELD_INTERVAL = 0.5
+
+# delta 模式：首个增量立即推送，之后间隔逐步放大；积压过多时提前推送
+DELTA_MIN_INTERVAL = 0.2
+DELTA_MAX_INTERVAL = 1.0
+DELTA_MAX_PENDING_CHARS = 200
+
+
+class ReplyBuffer:
+    """回复缓冲：累计 stream_chat 产出的增量，按推送模式生成 SSE 事件
+
+    - snapshot: 每次推送完整累计内容
+    - delta: 推送 seq + 自上次推送以来追加的文本；replace 事件携带完整内容
+    """
+
+    def __init__(self, mode: StreamMode):
+        self.mode = mode
+        self.seq = 0
+        self._parts: list[str] = []
+        self._reason_parts: list[str] = []
+        self._pending: list[str] = []
+        self._pending_replace = False
+        self._dirty = False
+        self._snapshot_checker = AsyncIntervalChecker(YIELD_INTERVAL)
+        self._delta_checker = AdaptiveIntervalChecker(
+            DELTA_MIN_INTERVAL,
+            DELTA_MAX_INTERVAL,
+            max_pending=DELTA_MAX_PENDING_CHARS,
+        )
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def reason_content(self) -> str:
+        return "".join(self._reason_parts)
+
+    def append(self, chunk: ChatStreamChunk) -> None:
+        if chunk.replace:
+            self._parts = [chunk.content or ""]
+            self._pending = [chunk.content or ""]
+            self._pending_replace = True
+        elif chunk.content:
+            self._parts.append(chunk.content)
+            self._pending.append(chunk.content)
+        if chunk.reason_content:
+            self._reason_parts.append(chunk.reason_content)
+        self._dirty = True
+
+    def should_flush(self) -> bool:
+        if self.mode == StreamMode.DELTA:
+            return self._delta_checker.check(sum(len(p) for p in self._pending))
+        return self._snapshot_checker.check()
+
+    def flush(self) -> ChatProcessResponse | ChatDeltaResponse | None:
+        """产出自上次推送以来的事件，无新内容时返回 None"""
+        if not self._dirty:
+            return None
+
+        response: ChatProcessResponse | ChatDeltaResponse | None
+        if self.mode == StreamMode.DELTA:
+            delta = "".join(self._pending)
+            response = (
+                ChatDeltaResponse(seq=self.seq, delta=delta, replace=True)
+                if self._pending_replace
+                else ChatDeltaResponse(seq=self.seq, delta=delta)
+                if delta
+                else None
+            )
+            if response:
+                self.seq += 1
+        else:
+            content = self.content
+            reason_content = self.reason_content
+            response = (
+                ChatProcessResponse(
+                    step=Step.SEND, content=content, reason_content=reason_content
+                )
+                if content or reason_content
+                else None
+            )
+
+        self._pending = []
+        self._pending_replace = False
+        self._dirty = False
+        return response
+
 
 class ChatService:
     """聊天服务类"""
@@ -28,16 +121,20 @@ class ChatService:
     async def process_chat_sse(
         request: ChatRequest,
     ) -> AsyncGenerator[
-        ChatNormalResponse | ChatProcessResponse | ChatStatusResponse, None
+        ChatNormalResponse
+        | ChatProcessResponse
+        | ChatDeltaResponse
+        | ChatStatusResponse,
+        None,
     ]:
         """
         处理 SSE 聊天流程
 
         Args:
-            request: 聊天请求对象
+            request: 聊天请求对象（stream_mode 决定推送完整内容还是增量）
 
         Yields:
-            ChatNormalResponse | ChatProcessResponse: 聊天响应对象
+            ChatNormalResponse | ChatProcessResponse | ChatDeltaResponse | ChatStatusResponse: 聊天响应对象
         """
 
         try:
@@ -48,31 +145,31 @@ class ChatService:
             yield ChatNormalResponse(step=Step.START_REPLY)
 
             # 4. 生成并发送回复
-            last_content = ""  # 用于跟踪最后的内容
-            last_reason_content = ""  # 用于跟踪最后的思维链内容
+            reply = ReplyBuffer(request.stream_mode)
 
-            # 使用原有服务
             async for chunk in stream_chat(
                 request.message_id, session_id=request.session_id
             ):
                 if chunk.status_message:
+                    # 先推送已累计的内容，保持与状态消息的先后顺序
+                    if pending := reply.flush():
+                        yield pending
                     yield ChatStatusResponse(
                         step=Step.SEND, status_message=chunk.status_message
                     )
-                elif chunk.content or chunk.reason_content:
-                    last_content = chunk.content  # 保存最后的内容
-                    last_reason_content = chunk.reason_content  # 保存最后的思维链内容
-                    yield ChatProcessResponse(
-                        step=Step.SEND,
-                        content=chunk.content,
-                        reason_content=chunk.reason_content,
-                    )
+                elif chunk.content or chunk.reason_content or chunk.replace:
+                    reply.append(chunk)
+                    if reply.should_flush() and (pending := reply.flush()):
+                        yield pending
+
+            if pending := reply.flush():
+                yield pending
 
             # 5. 回复成功，返回完整内容
             yield ChatProcessResponse(
                 step=Step.SUCCESS,
-                content=last_content,
-                reason_content=last_reason_content,
+                content=reply.content,
+                reason_content=reply.reason_content,
             )
 
         except Exception as e:
@@ -0,0 +1,171 @@
+"""search_group_history 结果缓存
+
+Agent 在同一段对话的多轮里经常重复发出相同或几乎相同的历史检索，每次都要
+生成查询向量、做一次 Qdrant 混合检索和上下文 SQL。这里提供两层缓存：
+
+1. 结果缓存（Redis）：以 (chat_id, 召回向量版本, 归一化查询, limit) 为 key
+   缓存格式化后的结果文本，值中带写入时该群的向量水位
+2. 查询向量 LRU（进程内）：以 (模型名, 归一化查询) 为 key 缓存查询的混合向量
+
+失效：向量化 worker 每为某个群写入新的点，就把该群的水位（Redis 计数器）加一；
+读取时水位与条目中记录的不一致即视为过期。水位与结果用一次 MGET 取回。
+Redis 异常时直接放行（视为未命中，且不写入）。
+"""
+
+import hashlib
+import json
+import logging
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from app.agents.clients.base import HybridEmbedding
+from app.clients.redis import AsyncRedisClient
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_RESULT_KEY_PREFIX = "history:result:"
+_WATERMARK_KEY_PREFIX = "history:watermark:"
+_WATERMARK_TTL_SECONDS = 30 * 86400  # 长期没有新消息的群，水位随结果一起过期
+
+
+def normalize_query(query: str) -> str:
+    """全角 / 大小写 / 空白差异不同的查询视为同一查询"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def watermark_key(chat_id: str) -> str:
+    return f"{_WATERMARK_KEY_PREFIX}{chat_id}"
+
+
+def result_key(chat_id: str, version: str, query: str, limit: int) -> str:
+    digest = hashlib.sha256(
+        f"{version}\0{normalize_query(query)}\0{limit}".encode()
+    ).hexdigest()
+    return f"{_RESULT_KEY_PREFIX}{chat_id}:{digest}"
+
+
+async def bump_watermarks(chat_ids: list[str]) -> None:
+    """群内写入了新的点：水位加一，使该群已缓存的检索结果失效"""
+    if not chat_ids:
+        return
+    try:
+        redis = AsyncRedisClient.get_instance()
+        async with redis.pipeline(transaction=False) as pipe:
+            for chat_id in dict.fromkeys(chat_ids):
+                pipe.incr(watermark_key(chat_id))
+                pipe.expire(watermark_key(chat_id), _WATERMARK_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"更新历史检索水位失败: {e}")
+
+
+@dataclass
+class HistorySearchCacheStats:
+    """历史检索缓存统计"""
+
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0  # 条目存在但水位已变化
+    errors: int = 0
+    embedding_hits: int = 0
+    embedding_misses: int = 0
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **asdict(self),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class HistorySearchCache:
+    """按群水位失效的检索结果缓存 + 查询向量 LRU"""
+
+    def __init__(
+        self,
+        ttl_seconds: int | None = None,
+        embedding_cache_size: int | None = None,
+    ):
+        self.ttl_seconds = ttl_seconds or settings.history_search_cache_ttl_seconds
+        self.embedding_cache_size = (
+            embedding_cache_size or settings.history_query_embedding_cache_size
+        )
+        self.stats = HistorySearchCacheStats()
+        self._embeddings: OrderedDict[tuple[str, str], HybridEmbedding] = OrderedDict()
+
+    async def get(
+        self, chat_id: str, version: str, query: str, limit: int
+    ) -> tuple[str | None, int | None]:
+        """查询缓存结果，返回 (结果文本, 当前水位)
+
+        未命中时结果为 None；Redis 不可用时水位也为 None，调用方不应写入。
+        """
+        try:
+            redis = AsyncRedisClient.get_instance()
+            raw_watermark, raw = await redis.mget(
+                [watermark_key(chat_id), result_key(chat_id, version, query, limit)]
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            self.stats.misses += 1
+            logger.warning(f"读取历史检索缓存失败: {e}")
+            return None, None
+
+        watermark = int(raw_watermark or 0)
+        if raw:
+            try:
+                entry = json.loads(raw)
+                if entry["watermark"] == watermark:
+                    self.stats.hits += 1
+                    return entry["text"], watermark
+                self.stats.stale += 1
+            except Exception as e:
+                logger.warning(f"历史检索缓存条目损坏，忽略: {e}")
+        self.stats.misses += 1
+        return None, watermark
+
+    async def put(
+        self,
+        chat_id: str,
+        version: str,
+        query: str,
+        limit: int,
+        watermark: int,
+        text: str,
+    ) -> None:
+        """写入结果；watermark 须是检索开始前读到的水位，检索期间有新写入时条目直接过期"""
+        try:
+            redis = AsyncRedisClient.get_instance()
+            await redis.set(
+                result_key(chat_id, version, query, limit),
+                json.dumps({"watermark": watermark, "text": text}, ensure_ascii=False),
+                ex=self.ttl_seconds,
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"写入历史检索缓存失败: {e}")
+
+    def get_embedding(self, model_name: str, query: str) -> HybridEmbedding | None:
+        key = (model_name, normalize_query(query))
+        embedding = self._embeddings.get(key)
+        if embedding is None:
+            self.stats.embedding_misses += 1
+            return None
+        self._embeddings.move_to_end(key)
+        self.stats.embedding_hits += 1
+        return embedding
+
+    def put_embedding(
+        self, model_name: str, query: str, embedding: HybridEmbedding
+    ) -> None:
+        key = (model_name, normalize_query(query))
+        self._embeddings[key] = embedding
+        self._embeddings.move_to_end(key)
+        while len(self._embeddings) > self.embedding_cache_size:
+            self._embeddings.popitem(last=False)
+
+
+# 全局单例
+history_search_cache = HistorySearchCache()
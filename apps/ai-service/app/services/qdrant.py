@@ -3,14 +3,18 @@ from datetime import datetime
 from typing import Any
 
 import numpy as np
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import (
     Distance,
     ExtendedPointId,
+    FieldCondition,
     Filter,
+    MatchValue,
     PointStruct,
+    PointVectors,
     Prefetch,
+    SearchParams,
     SparseIndexParams,
     SparseVector,
     SparseVectorParams,
@@ -18,24 +22,43 @@ from qdrant_client.http.models import (
 )
 
 from app.config.config import settings
+from app.services.qdrant_schema import TENANT_FIELD, sync_collections
 
 logger = logging.getLogger(__name__)
 
 
 class QdrantService:
-    def __init__(self):
-        self.client = QdrantClient(
+    """Qdrant 向量库服务（基于 AsyncQdrantClient，不阻塞事件循环）
+
+    传输方式和连接池由配置决定：
+    - qdrant_prefer_grpc: 优先使用 gRPC（端口 qdrant_service_grpc_port）
+    - qdrant_pool_size: REST 模式下为 httpx 最大连接数，gRPC 模式下为 channel 数量
+    """
+
+    def __init__(self, client: AsyncQdrantClient | None = None):
+        self.client = client or AsyncQdrantClient(
             host=settings.qdrant_service_host,
             port=settings.qdrant_service_port,
+            grpc_port=settings.qdrant_service_grpc_port,
             api_key=settings.qdrant_service_api_key,
-            prefer_grpc=False,
+            prefer_grpc=settings.qdrant_prefer_grpc,
             https=False,
+            timeout=settings.qdrant_timeout,
+            pool_size=settings.qdrant_pool_size,
+            check_compatibility=False,
         )
 
+    async def close(self) -> None:
+        """关闭底层连接（应用/Worker 退出时调用）"""
+        try:
+            await self.client.close()
+        except Exception as e:
+            logger.warning(f"关闭 Qdrant 客户端失败: {str(e)}")
+
     async def create_collection(self, collection_name: str, vector_size: int) -> bool:
         """创建新的集合"""
         try:
-            self.client.create_collection(
+            await self.client.create_collection(
                 collection_name=collection_name,
                 vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
             )
@@ -53,7 +76,7 @@ class QdrantService:
     ) -> bool:
         """插入或更新向量"""
         try:
-            self.client.upsert(
+            await self.client.upsert(
                 collection_name=collection,
                 points=models.Batch(
                     ids=ids, vectors=vectors, payloads=payloads or [{}] * len(vectors)
@@ -64,17 +87,80 @@ class QdrantService:
             logger.error(f"插入向量失败: {str(e)}")
             return False
 
+    async def upsert_points(
+        self, collection_name: str, points: list[PointStruct], wait: bool = True
+    ) -> bool:
+        """批量写入点
+
+        Args:
+            collection_name: 集合名称
+            points: 点列表
+            wait: 是否等待写入生效（False 时 Qdrant 写入 WAL 后即返回）
+        """
+        try:
+            await self.client.upsert(
+                collection_name=collection_name, points=points, wait=wait
+            )
+            return True
+        except Exception as e:
+            logger.error(f"批量写入 {collection_name} 失败: {str(e)}")
+            return False
+
+    async def update_vectors(
+        self, collection_name: str, points: list[PointVectors], wait: bool = True
+    ) -> bool:
+        """只更新已有点的指定命名向量（不影响该点的其他向量和 payload）
+
+        Args:
+            collection_name: 集合名称
+            points: 点 ID + 待更新的命名向量
+            wait: 是否等待写入生效
+        """
+        try:
+            await self.client.update_vectors(
+                collection_name=collection_name, points=points, wait=wait
+            )
+            return True
+        except Exception as e:
+            logger.error(f"更新 {collection_name} 命名向量失败: {str(e)}")
+            return False
+
+    async def existing_ids(
+        self, collection_name: str, ids: list[ExtendedPointId]
+    ) -> set[ExtendedPointId]:
+        """返回 ids 中已存在的点 ID（不取 payload 和向量）；请求失败时抛出"""
+        if not ids:
+            return set()
+        records = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=ids,
+            with_payload=False,
+            with_vectors=False,
+        )
+        return {record.id for record in records}
+
+    async def missing_vectors(
+        self, collection_name: str, vector_names: list[str]
+    ) -> list[str]:
+        """返回集合中未声明的命名向量（Dense 与 Sparse 均检查）"""
+        info = await self.client.get_collection(collection_name)
+        params = info.config.params
+        declared = set(params.sparse_vectors or {})
+        if isinstance(params.vectors, dict):
+            declared |= set(params.vectors)
+        return [name for name in vector_names if name not in declared]
+
     async def search_vectors(
         self, collection_name: str, query_vector: list[float], limit: int = 10
     ) -> list[dict[str, Any]]:
         """搜索最相似的向量"""
         try:
-            results = self.client.search(
-                collection_name=collection_name, query_vector=query_vector, limit=limit
+            response = await self.client.query_points(
+                collection_name=collection_name, query=query_vector, limit=limit
             )
             return [
                 {"id": hit.id, "score": hit.score, "payload": hit.payload}
-                for hit in results
+                for hit in response.points
             ]
         except Exception as e:
             logger.error(f"搜索向量失败: {str(e)}")
@@ -104,12 +190,13 @@ class QdrantService:
         """
         try:
             # 获取原始搜索结果
-            results = self.client.search(
+            response = await self.client.query_points(
                 collection_name=collection_name,
-                query_vector=query_vector,
+                query=query_vector,
                 query_filter=query_filter,
                 limit=limit * 2,  # 获取更多结果以便后续重排序
             )
+            results = response.points
 
             if not results:
                 return []
@@ -182,7 +269,7 @@ class QdrantService:
     async def delete_collection(self, collection_name: str) -> bool:
         """删除集合"""
         try:
-            self.client.delete_collection(collection_name=collection_name)
+            await self.client.delete_collection(collection_name=collection_name)
             return True
         except Exception as e:
             logger.error(f"删除集合失败: {str(e)}")
@@ -192,23 +279,28 @@ class QdrantService:
         self,
         collection_name: str,
         dense_size: int = 1024,
+        vector_names: list[tuple[str, str]] | None = None,
     ) -> bool:
         """创建支持 Dense + Sparse 双向量的混合集合
 
         Args:
             collection_name: 集合名称
             dense_size: Dense 向量维度，默认 1024
+            vector_names: [(Dense 名称, Sparse 名称)]，默认 [("dense", "sparse")]
         """
+        vector_names = vector_names or [("dense", "sparse")]
         try:
-            self.client.create_collection(
+            await self.client.create_collection(
                 collection_name=collection_name,
                 vectors_config={
-                    "dense": VectorParams(size=dense_size, distance=Distance.COSINE),
+                    dense: VectorParams(size=dense_size, distance=Distance.COSINE)
+                    for dense, _ in vector_names
                 },
                 sparse_vectors_config={
-                    "sparse": SparseVectorParams(
+                    sparse: SparseVectorParams(
                         index=SparseIndexParams(on_disk=False),
-                    ),
+                    )
+                    for _, sparse in vector_names
                 },
             )
             return True
@@ -224,6 +316,7 @@ class QdrantService:
         sparse_indices: list[int],
         sparse_values: list[float],
         payload: dict[str, Any],
+        chat_id: str | None = None,
     ) -> bool:
         """插入混合向量（Dense + Sparse）
 
@@ -234,7 +327,10 @@ class QdrantService:
             sparse_indices: Sparse 向量索引
             sparse_values: Sparse 向量值
             payload: 元数据
+            chat_id: 所属群，写入租户字段（集合按群分区时决定点的存放位置）
         """
+        if chat_id is not None:
+            payload = {**payload, TENANT_FIELD: chat_id}
         try:
             point = PointStruct(
                 id=point_id,
@@ -247,7 +343,7 @@ class QdrantService:
                 },
                 payload=payload,
             )
-            self.client.upsert(
+            await self.client.upsert(
                 collection_name=collection_name,
                 points=[point],
             )
@@ -265,8 +361,14 @@ class QdrantService:
         query_filter: Filter | None = None,
         limit: int = 10,
         prefetch_limit: int | None = None,
+        dense_using: str = "dense",
+        sparse_using: str = "sparse",
+        search_params: SearchParams | None = None,
+        fusion: models.Fusion = models.Fusion.RRF,
+        chat_id: str | None = None,
+        raise_errors: bool = False,
     ) -> list[dict[str, Any]]:
-        """混合搜索（Dense + Sparse，使用 RRF 融合）
+        """混合搜索（Dense + Sparse，默认使用 RRF 融合）
 
         Args:
             collection_name: 集合名称
@@ -276,34 +378,49 @@ class QdrantService:
             query_filter: 过滤条件
             limit: 返回结果数量
             prefetch_limit: 预取数量，默认为 limit * 5
+            dense_using: Dense 命名向量（版本见 vector_schema）
+            sparse_using: Sparse 命名向量
+            search_params: Dense 预取的检索参数（hnsw_ef、量化重打分、exact 等）
+            fusion: 融合方式，默认 RRF
+            chat_id: 只检索该群（租户）的数据，与 query_filter 同时生效
+            raise_errors: 失败时抛出异常而不是返回空列表
+                （调用方需要区分"没有结果"和"检索失败"时使用）
 
         Returns:
             搜索结果列表
         """
         try:
             prefetch_count = prefetch_limit or limit * 5
+            if chat_id is not None:
+                tenant = FieldCondition(
+                    key=TENANT_FIELD, match=MatchValue(value=chat_id)
+                )
+                query_filter = Filter(
+                    must=[tenant, query_filter] if query_filter else [tenant]
+                )
 
             # 使用 prefetch + RRF 融合
-            results = self.client.query_points(
+            results = await self.client.query_points(
                 collection_name=collection_name,
                 prefetch=[
                     Prefetch(
                         query=dense_vector,
-                        using="dense",
+                        using=dense_using,
                         limit=prefetch_count,
                         filter=query_filter,
+                        params=search_params,
                     ),
                     Prefetch(
                         query=SparseVector(
                             indices=sparse_indices,
                             values=sparse_values,
                         ),
-                        using="sparse",
+                        using=sparse_using,
                         limit=prefetch_count,
                         filter=query_filter,
                     ),
                 ],
-                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                query=models.FusionQuery(fusion=fusion),
                 limit=limit,
             )
 
@@ -313,6 +430,8 @@ class QdrantService:
             ]
         except Exception as e:
             logger.error(f"混合搜索失败: {str(e)}")
+            if raise_errors:
+                raise
             return []
 
 
@@ -321,24 +440,8 @@ qdrant_service = QdrantService()
 
 
 async def init_qdrant_collections():
-    """初始化所有必要的 QDrant 集合"""
+    """按 qdrant_schema 中的声明创建 / 迁移所有 Qdrant 集合（幂等）"""
     try:
-        # 创建消息召回混合向量集合（Dense + Sparse）
-        recall_result = await qdrant_service.create_hybrid_collection(
-            collection_name="messages_recall", dense_size=1024
-        )
-        if recall_result:
-            logger.info("Qdrant 消息召回混合向量集合创建成功")
-        else:
-            logger.warning("Qdrant 消息召回混合向量集合可能已存在")
-
-        # 创建消息聚类向量集合，向量维度为1024（火山引擎多模态模型）
-        cluster_result = await qdrant_service.create_collection(
-            collection_name="messages_cluster", vector_size=1024
-        )
-        if cluster_result:
-            logger.info("Qdrant 消息聚类向量集合创建成功")
-        else:
-            logger.warning("Qdrant 消息聚类向量集合可能已存在")
+        await sync_collections(qdrant_service.client)
     except Exception as e:
         logger.error(f"初始化QDrant集合失败: {str(e)}")
@@ -0,0 +1,389 @@
+"""
+Qdrant 集合 schema 声明与同步
+
+declared_collections() 声明每个集合的向量、payload 索引、HNSW 参数、量化方式和
+payload 存储位置；启动时 sync_collections 逐项对比声明与线上配置：
+
+- 集合不存在：按声明创建，并建立 payload 索引
+- payload 索引缺失 / 类型或参数不一致：创建 / 删除后重建
+- HNSW、量化、on_disk_payload 不一致：update_collection 在线修改（Qdrant 后台重建）
+- 向量维度不一致、缺少命名向量：无法在线修改，只报告，需要人工迁移
+- 线上存在但未声明的 payload 索引：只报告，不删除
+
+messages_recall 默认按 chat_id 分租户（qdrant_recall_tenant_partition）：chat_id 建
+is_tenant 索引，Qdrant 按群聚合存储；不建全局 HNSW 图（m=0），每个群单独建图
+（payload_m），群内检索只访问该群的段和图。已有集合的迁移同样由同步完成：重建
+chat_id 索引并修改 HNSW 参数后，Qdrant 在后台按新布局重新优化已有的点
+（期间集合状态为 yellow，可照常读写）。
+
+每一项差异以 SchemaDrift 返回并记录日志，重复执行是幂等的；
+qdrant_schema_auto_migrate=False 时只报告不修改。
+"""
+
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionParamsDiff,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    IntegerIndexParams,
+    IntegerIndexType,
+    KeywordIndexParams,
+    KeywordIndexType,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseIndexParams,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from app.config.config import settings
+from app.services.vector_schema import all_recall_versions
+
+logger = logging.getLogger(__name__)
+
+# 租户字段：messages_recall 按群分区，检索 / 写入都按它路由
+TENANT_FIELD = "chat_id"
+
+# 所有集合的 payload 都带有 chat_id / user_id / timestamp（毫秒）
+_MESSAGE_PAYLOAD_INDEXES: dict[str, Any] = {
+    "chat_id": PayloadSchemaType.KEYWORD,
+    "user_id": PayloadSchemaType.KEYWORD,
+    # 只用于范围过滤，不需要精确匹配索引
+    "timestamp": IntegerIndexParams(
+        type=IntegerIndexType.INTEGER, lookup=False, range=True
+    ),
+}
+
+
+@dataclass(frozen=True)
+class CollectionSchema:
+    """一个集合的声明配置"""
+
+    name: str
+    dense_size: int
+    # 命名 Dense 向量；为空时是单个匿名 Dense 向量
+    dense_vectors: tuple[str, ...] = ()
+    sparse_vectors: tuple[str, ...] = ()
+    # 字段 → PayloadSchemaType 或 *IndexParams
+    payload_indexes: dict[str, Any] = field(default_factory=dict)
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    # 按 payload 索引（租户）单独建图的 m；None 为不建
+    hnsw_payload_m: int | None = None
+    quantization: str = "none"  # none | scalar | binary
+    quantization_always_ram: bool = True
+    on_disk_payload: bool = True
+
+
+@dataclass(frozen=True)
+class SchemaDrift:
+    """声明与线上配置的一项差异"""
+
+    collection: str
+    item: str  # collection / vectors.<名称> / payload_index.<字段> / hnsw / ...
+    declared: str
+    live: str
+    migratable: bool
+    migrated: bool = False
+
+
+def declared_collections() -> list[CollectionSchema]:
+    """当前配置下应存在的集合"""
+    # 消息聚类：单个匿名 Dense 向量
+    cluster = CollectionSchema(
+        name="messages_cluster",
+        dense_size=1024,
+        payload_indexes=_MESSAGE_PAYLOAD_INDEXES,
+        hnsw_m=settings.qdrant_hnsw_m,
+        hnsw_ef_construct=settings.qdrant_hnsw_ef_construct,
+        quantization=settings.qdrant_quantization,
+        quantization_always_ram=settings.qdrant_quantization_always_ram,
+        on_disk_payload=settings.qdrant_on_disk_payload,
+    )
+    # 消息召回：Dense + Sparse，每个已配置版本一组命名向量
+    versions = all_recall_versions()
+    recall = replace(
+        cluster,
+        name="messages_recall",
+        dense_vectors=tuple(v.dense for v in versions),
+        sparse_vectors=tuple(v.sparse for v in versions),
+    )
+    if settings.qdrant_recall_tenant_partition:
+        recall = replace(
+            recall,
+            hnsw_m=0,
+            hnsw_payload_m=settings.qdrant_hnsw_payload_m,
+            payload_indexes={
+                **_MESSAGE_PAYLOAD_INDEXES,
+                TENANT_FIELD: KeywordIndexParams(
+                    type=KeywordIndexType.KEYWORD, is_tenant=True
+                ),
+            },
+        )
+    return [recall, cluster]
+
+
+def _quantization_config(schema: CollectionSchema):
+    if schema.quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, always_ram=schema.quantization_always_ram
+            )
+        )
+    if schema.quantization == "binary":
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=schema.quantization_always_ram)
+        )
+    if schema.quantization == "none":
+        return None
+    raise ValueError(f"不支持的量化方式: {schema.quantization}")
+
+
+def _hnsw_config(schema: CollectionSchema) -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=schema.hnsw_m,
+        ef_construct=schema.hnsw_ef_construct,
+        payload_m=schema.hnsw_payload_m,
+    )
+
+
+def _describe_quantization(config) -> str:
+    if isinstance(config, ScalarQuantization):
+        return f"scalar(always_ram={bool(config.scalar.always_ram)})"
+    if isinstance(config, BinaryQuantization):
+        return f"binary(always_ram={bool(config.binary.always_ram)})"
+    if config is None:
+        return "none"
+    return type(config).__name__
+
+
+def _index_type(schema) -> str:
+    return str(getattr(schema, "type", schema).value)
+
+
+def _describe_index(schema) -> str:
+    """索引类型 + 声明中显式设置的参数，如 integer(lookup=False, range=True)"""
+    if isinstance(schema, PayloadSchemaType):
+        return schema.value
+    params = ", ".join(
+        f"{name}={getattr(schema, name)}"
+        for name in sorted(schema.model_fields_set - {"type"})
+    )
+    return f"{_index_type(schema)}({params})"
+
+
+def _index_matches(declared, live) -> bool:
+    if _index_type(declared) != _index_type(live.data_type):
+        return False
+    if isinstance(declared, PayloadSchemaType):
+        return True
+    # 只比较声明中显式设置的参数
+    return all(
+        getattr(live.params, name, None) == getattr(declared, name)
+        for name in declared.model_fields_set - {"type"}
+    )
+
+
+def diff_collection(schema: CollectionSchema, info) -> list[SchemaDrift]:
+    """对比声明与 get_collection 返回的线上配置"""
+    drifts = []
+    name = schema.name
+    params = info.config.params
+
+    # 向量：维度与命名向量都无法在线修改
+    live_vectors = params.vectors
+    if schema.dense_vectors:
+        live_named = live_vectors if isinstance(live_vectors, dict) else {}
+        expected = dict.fromkeys(schema.dense_vectors, schema.dense_size)
+    else:
+        live_named = {"": live_vectors} if live_vectors is not None else {}
+        expected = {"": schema.dense_size}
+    for vector, size in expected.items():
+        live = live_named.get(vector)
+        live_size = getattr(live, "size", None)
+        if live_size != size:
+            drifts.append(
+                SchemaDrift(
+                    name,
+                    f"vectors.{vector or 'default'}",
+                    f"dense({size})",
+                    "missing" if live is None else f"dense({live_size})",
+                    migratable=False,
+                )
+            )
+    live_sparse = params.sparse_vectors or {}
+    for vector in schema.sparse_vectors:
+        if vector not in live_sparse:
+            drifts.append(
+                SchemaDrift(
+                    name, f"vectors.{vector}", "sparse", "missing", migratable=False
+                )
+            )
+
+    # payload 索引
+    live_indexes = info.payload_schema or {}
+    for key, declared in schema.payload_indexes.items():
+        live = live_indexes.get(key)
+        if live is None or not _index_matches(declared, live):
+            drifts.append(
+                SchemaDrift(
+                    name,
+                    f"payload_index.{key}",
+                    _describe_index(declared),
+                    "missing" if live is None else _index_type(live.data_type),
+                    migratable=True,
+                )
+            )
+    for key, live in live_indexes.items():
+        if key not in schema.payload_indexes:
+            drifts.append(
+                SchemaDrift(
+                    name,
+                    f"payload_index.{key}",
+                    "undeclared",
+                    _index_type(live.data_type),
+                    migratable=False,
+                )
+            )
+
+    # HNSW / 量化 / payload 存储
+    hnsw = info.config.hnsw_config
+    declared_hnsw = f"m={schema.hnsw_m}, ef_construct={schema.hnsw_ef_construct}"
+    live_hnsw = f"m={hnsw.m}, ef_construct={hnsw.ef_construct}"
+    if schema.hnsw_payload_m is not None:
+        declared_hnsw += f", payload_m={schema.hnsw_payload_m}"
+        live_hnsw += f", payload_m={getattr(hnsw, 'payload_m', None)}"
+    if declared_hnsw != live_hnsw:
+        drifts.append(SchemaDrift(name, "hnsw", declared_hnsw, live_hnsw, True))
+
+    declared_quantization = _describe_quantization(_quantization_config(schema))
+    live_quantization = _describe_quantization(info.config.quantization_config)
+    if declared_quantization != live_quantization:
+        drifts.append(
+            SchemaDrift(
+                name, "quantization", declared_quantization, live_quantization, True
+            )
+        )
+
+    if params.on_disk_payload != schema.on_disk_payload:
+        drifts.append(
+            SchemaDrift(
+                name,
+                "on_disk_payload",
+                str(schema.on_disk_payload),
+                str(params.on_disk_payload),
+                True,
+            )
+        )
+    return drifts
+
+
+async def _create_collection(
+    client: AsyncQdrantClient, schema: CollectionSchema
+) -> None:
+    dense = VectorParams(size=schema.dense_size, distance=Distance.COSINE)
+    await client.create_collection(
+        collection_name=schema.name,
+        vectors_config=(
+            dict.fromkeys(schema.dense_vectors, dense)
+            if schema.dense_vectors
+            else dense
+        ),
+        sparse_vectors_config={
+            v: SparseVectorParams(index=SparseIndexParams(on_disk=False))
+            for v in schema.sparse_vectors
+        }
+        or None,
+        hnsw_config=_hnsw_config(schema),
+        quantization_config=_quantization_config(schema),
+        on_disk_payload=schema.on_disk_payload,
+    )
+    for key, index in schema.payload_indexes.items():
+        await client.create_payload_index(schema.name, key, field_schema=index)
+
+
+async def _apply(
+    client: AsyncQdrantClient, schema: CollectionSchema, drifts: list[SchemaDrift]
+) -> list[SchemaDrift]:
+    """修复可在线迁移的差异，返回标记了 migrated 的差异列表"""
+    items = {d.item for d in drifts if d.migratable}
+
+    for item in sorted(i for i in items if i.startswith("payload_index.")):
+        key = item.removeprefix("payload_index.")
+        if any(d.item == item and d.live != "missing" for d in drifts):
+            await client.delete_payload_index(schema.name, key)
+        await client.create_payload_index(
+            schema.name, key, field_schema=schema.payload_indexes[key]
+        )
+
+    update: dict[str, Any] = {}
+    if "hnsw" in items:
+        update["hnsw_config"] = _hnsw_config(schema)
+    if "quantization" in items:
+        update["quantization_config"] = (
+            _quantization_config(schema) or Disabled.DISABLED
+        )
+    if "on_disk_payload" in items:
+        update["collection_params"] = CollectionParamsDiff(
+            on_disk_payload=schema.on_disk_payload
+        )
+    if update and not await client.update_collection(schema.name, **update):
+        raise RuntimeError(f"更新集合 {schema.name} 配置失败")
+
+    return [replace(d, migrated=d.migratable) for d in drifts]
+
+
+async def sync_collection(
+    client: AsyncQdrantClient, schema: CollectionSchema, migrate: bool = True
+) -> list[SchemaDrift]:
+    """同步单个集合，返回发现的差异（migrate=True 时可迁移项已修复）"""
+    if not await client.collection_exists(schema.name):
+        if migrate:
+            await _create_collection(client, schema)
+            logger.info(f"Qdrant 集合 {schema.name} 已按声明创建")
+        return [
+            SchemaDrift(schema.name, "collection", "present", "missing", True, migrate)
+        ]
+
+    drifts = diff_collection(schema, await client.get_collection(schema.name))
+    if migrate and any(d.migratable for d in drifts):
+        drifts = await _apply(client, schema, drifts)
+    return drifts
+
+
+async def sync_collections(
+    client: AsyncQdrantClient,
+    schemas: list[CollectionSchema] | None = None,
+    migrate: bool | None = None,
+) -> list[SchemaDrift]:
+    """同步所有声明的集合并记录差异；单个集合失败不影响其他集合"""
+    auto_migrate: bool = (
+        settings.qdrant_schema_auto_migrate if migrate is None else migrate
+    )
+    drifts = []
+    for schema in schemas if schemas is not None else declared_collections():
+        try:
+            drifts.extend(await sync_collection(client, schema, auto_migrate))
+        except Exception as e:
+            logger.error(f"同步 Qdrant 集合 {schema.name} 失败: {str(e)}")
+
+    for d in drifts:
+        if d.migrated:
+            logger.info(
+                f"Qdrant schema 已迁移 {d.collection}.{d.item}: {d.live} -> {d.declared}"
+            )
+        else:
+            logger.warning(
+                f"Qdrant schema 差异 {d.collection}.{d.item}: 声明 {d.declared}，"
+                f"线上 {d.live}" + ("" if d.migratable else "（需人工迁移）")
+            )
+    return drifts
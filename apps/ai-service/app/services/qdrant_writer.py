@@ -0,0 +1,119 @@
+"""Qdrant 写入缓冲（write-behind）
+
+并发处理中的多条消息把各自的点交给同一个缓冲区，攒满 max_points 或等待
+flush_interval 后按集合合并为一次 upsert。
+
+调用方 `await write(...)` 在包含其点的那次 flush 成功后才返回，失败时抛出异常，
+因此调用方可以在 write 返回后再更新 vector_status / XACK（ack-after-flush），
+flush 失败的消息留在 pending 中等待重试。
+
+Usage:
+    writer = QdrantWriteBuffer()
+    await writer.write({"messages_recall": [p1], "messages_cluster": [p2]})
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+from qdrant_client.http.models import PointStruct
+
+from app.config.config import settings
+from app.services.qdrant import QdrantService, qdrant_service
+
+logger = logging.getLogger(__name__)
+
+
+class QdrantFlushError(RuntimeError):
+    """批量写入 Qdrant 失败"""
+
+
+class QdrantWriteBuffer:
+    """按点数 / 时间窗口合并 Qdrant upsert"""
+
+    def __init__(
+        self,
+        service: QdrantService = qdrant_service,
+        max_points: int | None = None,
+        flush_interval_ms: float | None = None,
+        wait: bool | None = None,
+    ):
+        self._service = service
+        self.max_points = max_points or settings.vectorize_flush_max_points
+        self.flush_interval = (
+            flush_interval_ms
+            if flush_interval_ms is not None
+            else settings.vectorize_flush_interval_ms
+        ) / 1000
+        self.wait = settings.vectorize_upsert_wait if wait is None else wait
+
+        self._points: dict[str, list[PointStruct]] = defaultdict(list)
+        self._size = 0
+        self._waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"writes": 0, "flushes": 0, "points": 0, "errors": 0}
+
+    async def write(self, points: dict[str, list[PointStruct]]) -> None:
+        """加入缓冲并等待包含这些点的 flush 完成
+
+        Raises:
+            QdrantFlushError: flush 失败
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        for collection, items in points.items():
+            self._points[collection].extend(items)
+            self._size += len(items)
+        self._waiters.append(future)
+        self.stats["writes"] += 1
+
+        if self._size >= self.max_points:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._flush)
+        await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+        points, self._points = self._points, defaultdict(list)
+        waiters, self._waiters = self._waiters, []
+        self._size = 0
+        task = asyncio.create_task(self._run_flush(points, waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_flush(
+        self, points: dict[str, list[PointStruct]], waiters: list[asyncio.Future]
+    ) -> None:
+        self.stats["flushes"] += 1
+        results = await asyncio.gather(
+            *(
+                self._service.upsert_points(collection, items, wait=self.wait)
+                for collection, items in points.items()
+            )
+        )
+        failed = [c for c, ok in zip(points, results, strict=True) if not ok]
+
+        if failed:
+            self.stats["errors"] += 1
+            error = QdrantFlushError(f"写入 Qdrant 失败: {failed}")
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.stats["points"] += sum(len(items) for items in points.values())
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    async def drain(self) -> None:
+        """立即 flush 剩余的点并等待全部 flush 完成（退出前调用）"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
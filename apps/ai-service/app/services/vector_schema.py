@@ -0,0 +1,63 @@
+"""messages_recall 命名向量版本
+
+同一个点上可以同时存放多个版本的 Dense + Sparse 命名向量：
+- v1 沿用历史命名 dense / sparse
+- 其他版本命名为 dense_<版本> / sparse_<版本>
+
+命名向量只能在创建集合时声明：新建的 messages_recall 会声明 recall_vector_models
+中的全部版本，而 Qdrant 不能给已有集合新增命名向量（schema 同步只报告
+"需人工迁移"）。在已有集合上，未声明的版本不会被写入（向量化 worker 跳过并报错，
+回填任务直接 FAILED），否则整批 upsert 都会失败。
+
+切换 embedding 模型的流程：
+1. recall_vector_models 中加入新版本；已有集合需先人工迁移（按声明重建集合并
+   重新导入已有的点）
+2. recall_vector_write_versions 加入新版本，新消息双写
+3. 提交 recall_backfill 任务把历史消息回填到新版本
+4. recall_vector_read_version 切换到新版本，之后从写入版本中移除旧版本
+"""
+
+from dataclasses import dataclass
+
+from app.config.config import settings
+
+LEGACY_VERSION = "v1"
+
+
+@dataclass(frozen=True)
+class RecallVectorVersion:
+    """一个召回向量版本：命名向量 + 生成它的 embedding 模型"""
+
+    name: str
+    model_id: str
+
+    @property
+    def dense(self) -> str:
+        return "dense" if self.name == LEGACY_VERSION else f"dense_{self.name}"
+
+    @property
+    def sparse(self) -> str:
+        return "sparse" if self.name == LEGACY_VERSION else f"sparse_{self.name}"
+
+
+def get_recall_version(name: str) -> RecallVectorVersion:
+    """按名称获取版本
+
+    Raises:
+        KeyError: 版本未在 recall_vector_models 中配置
+    """
+    if name not in settings.recall_vector_models:
+        raise KeyError(f"未配置召回向量版本 '{name}'")
+    return RecallVectorVersion(name, settings.recall_vector_models[name])
+
+
+def all_recall_versions() -> list[RecallVectorVersion]:
+    return [get_recall_version(name) for name in settings.recall_vector_models]
+
+
+def read_recall_version() -> RecallVectorVersion:
+    return get_recall_version(settings.recall_vector_read_version)
+
+
+def write_recall_versions() -> list[RecallVectorVersion]:
+    return [get_recall_version(name) for name in settings.recall_vector_write_versions]
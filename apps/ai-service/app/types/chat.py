@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 from pydantic import BaseModel
 
@@ -17,6 +17,18 @@ class Step(str, Enum):
     END = "end"  # 结束 / End
 
 
+class StreamMode(StrEnum):
+    """
+    SSE 推送模式（按请求协商）
+    SSE streaming mode (negotiated per request)
+    """
+
+    SNAPSHOT = (
+        "snapshot"  # 每次推送完整累计内容（旧版 main-server）/ Full accumulated content
+    )
+    DELTA = "delta"  # 推送 seq + 增量文本，SUCCESS 携带完整内容 / Seq + appended text
+
+
 class ChatMessage(BaseModel):
     """
     聊天消息
@@ -59,6 +71,7 @@ class ChatRequest(BaseModel):
     message_id: str  # 消息id / Message ID
     session_id: str | None = None  # 会话追踪 ID / Session tracking ID
     is_canary: bool | None = False  # 是否开启灰度
+    stream_mode: StreamMode = StreamMode.SNAPSHOT  # SSE 推送模式 / Streaming mode
 
 
 class ChatStreamChunk(BaseModel):
@@ -67,9 +80,10 @@ class ChatStreamChunk(BaseModel):
     Chat stream response
     """
 
-    reason_content: str | None = None  # 思维链内容 / Reasoning content
-    content: str | None = None  # 回复内容 / Reply content
+    reason_content: str | None = None  # 思维链增量 / Reasoning content delta
+    content: str | None = None  # 回复增量 / Reply content delta
     status_message: str | None = None  # 状态消息 / Status message
+    replace: bool = False  # content 为完整内容，替换此前内容 / Replaces prior content
 
 
 class ChatProcessResponse(BaseModel):
@@ -83,6 +97,18 @@ class ChatProcessResponse(BaseModel):
     content: str | None = None  # 回复内容 / Reply content
 
 
+class ChatDeltaResponse(BaseModel):
+    """
+    聊天增量响应（delta 模式）
+    Chat delta response (delta mode)
+    """
+
+    step: Step = Step.SEND  # 步骤 / Step
+    seq: int  # 序号，从 0 递增 / Sequence number, starting at 0
+    delta: str = ""  # 追加文本 / Appended text
+    replace: bool = False  # delta 为完整内容，替换此前内容 / Replaces prior content
+
+
 class ChatNormalResponse(BaseModel):
     """
     聊天普通响应
@@ -102,4 +128,6 @@ class ChatStatusResponse(BaseModel):
     status_message: str  # 状态消息 / Status message
 
 
-ChatResponse = ChatProcessResponse | ChatNormalResponse | ChatStatusResponse
+ChatResponse = (
+    ChatProcessResponse | ChatDeltaResponse | ChatNormalResponse | ChatStatusResponse
+)
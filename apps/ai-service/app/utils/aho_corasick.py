@@ -0,0 +1,87 @@
+"""Aho-Corasick 多模式匹配自动机
+
+一次扫描文本即可找出所有模式串的全部出现位置，复杂度 O(文本长度 + 匹配数)，
+与模式串数量无关（逐词 `in` 扫描为 O(模式数 × 文本长度)）。
+
+构建后只读，可在协程间共享；模式集合变化时整体重建。
+"""
+
+from collections import deque
+from collections.abc import Iterable
+
+
+class AhoCorasick:
+    """多模式匹配自动机
+
+    Usage:
+        ac = AhoCorasick(["he", "she", "hers"])
+        ac.find_all("ushers")  # [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        # 节点用下标表示：goto[i] 为转移表，fail[i] 为失配指针，
+        # output[i] 为在节点 i 结束的全部模式（含经失配链继承的）
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[str]] = [[]]
+
+        patterns = list(dict.fromkeys(p for p in patterns if p))
+        for pattern in patterns:
+            self._insert(pattern)
+        self._build_fail_links()
+        self.size = len(patterns)
+
+    def _insert(self, pattern: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(pattern)
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = (
+                    self._output[child] + self._output[self._fail[child]]
+                )
+
+    def find_all(self, text: str) -> list[tuple[int, int, str]]:
+        """返回全部匹配 (start, end, pattern)，end 为开区间，按 end 升序"""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches: list[tuple[int, int, str]] = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                end = i + 1
+                matches.extend((end - len(p), end, p) for p in output[node])
+        return matches
+
+    def find_first(self, text: str) -> tuple[int, int, str] | None:
+        """返回第一个结束的匹配，找到即停止扫描"""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                pattern = output[node][0]
+                return i + 1 - len(pattern), i + 1, pattern
+        return None
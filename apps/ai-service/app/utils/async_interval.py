@@ -35,3 +35,57 @@ class AsyncIntervalChecker:
             return True
         else:
             return False
+
+
+class AdaptiveIntervalChecker:
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        growth: float = 1.5,
+        max_pending: int | None = None,
+    ):
+        """
+        初始化自适应间隔检查器
+
+        首次调用立即触发（保证首 token 尽快送出），之后每次触发间隔乘以 growth，
+        直到 max_interval；积压量达到 max_pending 时不等间隔直接触发。
+
+        Args:
+            min_interval: 初始间隔秒数
+            max_interval: 最大间隔秒数
+            growth: 每次触发后间隔的放大倍数
+            max_pending: 积压阈值（如未发送字符数），None 表示不启用
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.max_pending = max_pending
+        self.interval = min_interval
+        self.last_trigger_time = None
+
+    def check(self, pending: int = 0):
+        """
+        检查是否应当触发
+
+        Args:
+            pending: 当前积压量
+
+        Returns:
+            bool: 达到间隔或积压阈值时返回True并更新状态，否则返回False
+        """
+        current_time = asyncio.get_event_loop().time()
+
+        if self.last_trigger_time is None:
+            self.last_trigger_time = current_time
+            return True
+
+        reached_interval = current_time - self.last_trigger_time >= self.interval
+        reached_pending = self.max_pending is not None and pending >= self.max_pending
+        if not (reached_interval or reached_pending):
+            return False
+
+        self.last_trigger_time = current_time
+        if reached_interval:
+            self.interval = min(self.interval * self.growth, self.max_interval)
+        return True
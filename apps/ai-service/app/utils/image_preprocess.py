@@ -0,0 +1,143 @@
+"""
+图片 embedding 预处理
+
+embedding 模型只需要较低分辨率，原图直接 Base64 上传既占内存又拖慢请求。
+预处理步骤：解码（动图只取第一帧）→ 按 EXIF 方向摆正 → 缩放到最长边 max_edge
+→ 重新编码为 JPEG / WebP（不写入 EXIF / ICC 等元数据），编码结果超过 max_bytes 时
+逐步降低质量，仍超出再缩小尺寸。
+
+解码 / 缩放 / 编码是 CPU 密集操作，通过共享线程池执行，不阻塞事件循环
+（Pillow 在这些操作中会释放 GIL）。
+"""
+
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MIN_QUALITY = 40
+_QUALITY_STEP = 10
+_SHRINK_FACTOR = 0.75
+_MIME = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+_executor: ThreadPoolExecutor | None = None
+
+
+@dataclass(frozen=True)
+class PreprocessedImage:
+    """预处理结果"""
+
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    original_bytes: int
+
+
+def _flatten(img: Image.Image, image_format: str) -> Image.Image:
+    """转换为编码格式支持的色彩模式；JPEG 不支持透明通道，合成到白底"""
+    has_alpha = img.mode in ("RGBA", "LA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+    if image_format == "webp":
+        return img.convert("RGBA" if has_alpha else "RGB")
+    if not has_alpha:
+        return img.convert("RGB")
+    rgba = img.convert("RGBA")
+    background = Image.new("RGB", rgba.size, (255, 255, 255))
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+
+def _encode(img: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    # 不传 exif / icc_profile，元数据不会写入输出
+    img.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image(
+    data: bytes,
+    max_edge: int | None = None,
+    image_format: str | None = None,
+    quality: int | None = None,
+    max_bytes: int | None = None,
+) -> PreprocessedImage:
+    """
+    同步预处理一张图片（在线程池中调用）
+
+    Args:
+        data: 原始图片字节
+        max_edge: 最长边像素，默认 image_preprocess_max_edge
+        image_format: 输出格式 jpeg | webp，默认 image_preprocess_format
+        quality: 初始编码质量，默认 image_preprocess_quality
+        max_bytes: 输出大小上限，默认 image_preprocess_max_bytes
+
+    Raises:
+        PIL.UnidentifiedImageError / OSError: 无法解码
+    """
+    max_edge = max_edge or settings.image_preprocess_max_edge
+    image_format = (image_format or settings.image_preprocess_format).lower()
+    quality = quality or settings.image_preprocess_quality
+    max_bytes = max_bytes or settings.image_preprocess_max_bytes
+    if image_format not in _MIME:
+        raise ValueError(f"不支持的输出格式: {image_format}")
+
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEG 解码时直接按 1/2、1/4、1/8 缩小，减少解码开销
+        source.draft("RGB", (max_edge, max_edge))
+        # 动图只取第一帧
+        source.seek(0)
+        img = ImageOps.exif_transpose(source)
+        img = _flatten(img, image_format)
+
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    encoded = _encode(img, image_format, quality)
+    while len(encoded) > max_bytes:
+        if quality > _MIN_QUALITY:
+            quality = max(_MIN_QUALITY, quality - _QUALITY_STEP)
+        else:
+            width, height = img.size
+            if max(width, height) <= 64:
+                break
+            img = img.resize(
+                (
+                    max(1, int(width * _SHRINK_FACTOR)),
+                    max(1, int(height * _SHRINK_FACTOR)),
+                ),
+                Image.Resampling.LANCZOS,
+            )
+        encoded = _encode(img, image_format, quality)
+
+    return PreprocessedImage(
+        data=encoded,
+        mime=_MIME[image_format],
+        width=img.width,
+        height=img.height,
+        original_bytes=len(data),
+    )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.image_preprocess_workers,
+            thread_name_prefix="image-preprocess",
+        )
+    return _executor
+
+
+async def preprocess_image_async(data: bytes, **kwargs) -> PreprocessedImage:
+    """在共享线程池中预处理图片，参数同 preprocess_image"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), lambda: preprocess_image(data, **kwargs)
+    )
@@ -0,0 +1,39 @@
+import asyncio
+
+
+class AsyncRateLimiter:
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        初始化令牌桶限速器
+
+        平均每秒放行 rate 次，最多允许 burst 次突发（默认等于 rate，至少 1）。
+
+        Args:
+            rate: 每秒令牌数
+            burst: 桶容量
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._tokens = self.burst
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        获取令牌，不足时等待
+
+        Args:
+            tokens: 需要的令牌数
+        """
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    elapsed = now - self._updated
+                    self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,54 @@
+"""
+流水线阶段计时器
+
+记录一次请求内各阶段的耗时（阶段可以并发执行）以及关键时间点相对请求开始的偏移，
+用于统计首 token 延迟（TTFT）的构成。
+"""
+
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """阶段计时器
+
+    - stage / measure: 记录阶段耗时（毫秒）
+    - mark: 记录时间点相对请求开始的偏移（毫秒），同名只记录第一次
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.marks: dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """同步/异步代码块计时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (time.perf_counter() - begin) * 1000
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        """等待 awaitable 并记录耗时，便于与 asyncio.gather 组合"""
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str) -> None:
+        if name not in self.marks:
+            self.marks[name] = self.elapsed_ms()
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """导出为可直接写入日志 / trace metadata 的结构"""
+        return {
+            "stages_ms": {k: round(v, 1) for k, v in self.stages.items()},
+            "marks_ms": {k: round(v, 1) for k, v in self.marks.items()},
+        }
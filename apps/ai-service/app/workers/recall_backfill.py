@@ -0,0 +1,195 @@
+"""
+召回向量回填任务 - 把历史消息重新 embedding 到 messages_recall 的指定版本
+
+基于 long_tasks：每一步最多执行 recall_backfill_step_seconds 秒，按
+(create_time, message_id) keyset 分页处理已向量化（completed）的消息，
+结束时把游标和计数作为 current_result 提交（COMMIT），下一轮从游标继续；
+步骤中途失败时由框架从上一次提交的游标重试（写入按点 ID 幂等）。
+
+只通过 update_vectors 写入目标版本的命名向量，不影响点上的其他版本和 payload，
+因此迁移期间检索可以继续使用旧版本，回填完成后切换 recall_vector_read_version。
+update_vectors 要求点已存在（任一点不存在整批失败），因此每页先查出已有的点，
+Qdrant 中没有对应点的消息计入 skipped，也不消耗 embedding 配额。
+
+提交任务：
+    POST /vectorize/backfill {"version": "v2", "chat_id": "...", "start_time": ...}
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+
+from qdrant_client.http.models import PointVectors
+from sqlalchemy import func, tuple_
+from sqlalchemy.future import select
+
+from app.config.config import settings
+from app.long_tasks import BaseTask, TaskStatus, task_register
+from app.orm.base import AsyncSessionLocal
+from app.orm.models import ConversationMessage
+from app.services.qdrant import qdrant_service
+from app.services.vector_schema import get_recall_version
+from app.utils.rate_limiter import AsyncRateLimiter
+from app.workers.vectorize_worker import embed_recall_vectors, prepare_embedding_input
+
+logger = logging.getLogger(__name__)
+
+RECALL_COLLECTION = "messages_recall"
+TASK_TYPE = "recall_backfill"
+_MAX_FAILED_IDS = 100  # current_result 中保留的失败消息 ID 数量
+
+
+def _point_id(message_id: str) -> str:
+    """与向量化 worker 一致：点 ID 由 message_id 确定性生成"""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, message_id))
+
+
+def _filters(params: dict) -> list:
+    conditions = [ConversationMessage.vector_status == "completed"]
+    if params.get("chat_id"):
+        conditions.append(ConversationMessage.chat_id == params["chat_id"])
+    if params.get("start_time") is not None:
+        conditions.append(ConversationMessage.create_time >= params["start_time"])
+    if params.get("end_time") is not None:
+        conditions.append(ConversationMessage.create_time < params["end_time"])
+    return conditions
+
+
+async def count_backfill_messages(params: dict) -> int:
+    """统计回填范围内的消息数（用于进度展示）"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count())
+            .select_from(ConversationMessage)
+            .where(*_filters(params))
+        )
+        return result.scalar_one()
+
+
+async def fetch_backfill_page(
+    params: dict, cursor: list | None, limit: int
+) -> list[ConversationMessage]:
+    """按 (create_time, message_id) 升序 keyset 分页"""
+    stmt = (
+        select(ConversationMessage)
+        .where(*_filters(params))
+        .order_by(ConversationMessage.create_time, ConversationMessage.message_id)
+        .limit(limit)
+    )
+    if cursor:
+        stmt = stmt.where(
+            tuple_(ConversationMessage.create_time, ConversationMessage.message_id)
+            > tuple_(*cursor)
+        )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+
+@task_register(TASK_TYPE)
+class RecallBackfillTask(BaseTask):
+    """
+    召回向量回填
+
+    参数（initial_params）：
+        version: 目标版本（recall_vector_models 中已配置）
+        chat_id: 可选，只回填该群
+        start_time / end_time: 可选，create_time 范围（毫秒，左闭右开）
+        qps: 可选，embedding 请求速率上限，默认 recall_backfill_qps
+
+    进度（current_result）：
+        cursor, total, processed, updated, skipped, failed, failed_ids
+    """
+
+    async def execute(self) -> tuple[dict, str]:
+        params = dict(self.result)
+        version = get_recall_version(params["version"])
+
+        missing = await qdrant_service.missing_vectors(
+            RECALL_COLLECTION, [version.dense, version.sparse]
+        )
+        if missing:
+            params["error"] = f"{RECALL_COLLECTION} 未声明命名向量: {missing}"
+            logger.error(f"召回向量回填无法执行: {params['error']}")
+            return params, TaskStatus.FAILED
+
+        if params.get("total") is None:
+            params["total"] = await count_backfill_messages(params)
+        for key in ("processed", "updated", "skipped", "failed"):
+            params.setdefault(key, 0)
+        params.setdefault("failed_ids", [])
+
+        limiter = AsyncRateLimiter(params.get("qps") or settings.recall_backfill_qps)
+        deadline = time.monotonic() + settings.recall_backfill_step_seconds
+        page_size = settings.recall_backfill_page_size
+
+        done = False
+        while not done and time.monotonic() < deadline:
+            messages = await fetch_backfill_page(
+                params, params.get("cursor"), page_size
+            )
+            if not messages:
+                done = True
+                break
+
+            point_ids = {m.message_id: _point_id(m.message_id) for m in messages}
+            existing = await qdrant_service.existing_ids(
+                RECALL_COLLECTION, list(point_ids.values())
+            )
+            to_embed = [m for m in messages if point_ids[m.message_id] in existing]
+            params["skipped"] += len(messages) - len(to_embed)
+
+            results = await asyncio.gather(
+                *(self._embed(message, version, limiter) for message in to_embed),
+                return_exceptions=True,
+            )
+            points = []
+            for message, result in zip(to_embed, results, strict=True):
+                if isinstance(result, BaseException):
+                    logger.warning(f"回填消息 {message.message_id} 失败: {result}")
+                    params["failed"] += 1
+                    if len(params["failed_ids"]) < _MAX_FAILED_IDS:
+                        params["failed_ids"].append(message.message_id)
+                elif result is None:
+                    params["skipped"] += 1
+                else:
+                    points.append(result)
+
+            if points and not await qdrant_service.update_vectors(
+                RECALL_COLLECTION, points
+            ):
+                # 抛出异常由框架重试，从上一次提交的游标继续
+                raise RuntimeError(f"写入 {RECALL_COLLECTION} 版本 {version.name} 失败")
+
+            last = messages[-1]
+            params["cursor"] = [last.create_time, last.message_id]
+            params["processed"] += len(messages)
+            params["updated"] += len(points)
+            done = len(messages) < page_size
+
+        if not done:
+            logger.info(
+                f"召回向量回填 {version.name}: {params['processed']}/{params['total']}，"
+                "本步时间用尽，下一轮继续"
+            )
+            return params, TaskStatus.COMMIT
+
+        logger.info(
+            f"召回向量回填 {version.name} 完成: 处理 {params['processed']} 条，"
+            f"更新 {params['updated']}，跳过 {params['skipped']}，失败 {params['failed']}"
+        )
+        return params, TaskStatus.DONE
+
+    @staticmethod
+    async def _embed(
+        message, version, limiter: AsyncRateLimiter
+    ) -> PointVectors | None:
+        prepared = await prepare_embedding_input(message)
+        if prepared is None:
+            return None
+        text_content, image_base64_list = prepared
+        # 带图且有文本时供应商需要额外一次纯文本请求生成 Sparse
+        await limiter.acquire(2 if image_base64_list and text_content else 1)
+        vectors = await embed_recall_vectors(text_content, image_base64_list, [version])
+        return PointVectors(id=_point_id(message.message_id), vector=vectors)
@@ -12,9 +12,12 @@ from arq import cron
 from arq.connections import RedisSettings
 from inner_shared.logger import setup_logging
 
+from app.agents.clients import client_pool
+from app.clients.http import http_clients
 from app.config.config import settings
 from app.long_tasks.executor import poll_and_execute_tasks
 from app.memory.worker import task_update_topic_memory
+from app.workers.recall_backfill import RecallBackfillTask  # noqa: F401  注册长期任务
 from app.workers.vectorize_worker import cron_scan_pending_messages
 
 logger = logging.getLogger(__name__)
@@ -27,11 +30,18 @@ async def task_executor_job(ctx) -> None:
 
 
 async def on_startup(ctx) -> None:
-    """Worker 启动时配置日志"""
+    """Worker 启动时配置日志、创建共享 HTTP 客户端"""
     setup_logging(log_dir="/logs/ai-service", log_file="arq-worker.log")
+    await http_clients.start()
     logger.info("arq-worker started, file logging enabled")
 
 
+async def on_shutdown(ctx) -> None:
+    """Worker 退出时释放共享 AI / HTTP 客户端"""
+    await client_pool.close()
+    await http_clients.close()
+
+
 class UnifiedWorkerSettings:
     """
     统一的 Worker 配置
@@ -42,6 +52,7 @@ class UnifiedWorkerSettings:
     """
 
     on_startup = on_startup
+    on_shutdown = on_shutdown
 
     redis_settings = RedisSettings(
         host=settings.redis_host or "localhost",
@@ -4,7 +4,9 @@
 使用 Redis Stream + Consumer Group 实现可靠的消息队列：
 1. 消息持久化 - 消息写入后不会丢失
 2. ACK 机制 - 只有消费者确认后消息才算处理完成
-3. Pending 重试 - 消费者挂掉后，pending 消息可以被其他消费者接管
+3. Pending 重试 - 消费者挂掉后，pending 消息可以被其他消费者接管（XAUTOCLAIM）
+4. 死信 - 超过最大重试次数的消息转入死信 stream，可通过 API 重放
+5. 保留 - 定期按时间 / 长度裁剪 stream
 
 启动命令：
     uv run python -m app.workers.vectorize_worker
@@ -14,21 +16,28 @@ import asyncio
 import logging
 import os
 import signal
+import socket
 import time
 import uuid
 
 from inner_shared.logger import setup_logging
+from qdrant_client.http.models import PointStruct, SparseVector
 from redis.asyncio import Redis
 from redis.exceptions import ResponseError
-from sqlalchemy import update
+from sqlalchemy import String, column, literal, tuple_, update, values
 from sqlalchemy.future import select
 
-from app.agents import InstructionBuilder, create_client
+from app.agents import InstructionBuilder, client_pool
+from app.agents.clients import EmbeddingBatcher
+from app.clients.http import http_clients
 from app.clients.image_client import image_client
 from app.clients.redis import AsyncRedisClient
 from app.orm.base import AsyncSessionLocal
 from app.orm.models import ConversationMessage, LarkGroupChatInfo
+from app.services.history_search_cache import bump_watermarks
 from app.services.qdrant import qdrant_service
+from app.services.qdrant_writer import QdrantWriteBuffer
+from app.services.vector_schema import RecallVectorVersion, write_recall_versions
 from app.utils.content_parser import parse_content
 
 logger = logging.getLogger(__name__)
@@ -36,14 +45,38 @@ logger = logging.getLogger(__name__)
 # Redis Stream 配置
 STREAM_NAME = "vectorize_stream"
 GROUP_NAME = "vectorize_workers"
-CONSUMER_NAME = f"worker-{os.getpid()}"
+# 消费者名需在所有副本间唯一：容器内 PID 常为 1，因此带上主机名（容器 ID）
+CONSUMER_NAME = os.getenv(
+    "VECTORIZE_CONSUMER_NAME", f"worker-{socket.gethostname()}-{os.getpid()}"
+)
 
 # 重试配置
 MAX_RETRIES = 3  # 最大重试次数
 RETRY_DELAY_MS = 60000  # 重试间隔（毫秒）
 
 # 并发配置
-CONCURRENCY_LIMIT = 10  # 并发处理数量
+CONCURRENCY_LIMIT = 10  # 并发处理数量（同时在处理中的消息数上限）
+RECLAIM_INTERVAL_SEC = 10  # XAUTOCLAIM 认领待重试 pending 消息的间隔
+
+# 死信配置：超过最大重试次数的条目转入死信 stream，记录失败原因，可人工重放
+DEAD_LETTER_STREAM = f"{STREAM_NAME}:dead"
+DEAD_LETTER_MAX_LEN = 10000  # 死信 stream 近似长度上限
+_ERROR_KEY_PREFIX = "vectorize:error"  # 最近一次失败原因 vectorize:error:<message_id>
+_ERROR_TTL_SEC = 86400
+
+# 保留配置：定期 XTRIM 主 stream（PG 中 pending 状态才是事实来源，
+# 被裁掉但未处理的消息会由 cron_scan_pending_messages 重新推送）
+STREAM_RETENTION_MS = 2 * 86400 * 1000  # 按时间保留（MINID）
+STREAM_MAX_LEN = 100000  # 按长度保留（MAXLEN）
+RETENTION_INTERVAL_SEC = 300
+
+# 并发处理中的消息共用一个批处理器，合并 embedding 请求
+_embedding_batcher = EmbeddingBatcher("embedding-model")
+# 其他 embedding 模型（召回向量新版本）的批处理器，按需创建
+_version_batchers: dict[str, EmbeddingBatcher] = {}
+
+# 并发处理中的消息共用一个 Qdrant 写入缓冲，flush 成功后才更新状态 / ACK
+_vector_writer = QdrantWriteBuffer()
 
 # 控制 worker 运行状态
 _running = True
@@ -60,6 +93,10 @@ def _get_semaphore() -> asyncio.Semaphore:
     return _semaphore
 
 
+# messages_recall 可写入的召回向量版本: (versions, expire_time)
+_live_write_versions: tuple[list[RecallVectorVersion], float] | None = None
+_LIVE_VERSIONS_CACHE_TTL = 60
+
 # 下载权限缓存: chat_id -> (allows_download, expire_time)
 _download_permission_cache: dict[str, tuple[bool, float]] = {}
 _PERMISSION_CACHE_TTL = 600  # 10 分钟
@@ -105,39 +142,165 @@ def _handle_signal(signum, frame):
     _running = False
 
 
-async def get_message_by_id(message_id: str) -> ConversationMessage | None:
-    """从数据库获取消息"""
+async def get_messages_by_ids(
+    message_ids: list[str],
+) -> dict[str, ConversationMessage]:
+    """一次 IN 查询批量获取消息"""
+    if not message_ids:
+        return {}
     async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(ConversationMessage).where(
-                ConversationMessage.message_id == message_id
+                ConversationMessage.message_id.in_(message_ids)
             )
         )
-        return result.scalar_one_or_none()
+        return {m.message_id: m for m in result.scalars().all()}
 
 
-async def update_vector_status(message_id: str, status: str) -> None:
-    """更新消息的向量化状态"""
+async def update_vector_statuses(statuses: dict[str, str]) -> None:
+    """一条 UPDATE ... FROM (VALUES ...) 批量更新向量化状态"""
+    if not statuses:
+        return
+    rows = values(
+        column("message_id", String), column("status", String), name="v"
+    ).data(list(statuses.items()))
     async with AsyncSessionLocal() as session:
         await session.execute(
             update(ConversationMessage)
-            .where(ConversationMessage.message_id == message_id)
-            .values(vector_status=status)
+            .where(ConversationMessage.message_id == rows.c.message_id)
+            .values(vector_status=rows.c.status)
+            .execution_options(synchronize_session=False)
         )
         await session.commit()
 
 
-async def vectorize_message(message: ConversationMessage) -> bool:
-    """
-    向量化消息内容并写入 Qdrant
+# 已处理（completed / skipped）消息 ID 的按天分片 Redis set，
+# 重复投递时无需查 PG 即可直接 ACK；保留天数覆盖 pending 扫描窗口
+_DONE_KEY_PREFIX = "vectorize:done"
+_DONE_RETENTION_DAYS = 8
 
-    写入两个集合：
-    1. messages_recall: 混合向量（Dense + Sparse），用于混合检索
-    2. messages_cluster: 聚类向量，用于消息聚类
+
+def _done_keys(now: float | None = None) -> list[str]:
+    """最近 _DONE_RETENTION_DAYS 天的分片 key（第一个为当天）"""
+    day = int((now or time.time()) // 86400)
+    return [f"{_DONE_KEY_PREFIX}:{day - i}" for i in range(_DONE_RETENTION_DAYS)]
+
+
+async def filter_done(redis: Redis, message_ids: list[str]) -> set[str]:
+    """返回已处理过的消息 ID（Redis 异常时返回空集，回退到 PG 状态判断）"""
+    if not message_ids:
+        return set()
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in _done_keys():
+                pipe.smismember(key, message_ids)
+            shards = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"查询已处理消息集合失败: {e}")
+        return set()
+    return {
+        message_id
+        for flags in shards
+        for message_id, flag in zip(message_ids, flags, strict=True)
+        if flag
+    }
+
+
+async def mark_done(redis: Redis, message_ids: list[str]) -> None:
+    """记录已处理的消息 ID"""
+    if not message_ids:
+        return
+    key = _done_keys()[0]
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.sadd(key, *message_ids)
+            pipe.expire(key, _DONE_RETENTION_DAYS * 86400)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"写入已处理消息集合失败: {e}")
+
+
+async def record_errors(redis: Redis, reasons: dict[str, str]) -> None:
+    """记录消息最近一次的失败原因（转入死信时读取）"""
+    if not reasons:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for message_id, reason in reasons.items():
+                pipe.set(f"{_ERROR_KEY_PREFIX}:{message_id}", reason, ex=_ERROR_TTL_SEC)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"写入失败原因失败: {e}")
+
+
+async def dead_letter(redis: Redis, entries: list[tuple[str, str, int]]) -> None:
+    """把超过最大重试次数的条目 [(stream_id, message_id, times_delivered)]
+    写入死信 stream 并 ACK"""
+    if not entries:
+        return
+    reasons = await redis.mget([f"{_ERROR_KEY_PREFIX}:{m}" for _, m, _ in entries])
+    failed_at = str(int(time.time() * 1000))
+    async with redis.pipeline(transaction=False) as pipe:
+        for (stream_id, message_id, times_delivered), reason in zip(
+            entries, reasons, strict=True
+        ):
+            logger.warning(
+                f"消息 {message_id} 已投递 {times_delivered} 次，转入死信: {reason}"
+            )
+            pipe.xadd(
+                DEAD_LETTER_STREAM,
+                {
+                    "message_id": message_id,
+                    "stream_id": stream_id,
+                    "times_delivered": str(times_delivered),
+                    "reason": reason or "超过最大重试次数",
+                    "failed_at": failed_at,
+                },
+                maxlen=DEAD_LETTER_MAX_LEN,
+                approximate=True,
+            )
+        pipe.xack(STREAM_NAME, GROUP_NAME, *(s for s, _, _ in entries))
+        await pipe.execute()
+
+
+async def trim_stream(redis: Redis) -> int:
+    """按保留策略裁剪主 stream（MINID 按时间 + MAXLEN 按长度，均为近似裁剪）"""
+    min_id = f"{int(time.time() * 1000) - STREAM_RETENTION_MS}-0"
+    trimmed = await redis.xtrim(STREAM_NAME, minid=min_id, approximate=True)
+    trimmed += await redis.xtrim(STREAM_NAME, maxlen=STREAM_MAX_LEN, approximate=True)
+    if trimmed:
+        logger.info(f"已裁剪 {STREAM_NAME} {trimmed} 条")
+    return trimmed
+
+
+async def list_dead_letters(redis: Redis, count: int = 100) -> list[dict]:
+    """列出最早的 count 条死信"""
+    entries = await redis.xrange(DEAD_LETTER_STREAM, count=count)
+    return [{"id": entry_id, **data} for entry_id, data in entries]
+
+
+async def replay_dead_letters(redis: Redis, count: int = 100) -> int:
+    """把最早的 count 条死信重新投递到主 stream 并从死信中删除
 
     Returns:
-        bool: True 表示成功处理，False 表示内容为空需跳过
+        int: 重放的条目数
     """
+    entries = await redis.xrange(DEAD_LETTER_STREAM, count=count)
+    if not entries:
+        return 0
+    async with redis.pipeline(transaction=True) as pipe:
+        for _, data in entries:
+            pipe.xadd(STREAM_NAME, {"message_id": data["message_id"]})
+        pipe.xdel(DEAD_LETTER_STREAM, *(entry_id for entry_id, _ in entries))
+        await pipe.execute()
+    logger.info(f"已重放 {len(entries)} 条死信")
+    return len(entries)
+
+
+async def prepare_embedding_input(
+    message: ConversationMessage,
+) -> tuple[str, list[str]] | None:
+    """解析消息内容并下载图片，返回 (文本, 图片 Base64 列表)，内容为空时返回 None"""
     # 1. 解析消息内容：提取文本和图片keys
     parsed = parse_content(message.content)
     image_keys = parsed.image_keys
@@ -146,7 +309,7 @@ async def vectorize_message(message: ConversationMessage) -> bool:
     # 2. 判断是否为空内容（文本为空且无图片）
     if not text_content and not image_keys:
         logger.info(f"消息 {message.message_id} 内容为空，跳过向量化")
-        return False
+        return None
 
     # 3. 权限检查：限制下载的群跳过图片下载
     if image_keys:
@@ -164,6 +327,10 @@ async def vectorize_message(message: ConversationMessage) -> bool:
     if image_keys:
         # bot_name 默认 bytedance（兼容历史数据）
         bot_name = message.bot_name or "bytedance"
+        # 先批量解析 URL（一次请求 + 写入缓存），下载时直接命中缓存
+        await image_client.resolve_images(
+            [(key, message.message_id) for key in image_keys], bot_name
+        )
         tasks = [
             image_client.download_image_as_base64(key, message.message_id, bot_name)
             for key in image_keys
@@ -176,31 +343,118 @@ async def vectorize_message(message: ConversationMessage) -> bool:
         logger.info(
             f"消息 {message.message_id} 图片下载失败或被跳过且无文本，跳过向量化"
         )
+        return None
+    return text_content, image_base64_list
+
+
+def get_batcher(model_id: str) -> EmbeddingBatcher:
+    """按 embedding 模型获取共享的批处理器"""
+    if model_id == _embedding_batcher.model_id:
+        return _embedding_batcher
+    if model_id not in _version_batchers:
+        _version_batchers[model_id] = EmbeddingBatcher(model_id)
+    return _version_batchers[model_id]
+
+
+async def live_write_recall_versions() -> list[RecallVectorVersion]:
+    """写入版本中 messages_recall 已声明命名向量的部分（带缓存）
+
+    Qdrant 不能给已有集合新增命名向量，写入未声明的版本会让所在批次整批 upsert
+    失败，因此跳过这些版本并记录错误。查询集合失败时按配置写入。
+    """
+    global _live_write_versions
+    now = time.monotonic()
+    if _live_write_versions and _live_write_versions[1] > now:
+        return _live_write_versions[0]
+
+    versions = write_recall_versions()
+    try:
+        missing = set(
+            await qdrant_service.missing_vectors(
+                "messages_recall", [n for v in versions for n in (v.dense, v.sparse)]
+            )
+        )
+    except Exception as e:
+        logger.warning(f"查询 messages_recall 命名向量失败，按配置写入: {e}")
+        return versions
+
+    live = [v for v in versions if v.dense not in missing and v.sparse not in missing]
+    if len(live) < len(versions):
+        logger.error(
+            f"messages_recall 未声明命名向量 {sorted(missing)}，"
+            f"跳过写入版本 {[v.name for v in versions if v not in live]}（需人工迁移集合）"
+        )
+    _live_write_versions = (live, now + _LIVE_VERSIONS_CACHE_TTL)
+    return live
+
+
+async def embed_recall_vectors(
+    text_content: str,
+    image_base64_list: list[str],
+    versions: list[RecallVectorVersion],
+) -> dict:
+    """按版本生成 messages_recall 的命名向量 {dense 名: [...], sparse 名: SparseVector}"""
+    modality = InstructionBuilder.detect_input_modality(text_content, image_base64_list)
+    corpus_instructions = InstructionBuilder.for_corpus(modality)
+    embeddings = await asyncio.gather(
+        *(
+            get_batcher(version.model_id).embed_hybrid(
+                text=text_content or None,
+                image_base64_list=image_base64_list or None,
+                instructions=corpus_instructions,
+            )
+            for version in versions
+        )
+    )
+    vectors: dict = {}
+    for version, embedding in zip(versions, embeddings, strict=True):
+        vectors[version.dense] = embedding.dense
+        vectors[version.sparse] = SparseVector(
+            indices=embedding.sparse.indices, values=embedding.sparse.values
+        )
+    return vectors
+
+
+async def vectorize_message(message: ConversationMessage) -> bool:
+    """
+    向量化消息内容并写入 Qdrant
+
+    写入两个集合：
+    1. messages_recall: 混合向量（Dense + Sparse），用于混合检索；
+       recall_vector_write_versions 中集合已声明的每个版本各写一组命名向量
+    2. messages_cluster: 聚类向量，用于消息聚类
+
+    向量写入经 _vector_writer 与其他消息合并 upsert，返回时已 flush 成功，
+    并已推进该群的历史检索缓存水位。
+
+    Returns:
+        bool: True 表示成功处理，False 表示内容为空需跳过
+
+    Raises:
+        QdrantFlushError: 向量写入失败（调用方不应 ACK）
+    """
+    prepared = await prepare_embedding_input(message)
+    if prepared is None:
         return False
+    text_content, image_base64_list = prepared
 
     # 6. 生成向量
     modality = InstructionBuilder.detect_input_modality(text_content, image_base64_list)
-    corpus_instructions = InstructionBuilder.for_corpus(modality)
     cluster_instructions = InstructionBuilder.for_cluster(
         target_modality=modality,
         instruction="Retrieve semantically similar content",
     )
 
-    async with await create_client("embedding-model") as client:
-        # 并行生成混合向量和聚类向量
-        hybrid_task = client.embed_hybrid(
-            text=text_content or None,
-            image_base64_list=image_base64_list or None,
-            instructions=corpus_instructions,
-        )
-        cluster_task = client.embed(
+    # 并行生成各版本混合向量和聚类向量（经批处理器与其他消息合并发出）
+    versions = await live_write_recall_versions()
+    recall_vectors, cluster_vector = await asyncio.gather(
+        embed_recall_vectors(text_content, image_base64_list, versions),
+        _embedding_batcher.embed(
             text=text_content or None,
             image_base64_list=image_base64_list or None,
             instructions=cluster_instructions,
-        )
-        hybrid_embedding, cluster_vector = await asyncio.gather(
-            hybrid_task, cluster_task
-        )
+        ),
+    )
 
     # 7. 生成向量ID
     vector_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, message.message_id))
@@ -221,62 +475,362 @@ async def vectorize_message(message: ConversationMessage) -> bool:
         "timestamp": message.create_time,
     }
 
-    # 9. 并行写入两个集合
-    hybrid_upsert = qdrant_service.upsert_hybrid_vectors(
-        collection_name="messages_recall",
-        point_id=vector_id,
-        dense_vector=hybrid_embedding.dense,
-        sparse_indices=hybrid_embedding.sparse.indices,
-        sparse_values=hybrid_embedding.sparse.values,
-        payload=hybrid_payload,
-    )
-    cluster_upsert = qdrant_service.upsert_vectors(
-        collection="messages_cluster",
-        vectors=[cluster_vector],
-        ids=[vector_id],
-        payloads=[cluster_payload],
+    # 9. 写入两个集合（等待所在批次 flush 完成）
+    await _vector_writer.write(
+        {
+            "messages_recall": [
+                PointStruct(id=vector_id, vector=recall_vectors, payload=hybrid_payload)
+            ],
+            "messages_cluster": [
+                PointStruct(
+                    id=vector_id, vector=cluster_vector, payload=cluster_payload
+                )
+            ],
+        }
     )
-    await asyncio.gather(hybrid_upsert, cluster_upsert)
+    # 10. 本群有新向量可检索，使已缓存的历史检索结果失效
+    await bump_watermarks([message.chat_id])
     return True
 
 
-async def process_message(redis: Redis, stream_id: str, message_id: str) -> None:
-    """处理单条消息（带并发控制）"""
-    async with _get_semaphore():
+async def _vectorize_one(message: ConversationMessage) -> tuple[str, str | None]:
+    """向量化单条消息，返回 (新状态, 失败原因)"""
+    try:
+        if await vectorize_message(message):
+            logger.info(f"消息 {message.message_id} 向量化完成")
+            return "completed", None
+        logger.info(f"消息 {message.message_id} 内容为空，已跳过")
+        return "skipped", None
+    except Exception as e:
+        logger.error(f"消息 {message.message_id} 向量化失败: {e}")
+        return "failed", f"{type(e).__name__}: {e}"
+
+
+# StatusCommitter 条目状态：除向量化结果外，
+# "done" 表示 PG 中已处理（只 ACK 并记入已处理集合），None 表示只 ACK
+_VECTOR_STATUSES = ("completed", "skipped", "failed")
+
+
+class StatusCommitter:
+    """攒批写回向量化状态并 ACK
+
+    每次 flush：一条 UPDATE ... FROM (VALUES ...) 写回全部状态 → 记入已处理集合
+    → 一次多 ID 的 XACK。failed 的条目不 ACK，留在 pending 中等待重试，
+    失败原因写入 Redis，转入死信时一并记录；
+    状态写回失败时，需要写状态的条目都不 ACK。
+    """
+
+    def __init__(self, redis: Redis, max_size: int = 50, interval: float = 0.2):
+        self._redis = redis
+        self.max_size = max_size
+        self.interval = interval
+        self._items: list[tuple[str, str, str | None, str | None]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(
+        self,
+        stream_id: str,
+        message_id: str,
+        status: str | None,
+        reason: str | None = None,
+    ) -> None:
+        """加入待提交条目，攒满 max_size 或等待 interval 后自动 flush"""
+        self._items.append((stream_id, message_id, status, reason))
+        if len(self._items) >= self.max_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.interval, self._schedule_flush
+            )
+
+    def _schedule_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        if not items:
+            return
+
+        statuses = {m: s for _, m, s, _ in items if s in _VECTOR_STATUSES}
         try:
-            # 1. 从数据库获取完整消息
-            message = await get_message_by_id(message_id)
-            if not message:
-                logger.warning(f"消息 {message_id} 不存在，跳过")
-                await redis.xack(STREAM_NAME, GROUP_NAME, stream_id)
-                return
-
-            # 2. 检查状态，已处理过的直接跳过
-            if message.vector_status in ("completed", "skipped"):
-                logger.debug(
-                    f"消息 {message_id} 已处理（{message.vector_status}），跳过"
-                )
-                await redis.xack(STREAM_NAME, GROUP_NAME, stream_id)
-                return
+            if statuses:
+                await update_vector_statuses(statuses)
+        except Exception as e:
+            # 状态未落库时不 ACK，避免 PG 中残留 pending 而 stream 已确认
+            logger.error(f"批量更新向量化状态失败: {e}")
+            items = [item for item in items if item[2] not in _VECTOR_STATUSES]
 
-            # 3. 执行向量化
-            success = await vectorize_message(message)
+        await mark_done(
+            self._redis,
+            [m for _, m, s, _ in items if s in ("completed", "skipped", "done")],
+        )
+        await record_errors(
+            self._redis, {m: r for _, m, s, r in items if s == "failed" and r}
+        )
+        ack_ids = [stream_id for stream_id, _, s, _ in items if s != "failed"]
+        if ack_ids:
+            try:
+                await self._redis.xack(STREAM_NAME, GROUP_NAME, *ack_ids)
+            except Exception as e:
+                logger.error(f"批量 ACK 失败: {e}")
+
+    async def drain(self) -> None:
+        """提交剩余条目并等待进行中的 flush 完成"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+async def prepare_entries(
+    redis: Redis, committer: StatusCommitter, entries: list[tuple[str, str]]
+) -> list[tuple[str, ConversationMessage]]:
+    """过滤一批 stream 条目，返回需要向量化的 [(stream_id, message)]
+
+    - Redis 已处理集合命中的直接提交 ACK，不访问 PG
+    - 其余一次 IN 查询取出；不存在 / PG 中已处理的直接提交 ACK
+    - PG 查询失败时整批不处理也不 ACK，留在 pending 中等待重试
+    """
+    if not entries:
+        return []
+
+    done = await filter_done(redis, [message_id for _, message_id in entries])
+    todo = []
+    for stream_id, message_id in entries:
+        if message_id in done:
+            committer.add(stream_id, message_id, None)
+        else:
+            todo.append((stream_id, message_id))
+    if not todo:
+        return []
 
-            # 4. 根据结果更新状态
-            if success:
-                await update_vector_status(message_id, "completed")
-                logger.info(f"消息 {message_id} 向量化完成")
-            else:
-                await update_vector_status(message_id, "skipped")
-                logger.info(f"消息 {message_id} 内容为空，已跳过")
+    try:
+        messages = await get_messages_by_ids(list({m for _, m in todo}))
+    except Exception as e:
+        logger.error(f"批量获取消息失败: {e}")
+        return []
+
+    result = []
+    for stream_id, message_id in todo:
+        message = messages.get(message_id)
+        if message is None:
+            logger.warning(f"消息 {message_id} 不存在，跳过")
+            committer.add(stream_id, message_id, None)
+        elif message.vector_status in ("completed", "skipped"):
+            logger.debug(f"消息 {message_id} 已处理（{message.vector_status}），跳过")
+            committer.add(stream_id, message_id, "done")
+        else:
+            result.append((stream_id, message))
+    return result
+
+
+async def process_batch(redis: Redis, entries: list[tuple[str, str]]) -> None:
+    """处理一批 stream 条目 [(stream_id, message_id)]，全部完成后一次提交
+
+    一次 IN 查询取出消息 → 并发向量化（写入 Qdrant 成功后才返回）
+    → 一条 UPDATE 写回全部状态 → 一次 XACK
+    """
+    committer = StatusCommitter(redis, max_size=len(entries) + 1)
+    to_vectorize = await prepare_entries(redis, committer, entries)
+
+    async def _run(stream_id: str, message: ConversationMessage) -> None:
+        async with _get_semaphore():
+            status, reason = await _vectorize_one(message)
+        committer.add(stream_id, message.message_id, status, reason)
+
+    await asyncio.gather(*(_run(s, m) for s, m in to_vectorize))
+    await committer.flush()
+
+
+async def process_message(redis: Redis, stream_id: str, message_id: str) -> None:
+    """处理单条 stream 条目"""
+    await process_batch(redis, [(stream_id, message_id)])
 
-            # 5. ACK 消息
-            await redis.xack(STREAM_NAME, GROUP_NAME, stream_id)
 
+class StreamConsumer:
+    """连续流式消费者
+
+    始终保持至多 concurrency 条消息在处理中：每有一条完成就按空出的槽位数
+    继续 XREADGROUP，单条慢消息（如图片下载）只占一个槽位，不阻塞其他消息。
+    状态写回与 ACK 由 StatusCommitter 按批提交。
+
+    回收：主循环每隔 RECLAIM_INTERVAL_SEC 在两次读取之间 XAUTOCLAIM 认领空闲
+    超过重试间隔的 pending 条目（含已退出的其他消费者遗留的），按空闲槽位数认领，
+    与新消息一起并发处理；超过最大重试次数的转入死信 stream。
+    （读取会在阻塞期间预留全部空闲槽位，回收若放在并行任务里会一直拿不到槽位）
+
+    与主循环并行的后台任务：
+    - 保留：定期按 MINID / MAXLEN 裁剪主 stream
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        consumer_name: str = CONSUMER_NAME,
+        concurrency: int = CONCURRENCY_LIMIT,
+    ):
+        self._redis = redis
+        self.consumer_name = consumer_name
+        self.concurrency = concurrency
+        self.committer = StatusCommitter(redis)
+        self._in_flight: set[asyncio.Task] = set()
+        # 已预留（正在读取 / 认领）但尚未开始处理的槽位
+        self._reserved = 0
+        self._slot_freed = asyncio.Event()
+        self._reclaim_cursor = "0-0"
+        self.processed = 0
+
+    @property
+    def free_slots(self) -> int:
+        return self.concurrency - len(self._in_flight) - self._reserved
+
+    def _spawn(self, stream_id: str, message: ConversationMessage) -> None:
+        task = asyncio.create_task(self._run_one(stream_id, message))
+        self._in_flight.add(task)
+        task.add_done_callback(self._release)
+
+    def _release(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self._slot_freed.set()
+
+    async def _run_one(self, stream_id: str, message: ConversationMessage) -> None:
+        status, reason = await _vectorize_one(message)
+        self.committer.add(stream_id, message.message_id, status, reason)
+        self.processed += 1
+
+    async def _fill(self, fetch) -> int:
+        """预留当前空闲槽位，用 fetch(count) 取条目并开始处理，返回取到的条目数"""
+        count = self.free_slots
+        if count <= 0:
+            return 0
+        self._reserved += count
+        try:
+            entries = await fetch(count)
+            for stream_id, message in await prepare_entries(
+                self._redis, self.committer, entries
+            ):
+                self._spawn(stream_id, message)
+        finally:
+            self._reserved -= count
+            self._slot_freed.set()
+        return len(entries)
+
+    async def _claim(self, count: int) -> list[tuple[str, str]]:
+        """XAUTOCLAIM 认领至多 count 条空闲超过重试间隔的 pending 条目
+
+        认领后投递次数 +1；超过 MAX_RETRIES 次重试的转入死信，其余返回重新处理。
+        """
+        redis = self._redis
+        result = await redis.xautoclaim(
+            STREAM_NAME,
+            GROUP_NAME,
+            self.consumer_name,
+            min_idle_time=RETRY_DELAY_MS,
+            start_id=self._reclaim_cursor,
+            count=count,
+        )
+        self._reclaim_cursor = result[0]
+        # Redis 7+ 第三项为已被裁剪的条目 ID，服务端已将其移出 pending
+        if len(result) > 2 and result[2]:
+            logger.info(f"{len(result[2])} 条 pending 条目已被裁剪，放弃重试")
+        claimed = [
+            (stream_id, data["message_id"])
+            for stream_id, data in result[1]
+            if data and "message_id" in data
+        ]
+        if not claimed:
+            return []
+
+        pending = await redis.xpending_range(
+            STREAM_NAME,
+            GROUP_NAME,
+            min=claimed[0][0],
+            max=claimed[-1][0],
+            count=len(claimed) + self.concurrency,
+            consumername=self.consumer_name,
+        )
+        delivered = {p["message_id"]: p["times_delivered"] for p in pending}
+
+        retry, exhausted = [], []
+        for stream_id, message_id in claimed:
+            times_delivered = delivered.get(stream_id, 0)
+            if times_delivered > MAX_RETRIES + 1:
+                exhausted.append((stream_id, message_id, times_delivered))
+            else:
+                logger.info(f"重试消息 {message_id}，第 {times_delivered} 次投递")
+                retry.append((stream_id, message_id))
+        await dead_letter(redis, exhausted)
+        return retry
+
+    async def _reclaim(self) -> None:
+        """一轮扫完整个 pending 列表（游标回到 0-0）或槽位占满为止"""
+        try:
+            while self.free_slots > 0:
+                await self._fill(self._claim)
+                if self._reclaim_cursor == "0-0":
+                    break
         except Exception as e:
-            logger.error(f"消息 {message_id} 向量化失败: {e}")
-            # 更新状态为失败，但不 ACK，消息会保留在 pending 中
-            await update_vector_status(message_id, "failed")
+            logger.error(f"回收 pending 消息异常: {e}")
+
+    async def _retention_loop(self, should_run) -> None:
+        while should_run():
+            try:
+                await trim_stream(self._redis)
+            except Exception as e:
+                logger.error(f"裁剪 {STREAM_NAME} 失败: {e}")
+            await asyncio.sleep(RETENTION_INTERVAL_SEC)
+
+    async def _read(self, count: int) -> list[tuple[str, str]]:
+        # 有消息在处理时短阻塞，以便尽快补充空出的槽位
+        block = 200 if self._in_flight else 5000
+        messages = await self._redis.xreadgroup(
+            GROUP_NAME,
+            self.consumer_name,
+            streams={STREAM_NAME: ">"},
+            count=count,
+            block=block,
+        )
+        return [
+            (stream_id, data["message_id"])
+            for _stream_name, entries in messages or []
+            for stream_id, data in entries
+            if data and "message_id" in data
+        ]
+
+    async def run(self, should_run=lambda: _running) -> None:
+        background = [asyncio.create_task(self._retention_loop(should_run))]
+        next_reclaim = 0.0
+        while should_run():
+            try:
+                if self.free_slots <= 0:
+                    self._slot_freed.clear()
+                    await self._slot_freed.wait()
+                    continue
+
+                if time.monotonic() >= next_reclaim:
+                    next_reclaim = time.monotonic() + RECLAIM_INTERVAL_SEC
+                    await self._reclaim()
+                    continue
+
+                await self._fill(self._read)
+
+            except Exception as e:
+                logger.error(f"消费循环异常: {e}")
+                await asyncio.sleep(5)  # 出错后等待重试
+
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+        # 退出前等待处理中的消息完成并提交
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self.committer.drain()
 
 
 async def consume_stream() -> None:
@@ -293,91 +847,84 @@ async def consume_stream() -> None:
         # 组已存在，忽略
 
     logger.info(f"启动向量化 Worker: {CONSUMER_NAME}")
-
-    while _running:
-        try:
-            # 1. 先处理 pending 消息（之前消费失败的）
-            pending_info = await redis.xpending(STREAM_NAME, GROUP_NAME)
-            if pending_info and pending_info["pending"] > 0:
-                # 获取 pending 消息
-                pending_messages = await redis.xpending_range(
-                    STREAM_NAME, GROUP_NAME, min="-", max="+", count=10
-                )
-                for pending in pending_messages:
-                    stream_id = pending["message_id"]
-                    times_delivered = pending["times_delivered"]
-
-                    # 检查是否超过最大重试次数
-                    if times_delivered > MAX_RETRIES:
-                        logger.warning(
-                            f"消息 {stream_id} 已重试 {times_delivered} 次，放弃重试"
-                        )
-                        # 超过重试次数，ACK 消息避免无限堆积
-                        await redis.xack(STREAM_NAME, GROUP_NAME, stream_id)
-                        continue
-
-                    # 如果消息已经 pending 超过重试间隔，尝试重新处理
-                    if pending["time_since_delivered"] > RETRY_DELAY_MS:
-                        # 认领消息
-                        claimed = await redis.xclaim(
-                            STREAM_NAME,
-                            GROUP_NAME,
-                            CONSUMER_NAME,
-                            min_idle_time=RETRY_DELAY_MS,
-                            message_ids=[stream_id],
-                        )
-                        for claimed_id, data in claimed:
-                            if data and "message_id" in data:
-                                logger.info(
-                                    f"重试消息 {data['message_id']}，"
-                                    f"第 {times_delivered} 次尝试"
-                                )
-                                await process_message(
-                                    redis, claimed_id, data["message_id"]
-                                )
-
-            # 2. 读取新消息
-            messages = await redis.xreadgroup(
-                GROUP_NAME,
-                CONSUMER_NAME,
-                streams={STREAM_NAME: ">"},
-                count=10,
-                block=5000,  # 阻塞 5 秒
-            )
-
-            if messages:
-                # 收集所有待处理的任务
-                tasks = []
-                for _stream_name, entries in messages:
-                    for stream_id, data in entries:
-                        if data and "message_id" in data:
-                            tasks.append(
-                                process_message(redis, stream_id, data["message_id"])
-                            )
-                # 并发执行（并发数由 semaphore 控制）
-                if tasks:
-                    await asyncio.gather(*tasks)
-
-        except Exception as e:
-            logger.error(f"消费循环异常: {e}")
-            await asyncio.sleep(5)  # 出错后等待重试
-
+    await StreamConsumer(redis).run()
     logger.info("Worker 已停止")
 
 
 # ==================== 定时任务：捞取 pending 消息 ====================
 
 # 捞取配置
-PENDING_SCAN_BATCH_SIZE = 100  # 每批捞取数量
-PENDING_SCAN_MAX_TOTAL = 1000  # 每次最多捞取总数
-PENDING_SCAN_INTERVAL_SEC = 1  # 批次间隔（秒）
+PENDING_SCAN_BATCH_SIZE = 500  # 每批捞取数量
+PENDING_SCAN_MAX_TOTAL = 1000  # 每次最多推送总数
 PENDING_SCAN_DAYS = 7  # 只捞取 N 天内的消息
+PENDING_SCAN_DEDUP_MAX = 20000  # 去重时最多读取的 stream 条目数
+
+
+async def get_queued_message_ids(redis: Redis) -> set[str]:
+    """主 stream 中尚未 ACK 的消息 ID（已投递未确认 + 尚未投递）
+
+    从最早的 pending 条目（无 pending 时从 last-delivered-id 之后）读到末尾，
+    最多读取 PENDING_SCAN_DEDUP_MAX 条。
+    """
+    try:
+        groups = await redis.xinfo_groups(STREAM_NAME)
+    except ResponseError:
+        return set()  # stream 不存在
+    group = next((g for g in groups if g["name"] == GROUP_NAME), None)
+    if group is None:
+        start = "-"
+    else:
+        pending = await redis.xpending(STREAM_NAME, GROUP_NAME)
+        start = (
+            pending["min"] if pending["pending"] else f"({group['last-delivered-id']}"
+        )
+
+    queued: set[str] = set()
+    read = 0
+    while read < PENDING_SCAN_DEDUP_MAX:
+        entries = await redis.xrange(STREAM_NAME, min=start, max="+", count=1000)
+        read += len(entries)
+        queued.update(data["message_id"] for _, data in entries if "message_id" in data)
+        if len(entries) < 1000:
+            break
+        start = f"({entries[-1][0]}"
+    return queued
+
+
+async def fetch_pending_page(
+    cutoff_ts: int, after: tuple[int, str] | None, limit: int
+) -> list[tuple[int, str]]:
+    """按 (create_time, message_id) 倒序 keyset 分页查询 pending 消息
+
+    只访问 vector_status = 'pending' 的行，可走部分索引
+    idx_conversation_messages_pending；翻页期间其他行的状态变化不会造成漏读。
+    """
+    stmt = (
+        select(ConversationMessage.create_time, ConversationMessage.message_id)
+        .where(ConversationMessage.vector_status == "pending")
+        .where(ConversationMessage.create_time >= cutoff_ts)
+        .order_by(
+            ConversationMessage.create_time.desc(),
+            ConversationMessage.message_id.desc(),
+        )
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(ConversationMessage.create_time, ConversationMessage.message_id)
+            < tuple_(literal(after[0]), literal(after[1]))
+        )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(stmt)
+        return [(row[0], row[1]) for row in result.fetchall()]
 
 
 async def scan_pending_messages() -> int:
     """
     扫描数据库中 pending 状态的消息，推送到 Redis Stream
 
+    已在 stream 中等待处理的消息不重复推送；每批一次 pipeline XADD。
+
     Returns:
         int: 推送的消息数量
     """
@@ -389,37 +936,29 @@ async def scan_pending_messages() -> int:
     cutoff_time = datetime.now() - timedelta(days=PENDING_SCAN_DAYS)
     cutoff_ts = int(cutoff_time.timestamp() * 1000)
 
+    queued = await get_queued_message_ids(redis)
     total_pushed = 0
-    offset = 0
+    cursor: tuple[int, str] | None = None
 
     while total_pushed < PENDING_SCAN_MAX_TOTAL:
-        # 查询 pending 状态的消息
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(ConversationMessage.message_id)
-                .where(ConversationMessage.vector_status == "pending")
-                .where(ConversationMessage.create_time >= cutoff_ts)
-                .order_by(ConversationMessage.create_time.desc())
-                .offset(offset)
-                .limit(PENDING_SCAN_BATCH_SIZE)
-            )
-            message_ids = [row[0] for row in result.fetchall()]
-
-        if not message_ids:
+        rows = await fetch_pending_page(cutoff_ts, cursor, PENDING_SCAN_BATCH_SIZE)
+        if not rows:
+            break
+        cursor = rows[-1]
+
+        message_ids = [m for _, m in rows if m not in queued]
+        message_ids = message_ids[: PENDING_SCAN_MAX_TOTAL - total_pushed]
+        if message_ids:
+            async with redis.pipeline(transaction=False) as pipe:
+                for message_id in message_ids:
+                    pipe.xadd(STREAM_NAME, {"message_id": message_id})
+                await pipe.execute()
+            queued.update(message_ids)
+            total_pushed += len(message_ids)
+            logger.info(f"已推送 {len(message_ids)} 条 pending 消息到队列")
+
+        if len(rows) < PENDING_SCAN_BATCH_SIZE:
             break
-
-        # 推送到 Redis Stream
-        for message_id in message_ids:
-            await redis.xadd(STREAM_NAME, {"message_id": message_id})
-            total_pushed += 1
-
-        logger.info(f"已推送 {len(message_ids)} 条 pending 消息到队列")
-
-        offset += PENDING_SCAN_BATCH_SIZE
-
-        # 批次间隔，控制 QPS
-        if total_pushed < PENDING_SCAN_MAX_TOTAL:
-            await asyncio.sleep(PENDING_SCAN_INTERVAL_SEC)
 
     return total_pushed
 
@@ -461,7 +1000,19 @@ async def main():
     # 配置日志（JSON 格式 + 文件输出，供 ELK 采集）
     setup_logging(log_dir="/logs/ai-service", log_file="vectorize-worker.log")
 
-    await consume_stream()
+    await http_clients.start()
+    try:
+        await consume_stream()
+    finally:
+        await _embedding_batcher.drain()
+        for batcher in _version_batchers.values():
+            await batcher.drain()
+        await _vector_writer.drain()
+        logger.info(f"Qdrant 写入缓冲统计: {_vector_writer.stats}")
+        logger.info(f"embedding 批处理统计: {_embedding_batcher.stats}")
+        await qdrant_service.close()
+        await client_pool.close()
+        await http_clients.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+封禁词检测基准
+
+对比同一批消息在不同词表规模下的单次检测耗时（纯 CPU，不含 Redis）：
+
+- before: 旧实现（去空格 + 小写，逐词 `word in text`）
+- after:  BannedWordMatcher（完整归一化 + Aho-Corasick 单次扫描）
+
+旧实现每次调用还需要一次 SMEMBERS 把整个词表拉回进程，
+词表越大这部分网络 / 反序列化开销越大，基准中未计入（只会让差距更大）。
+
+启动命令：
+    uv run python -m benchmarks.banned_word
+    uv run python -m benchmarks.banned_word --sizes 1000 10000 --messages 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.services.banned_word import BannedWordMatcher
+
+_ALPHABET = "的一是不了人我在有他这中大来上们为和国地到以说时要就出也得里后自之"
+
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choices(_ALPHABET, k=rng.randint(2, 5)))
+
+
+def _random_message(rng: random.Random, length: int) -> str:
+    return "".join(rng.choices(_ALPHABET + "，。！？ abcXYZ", k=length))
+
+
+def legacy_check(words: set[str], text: str) -> str | None:
+    normalized_text = text.replace(" ", "").lower()
+    for word in words:
+        if word in normalized_text:
+            return word
+    return None
+
+
+def _timeit(fn, messages: list[str]) -> list[float]:
+    samples = []
+    for msg in messages:
+        start = time.perf_counter()
+        fn(msg)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    return f"p50={statistics.median(samples):8.1f}us  p99={p99:8.1f}us"
+
+
+def run(sizes: list[int], n_messages: int, length: int, seed: int) -> None:
+    rng = random.Random(seed)
+    messages = [_random_message(rng, length) for _ in range(n_messages)]
+
+    for size in sizes:
+        # 使用较长的随机词，保证大部分消息不命中（与线上分布一致，旧实现需扫完全表）
+        words = {_random_word(rng) + _random_word(rng) for _ in range(size)}
+
+        start = time.perf_counter()
+        matcher = BannedWordMatcher(words)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        before = _timeit(lambda m, w=words: legacy_check(w, m), messages)
+        after = _timeit(matcher.find_first, messages)
+        after_all = _timeit(matcher.find_all, messages)
+
+        print(f"\n== words={size}, messages={n_messages}, length={length} ==")
+        print(f"build:            {build_ms:.1f}ms")
+        print(f"before (in-scan): {_summary(before)}")
+        print(f"after  (first):   {_summary(after)}")
+        print(f"after  (all):     {_summary(after_all)}")
+        print(
+            f"speedup (p50):    "
+            f"{statistics.median(before) / statistics.median(after):.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="封禁词检测基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--length", type=int, default=200, help="消息长度（字符）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.messages, args.length, args.seed)
+
+
+if __name__ == "__main__":
+    main()
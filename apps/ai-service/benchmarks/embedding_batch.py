@@ -0,0 +1,181 @@
+"""
+向量化 embedding 微批处理基准
+
+用模拟的 embedding 供应商（固定延迟 + 供应商侧并发上限）复现 vectorize worker 的
+调用模式：每条消息一次 embed_hybrid + 一次 embed，并发度与 worker 一致。对比：
+
+- before: 每条消息直接调用客户端（纯文本 2 次请求，带图 3 次）
+- after:  经 EmbeddingBatcher 合并（批内去重；支持批量接口的供应商一批一次请求）
+
+供应商类型：
+- ark:    多模态接口每次只返回一个向量，批处理只能去重 + 共享客户端租借
+- openai: 纯文本 embed 支持 input 列表，一批聚类向量只需一次请求
+
+输出消息吞吐（条/秒）与供应商请求数。
+
+启动命令：
+    uv run python -m benchmarks.embedding_batch
+    uv run python -m benchmarks.embedding_batch --provider openai --messages 2000
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+from contextlib import asynccontextmanager
+
+from app.agents.clients import EmbeddingBatcher
+from app.agents.clients.base import (
+    BaseAIClient,
+    EmbeddingRequest,
+    HybridEmbedding,
+    SparseVector,
+)
+
+# 群聊里高频重复的短消息
+_COMMON_TEXTS = ["哈哈哈", "+1", "好的", "收到", "？", "草", "确实", "[表情]"]
+_ALPHABET = "的一是不了人我在有他这中大来上们为和国地到以说时要就出也得里后自之"
+
+
+class FakeProvider(BaseAIClient[None]):
+    """模拟 embedding 供应商：每次请求固定延迟，供应商侧限制并发"""
+
+    def __init__(self, latency: float, concurrency: int, batch_text: bool):
+        super().__init__("fake-embedding")
+        self.latency = latency
+        self.batch_text = batch_text
+        self.native_batch_embed = batch_text
+        self.requests = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def _create_client(self, model_info: dict) -> None:
+        return None
+
+    async def _request(self, items: int = 1) -> None:
+        async with self._slots:
+            self.requests += 1
+            await asyncio.sleep(self.latency + 0.001 * (items - 1))
+
+    async def embed(self, text=None, image_base64_list=None, **kwargs):
+        await self._request()
+        return [0.0]
+
+    async def embed_hybrid(self, text=None, image_base64_list=None, **kwargs):
+        # 与 ArkClient 一致：带图时 Sparse 需要额外一次纯文本请求（与 Dense 并发）
+        if image_base64_list and text:
+            await asyncio.gather(self._request(), self._request())
+        else:
+            await self._request()
+        return HybridEmbedding(dense=[0.0], sparse=SparseVector([], []))
+
+    async def embed_batch(self, requests: list[EmbeddingRequest]):
+        if not self.batch_text:
+            return await super().embed_batch(requests)
+        batchable = [r for r in requests if not r.hybrid and not r.images]
+        rest = [r for r in requests if r.hybrid or r.images]
+        rest_results, _ = await asyncio.gather(
+            super().embed_batch(rest),
+            self._request(len(batchable)) if batchable else asyncio.sleep(0),
+        )
+        results = dict(zip(rest, rest_results, strict=True))
+        return [results.get(r, [0.0]) for r in requests]
+
+
+class _StaticPool:
+    """只租借同一个客户端的池（替代 client_pool）"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @asynccontextmanager
+    async def acquire(self, model_id: str):
+        yield self.client
+
+
+def _messages(n: int, dup_ratio: float, image_ratio: float, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        if rng.random() < dup_ratio:
+            text = rng.choice(_COMMON_TEXTS)
+        else:
+            text = "".join(rng.choices(_ALPHABET, k=rng.randint(5, 60)))
+        images = (
+            [f"data:image/png;base64,{rng.random()}"]
+            if rng.random() < image_ratio
+            else []
+        )
+        out.append((text, images))
+    return out
+
+
+async def _run(embedder, messages, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text, images):
+        async with semaphore:
+            await asyncio.gather(
+                embedder.embed_hybrid(
+                    text=text, image_base64_list=images or None, instructions="corpus"
+                ),
+                embedder.embed(
+                    text=text, image_base64_list=images or None, instructions="cluster"
+                ),
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(t, i) for t, i in messages))
+    return time.perf_counter() - start
+
+
+async def run(args) -> None:
+    messages = _messages(args.messages, args.dup_ratio, args.image_ratio, args.seed)
+    # app 的导入图很大，一次全量 GC 可达数百毫秒；冻结已有对象，避免落在某一轮计时里
+    gc.collect()
+    gc.freeze()
+    batch_text = args.provider == "openai"
+
+    def provider() -> FakeProvider:
+        return FakeProvider(args.latency / 1000, args.provider_concurrency, batch_text)
+
+    before_client = provider()
+    before = await _run(before_client, messages, args.concurrency)
+
+    after_client = provider()
+    batcher = EmbeddingBatcher(
+        max_batch_size=args.batch_size,
+        window_ms=args.window_ms,
+        pool=_StaticPool(after_client),  # type: ignore[arg-type]
+        cache=None,
+    )
+    after = await _run(batcher, messages, args.concurrency)
+
+    n = len(messages)
+    print(
+        f"\n== provider={args.provider}, messages={n}, latency={args.latency}ms, "
+        f"worker_concurrency={args.concurrency}, "
+        f"provider_concurrency={args.provider_concurrency} =="
+    )
+    print(f"before: {n / before:8.1f} msg/s  requests={before_client.requests}")
+    print(f"after:  {n / after:8.1f} msg/s  requests={after_client.requests}")
+    print(f"batcher: {batcher.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="embedding 微批处理基准")
+    parser.add_argument("--provider", choices=["ark", "openai"], default="ark")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10, help="worker 并发")
+    parser.add_argument("--provider-concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=50, help="单次请求延迟(ms)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, default=10)
+    parser.add_argument("--dup-ratio", type=float, default=0.2)
+    parser.add_argument("--image-ratio", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
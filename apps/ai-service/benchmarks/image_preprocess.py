@@ -0,0 +1,164 @@
+"""
+图片 embedding 预处理基准
+
+对一组图片（默认生成的合成语料，或 --corpus 指定目录下的真实图片）对比：
+
+- before: 原图直接 Base64
+- after:  preprocess_image（缩放 + 去元数据 + 重新编码）后 Base64
+
+输出每张图的 Base64 负载大小、预处理 CPU 耗时，以及 embedding 请求耗时：
+- 默认按上行带宽 + 固定服务端延迟估算（--uplink-mbps / --server-latency）
+- --live 时通过 client_pool 实际调用 embedding-model（需要可用的模型配置）
+
+启动命令：
+    uv run python -m benchmarks.image_preprocess
+    uv run python -m benchmarks.image_preprocess --corpus ./fixtures/images --live
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from app.utils.image_preprocess import preprocess_image
+
+_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+
+
+def _photo(width: int, height: int, rng: random.Random) -> Image.Image:
+    """带渐变和噪声的伪照片（压缩率接近真实照片）"""
+    base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), rng.uniform(20, 60)).convert("RGB")
+    return Image.blend(base, noise, 0.5)
+
+
+def synthetic_corpus(seed: int) -> list[tuple[str, bytes]]:
+    """合成语料：手机照片、截图、带 EXIF 的大图、透明 PNG、动图表情"""
+    rng = random.Random(seed)
+    corpus = []
+
+    def add(name: str, img: Image.Image, fmt: str, **kwargs) -> None:
+        buffer = io.BytesIO()
+        img.save(buffer, format=fmt, **kwargs)
+        corpus.append((name, buffer.getvalue()))
+
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "Camera"
+    for i in range(4):
+        add(f"photo_{i}.jpg", _photo(4032, 3024, rng), "JPEG", quality=92, exif=exif)
+    for i in range(3):
+        add(f"screenshot_{i}.png", _photo(1170, 2532, rng), "PNG")
+    add("sticker.png", Image.new("RGBA", (512, 512), (255, 0, 0, 128)), "PNG")
+    frames = [_photo(480, 480, rng) for _ in range(12)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:])
+    corpus.append(("animated.gif", buffer.getvalue()))
+    return corpus
+
+
+def load_corpus(path: Path) -> list[tuple[str, bytes]]:
+    return [
+        (p.name, p.read_bytes())
+        for p in sorted(path.iterdir())
+        if p.suffix.lower() in _SUFFIXES
+    ]
+
+
+def _data_url(data: bytes, mime: str) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+async def _live_latency(data_urls: list[str]) -> list[float]:
+    from app.agents import client_pool
+
+    samples = []
+    async with client_pool.acquire("embedding-model") as client:
+        for url in data_urls:
+            start = time.perf_counter()
+            await client.embed(image_base64_list=[url])
+            samples.append((time.perf_counter() - start) * 1000)
+    await client_pool.close()
+    return samples
+
+
+def _estimated_latency(data_urls: list[str], uplink_mbps: float, server_ms: float):
+    return [len(u) * 8 / (uplink_mbps * 1000) + server_ms for u in data_urls]
+
+
+def _kb(n: float) -> str:
+    return f"{n / 1024:8.1f}KB"
+
+
+def run(args) -> None:
+    corpus = (
+        load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(args.seed)
+    )
+    before, after, cpu_ms = [], [], []
+    print(f"\n{'image':<20}{'original':>12}{'processed':>12}{'cpu':>10}")
+    for name, data in corpus:
+        start = time.perf_counter()
+        processed = preprocess_image(
+            data,
+            max_edge=args.max_edge,
+            image_format=args.format,
+            max_bytes=args.max_bytes,
+        )
+        cpu_ms.append((time.perf_counter() - start) * 1000)
+        before.append(_data_url(data, "image/jpeg"))
+        after.append(_data_url(processed.data, processed.mime))
+        print(
+            f"{name:<20}{_kb(len(before[-1])):>12}{_kb(len(after[-1])):>12}"
+            f"{cpu_ms[-1]:8.1f}ms"
+        )
+
+    total_before = sum(len(u) for u in before)
+    total_after = sum(len(u) for u in after)
+    print(
+        f"\n== {len(corpus)} images, max_edge={args.max_edge}, format={args.format} =="
+    )
+    print(
+        f"payload: {_kb(total_before)} -> {_kb(total_after)} "
+        f"({total_after / total_before:.1%})"
+    )
+    print(
+        f"preprocess cpu: p50={statistics.median(cpu_ms):.1f}ms max={max(cpu_ms):.1f}ms"
+    )
+
+    if args.live:
+        lat_before = asyncio.run(_live_latency(before))
+        lat_after = asyncio.run(_live_latency(after))
+        mode = "live"
+    else:
+        lat_before = _estimated_latency(before, args.uplink_mbps, args.server_latency)
+        lat_after = _estimated_latency(after, args.uplink_mbps, args.server_latency)
+        mode = f"estimated, uplink={args.uplink_mbps}Mbps"
+    print(
+        f"embedding latency ({mode}): "
+        f"before p50={statistics.median(lat_before):.0f}ms, "
+        f"after p50={statistics.median(lat_after):.0f}ms "
+        f"(+cpu {statistics.median(cpu_ms):.0f}ms)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片 embedding 预处理基准")
+    parser.add_argument("--corpus", help="图片目录，默认使用合成语料")
+    parser.add_argument("--max-edge", type=int, default=1024)
+    parser.add_argument("--format", choices=["jpeg", "webp"], default="jpeg")
+    parser.add_argument("--max-bytes", type=int, default=300 * 1024)
+    parser.add_argument("--live", action="store_true", help="实际调用 embedding")
+    parser.add_argument("--uplink-mbps", type=float, default=20)
+    parser.add_argument("--server-latency", type=float, default=150, help="ms")
+    parser.add_argument("--seed", type=int, default=42)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
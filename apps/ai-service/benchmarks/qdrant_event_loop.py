@@ -0,0 +1,212 @@
+"""
+QdrantService 事件循环阻塞基准
+
+模拟一个 SSE 流（每 CHUNK_INTERVAL 秒推送一个 chunk），同时并发执行 hybrid_search，
+统计 chunk 实际间隔相对预期间隔的延迟（p50/p99/max），对比：
+
+- before: 旧实现（同步 QdrantClient 包在 async def 中，阻塞事件循环）
+- after:  新实现（QdrantService / AsyncQdrantClient）
+
+需要一个可访问的 Qdrant 服务（默认读取 settings），基准会创建并在结束时删除临时集合。
+
+启动命令：
+    uv run python -m benchmarks.qdrant_event_loop --concurrency 20 --duration 10
+    uv run python -m benchmarks.qdrant_event_loop --grpc
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+from qdrant_client.http.models import (
+    Distance,
+    PointStruct,
+    Prefetch,
+    SparseIndexParams,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from app.config import settings
+from app.services.qdrant import QdrantService
+
+CHUNK_INTERVAL = 0.02  # 20ms 一个 chunk，接近 LLM token 流的节奏
+DENSE_SIZE = 1024
+SPARSE_VOCAB = 30000
+
+
+def _random_dense() -> list[float]:
+    return np.random.rand(DENSE_SIZE).astype(np.float32).tolist()
+
+
+def _random_sparse(nnz: int = 32) -> tuple[list[int], list[float]]:
+    indices = sorted(random.sample(range(SPARSE_VOCAB), nnz))
+    return indices, np.random.rand(nnz).astype(np.float32).tolist()
+
+
+class LegacySyncQdrantService:
+    """旧实现复刻：同步客户端 + async def 包装"""
+
+    def __init__(self, prefer_grpc: bool):
+        self.client = QdrantClient(
+            host=settings.qdrant_service_host,
+            port=settings.qdrant_service_port,
+            grpc_port=settings.qdrant_service_grpc_port,
+            api_key=settings.qdrant_service_api_key,
+            prefer_grpc=prefer_grpc,
+            https=False,
+            check_compatibility=False,
+        )
+
+    async def hybrid_search(
+        self,
+        collection_name: str,
+        dense_vector: list[float],
+        sparse_indices: list[int],
+        sparse_values: list[float],
+        limit: int = 10,
+    ) -> list:
+        result = self.client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                Prefetch(query=dense_vector, using="dense", limit=limit * 5),
+                Prefetch(
+                    query=SparseVector(indices=sparse_indices, values=sparse_values),
+                    using="sparse",
+                    limit=limit * 5,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=limit,
+        )
+        return result.points
+
+    async def close(self) -> None:
+        self.client.close()
+
+
+async def _seed_collection(client: AsyncQdrantClient, name: str, points: int) -> None:
+    await client.create_collection(
+        collection_name=name,
+        vectors_config={
+            "dense": VectorParams(size=DENSE_SIZE, distance=Distance.COSINE)
+        },
+        sparse_vectors_config={
+            "sparse": SparseVectorParams(index=SparseIndexParams(on_disk=False))
+        },
+    )
+    batch: list[PointStruct] = []
+    for i in range(points):
+        indices, values = _random_sparse()
+        batch.append(
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector={
+                    "dense": _random_dense(),
+                    "sparse": SparseVector(indices=indices, values=values),
+                },
+                payload={"chat_id": f"chat-{i % 20}"},
+            )
+        )
+        if len(batch) >= 256:
+            await client.upsert(collection_name=name, points=batch)
+            batch = []
+    if batch:
+        await client.upsert(collection_name=name, points=batch)
+
+
+async def _sse_ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    """模拟 SSE 推送：记录每个 chunk 相对预期时刻的延迟"""
+    loop = asyncio.get_running_loop()
+    expected = loop.time() + CHUNK_INTERVAL
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, expected - loop.time()))
+        now = loop.time()
+        lags.append(now - expected)
+        expected = now + CHUNK_INTERVAL
+
+
+async def _search_worker(service, collection: str, stop: asyncio.Event) -> int:
+    count = 0
+    while not stop.is_set():
+        indices, values = _random_sparse(8)
+        await service.hybrid_search(
+            collection_name=collection,
+            dense_vector=_random_dense(),
+            sparse_indices=indices,
+            sparse_values=values,
+            limit=10,
+        )
+        count += 1
+    return count
+
+
+async def _run_case(
+    label: str, service, collection: str, concurrency: int, duration: float
+) -> None:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(_sse_ticker(stop, lags))
+    workers = [
+        asyncio.create_task(_search_worker(service, collection, stop))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop.set()
+    searches = sum(await asyncio.gather(*workers))
+    await ticker
+    elapsed = time.perf_counter() - started
+
+    lag_ms = np.array(lags) * 1000
+    print(
+        f"[{label:<6}] chunks={len(lags):<5} "
+        f"p50={np.percentile(lag_ms, 50):7.2f}ms "
+        f"p99={np.percentile(lag_ms, 99):7.2f}ms "
+        f"max={lag_ms.max():7.2f}ms "
+        f"searches/s={searches / elapsed:8.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--grpc", action="store_true", help="两种实现都使用 gRPC")
+    args = parser.parse_args()
+
+    collection = f"bench_event_loop_{uuid.uuid4().hex[:8]}"
+    service = QdrantService(
+        AsyncQdrantClient(
+            host=settings.qdrant_service_host,
+            port=settings.qdrant_service_port,
+            grpc_port=settings.qdrant_service_grpc_port,
+            api_key=settings.qdrant_service_api_key,
+            prefer_grpc=args.grpc,
+            https=False,
+            pool_size=settings.qdrant_pool_size,
+            check_compatibility=False,
+        )
+    )
+    legacy = LegacySyncQdrantService(prefer_grpc=args.grpc)
+
+    print(f"seeding {args.points} points into {collection} ...")
+    await _seed_collection(service.client, collection, args.points)
+    try:
+        await _run_case("before", legacy, collection, args.concurrency, args.duration)
+        await _run_case("after", service, collection, args.concurrency, args.duration)
+    finally:
+        await service.delete_collection(collection)
+        await legacy.close()
+        await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,444 @@
+"""
+混合检索参数基准（recall@k / 延迟 / 内存）
+
+在进程内 Qdrant（local 模式，:memory: 或 --path 目录）中加载 1024 维 Dense + Sparse
+语料，通过 QdrantService.hybrid_search 对每组配置执行同一批查询（按 chat_id 过滤，
+与 search_group_history 一致），输出：
+
+- recall@k: 与精确检索（exact=True、预取全部候选、相同融合方式）结果的重合率
+- hit@k:    合成语料中查询来源消息出现在前 k 条的比例（对比不同融合方式的效果）
+- p50 / p99 延迟
+- 内存: 加载语料后进程内新增的内存（tracemalloc，仅 local 模式）
+
+配置为各参数的笛卡尔积：
+- 集合级: --quantization none|scalar|binary, --hnsw-m（每组重建一次集合）
+- 查询级: --ef（hnsw_ef，0 为默认）, --prefetch（预取倍数，预取数 = k * 倍数）,
+         --fusion rrf|dbsf
+
+注意: local 模式始终是精确检索，HNSW / 量化参数不生效；测它们的代价需要 --url
+指向一个 Qdrant 服务（基准会创建并删除临时集合）。
+
+语料默认为合成数据（固定随机种子，可离线在 CI 中运行），也可以用 --corpus 加载
+导出的 .npz：
+    uv run python -m benchmarks.retrieval --export-from messages_recall --corpus recall.npz
+
+启动命令：
+    uv run python -m benchmarks.retrieval
+    uv run python -m benchmarks.retrieval --prefetch 1 2 5 --fusion rrf dbsf --min-recall 0.9
+    uv run python -m benchmarks.retrieval --url http://localhost:6333 --quantization none scalar --ef 32 128
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+    SparseVector,
+)
+
+from app.services.qdrant import QdrantService
+from app.services.qdrant_schema import CollectionSchema, sync_collection
+
+DENSE_SIZE = 1024
+COLLECTION = "bench_retrieval"
+UPSERT_BATCH = 256
+
+# local 模式下 payload 索引不生效，sync_collection 建索引时会给出警告
+warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+
+@dataclass
+class Corpus:
+    """Dense 矩阵 + Sparse 向量 + 每条所属 chat_id"""
+
+    dense: np.ndarray  # (N, D) float32
+    sparse: list[tuple[list[int], list[float]]]
+    chat_ids: list[str]
+
+    def __len__(self) -> int:
+        return len(self.chat_ids)
+
+
+@dataclass(frozen=True)
+class Query:
+    source: int  # 生成该查询的语料下标（合成语料）；导出语料同样以某条消息为源
+    dense: list[float]
+    sparse: tuple[list[int], list[float]]
+    chat_id: str
+
+
+@dataclass(frozen=True)
+class BenchConfig:
+    quantization: str
+    hnsw_m: int
+    hnsw_ef: int
+    prefetch: int
+    fusion: str
+
+    @property
+    def label(self) -> str:
+        return (
+            f"q={self.quantization} m={self.hnsw_m} ef={self.hnsw_ef or '-'} "
+            f"prefetch={self.prefetch}x {self.fusion}"
+        )
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+def synthetic_corpus(size: int, chats: int, topics: int = 50, seed: int = 42) -> Corpus:
+    """
+    合成语料：Dense 围绕 topics 个主题中心分布；Sparse 从主题词表按 Zipf 分布抽词，
+    使 Dense 与 Sparse 对同一主题有相关但不完全一致的排序
+    """
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((topics, DENSE_SIZE)))
+    topic_of = rng.integers(0, topics, size)
+    dense = _normalize(
+        centers[topic_of] + 0.6 * rng.standard_normal((size, DENSE_SIZE)) / 32
+    ).astype(np.float32)
+
+    vocab = 30_000
+    topic_vocab = rng.integers(0, vocab, (topics, 400))
+    sparse = []
+    for topic in topic_of:
+        terms = topic_vocab[topic][
+            np.minimum(rng.zipf(1.3, rng.integers(8, 24)) - 1, 399)
+        ]
+        noise = rng.integers(0, vocab, 3)
+        indices, counts = np.unique(np.concatenate([terms, noise]), return_counts=True)
+        sparse.append((indices.tolist(), np.log1p(counts).astype(float).tolist()))
+
+    chat_ids = [f"chat-{i % chats}" for i in range(size)]
+    return Corpus(dense=dense, sparse=sparse, chat_ids=chat_ids)
+
+
+def make_queries(corpus: Corpus, count: int, seed: int = 7) -> list[Query]:
+    """以随机语料为源生成查询：Dense 加噪声，Sparse 取源的三分之一词并混入噪声词"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for source in rng.choice(len(corpus), size=min(count, len(corpus)), replace=False):
+        # 噪声强度使纯 Dense 检索 hit@10 约 0.7，hit@k 反映融合 Sparse 后能否找回
+        dense = _normalize(
+            corpus.dense[source] + 14 * rng.standard_normal(DENSE_SIZE) / 32
+        )
+        indices, values = corpus.sparse[source]
+        keep = rng.choice(len(indices), max(1, len(indices) // 3), False)
+        terms = {indices[i]: values[i] for i in keep}
+        for noise in rng.integers(0, 30_000, 2):
+            terms.setdefault(int(noise), 1.0)
+        queries.append(
+            Query(
+                source=int(source),
+                dense=dense.tolist(),
+                sparse=(list(terms), list(terms.values())),
+                chat_id=corpus.chat_ids[source],
+            )
+        )
+    return queries
+
+
+def save_corpus(corpus: Corpus, path: str) -> None:
+    """保存为 .npz（Sparse 以 CSR 形式存放）"""
+    offsets = np.cumsum([0] + [len(idx) for idx, _ in corpus.sparse])
+    np.savez_compressed(
+        path,
+        dense=corpus.dense,
+        sparse_offsets=offsets,
+        sparse_indices=np.array(
+            [i for idx, _ in corpus.sparse for i in idx], dtype=np.int64
+        ),
+        sparse_values=np.array(
+            [v for _, val in corpus.sparse for v in val], dtype=np.float32
+        ),
+        chat_ids=np.array(corpus.chat_ids),
+    )
+
+
+def load_corpus(path: str) -> Corpus:
+    data = np.load(path)
+    offsets = data["sparse_offsets"]
+    sparse = [
+        (
+            data["sparse_indices"][start:end].tolist(),
+            data["sparse_values"][start:end].tolist(),
+        )
+        for start, end in itertools.pairwise(offsets)
+    ]
+    return Corpus(
+        dense=data["dense"].astype(np.float32),
+        sparse=sparse,
+        chat_ids=data["chat_ids"].tolist(),
+    )
+
+
+async def export_collection(
+    client: AsyncQdrantClient,
+    collection: str,
+    limit: int,
+    dense_using: str = "dense",
+    sparse_using: str = "sparse",
+) -> Corpus:
+    """从线上集合（如 messages_recall）滚动导出向量与 chat_id"""
+    dense, sparse, chat_ids = [], [], []
+    offset = None
+    while len(chat_ids) < limit:
+        points, offset = await client.scroll(
+            collection,
+            limit=min(256, limit - len(chat_ids)),
+            offset=offset,
+            with_payload=["chat_id"],
+            with_vectors=[dense_using, sparse_using],
+        )
+        for point in points:
+            vectors = point.vector or {}
+            if dense_using not in vectors or sparse_using not in vectors:
+                continue
+            dense.append(vectors[dense_using])
+            sparse.append((vectors[sparse_using].indices, vectors[sparse_using].values))
+            chat_ids.append((point.payload or {}).get("chat_id", ""))
+        if offset is None:
+            break
+    return Corpus(np.array(dense, dtype=np.float32), sparse, chat_ids)
+
+
+async def load_collection(
+    client: AsyncQdrantClient, corpus: Corpus, quantization: str, hnsw_m: int
+) -> None:
+    schema = CollectionSchema(
+        name=COLLECTION,
+        dense_size=corpus.dense.shape[1],
+        dense_vectors=("dense",),
+        sparse_vectors=("sparse",),
+        payload_indexes={"chat_id": PayloadSchemaType.KEYWORD},
+        hnsw_m=hnsw_m,
+        quantization=quantization,
+        on_disk_payload=False,
+    )
+    if await client.collection_exists(COLLECTION):
+        await client.delete_collection(COLLECTION)
+    await sync_collection(client, schema)
+
+    for start in range(0, len(corpus), UPSERT_BATCH):
+        points = [
+            PointStruct(
+                id=str(uuid.uuid5(uuid.NAMESPACE_DNS, str(i))),
+                vector={
+                    "dense": corpus.dense[i].tolist(),
+                    "sparse": SparseVector(
+                        indices=corpus.sparse[i][0], values=corpus.sparse[i][1]
+                    ),
+                },
+                payload={"idx": i, "chat_id": corpus.chat_ids[i]},
+            )
+            for i in range(start, min(start + UPSERT_BATCH, len(corpus)))
+        ]
+        await client.upsert(COLLECTION, points=points, wait=True)
+
+
+async def wait_indexed(client: AsyncQdrantClient) -> None:
+    """服务模式下强制建 HNSW 索引并等待完成（小语料默认不会建索引）"""
+    await client.update_collection(
+        COLLECTION,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1),
+    )
+    while True:
+        info = await client.get_collection(COLLECTION)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        await asyncio.sleep(0.5)
+
+
+async def _search(
+    service: QdrantService,
+    query: Query,
+    k: int,
+    prefetch_limit: int,
+    search_params: SearchParams | None,
+    fusion: models.Fusion,
+) -> list[int]:
+    results = await service.hybrid_search(
+        collection_name=COLLECTION,
+        dense_vector=query.dense,
+        sparse_indices=query.sparse[0],
+        sparse_values=query.sparse[1],
+        query_filter=Filter(
+            must=[FieldCondition(key="chat_id", match=MatchValue(value=query.chat_id))]
+        ),
+        limit=k,
+        prefetch_limit=prefetch_limit,
+        search_params=search_params,
+        fusion=fusion,
+    )
+    return [r["payload"]["idx"] for r in results]
+
+
+async def run_config(
+    service: QdrantService,
+    config: BenchConfig,
+    queries: list[Query],
+    truth: dict[str, list[list[int]]],
+    k: int,
+) -> dict:
+    fusion = models.Fusion(config.fusion)
+    search_params = SearchParams(
+        hnsw_ef=config.hnsw_ef or None,
+        quantization=(
+            QuantizationSearchParams(rescore=True)
+            if config.quantization != "none"
+            else None
+        ),
+    )
+    latencies, recalls, hits = [], [], []
+    for query, expected in zip(queries, truth[config.fusion], strict=True):
+        start = time.perf_counter()
+        found = await _search(
+            service, query, k, k * config.prefetch, search_params, fusion
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(found) & set(expected)) / max(1, len(expected)))
+        hits.append(query.source in found)
+
+    latencies.sort()
+    return {
+        "recall": statistics.fmean(recalls),
+        "hit": statistics.fmean(hits),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+async def exact_results(
+    service: QdrantService, queries: list[Query], fusion: str, k: int, size: int
+) -> list[list[int]]:
+    """精确检索基准：exact=True 且预取全部候选"""
+    return [
+        await _search(
+            service, q, k, size, SearchParams(exact=True), models.Fusion(fusion)
+        )
+        for q in queries
+    ]
+
+
+async def run(args) -> int:
+    if args.export_from:
+        source = AsyncQdrantClient(url=args.url) if args.url else QdrantService().client
+        corpus = await export_collection(source, args.export_from, args.size)
+        save_corpus(corpus, args.corpus)
+        print(f"已导出 {len(corpus)} 条到 {args.corpus}")
+        await source.close()
+        return 0
+
+    corpus = (
+        load_corpus(args.corpus)
+        if args.corpus
+        else synthetic_corpus(args.size, args.chats, seed=args.seed)
+    )
+    queries = make_queries(corpus, args.queries, seed=args.seed + 1)
+    local = not args.url
+    client = (
+        AsyncQdrantClient(path=args.path)
+        if args.path
+        else AsyncQdrantClient(location=":memory:")
+        if local
+        else AsyncQdrantClient(url=args.url)
+    )
+    service = QdrantService(client)
+    if local and (args.quantization != ["none"] or len(args.ef) > 1):
+        print("注意: local 模式为精确检索，HNSW / 量化参数不生效")
+
+    print(
+        f"\n语料 {len(corpus)} 条 / {len(set(corpus.chat_ids))} 个群，"
+        f"查询 {len(queries)} 条，k={args.k}，{'local' if local else args.url}\n"
+    )
+    print(
+        f"{'config':<48}{'recall@k':>10}{'hit@k':>8}{'p50':>9}{'p99':>9}{'memory':>10}"
+    )
+
+    below = 0
+    for quantization, hnsw_m in itertools.product(args.quantization, args.hnsw_m):
+        if local:
+            tracemalloc.start()
+        await load_collection(client, corpus, quantization, hnsw_m)
+        if local:
+            memory = f"{tracemalloc.get_traced_memory()[0] / 2**20:.0f}MB"
+            tracemalloc.stop()
+        else:
+            await wait_indexed(client)
+            memory = "-"
+
+        truth = {
+            fusion: await exact_results(service, queries, fusion, args.k, len(corpus))
+            for fusion in args.fusion
+        }
+        for ef, prefetch, fusion in itertools.product(
+            args.ef, args.prefetch, args.fusion
+        ):
+            config = BenchConfig(quantization, hnsw_m, ef, prefetch, fusion)
+            stats = await run_config(service, config, queries, truth, args.k)
+            below += stats["recall"] < args.min_recall
+            print(
+                f"{config.label:<48}{stats['recall']:>10.3f}{stats['hit']:>8.3f}"
+                f"{stats['p50']:>7.1f}ms{stats['p99']:>7.1f}ms{memory:>10}"
+            )
+        await client.delete_collection(COLLECTION)
+
+    await client.close()
+    if below:
+        print(f"\n{below} 组配置 recall@k 低于 {args.min_recall}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="混合检索参数基准")
+    parser.add_argument("--size", type=int, default=2000, help="语料条数")
+    parser.add_argument("--chats", type=int, default=10, help="合成语料的群数")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", help="导出语料 .npz（--export-from 时为输出路径）")
+    parser.add_argument("--export-from", help="从该集合导出语料到 --corpus 后退出")
+    parser.add_argument("--url", help="Qdrant 服务地址，默认使用进程内 local 模式")
+    parser.add_argument("--path", help="local 模式的存储目录，默认 :memory:")
+    parser.add_argument(
+        "--quantization",
+        nargs="+",
+        default=["none"],
+        choices=["none", "scalar", "binary"],
+    )
+    parser.add_argument("--hnsw-m", nargs="+", type=int, default=[16])
+    parser.add_argument("--ef", nargs="+", type=int, default=[0], help="0 为默认")
+    parser.add_argument("--prefetch", nargs="+", type=int, default=[1, 5])
+    parser.add_argument(
+        "--fusion", nargs="+", default=["rrf", "dbsf"], choices=["rrf", "dbsf"]
+    )
+    parser.add_argument(
+        "--min-recall", type=float, default=0.0, help="低于该值时退出码为 1（CI 用）"
+    )
+    args = parser.parse_args()
+    if args.export_from and not args.corpus:
+        parser.error("--export-from 需要同时指定 --corpus")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+向量化 worker 多副本扩展基准
+
+向本地 Redis 的临时 stream 写入一批消息，启动 N 个 worker 进程（各自一个唯一的
+消费者名，同一个消费者组）消费，统计全部 ACK 所需时间与吞吐。PG / embedding /
+Qdrant / 图片下载均为进程内模拟：
+
+- embedding: 固定延迟的模拟供应商（经 EmbeddingBatcher 合并，与线上调用路径一致）
+- Qdrant:    固定延迟的 upsert_points（经 QdrantWriteBuffer 合并）
+- 图片下载:  部分消息带图，下载耗时远大于 embedding，用于复现慢消息
+
+消费模式：
+- stream: StreamConsumer（槽位空出即补充）
+- batch:  旧实现（读 concurrency 条 → gather 全部完成 → 再读）
+
+对比 --replicas 1 2 4 的吞吐即可看出扩展是否接近线性。
+
+启动命令（需要本地 Redis，默认 redis://localhost:6379/0）：
+    uv run python -m benchmarks.vectorize_scaleout
+    uv run python -m benchmarks.vectorize_scaleout --replicas 1 2 4 8 --mode batch
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import time
+import uuid
+from types import SimpleNamespace
+
+from redis.asyncio import Redis
+
+from app.agents.clients import EmbeddingBatcher
+from app.services.qdrant_writer import QdrantWriteBuffer
+from app.workers import vectorize_worker
+from benchmarks.embedding_batch import FakeProvider, _StaticPool
+
+_BENCH_PREFIX = "vectorize_bench"
+
+
+class FakeQdrant:
+    """模拟 Qdrant：每次 upsert 固定延迟"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def upsert_points(self, collection_name, points, wait=True) -> bool:
+        await asyncio.sleep(self.latency)
+        return True
+
+
+def _content(message_id: str, image_ratio: float) -> str:
+    rng = random.Random(message_id)
+    items = [{"type": "text", "value": f"消息 {message_id}"}]
+    if rng.random() < image_ratio:
+        items.append({"type": "image", "value": f"img-{message_id}"})
+    return json.dumps({"v": 2, "text": items[0]["value"], "items": items})
+
+
+def _install_fakes(args) -> None:
+    """把 worker 的外部依赖替换为进程内模拟"""
+    w = vectorize_worker
+    w.STREAM_NAME = f"{_BENCH_PREFIX}:{args.run_id}:stream"
+    w.GROUP_NAME = f"{_BENCH_PREFIX}:{args.run_id}:group"
+    w.DEAD_LETTER_STREAM = f"{_BENCH_PREFIX}:{args.run_id}:dead"
+    w._DONE_KEY_PREFIX = f"{_BENCH_PREFIX}:{args.run_id}:done"
+
+    provider = FakeProvider(
+        args.embed_latency / 1000, args.provider_concurrency, batch_text=False
+    )
+    w._embedding_batcher = EmbeddingBatcher(
+        pool=_StaticPool(provider),  # type: ignore[arg-type]
+        max_batch_size=16,
+        window_ms=5,
+        cache=None,
+    )
+    w._vector_writer = QdrantWriteBuffer(
+        service=FakeQdrant(args.qdrant_latency / 1000),  # type: ignore[arg-type]
+        max_points=64,
+        flush_interval_ms=10,
+        wait=False,
+    )
+
+    async def get_messages_by_ids(message_ids):
+        await asyncio.sleep(args.pg_latency / 1000)
+        return {
+            m: SimpleNamespace(
+                message_id=m,
+                user_id="u",
+                chat_id="c",
+                chat_type="p2p",
+                root_message_id=m,
+                create_time=0,
+                bot_name=None,
+                vector_status="pending",
+                content=_content(m, args.image_ratio),
+            )
+            for m in message_ids
+        }
+
+    async def update_vector_statuses(statuses):
+        await asyncio.sleep(args.pg_latency / 1000)
+
+    async def resolve_images(items, bot_name):
+        return None
+
+    async def download_image_as_base64(key, message_id, bot_name):
+        await asyncio.sleep(args.image_latency / 1000)
+        return "data:image/png;base64,AAAA"
+
+    w.get_messages_by_ids = get_messages_by_ids
+    w.update_vector_statuses = update_vector_statuses
+    w.image_client = SimpleNamespace(
+        resolve_images=resolve_images,
+        download_image_as_base64=download_image_as_base64,
+    )
+
+
+async def _legacy_run(redis: Redis, consumer_name: str, should_run) -> None:
+    """旧消费循环：读满一批，等整批完成再读下一批"""
+    w = vectorize_worker
+    while should_run():
+        messages = await redis.xreadgroup(
+            w.GROUP_NAME,
+            consumer_name,
+            streams={w.STREAM_NAME: ">"},
+            count=w.CONCURRENCY_LIMIT,
+            block=200,
+        )
+        entries = [
+            (stream_id, data["message_id"])
+            for _stream_name, items in messages or []
+            for stream_id, data in items
+        ]
+        await w.process_batch(redis, entries)
+
+
+def _replica(index: int, args, go, stop) -> None:
+    _install_fakes(args)
+    go.wait()
+
+    async def main() -> None:
+        redis = Redis.from_url(args.redis_url, decode_responses=True)
+        consumer_name = f"bench-{index}"
+        should_run = lambda: not stop.is_set()  # noqa: E731
+        try:
+            if args.mode == "batch":
+                await _legacy_run(redis, consumer_name, should_run)
+            else:
+                consumer = vectorize_worker.StreamConsumer(redis, consumer_name)
+                await consumer.run(should_run=should_run)
+            await vectorize_worker._embedding_batcher.drain()
+            await vectorize_worker._vector_writer.drain()
+        finally:
+            await redis.aclose()
+
+    asyncio.run(main())
+
+
+async def _acked(redis: Redis, stream: str, group: str, last_id: str) -> bool:
+    groups = await redis.xinfo_groups(stream)
+    info = next(g for g in groups if g["name"] == group)
+    return info["last-delivered-id"] == last_id and info["pending"] == 0
+
+
+async def run_once(args, replicas: int) -> float:
+    args.run_id = uuid.uuid4().hex[:8]
+    stream = f"{_BENCH_PREFIX}:{args.run_id}:stream"
+    group = f"{_BENCH_PREFIX}:{args.run_id}:group"
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        await redis.xgroup_create(stream, group, id="0", mkstream=True)
+        async with redis.pipeline(transaction=False) as pipe:
+            for i in range(args.messages):
+                pipe.xadd(stream, {"message_id": f"{args.run_id}-{i}"})
+            ids = await pipe.execute()
+        last_id = ids[-1]
+
+        ctx = mp.get_context("spawn")
+        go, stop = ctx.Event(), ctx.Event()
+        procs = [
+            ctx.Process(target=_replica, args=(i, args, go, stop))
+            for i in range(replicas)
+        ]
+        for p in procs:
+            p.start()
+        # 等待子进程完成导入，计时不含进程启动
+        await asyncio.sleep(args.warmup)
+
+        start = time.perf_counter()
+        go.set()
+        while not await _acked(redis, stream, group, last_id):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        for p in procs:
+            p.join()
+        return elapsed
+    finally:
+        keys = [k async for k in redis.scan_iter(f"{_BENCH_PREFIX}:{args.run_id}:*")]
+        if keys:
+            await redis.delete(*keys)
+        await redis.aclose()
+
+
+async def run(args) -> None:
+    print(
+        f"\n== mode={args.mode}, messages={args.messages}, "
+        f"concurrency={vectorize_worker.CONCURRENCY_LIMIT}, "
+        f"image_ratio={args.image_ratio}, image_latency={args.image_latency}ms, "
+        f"embed_latency={args.embed_latency}ms =="
+    )
+    base = None
+    for replicas in args.replicas:
+        elapsed = await run_once(args, replicas)
+        rate = args.messages / elapsed
+        base = base or rate / replicas
+        print(
+            f"replicas={replicas:2d}: {rate:8.1f} msg/s  "
+            f"elapsed={elapsed:6.2f}s  scaling={rate / base / replicas:5.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化 worker 多副本扩展基准")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--mode", choices=["stream", "batch"], default="stream")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--image-ratio", type=float, default=0.1)
+    parser.add_argument("--image-latency", type=float, default=500, help="ms")
+    parser.add_argument("--embed-latency", type=float, default=30, help="ms")
+    parser.add_argument("--qdrant-latency", type=float, default=5, help="ms")
+    parser.add_argument("--pg-latency", type=float, default=2, help="ms")
+    parser.add_argument(
+        "--provider-concurrency", type=int, default=64, help="单副本供应商并发"
+    )
+    parser.add_argument("--warmup", type=float, default=3, help="子进程启动等待(s)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
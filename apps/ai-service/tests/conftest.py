@@ -27,16 +27,22 @@ for mod_name in ("_sqlite3", "sqlite3", "sqlite3.dbapi2"):
 
 
 # ---------------------------------------------------------------------------
-# 缓存清理 (autouse) — 每个测试前后清空 ModelBuilder 缓存
+# 缓存清理 (autouse) — 每个测试前后清空 ModelBuilder / ChatAgent / Pre 缓存
 # ---------------------------------------------------------------------------
 @pytest.fixture(autouse=True)
 def _clear_model_cache():
-    """每个测试前后清空 ModelBuilder 的 model_info 缓存"""
+    """每个测试前后清空 ModelBuilder 的 model_info 缓存、agent 缓存和 pre 缓存"""
+    from app.agents.core.agent import clear_agent_cache
+    from app.agents.graphs.pre.cache import clear_pre_cache
     from app.agents.infra.model_builder import clear_model_info_cache
 
     clear_model_info_cache()
+    clear_agent_cache()
+    clear_pre_cache()
     yield
     clear_model_info_cache()
+    clear_agent_cache()
+    clear_pre_cache()
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,70 @@
+"""test_history_context_plan.py — 群聊历史上下文查询计划回归测试（需要 PostgreSQL）
+
+在临时表中按 ORM 模型建表和索引、写入多个群的数据并 ANALYZE 后，对 window_query
+生成的语句执行 EXPLAIN，断言走 (chat_id, create_time) 复合索引的范围扫描。
+
+未配置 POSTGRES_HOST 时跳过。
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.agents.tools.history.search import window_query
+from app.config.config import settings
+from app.orm.models import ConversationMessage
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not settings.postgres_host, reason="需要 PostgreSQL"),
+]
+
+CHATS = 50
+ROWS_PER_CHAT = 2000
+
+
+@pytest.fixture()
+async def connection():
+    from app.orm.base import engine
+
+    table = ConversationMessage.__table__
+    dialect = postgresql.dialect()
+    async with engine.connect() as conn:
+        # 临时表只在当前连接可见，且在 search_path 中优先于同名正式表
+        ddl = str(CreateTable(table).compile(dialect=dialect))
+        await conn.execute(text(ddl.replace("CREATE TABLE", "CREATE TEMPORARY TABLE")))
+        for index in table.indexes:
+            await conn.execute(text(str(CreateIndex(index).compile(dialect=dialect))))
+        await conn.execute(
+            text(
+                f"""
+                INSERT INTO conversation_messages (
+                    message_id, user_id, content, role, root_message_id,
+                    chat_id, chat_type, create_time, vector_status
+                )
+                SELECT 'm' || i, 'u' || (i % 20), 'hello', 'user', 'm' || i,
+                       'chat-' || (i % {CHATS}), 'group', 1700000000000 + i * 1000,
+                       'completed'
+                FROM generate_series(1, {CHATS * ROWS_PER_CHAT}) AS i
+                """
+            )
+        )
+        await conn.execute(text("ANALYZE conversation_messages"))
+        yield conn
+        await conn.rollback()
+
+
+async def test_window_query_uses_composite_index(connection):
+    lo = 1700000000000 + 40_000 * 1000
+    anchors = [lo + 5 * 60 * 1000, lo + 8 * 60 * 1000]
+    stmt = window_query("chat-7", lo, lo + 13 * 60 * 1000, anchors, limit=200)
+    sql = stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+
+    result = await connection.execute(text(f"EXPLAIN {sql}"))
+    plan = "\n".join(row[0] for row in result)
+
+    assert "idx_conversation_messages_chat_time" in plan, plan
+    assert "Seq Scan" not in plan, plan
@@ -45,6 +45,13 @@ def _clear_pre_graph_cache():
     get_pre_graph.cache_clear()
 
 
+@pytest.fixture(autouse=True)
+def _disable_pre_result_cache():
+    """端到端测试始终运行完整的图（结果缓存由单元测试覆盖）"""
+    with patch("app.agents.graphs.pre.graph.build_cache_key", return_value=None):
+        yield
+
+
 class TestPreGraphNormalMessage:
     """正常消息 — 所有检查通过"""
 
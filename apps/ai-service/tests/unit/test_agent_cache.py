@@ -0,0 +1,155 @@
+"""test_agent_cache.py — ChatAgent 进程级缓存测试
+
+场景覆盖：
+- 相同 prompt 版本 / 模型配置复用编译好的 agent
+- prompt 版本变化、模型配置变化、tools 变化时重建
+- TTL 过期后重建
+- prompt_vars / currDate 在调用时注入 system prompt
+"""
+
+import time
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.agents.core import agent as agent_module
+from app.agents.core.agent import ChatAgent
+from app.agents.core.context import ContextSchema
+
+pytestmark = pytest.mark.unit
+
+
+class NoopCallback(BaseCallbackHandler):
+    """替代 Langfuse CallbackHandler"""
+
+
+# 模型实际收到的 system prompt（fixture 中重置）
+_seen_system_prompts: list[str] = []
+
+
+class _RecordingChatModel(GenericFakeChatModel):
+    """记录每次调用收到的 system prompt"""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        _seen_system_prompts.extend(
+            m.content for m in messages if isinstance(m, SystemMessage)
+        )
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _fake_model() -> _RecordingChatModel:
+    return _RecordingChatModel(
+        messages=iter([AIMessage(content="ok") for _ in range(10)])
+    )
+
+
+def _fake_prompt(version: int = 1) -> MagicMock:
+    prompt = MagicMock()
+    prompt.version = version
+    prompt.get_langchain_prompt.side_effect = lambda **kw: (
+        f"v{version} user={kw.get('user_info', '')} date={kw['currDate']}"
+    )
+    return prompt
+
+
+@pytest.fixture()
+def patched(model_info_factory):
+    """Mock prompt / model_info / build_chat_model"""
+    state: dict[str, Any] = {
+        "prompt": _fake_prompt(),
+        "model_info": model_info_factory(),
+    }
+    _seen_system_prompts.clear()
+    build = AsyncMock(side_effect=lambda *a, **kw: _fake_model())
+    with (
+        patch.object(
+            agent_module, "get_prompt", side_effect=lambda _id: state["prompt"]
+        ),
+        patch.object(
+            agent_module.ModelBuilder,
+            "_get_model_and_provider_info",
+            AsyncMock(side_effect=lambda _id: state["model_info"]),
+        ),
+        patch.object(agent_module.ModelBuilder, "build_chat_model", build),
+        patch.object(
+            agent_module, "CallbackHandler", side_effect=lambda **_: NoopCallback()
+        ),
+    ):
+        state["build"] = build
+        yield state
+
+
+class TestAgentReuse:
+    async def test_same_key_reuses_agent(self, patched):
+        a1 = ChatAgent("main", [], model_id="m")
+        a2 = ChatAgent("main", [], model_id="m")
+        await a1._init_agent()
+        await a2._init_agent()
+
+        assert a1._agent is a2._agent
+        assert patched["build"].call_count == 1
+
+    async def test_prompt_version_change_rebuilds(self, patched):
+        await ChatAgent("main", [], model_id="m")._init_agent()
+        patched["prompt"] = _fake_prompt(version=2)
+        await ChatAgent("main", [], model_id="m")._init_agent()
+
+        assert patched["build"].call_count == 2
+
+    async def test_model_info_change_rebuilds(self, patched, model_info_factory):
+        await ChatAgent("main", [], model_id="m")._init_agent()
+        patched["model_info"] = model_info_factory(base_url="https://other/v1")
+        await ChatAgent("main", [], model_id="m")._init_agent()
+
+        assert patched["build"].call_count == 2
+
+    async def test_model_kwargs_are_part_of_key(self, patched):
+        await ChatAgent("main", [], model_id="m")._init_agent()
+        await ChatAgent(
+            "main", [], model_id="m", model_kwargs={"temperature": 0}
+        )._init_agent()
+
+        assert patched["build"].call_count == 2
+        assert patched["build"].call_args.kwargs == {"temperature": 0}
+
+    async def test_ttl_expiry_rebuilds(self, patched):
+        await ChatAgent("main", [], model_id="m")._init_agent()
+
+        future = time.monotonic() + agent_module._AGENT_CACHE_TTL_SECONDS + 1
+        with patch.object(agent_module.time, "monotonic", return_value=future):
+            await ChatAgent("main", [], model_id="m")._init_agent()
+
+        assert patched["build"].call_count == 2
+        assert len(agent_module._agent_cache) == 1  # 过期条目被淘汰
+
+
+class TestPromptVarsInjection:
+    async def test_prompt_vars_injected_per_call(self, patched):
+        agent = ChatAgent("main", [], model_id="m")
+
+        await agent.run(
+            [HumanMessage(content="hi")], prompt_vars={"user_info": "alice"}
+        )
+        await agent.run([HumanMessage(content="hi")], prompt_vars={"user_info": "bob"})
+
+        assert patched["build"].call_count == 1  # 仅构建一次
+        assert [p.split(" date=")[0] for p in _seen_system_prompts] == [
+            "v1 user=alice",
+            "v1 user=bob",
+        ]
+        prompts = [
+            c.kwargs for c in patched["prompt"].get_langchain_prompt.call_args_list
+        ]
+        assert all("currDate" in p and "currTime" in p for p in prompts)
+
+    async def test_caller_context_is_not_mutated(self, patched):
+        context = ContextSchema(curr_chat_id="chat-1")
+        await ChatAgent("main", [], model_id="m").run(
+            [HumanMessage(content="hi")], context=context, prompt_vars={"x": 1}
+        )
+
+        assert context.prompt_vars is None
@@ -0,0 +1,150 @@
+"""test_banned_word.py — 封禁词自动机与刷新测试
+
+场景覆盖：
+- Aho-Corasick 与暴力匹配结果一致（含重叠 / 嵌套模式）
+- 归一化：全角、大小写、标点/空白穿插、繁体
+- 命中位置映射回原文
+- 版本号 / 词表数量不变时不重新 SMEMBERS，变化时重建
+- Redis 异常时沿用旧词表，首次加载失败向上抛出
+"""
+
+import random
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import banned_word
+from app.services.banned_word import (
+    BannedWordMatcher,
+    check_banned_word,
+    clear_banned_word_cache,
+    find_banned_words,
+)
+from app.utils.aho_corasick import AhoCorasick
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def _reset_engine():
+    clear_banned_word_cache()
+    yield
+    clear_banned_word_cache()
+
+
+class FakeRedis:
+    """只实现封禁词刷新用到的命令"""
+
+    def __init__(self, words: set[str]):
+        self.words = set(words)
+        self.version: str | None = None
+        self.smembers = AsyncMock(side_effect=lambda key: set(self.words))
+
+    def pipeline(self, transaction=True):
+        redis = self
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.execute = AsyncMock(side_effect=lambda: [redis.version, len(redis.words)])
+        return pipe
+
+
+@pytest.fixture()
+def fake_redis():
+    redis = FakeRedis({"坏词", "BadWord"})
+    with patch.object(banned_word.AsyncRedisClient, "get_instance", return_value=redis):
+        yield redis
+
+
+class TestAhoCorasick:
+    def test_overlapping_patterns(self):
+        ac = AhoCorasick(["he", "she", "his", "hers"])
+        assert sorted(ac.find_all("ushers")) == [
+            (1, 4, "she"),
+            (2, 4, "he"),
+            (2, 6, "hers"),
+        ]
+        assert ac.find_first("ushers") == (1, 4, "she")
+        assert ac.find_first("nothing") is None
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        patterns = {"".join(rng.choices("abc", k=rng.randint(1, 4))) for _ in range(30)}
+        text = "".join(rng.choices("abcd", k=300))
+
+        expected = sorted(
+            (i, i + len(p), p)
+            for p in patterns
+            for i in range(len(text) - len(p) + 1)
+            if text.startswith(p, i)
+        )
+        assert sorted(AhoCorasick(patterns).find_all(text)) == expected
+
+
+class TestMatcher:
+    def test_normalization(self):
+        matcher = BannedWordMatcher({"坏词", "BadWord"})
+        assert matcher.find_first("这是 坏 . 词") == "坏词"
+        assert matcher.find_first("ｂａｄ－ｗｏｒｄ!") == "BadWord"
+        assert matcher.find_first("好词") is None
+
+    def test_traditional_chinese(self):
+        matcher = BannedWordMatcher({"坏词"})
+        assert matcher.find_first("壞詞") == "坏词"
+
+    def test_positions_map_to_original_text(self):
+        text = "前缀 坏-词 和 bad word"
+        matches = BannedWordMatcher({"坏词", "badword"}).find_all(text)
+
+        assert [(m.word, text[m.start : m.end]) for m in matches] == [
+            ("坏词", "坏-词"),
+            ("badword", "bad word"),
+        ]
+
+    def test_symbol_only_words(self):
+        matcher = BannedWordMatcher({"🐷", "***", "坏词"})
+        assert len(matcher) == 3
+        assert matcher.find_first("你是🐷") == "🐷"
+        assert matcher.find_first("＊＊＊") == "***"
+        assert matcher.find_first("**") is None
+
+        text = "坏词 🐷"
+        matches = matcher.find_all(text)
+        assert [(m.word, text[m.start : m.end]) for m in matches] == [
+            ("坏词", "坏词"),
+            ("🐷", "🐷"),
+        ]
+
+
+class TestRefresh:
+    async def test_reuses_automaton_until_version_changes(self, fake_redis):
+        assert await check_banned_word("有坏词") == "坏词"
+
+        # 刷新间隔内不访问 Redis
+        assert await check_banned_word("没有") is None
+        assert fake_redis.smembers.await_count == 1
+
+        # 到期后版本未变：只读版本号，不重新拉词表
+        with patch.object(banned_word, "_REFRESH_INTERVAL_SECONDS", 0):
+            await check_banned_word("没有")
+            assert fake_redis.smembers.await_count == 1
+
+            fake_redis.words = {"新词"}
+            fake_redis.version = "2"
+            matches = await find_banned_words("一个新词")
+
+        assert fake_redis.smembers.await_count == 2
+        assert [m.word for m in matches] == ["新词"]
+
+    async def test_redis_failure_keeps_previous_words(self, fake_redis):
+        await check_banned_word("预热")
+        fake_redis.smembers.side_effect = ConnectionError("down")
+        fake_redis.version = "3"
+
+        with patch.object(banned_word, "_REFRESH_INTERVAL_SECONDS", 0):
+            assert await check_banned_word("有坏词") == "坏词"
+
+    async def test_first_load_failure_raises(self, fake_redis):
+        fake_redis.smembers.side_effect = ConnectionError("down")
+        with pytest.raises(ConnectionError):
+            await check_banned_word("有坏词")
@@ -0,0 +1,118 @@
+"""test_chat_context_loader.py — 单次 round trip 上下文加载测试
+
+场景覆盖：
+- 查询语句为单条 CTE 语句
+- 线程消息 + 时间窗口补足裁剪
+- 画像 / 灰度配置 / 群名取自触发消息行
+- 触发消息不存在返回 None
+- load_chat_context 只执行一次 SQL 并记录耗时
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.chat_context_loader import (
+    assemble_snapshot,
+    build_context_statement,
+    load_chat_context,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def _row(
+    message_id: str,
+    create_time: int,
+    *,
+    in_thread: bool = True,
+    role: str = "user",
+    user_id: str = "u1",
+    user_profile: str | None = None,
+) -> dict:
+    return {
+        "message_id": message_id,
+        "content": f"content-{message_id}",
+        "user_id": user_id,
+        "create_time": create_time,
+        "role": role,
+        "chat_type": "group",
+        "reply_message_id": None,
+        "chat_id": "chat-1",
+        "in_thread": in_thread,
+        "username": f"name-{user_id}",
+        "user_profile": user_profile,
+        "chat_name": "测试群",
+        "gray_config": {"pre_blocking": "true"},
+        "group_profile": "群画像",
+    }
+
+
+class TestStatement:
+    def test_single_cte_statement(self):
+        sql = str(build_context_statement("m1").compile(dialect=postgresql.dialect()))
+        assert sql.startswith("WITH trg AS")
+        assert "UNION ALL" in sql
+        for table in ("user_profiles", "group_profiles", "lark_base_chat_info"):
+            assert f"LEFT OUTER JOIN {table}" in sql
+
+
+class TestAssembleSnapshot:
+    def test_thread_plus_window_trimmed_to_limit(self):
+        rows = [
+            _row("w1", 1000, in_thread=False),
+            _row("w2", 2000, in_thread=False),
+            _row("w3", 3000, in_thread=False),
+            _row("t1", 4000),
+            _row("trigger", 5000),
+        ]
+        snapshot = assemble_snapshot("trigger", rows, limit=4)
+
+        assert snapshot is not None
+        # 线程 2 条 + 窗口内最近 2 条
+        assert [h.message_id for h in snapshot.history] == ["w2", "w3", "t1", "trigger"]
+        assert snapshot.trigger.message_id == "trigger"
+
+    def test_chat_level_fields_and_profiles(self):
+        rows = [
+            _row("a", 1000, role="assistant", user_id="bot", user_profile="x"),
+            _row("b", 2000, user_id="u2", user_profile="画像2"),
+            _row("trigger", 3000, user_id="u1"),
+        ]
+        snapshot = assemble_snapshot("trigger", rows)
+
+        assert snapshot is not None
+        assert snapshot.chat_id == "chat-1"
+        assert snapshot.chat_type == "group"
+        assert snapshot.chat_name == "测试群"
+        assert snapshot.gray_config == {"pre_blocking": "true"}
+        assert snapshot.group_profile == "群画像"
+        # 仅 user 角色且有画像的用户
+        assert snapshot.user_profiles == {"u2": "画像2"}
+        assert snapshot.history[0].username == "赤尾"
+
+    def test_missing_trigger_returns_none(self):
+        assert assemble_snapshot("trigger", [_row("other", 1000)]) is None
+
+
+class TestLoadChatContext:
+    async def test_single_round_trip(self):
+        result = MagicMock()
+        result.mappings.return_value.all.return_value = [_row("trigger", 1000)]
+        session = AsyncMock()
+        session.execute.return_value = result
+        session_cm = MagicMock()
+        session_cm.__aenter__ = AsyncMock(return_value=session)
+        session_cm.__aexit__ = AsyncMock(return_value=False)
+
+        with patch(
+            "app.services.chat_context_loader.AsyncSessionLocal",
+            return_value=session_cm,
+        ):
+            snapshot = await load_chat_context("trigger")
+
+        assert snapshot is not None
+        assert session.execute.await_count == 1
+        assert snapshot.query_count == 1
+        assert snapshot.elapsed_ms >= 0
@@ -0,0 +1,73 @@
+"""test_chat_pipeline_stages.py — 主聊天流水线阶段预算与 TTFT 计时测试
+
+场景覆盖：
+- StageTimer 记录阶段耗时与时间点（同名时间点只记录第一次）
+- 图片处理超出预算时丢弃慢图片，不阻塞上下文构建
+- 机器人发出的图片不带 message_id 解析
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.domains.main.context_builder import _resolve_images
+from app.utils.stage_timer import StageTimer
+
+pytestmark = pytest.mark.unit
+
+
+class TestStageTimer:
+    async def test_measure_and_marks(self):
+        timer = StageTimer()
+
+        result = await timer.measure("sleep", asyncio.sleep(0.01, result="ok"))
+        timer.mark("first_token")
+        first = timer.marks["first_token"]
+        timer.mark("first_token")
+
+        assert result == "ok"
+        assert timer.stages["sleep"] >= 10
+        assert timer.marks["first_token"] == first
+
+        report = timer.report()
+        assert set(report) == {"stages_ms", "marks_ms"}
+
+    async def test_stage_records_on_exception(self):
+        timer = StageTimer()
+        with pytest.raises(RuntimeError), timer.stage("boom"):
+            raise RuntimeError
+
+        assert "boom" in timer.stages
+
+
+class TestImageBudget:
+    async def test_slow_images_dropped_after_budget(self):
+        async def fake_resolve(items, bot_name=None, timeout=None):
+            await asyncio.sleep(timeout)  # 客户端在预算内只返回已完成的部分
+            return {"fast": "https://img/fast"}
+
+        keys = [("fast", "m1", "user"), ("slow", "m1", "user")]
+        with patch(
+            "app.agents.domains.main.context_builder.image_client.resolve_images",
+            side_effect=fake_resolve,
+        ) as resolve:
+            start = time.perf_counter()
+            result = await _resolve_images(keys, budget=0.05)
+            elapsed = time.perf_counter() - start
+
+        assert result == {"fast": "https://img/fast"}
+        assert elapsed < 1
+        assert resolve.call_args.kwargs["timeout"] == 0.05
+
+    async def test_assistant_images_resolved_without_message_id(self):
+        keys = [("ok", "m1", "user"), ("none", "m2", "assistant")]
+        with patch(
+            "app.agents.domains.main.context_builder.image_client.resolve_images",
+            return_value={"ok": "https://img/ok"},
+        ) as resolve:
+            result = await _resolve_images(keys, budget=1)
+
+        assert result == {"ok": "https://img/ok"}
+        assert resolve.call_args.args[0] == [("ok", "m1"), ("none", None)]
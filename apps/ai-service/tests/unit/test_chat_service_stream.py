@@ -0,0 +1,144 @@
+"""test_chat_service_stream.py — SSE 推送模式测试
+
+场景覆盖：
+- snapshot 模式（默认）：推送完整累计内容，兼容旧版 main-server
+- delta 模式：seq 递增 + 追加文本，拼接结果等于完整回复
+- replace 增量（拦截/出错提示）替换此前内容
+- 状态消息前先推送已累计内容
+- 自适应间隔：间隔逐步放大、积压超阈值立即触发
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services.chat_service import ChatService, ReplyBuffer
+from app.types.chat import ChatRequest, ChatStreamChunk, StreamMode
+from app.utils.async_interval import AdaptiveIntervalChecker
+
+pytestmark = pytest.mark.unit
+
+
+def _fake_stream(*chunks: ChatStreamChunk):
+    async def _stream(message_id, session_id=None):
+        for chunk in chunks:
+            yield chunk
+
+    return _stream
+
+
+async def _collect(request: ChatRequest, *chunks: ChatStreamChunk) -> list[dict]:
+    with patch("app.services.chat_service.stream_chat", _fake_stream(*chunks)):
+        return [
+            json.loads(event) async for event in ChatService.process_chat_sse(request)
+        ]
+
+
+def _sends(events: list[dict]) -> list[dict]:
+    return [e for e in events if e["step"] == "send"]
+
+
+class TestSnapshotMode:
+    async def test_default_mode_pushes_full_content(self):
+        events = await _collect(
+            ChatRequest(message_id="m1"),
+            ChatStreamChunk(content="你"),
+            ChatStreamChunk(content="好"),
+            ChatStreamChunk(content="呀"),
+        )
+
+        sends = _sends(events)
+        assert sends[0]["content"] == "你"
+        assert sends[-1]["content"] == "你好呀"
+        assert "seq" not in sends[-1]
+        assert events[-2] == {
+            "step": "success",
+            "content": "你好呀",
+            "reason_content": "",
+        }
+        assert events[-1] == {"step": "end"}
+
+
+class TestDeltaMode:
+    async def test_deltas_reassemble_to_full_reply(self):
+        events = await _collect(
+            ChatRequest(message_id="m1", stream_mode=StreamMode.DELTA),
+            ChatStreamChunk(content="你"),
+            ChatStreamChunk(content="好"),
+            ChatStreamChunk(content="呀"),
+        )
+
+        sends = _sends(events)
+        assert [e["seq"] for e in sends] == list(range(len(sends)))
+        assert "".join(e["delta"] for e in sends) == "你好呀"
+        assert events[-2]["step"] == "success"
+        assert events[-2]["content"] == "你好呀"
+
+    async def test_replace_discards_previous_content(self):
+        events = await _collect(
+            ChatRequest(message_id="m1", stream_mode=StreamMode.DELTA),
+            ChatStreamChunk(content="部分回复"),
+            ChatStreamChunk(content="出错了", replace=True),
+        )
+
+        sends = _sends(events)
+        assert sends[-1] == {
+            "step": "send",
+            "seq": 1,
+            "delta": "出错了",
+            "replace": True,
+        }
+        assert events[-2]["content"] == "出错了"
+
+    async def test_status_flushes_pending_content_first(self):
+        events = await _collect(
+            ChatRequest(message_id="m1", stream_mode=StreamMode.DELTA),
+            ChatStreamChunk(content="a"),
+            ChatStreamChunk(content="b"),
+            ChatStreamChunk(status_message="正在搜索"),
+            ChatStreamChunk(content="c"),
+        )
+
+        sends = _sends(events)
+        assert [e.get("delta", e.get("status_message")) for e in sends] == [
+            "a",
+            "b",
+            "正在搜索",
+            "c",
+        ]
+
+
+class TestReplyBuffer:
+    def test_flush_without_new_content_returns_none(self):
+        reply = ReplyBuffer(StreamMode.DELTA)
+        assert reply.flush() is None
+
+        reply.append(ChatStreamChunk(content="x"))
+        assert reply.flush() is not None
+        assert reply.flush() is None
+
+
+class TestAdaptiveIntervalChecker:
+    async def test_interval_grows_and_pending_triggers(self):
+        checker = AdaptiveIntervalChecker(0.25, 1.0, growth=2, max_pending=10)
+        loop_time = 100.0
+
+        with patch("asyncio.get_event_loop") as get_loop:
+            get_loop.return_value.time.side_effect = lambda: loop_time
+
+            assert checker.check()  # 首次立即触发
+            loop_time += 0.25
+            assert checker.check()
+            assert checker.interval == 0.5
+
+            loop_time += 0.25
+            assert not checker.check(pending=3)
+            assert checker.check(pending=10)  # 积压超阈值
+            assert checker.interval == 0.5
+
+            loop_time += 0.5
+            assert checker.check()
+            loop_time += 1.0
+            assert checker.check()
+            assert checker.interval == 1.0  # 不超过上限
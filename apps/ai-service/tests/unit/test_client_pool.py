@@ -0,0 +1,119 @@
+"""test_client_pool.py — AI 客户端池测试
+
+场景覆盖：
+- 同一 model_id 并发取用只创建 / 连接一次，归还不关闭
+- 模型配置变化时替换客户端，旧客户端在使用者归还后关闭
+- 模型配置查询失败时沿用已有客户端
+- close() 关闭全部客户端
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.clients import pool as pool_module
+from app.agents.clients.pool import ClientPool
+
+pytestmark = pytest.mark.unit
+
+
+async def _slow_connect():
+    await asyncio.sleep(0.01)
+
+
+def _fake_client(model_id: str) -> MagicMock:
+    client = MagicMock(model_id=model_id)
+    client.connect = AsyncMock(side_effect=_slow_connect)
+    client.disconnect = AsyncMock()
+    return client
+
+
+@pytest.fixture()
+def env(model_info_factory):
+    state = {"info": model_info_factory(model_id="embedding-model")}
+    created: list[MagicMock] = []
+
+    async def create(model_id):
+        client = _fake_client(model_id)
+        created.append(client)
+        return client
+
+    async def get_info(model_id):
+        return state["info"]
+
+    with (
+        patch.object(pool_module, "create_client", side_effect=create),
+        patch.object(
+            pool_module.ModelBuilder,
+            "_get_model_and_provider_info",
+            side_effect=get_info,
+        ),
+    ):
+        yield state, created
+
+
+async def test_concurrent_acquire_shares_one_client(env):
+    _, created = env
+    pool = ClientPool()
+
+    async def use():
+        async with pool.acquire("embedding-model") as client:
+            await asyncio.sleep(0)
+            return client
+
+    clients = await asyncio.gather(*(use() for _ in range(5)))
+
+    assert len(created) == 1
+    assert all(c is created[0] for c in clients)
+    created[0].connect.assert_awaited_once()
+    created[0].disconnect.assert_not_awaited()
+    assert pool.stats()["embedding-model"]["acquired"] == 5
+    assert pool.stats()["embedding-model"]["in_use"] == 0
+
+
+async def test_config_change_retires_old_client_after_release(env, model_info_factory):
+    state, created = env
+    pool = ClientPool()
+
+    async with pool.acquire("embedding-model") as old:
+        state["info"] = model_info_factory(api_key="sk-rotated")
+        async with pool.acquire("embedding-model") as new:
+            assert new is not old
+            # 旧客户端仍在使用中，不能关闭
+            old.disconnect.assert_not_awaited()
+            assert pool.stats()["embedding-model"]["retired_pending"] == 1
+
+    old.disconnect.assert_awaited_once()
+    new.disconnect.assert_not_awaited()
+    stats = pool.stats()["embedding-model"]
+    assert stats["refreshed"] == 1
+    assert stats["retired_pending"] == 0
+
+
+async def test_lookup_failure_keeps_existing_client(env):
+    state, created = env
+    pool = ClientPool()
+
+    async with pool.acquire("embedding-model"):
+        pass
+    state["info"] = None
+    async with pool.acquire("embedding-model") as client:
+        assert client is created[0]
+
+    assert len(created) == 1
+
+
+async def test_close_disconnects_all(env):
+    _, created = env
+    pool = ClientPool()
+    async with pool.acquire("embedding-model"):
+        pass
+    async with pool.acquire("other-model"):
+        pass
+
+    await pool.close()
+
+    assert len(created) == 2
+    for client in created:
+        client.disconnect.assert_awaited_once()
@@ -0,0 +1,175 @@
+"""test_embedding_batcher.py — embedding 微批处理测试
+
+场景覆盖：
+- 时间窗口内的并发请求合并为一批，共用一次客户端租借
+- 批内相同请求只发一次
+- 原生批量客户端一批只调用一次 embed_batch
+- 攒满 max_batch_size 立即发出
+- 非原生批量客户端第一批之后不再等待时间窗口
+- 取不到客户端时所有调用方收到异常
+- 缓存命中的请求不再发出，未命中的结果回写缓存
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.agents.clients.base import (
+    BaseAIClient,
+    EmbeddingRequest,
+    HybridEmbedding,
+    SparseVector,
+)
+from app.agents.clients.embedding_batcher import EmbeddingBatcher
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClient(BaseAIClient[None]):
+    def __init__(self, native: bool = False):
+        super().__init__("embedding-model")
+        self.native_batch_embed = native
+        self.calls: list[tuple[str, str | None]] = []
+        self.batches: list[list[EmbeddingRequest]] = []
+
+    async def _create_client(self, model_info: dict) -> None:
+        return None
+
+    async def embed(self, text=None, image_base64_list=None, **kwargs):
+        self.calls.append(("embed", text))
+        return [float(len(text or ""))]
+
+    async def embed_hybrid(self, text=None, image_base64_list=None, **kwargs):
+        self.calls.append(("hybrid", text))
+        return HybridEmbedding(dense=[1.0], sparse=SparseVector([0], [1.0]))
+
+    async def embed_batch(self, requests):
+        self.batches.append(list(requests))
+        return await super().embed_batch(requests)
+
+
+class FakePool:
+    def __init__(self, client: FakeClient | None):
+        self.client = client
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self, model_id: str):
+        if self.client is None:
+            raise ValueError("无法获取模型配置或模型未激活")
+        self.acquired += 1
+        yield self.client
+
+
+class FakeCache:
+    def __init__(self, entries: dict[EmbeddingRequest, object] | None = None):
+        self.entries = dict(entries or {})
+
+    async def get_many(self, model_name, requests):
+        return {r: self.entries[r] for r in requests if r in self.entries}
+
+    async def put_many(self, model_name, results):
+        self.entries.update(results)
+
+
+def _batcher(pool: FakePool, **kwargs) -> EmbeddingBatcher:
+    kwargs.setdefault("max_batch_size", 16)
+    kwargs.setdefault("window_ms", 5)
+    kwargs.setdefault("cache", None)
+    return EmbeddingBatcher(pool=pool, **kwargs)  # type: ignore[arg-type]
+
+
+async def test_concurrent_requests_share_one_batch():
+    client = FakeClient()
+    pool = FakePool(client)
+    batcher = _batcher(pool)
+
+    hybrid, dense, dup = await asyncio.gather(
+        batcher.embed_hybrid(text="你好", instructions="corpus"),
+        batcher.embed(text="你好", instructions="cluster"),
+        batcher.embed(text="你好", instructions="cluster"),
+    )
+
+    assert hybrid.dense == [1.0]
+    assert dense == dup == [2.0]
+    assert sorted(client.calls) == [("embed", "你好"), ("hybrid", "你好")]
+    assert pool.acquired == 1
+    assert batcher.stats == {
+        "submitted": 3,
+        "deduplicated": 1,
+        "batches": 1,
+        "requests": 2,
+    }
+
+
+async def test_native_batch_calls_embed_batch_once():
+    client = FakeClient(native=True)
+    batcher = _batcher(FakePool(client))
+
+    results = await asyncio.gather(*(batcher.embed(text=t) for t in ["a", "bb", "ccc"]))
+
+    assert results == [[1.0], [2.0], [3.0]]
+    assert len(client.batches) == 1
+    assert [r.text for r in client.batches[0]] == ["a", "bb", "ccc"]
+
+
+async def test_full_batch_flushes_without_waiting_for_window():
+    client = FakeClient()
+    batcher = _batcher(FakePool(client), max_batch_size=2, window_ms=10_000)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.embed(text="a"), batcher.embed(text="b")), timeout=1
+    )
+
+    assert results == [[1.0], [1.0]]
+
+
+async def test_non_native_client_skips_window_after_first_batch():
+    batcher = _batcher(FakePool(FakeClient()), window_ms=200)
+
+    start = asyncio.get_running_loop().time()
+    await batcher.embed(text="a")
+    assert asyncio.get_running_loop().time() - start >= 0.2
+
+    # 已知客户端只能逐条请求，攒批没有收益：同一轮事件循环内的请求仍合并去重
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.embed(text="b"), batcher.embed(text="b")), timeout=0.1
+    )
+    assert results == [[1.0], [1.0]]
+    assert batcher.stats["batches"] == 2
+    assert batcher.stats["deduplicated"] == 1
+
+
+async def test_native_client_keeps_window():
+    client = FakeClient(native=True)
+    batcher = _batcher(FakePool(client), window_ms=50)
+
+    await batcher.embed(text="a")
+    start = asyncio.get_running_loop().time()
+    await batcher.embed(text="b")
+    assert asyncio.get_running_loop().time() - start >= 0.05
+
+
+async def test_pool_failure_propagates_to_all_callers():
+    batcher = _batcher(FakePool(None))
+
+    results = await asyncio.gather(
+        batcher.embed(text="a"), batcher.embed_hybrid(text="b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+async def test_cache_hits_skip_provider():
+    client = FakeClient()
+    cached = EmbeddingRequest(hybrid=False, text="收到", dimensions=1024)
+    cache = FakeCache({cached: [9.0]})
+    batcher = _batcher(FakePool(client), cache=cache)
+
+    results = await asyncio.gather(batcher.embed(text="收到"), batcher.embed(text="新"))
+
+    assert results == [[9.0], [1.0]]
+    assert client.calls == [("embed", "新")]
+    assert cache.entries[EmbeddingRequest(hybrid=False, text="新")] == [1.0]
+    assert batcher.stats["requests"] == 1
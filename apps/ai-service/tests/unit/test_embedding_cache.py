@@ -0,0 +1,184 @@
+"""test_embedding_cache.py — 内容寻址 embedding 缓存测试
+
+场景覆盖：
+- float16 二进制编码往返（Dense / Hybrid），体积远小于 JSON
+- key 由模型 / 指令 / 维度 / 归一化内容决定
+- 写入后命中，超过上限淘汰最久未访问的条目
+- Redis 异常时视为未命中
+"""
+
+import asyncio
+import json
+import random
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.clients import embedding_cache as cache_module
+from app.agents.clients.base import EmbeddingRequest, HybridEmbedding, SparseVector
+from app.agents.clients.embedding_cache import (
+    EmbeddingCache,
+    cache_key,
+    decode,
+    encode,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class FakeRedis:
+    """只实现缓存用到的命令"""
+
+    def __init__(self):
+        self.store: dict[str, bytes] = {}
+        self.lru: dict[str, float] = {}
+        self.mget = AsyncMock(
+            side_effect=lambda keys: [self.store.get(k) for k in keys]
+        )
+        self.zrange = AsyncMock(
+            side_effect=lambda key, start, end: sorted(self.lru, key=self.lru.get)[
+                start : end + 1
+            ]
+        )
+
+    def pipeline(self, transaction=True):
+        redis = self
+        results: list = []
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+
+        def _set(key, value, ex=None):
+            redis.store[key] = value
+            results.append(True)
+
+        def _zadd(key, mapping):
+            redis.lru.update(mapping)
+            results.append(len(mapping))
+
+        def _delete(*keys):
+            for k in keys:
+                redis.store.pop(k, None)
+            results.append(len(keys))
+
+        def _zrem(key, *members):
+            for m in members:
+                redis.lru.pop(m, None)
+            results.append(len(members))
+
+        pipe.set.side_effect = _set
+        pipe.zadd.side_effect = _zadd
+        pipe.zcard.side_effect = lambda key: results.append(len(redis.lru))
+        pipe.expire.side_effect = lambda key, ttl: results.append(True)
+        pipe.delete.side_effect = _delete
+        pipe.zrem.side_effect = _zrem
+        pipe.execute = AsyncMock(side_effect=lambda: list(results))
+        return pipe
+
+
+@pytest.fixture()
+def redis():
+    fake = FakeRedis()
+    with patch.object(
+        cache_module.AsyncRedisClient, "get_binary_instance", return_value=fake
+    ):
+        yield fake
+
+
+def _hybrid(seed: int = 0) -> HybridEmbedding:
+    rng = random.Random(seed)
+    return HybridEmbedding(
+        dense=[rng.uniform(-0.1, 0.1) for _ in range(1024)],
+        sparse=SparseVector(indices=[3, 70000, 5], values=[0.5, 0.25, 1.0]),
+    )
+
+
+class TestEncoding:
+    def test_hybrid_round_trip(self):
+        original = _hybrid()
+        data = encode(original)
+        restored = decode(data, hybrid=True)
+
+        assert isinstance(restored, HybridEmbedding)
+        assert restored.dense == pytest.approx(original.dense, abs=1e-4)
+        assert restored.sparse.indices == [3, 70000, 5]
+        assert restored.sparse.values == pytest.approx([0.5, 0.25, 1.0])
+        # float16：约为 JSON 列表的 1/8 以下
+        assert len(data) * 8 < len(json.dumps(original.dense))
+
+    def test_dense_round_trip(self):
+        restored = decode(encode([0.5, -0.25]), hybrid=False)
+        assert restored == [0.5, -0.25]
+
+    def test_unknown_version_rejected(self):
+        data = b"\x09" + encode([1.0])[1:]
+        with pytest.raises(ValueError):
+            decode(data, hybrid=False)
+
+
+class TestKey:
+    def test_normalized_content_shares_key(self):
+        a = EmbeddingRequest(hybrid=True, text="收到 ", instructions="i")
+        b = EmbeddingRequest(hybrid=True, text=" 收到", instructions="i")
+        assert cache_key("m", a) == cache_key("m", b)
+
+    @pytest.mark.parametrize(
+        ("model", "request_"),
+        [
+            (
+                "other-model",
+                EmbeddingRequest(hybrid=True, text="收到", instructions="i"),
+            ),
+            ("m", EmbeddingRequest(hybrid=True, text="收到", instructions="j")),
+            ("m", EmbeddingRequest(hybrid=False, text="收到", instructions="i")),
+            (
+                "m",
+                EmbeddingRequest(
+                    hybrid=True, text="收到", instructions="i", dimensions=512
+                ),
+            ),
+            (
+                "m",
+                EmbeddingRequest(
+                    hybrid=True, text="收到", images=("img",), instructions="i"
+                ),
+            ),
+        ],
+    )
+    def test_key_dimensions(self, model, request_):
+        base = EmbeddingRequest(hybrid=True, text="收到", instructions="i")
+        assert cache_key(model, request_) != cache_key("m", base)
+
+
+class TestCache:
+    async def test_put_then_get(self, redis):
+        cache = EmbeddingCache(max_entries=10, ttl_seconds=60)
+        hit = EmbeddingRequest(hybrid=True, text="哈哈哈")
+        miss = EmbeddingRequest(hybrid=True, text="没见过")
+
+        await cache.put_many("m", {hit: _hybrid()})
+        result = await cache.get_many("m", [hit, miss])
+
+        assert list(result) == [hit]
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    async def test_evicts_least_recently_used(self, redis):
+        cache = EmbeddingCache(max_entries=2, ttl_seconds=60)
+        requests = [EmbeddingRequest(hybrid=False, text=t) for t in "abc"]
+
+        for req in requests:
+            await cache.put_many("m", {req: [1.0]})
+            await asyncio.sleep(0.001)
+
+        assert set(redis.store) == {cache_key("m", r) for r in requests[1:]}
+        assert cache.stats["evicted"] == 1
+
+    async def test_redis_failure_is_a_miss(self, redis):
+        redis.mget.side_effect = ConnectionError("down")
+        cache = EmbeddingCache(max_entries=10, ttl_seconds=60)
+
+        result = await cache.get_many("m", [EmbeddingRequest(hybrid=False, text="a")])
+
+        assert result == {}
+        assert cache.stats["errors"] == 1
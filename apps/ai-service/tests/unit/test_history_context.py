@@ -0,0 +1,157 @@
+"""test_history_context.py — search_group_history 上下文查询测试
+
+场景覆盖：
+- 重叠 / 相邻的锚点时间窗口合并为互不重叠的区间
+- 每个区间一条 (chat_id, create_time) 范围查询，不含 OR，按离区间内锚点的距离截断
+- 多条查询并发执行且不超过并发上限，结果去重、按时间排序
+- 超过单次上限时保留锚点和离锚点最近的消息
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.agents.tools.history import search
+from app.agents.tools.history.search import (
+    fetch_context_messages,
+    merge_windows,
+    window_query,
+)
+
+pytestmark = pytest.mark.unit
+
+MINUTE = 60 * 1000
+
+
+def test_merge_windows():
+    timestamps = [100 * MINUTE, 103 * MINUTE, 0, 200 * MINUTE, 110 * MINUTE]
+
+    # 95~105 与 98~108 重叠，105~115 与之相接，合并为一个区间；时间戳 0 忽略
+    assert merge_windows(timestamps, window_ms=5 * MINUTE) == [
+        (95 * MINUTE, 115 * MINUTE),
+        (195 * MINUTE, 205 * MINUTE),
+    ]
+    assert merge_windows([]) == []
+
+
+def _sql(stmt) -> str:
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_window_query_is_single_range_scan():
+    sql = _sql(window_query("chat-1", 10, 20, [15], limit=50))
+
+    assert "conversation_messages.chat_id = 'chat-1'" in sql
+    assert "conversation_messages.create_time BETWEEN 10 AND 20" in sql
+    assert " OR " not in sql
+    assert "ORDER BY abs(conversation_messages.create_time - 15)" in sql
+    assert "LIMIT 50" in sql
+
+
+def test_window_query_ranks_by_nearest_anchor():
+    sql = _sql(window_query("chat-1", 10, 40, [15, 35], limit=50))
+
+    # 区间内每个锚点都参与排序，后面的锚点不会被前面的消息挤掉
+    assert (
+        "ORDER BY least(abs(conversation_messages.create_time - 15), "
+        "abs(conversation_messages.create_time - 35))"
+    ) in sql
+
+
+def _msg(message_id: str, create_time: int, user_id: str = "u1"):
+    return SimpleNamespace(
+        message_id=message_id, create_time=create_time, user_id=user_id
+    )
+
+
+class _FakeSession:
+    """按语句返回结果：LarkUser 查询返回用户，其余返回消息；记录并发数"""
+
+    active = 0
+    peak = 0
+    statements: list = []
+
+    def __init__(self, messages, users):
+        self.messages = messages
+        self.users = users
+
+    async def __aenter__(self):
+        type(self).active += 1
+        type(self).peak = max(type(self).peak, type(self).active)
+        return self
+
+    async def __aexit__(self, *exc):
+        type(self).active -= 1
+
+    async def execute(self, stmt):
+        type(self).statements.append(stmt)
+        await asyncio.sleep(0.01)
+        table = stmt.column_descriptions[0]["entity"].__tablename__
+        rows = self.users if table == "lark_user" else self.messages
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = rows
+        return result
+
+
+@pytest.fixture()
+def fake_db():
+    def install(messages, users):
+        _FakeSession.active = _FakeSession.peak = 0
+        _FakeSession.statements = []
+        return patch.object(
+            search, "AsyncSessionLocal", lambda: _FakeSession(messages, users)
+        )
+
+    return install
+
+
+async def test_fetch_runs_one_query_per_range(fake_db):
+    messages = [_msg("m2", 2 * MINUTE), _msg("m1", 1 * MINUTE, "u2")]
+    users = [SimpleNamespace(union_id="u1", name="张三")]
+    anchors = [i * 60 * MINUTE for i in range(1, 8)]
+
+    with fake_db(messages, users), patch.object(search, "MAX_PARALLEL_QUERIES", 2):
+        rows = await fetch_context_messages(
+            "chat-1",
+            anchor_message_ids=["m2"],
+            anchor_timestamps=anchors,
+            anchor_root_ids={"root"},
+        )
+
+    # 7 个区间 + 锚点 ID + 引用链 + 用户；每个区间只按自己的锚点排序
+    assert len(_FakeSession.statements) == 10
+    first_range = _sql(_FakeSession.statements[0])
+    assert f"create_time - {anchors[0]})" in first_range
+    assert f"create_time - {anchors[1]})" not in first_range
+    assert _FakeSession.peak == 2
+    # 同一消息在多个区间出现只返回一次；找不到用户的消息不返回
+    assert [(m.message_id, u.name) for m, u in rows] == [("m2", "张三")]
+
+
+async def test_fetch_caps_rows_keeping_anchors(fake_db):
+    messages = [_msg(f"m{i}", i * MINUTE) for i in range(20)]
+    users = [SimpleNamespace(union_id="u1", name="张三")]
+
+    with fake_db(messages, users):
+        rows = await fetch_context_messages(
+            "chat-1",
+            anchor_message_ids=["m0"],
+            anchor_timestamps=[10 * MINUTE],
+            anchor_root_ids=set(),
+            max_rows=5,
+        )
+
+    ids = [m.message_id for m, _ in rows]
+    assert len(ids) == 5
+    # 锚点本身保留，其余为离锚点时间最近的消息，按时间升序
+    assert ids[0] == "m0"
+    assert set(ids[1:]) <= {"m8", "m9", "m10", "m11", "m12"}
+    times = [m.create_time for m, _ in rows]
+    assert times == sorted(times)
@@ -0,0 +1,198 @@
+"""test_history_search_cache.py — search_group_history 结果缓存测试
+
+场景覆盖：
+- 全角 / 大小写 / 空白不同的查询共用一个 key，limit / 版本不同则不共用
+- 写入后命中；群水位推进后条目过期，其他群不受影响
+- Redis 异常时视为未命中且不写入；Qdrant 检索失败时不缓存"未找到"
+- 查询向量 LRU 命中与淘汰；工具重复查询不再检索和生成向量
+"""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.clients.base import HybridEmbedding, SparseVector
+from app.agents.tools.history import search
+from app.services import history_search_cache as cache_module
+from app.services.history_search_cache import (
+    HistorySearchCache,
+    bump_watermarks,
+    normalize_query,
+    result_key,
+)
+from app.services.qdrant import QdrantService
+from app.services.vector_schema import RecallVectorVersion
+
+pytestmark = pytest.mark.unit
+
+
+class FakeRedis:
+    """只实现缓存用到的命令"""
+
+    def __init__(self):
+        self.store: dict[str, str] = {}
+        self.mget = AsyncMock(
+            side_effect=lambda keys: [self.store.get(k) for k in keys]
+        )
+        self.set = AsyncMock(
+            side_effect=lambda key, value, ex=None: self.store.update({key: value})
+        )
+
+    def pipeline(self, transaction=True):
+        redis = self
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.incr.side_effect = lambda key: redis.store.update(
+            {key: str(int(redis.store.get(key, 0)) + 1)}
+        )
+        pipe.execute = AsyncMock()
+        return pipe
+
+
+@pytest.fixture()
+def redis():
+    fake = FakeRedis()
+    with patch.object(cache_module.AsyncRedisClient, "get_instance", return_value=fake):
+        yield fake
+
+
+def _embedding(seed: float) -> HybridEmbedding:
+    return HybridEmbedding(
+        dense=[seed, 1.0], sparse=SparseVector(indices=[1], values=[seed])
+    )
+
+
+def test_normalized_queries_share_key():
+    assert normalize_query("  Redis　的\n讨论 ") == "redis 的 讨论"
+    assert result_key("c1", "v1", "Redis 讨论", 10) == result_key(
+        "c1", "v1", "ＲＥＤＩＳ  讨论", 10
+    )
+    assert result_key("c1", "v1", "redis", 10) != result_key("c1", "v1", "redis", 5)
+    assert result_key("c1", "v1", "redis", 10) != result_key("c1", "v2", "redis", 10)
+    assert result_key("c1", "v1", "redis", 10) != result_key("c2", "v1", "redis", 10)
+
+
+class TestResultCache:
+    async def test_hit_until_watermark_moves(self, redis):
+        cache = HistorySearchCache()
+        assert await cache.get("c1", "v1", "redis", 10) == (None, 0)
+
+        await cache.put("c1", "v1", "redis", 10, 0, "结果")
+        await cache.put("c2", "v1", "redis", 10, 0, "其他群")
+        assert await cache.get("c1", "v1", "Redis", 10) == ("结果", 0)
+
+        await bump_watermarks(["c1", "c1"])
+        assert await cache.get("c1", "v1", "redis", 10) == (None, 1)
+        assert await cache.get("c2", "v1", "redis", 10) == ("其他群", 0)
+        assert cache.stats.to_dict()["stale"] == 1
+
+    async def test_entry_written_with_old_watermark_is_stale(self, redis):
+        cache = HistorySearchCache()
+        _, watermark = await cache.get("c1", "v1", "redis", 10)
+        # 检索期间该群写入了新向量
+        await bump_watermarks(["c1"])
+        await cache.put("c1", "v1", "redis", 10, watermark, "旧结果")
+
+        assert await cache.get("c1", "v1", "redis", 10) == (None, 1)
+
+    async def test_redis_error_is_a_miss(self):
+        cache = HistorySearchCache()
+        # pipeline 的排队命令是同步调用，只有 execute 需要 await
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.execute = AsyncMock(side_effect=ConnectionError("down"))
+        broken = MagicMock(pipeline=MagicMock(return_value=pipe))
+        broken.mget = AsyncMock(side_effect=ConnectionError("down"))
+        with patch.object(
+            cache_module.AsyncRedisClient, "get_instance", return_value=broken
+        ):
+            assert await cache.get("c1", "v1", "redis", 10) == (None, None)
+            await bump_watermarks(["c1"])
+        assert cache.stats.errors == 1
+
+
+def test_embedding_lru_evicts_least_recent():
+    cache = HistorySearchCache(embedding_cache_size=2)
+    cache.put_embedding("m", "a", _embedding(1))
+    cache.put_embedding("m", "b", _embedding(2))
+    assert cache.get_embedding("m", " A ") == _embedding(1)
+
+    cache.put_embedding("m", "c", _embedding(3))
+    assert cache.get_embedding("m", "b") is None
+    assert cache.get_embedding("m", "a") == _embedding(1)
+    assert cache.get_embedding("other", "a") is None
+
+
+class TestSearchTool:
+    @pytest.fixture()
+    def tool_env(self, redis):
+        cache = HistorySearchCache()
+        runtime = SimpleNamespace(context=SimpleNamespace(curr_chat_id="c1"))
+        version = RecallVectorVersion("v1", "embedding-model")
+        with (
+            patch.object(search, "history_search_cache", cache),
+            patch.object(search, "get_runtime", return_value=runtime),
+            patch.object(search, "read_recall_version", return_value=version),
+        ):
+            yield cache
+
+    async def test_repeated_query_served_from_cache(self, tool_env):
+        run = AsyncMock(return_value="找到 1 条相关消息及其上下文：")
+        with patch.object(search, "_search", run):
+            first = await search.search_group_history.coroutine(query="Redis 讨论")
+            second = await search.search_group_history.coroutine(query="redis  讨论")
+            await bump_watermarks(["c1"])
+            await search.search_group_history.coroutine(query="redis 讨论")
+
+        assert first == second
+        assert run.await_count == 2
+
+    async def test_failed_search_not_cached(self, tool_env):
+        run = AsyncMock(side_effect=[RuntimeError("qdrant down"), "结果"])
+        with patch.object(search, "_search", run):
+            failed = await search.search_group_history.coroutine(query="redis")
+            ok = await search.search_group_history.coroutine(query="redis")
+
+        assert failed.startswith("搜索失败")
+        assert ok == "结果"
+
+    async def test_qdrant_failure_not_cached(self, tool_env, redis):
+        client = MagicMock(query_points=AsyncMock(side_effect=ConnectionError("down")))
+        with (
+            patch.object(search, "qdrant_service", QdrantService(client)),
+            patch.object(search, "_embed_query", AsyncMock(return_value=_embedding(1))),
+        ):
+            first = await search.search_group_history.coroutine(query="redis")
+            second = await search.search_group_history.coroutine(query="redis")
+
+        # 检索失败不能变成"未找到相关消息"，也不能写入缓存
+        assert first.startswith("搜索失败") and second.startswith("搜索失败")
+        assert client.query_points.await_count == 2
+        redis.set.assert_not_awaited()
+
+    async def test_query_embedding_reused(self, tool_env):
+        client = SimpleNamespace(
+            model_name="m", embed_hybrid=AsyncMock(return_value=_embedding(1))
+        )
+
+        @asynccontextmanager
+        async def acquire(model_id):
+            yield client
+
+        remote = SimpleNamespace(
+            get_many=AsyncMock(return_value={}), put_many=AsyncMock()
+        )
+        with (
+            patch.object(search.client_pool, "acquire", acquire),
+            patch.object(search, "embedding_cache", remote),
+        ):
+            for query in ("Redis 讨论", " redis 讨论"):
+                assert await search._embed_query(query, "model") == _embedding(1)
+
+        assert client.embed_hybrid.await_count == 1
+        assert remote.get_many.await_count == 1
+        assert tool_env.stats.embedding_hits == 1
@@ -0,0 +1,91 @@
+"""test_http_clients.py — 共享 HTTP 客户端注册表测试
+
+场景覆盖：
+- 同一服务复用同一个客户端，close 后重新创建
+- 连接池统计：进行中请求在响应体读取完毕后释放，超过上限计为饱和
+- 请求异常计入 errors 并释放计数
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.clients.http import HttpClientRegistry, HttpServiceConfig
+
+pytestmark = pytest.mark.unit
+
+
+class _Body(httpx.AsyncByteStream):
+    """流式响应体（MockTransport 对 ByteStream 会提前读完，无法覆盖释放时机）"""
+
+    async def __aiter__(self):
+        yield b'{"ok": true}'
+
+
+def _registry(handler, max_connections: int = 2) -> HttpClientRegistry:
+    registry = HttpClientRegistry(
+        {"svc": HttpServiceConfig(timeout=1, max_connections=max_connections)}
+    )
+    # 用 MockTransport 替换底层连接池，保留统计包装
+    create = registry._create
+
+    def _create(name):
+        client = create(name)
+        client._transport._transport = httpx.MockTransport(handler)
+        return client
+
+    registry._create = _create
+    return registry
+
+
+class TestRegistry:
+    async def test_client_reused_until_closed(self):
+        registry = _registry(lambda request: httpx.Response(200))
+        await registry.start()
+        client = registry.get("svc")
+        assert registry.get("svc") is client
+
+        await registry.close()
+        assert client.is_closed
+        assert registry.get("svc") is not client
+        await registry.close()
+
+    async def test_pool_stats(self):
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, stream=_Body())
+
+        registry = _registry(handler, max_connections=2)
+        client = registry.get("svc")
+
+        tasks = [asyncio.create_task(client.get("http://svc/")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        stats = registry.stats()["svc"]
+        assert stats["in_flight"] == 3
+        assert stats["saturated"] == 1
+        assert stats["saturation"] == 1.5
+
+        release.set()
+        responses = await asyncio.gather(*tasks)
+        assert all(r.json() == {"ok": True} for r in responses)
+
+        stats = registry.stats()["svc"]
+        assert stats["in_flight"] == 0
+        assert stats["peak_in_flight"] == 3
+        assert stats["requests"] == 3
+        await registry.close()
+
+    async def test_errors_release_in_flight(self):
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        registry = _registry(handler)
+        with pytest.raises(httpx.ConnectError):
+            await registry.get("svc").get("http://svc/")
+
+        stats = registry.stats()["svc"]
+        assert (stats["in_flight"], stats["errors"]) == (0, 1)
+        await registry.close()
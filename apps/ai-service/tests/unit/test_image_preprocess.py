@@ -0,0 +1,119 @@
+"""test_image_preprocess.py — 图片 embedding 预处理测试
+
+场景覆盖：
+- 缩放到最长边，小图不放大
+- 去除 EXIF 元数据，并按 EXIF 方向摆正
+- 动图只取第一帧
+- 透明图编码为 JPEG 时合成到白底，WebP 保留透明通道
+- 超过大小上限时降低质量 / 尺寸
+- 线程池异步入口
+"""
+
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from app.utils.image_preprocess import preprocess_image, preprocess_image_async
+
+pytestmark = pytest.mark.unit
+
+
+def _encode(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def _noise(width: int, height: int, seed: int = 0) -> Image.Image:
+    """随机噪声图（几乎不可压缩，用于测试大小上限）"""
+    rng = random.Random(seed)
+    return Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+
+
+def _open(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_downscales_to_max_edge():
+    data = _encode(Image.new("RGB", (4000, 3000), "red"), "PNG")
+
+    result = preprocess_image(data, max_edge=512, image_format="jpeg")
+
+    assert (result.width, result.height) == (512, 384)
+    assert result.mime == "image/jpeg"
+    assert result.original_bytes == len(data)
+    assert _open(result.data).format == "JPEG"
+
+
+def test_small_image_not_upscaled():
+    data = _encode(Image.new("RGB", (100, 50), "blue"), "PNG")
+
+    result = preprocess_image(data, max_edge=512, image_format="jpeg")
+
+    assert (result.width, result.height) == (100, 50)
+
+
+def test_strips_exif_and_applies_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: 顺时针旋转 90°
+    exif[0x010F] = "SecretCamera"  # Make
+    data = _encode(Image.new("RGB", (400, 200), "green"), "JPEG", exif=exif)
+
+    result = preprocess_image(data, max_edge=1024, image_format="jpeg")
+
+    out = _open(result.data)
+    assert (result.width, result.height) == (200, 400)
+    assert len(out.getexif()) == 0
+    assert b"SecretCamera" not in result.data
+
+
+def test_animated_gif_uses_first_frame():
+    frames = [Image.new("RGB", (64, 64), color) for color in ("red", "blue", "green")]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:])
+
+    result = preprocess_image(buffer.getvalue(), image_format="webp")
+
+    out = _open(result.data)
+    assert getattr(out, "n_frames", 1) == 1
+    r, g, b = out.convert("RGB").getpixel((32, 32))
+    assert r > 200 and g < 50 and b < 50
+
+
+def test_transparency_handling():
+    img = Image.new("RGBA", (32, 32), (0, 0, 0, 0))
+    data = _encode(img, "PNG")
+
+    jpeg = _open(preprocess_image(data, image_format="jpeg").data)
+    assert jpeg.mode == "RGB"
+    assert jpeg.getpixel((0, 0)) == (255, 255, 255)
+
+    webp = _open(preprocess_image(data, image_format="webp").data)
+    assert webp.mode == "RGBA"
+
+
+def test_size_cap_lowers_quality_then_size():
+    data = _encode(_noise(1024, 1024), "PNG")
+
+    result = preprocess_image(
+        data, max_edge=1024, image_format="jpeg", quality=95, max_bytes=60 * 1024
+    )
+
+    assert len(result.data) <= 60 * 1024
+    assert result.width < 1024
+
+
+def test_rejects_unknown_format():
+    data = _encode(Image.new("RGB", (8, 8)), "PNG")
+    with pytest.raises(ValueError):
+        preprocess_image(data, image_format="tiff")
+
+
+async def test_async_entry_runs_in_pool():
+    data = _encode(Image.new("RGB", (2048, 2048), "red"), "PNG")
+
+    result = await preprocess_image_async(data, max_edge=256)
+
+    assert max(result.width, result.height) == 256
@@ -0,0 +1,179 @@
+"""test_image_url_cache.py — 图片 URL 两级缓存与 single-flight 测试
+
+场景覆盖：
+- 并发解析同一 key 只请求一次 main-server
+- 多个未命中 key 合并为一次批量请求
+- 进程内缓存命中不再访问 Redis / main-server
+- Redis 命中回填进程内缓存，过期条目视为未命中
+- 解析失败不缓存
+- 批量接口 404（旧版 main-server）时逐个回退
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.clients import image_client as image_client_module
+from app.clients.image_client import ImageProcessClient
+
+pytestmark = pytest.mark.unit
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store: dict[str, str] = {}
+        self.mget = AsyncMock(
+            side_effect=lambda keys: [self.store.get(k) for k in keys]
+        )
+
+    def pipeline(self, transaction=True):
+        redis = self
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.set.side_effect = lambda key, value, ex=None: redis.store.update(
+            {key: value}
+        )
+        pipe.execute = AsyncMock()
+        return pipe
+
+
+@pytest.fixture()
+def redis():
+    fake = FakeRedis()
+    with patch.object(
+        image_client_module.AsyncRedisClient, "get_instance", return_value=fake
+    ):
+        yield fake
+
+
+@pytest.fixture()
+def client(redis):
+    return ImageProcessClient()
+
+
+def _fetcher(delay: float = 0.0, fail: set[str] | None = None):
+    async def fetch(items, app_name):
+        await asyncio.sleep(delay)
+        return {
+            k: None if k in (fail or set()) else f"https://img/{k}" for k, _ in items
+        }
+
+    return AsyncMock(side_effect=fetch)
+
+
+class TestSingleFlight:
+    async def test_concurrent_requests_share_one_fetch(self, client):
+        fetch = _fetcher(delay=0.01)
+        with patch.object(client, "_fetch_urls", fetch):
+            results = await asyncio.gather(
+                *(client.process_image("k1", "m1") for _ in range(5))
+            )
+
+        assert results == ["https://img/k1"] * 5
+        assert fetch.await_count == 1
+        assert client.stats["shared"] == 4
+
+    async def test_misses_are_batched(self, client):
+        fetch = _fetcher()
+        with patch.object(client, "_fetch_urls", fetch):
+            urls = await client.resolve_images([("a", "m1"), ("b", "m1"), ("a", "m1")])
+
+        assert urls == {"a": "https://img/a", "b": "https://img/b"}
+        fetch.assert_awaited_once()
+        assert [k for k, _ in fetch.await_args.args[0]] == ["a", "b"]
+
+    async def test_timeout_returns_partial_and_keeps_filling(self, client):
+        client._set_l1("cached", "https://img/cached", time.time() + 60)
+        fetch = _fetcher(delay=0.2)
+        with patch.object(client, "_fetch_urls", fetch):
+            urls = await client.resolve_images(
+                [("cached", None), ("slow", None)], timeout=0.01
+            )
+            assert urls == {"cached": "https://img/cached"}
+
+            await asyncio.gather(*client._background)
+            assert await client.process_image("slow", None) == "https://img/slow"
+
+        assert fetch.await_count == 1
+
+
+class TestTwoTierCache:
+    async def test_l1_hit_skips_redis_and_fetch(self, client, redis):
+        fetch = _fetcher()
+        with patch.object(client, "_fetch_urls", fetch):
+            await client.process_image("k1", "m1")
+            await client.process_image("k1", "m1")
+
+        assert fetch.await_count == 1
+        assert redis.mget.await_count == 1
+        assert client.stats["l1_hits"] == 1
+
+    async def test_redis_hit_fills_l1(self, client, redis):
+        redis.store["image_url:k1"] = json.dumps(
+            {"url": "https://img/shared", "expire_at": time.time() + 60}
+        )
+        redis.store["image_url:old"] = json.dumps(
+            {"url": "https://img/old", "expire_at": time.time() - 1}
+        )
+        fetch = _fetcher()
+        with patch.object(client, "_fetch_urls", fetch):
+            urls = await client.resolve_images([("k1", None), ("old", None)])
+
+        assert urls == {"k1": "https://img/shared", "old": "https://img/old"}
+        assert [k for k, _ in fetch.await_args.args[0]] == ["old"]
+        assert "k1" in client._url_cache
+
+    async def test_partly_warm_cache_keeps_input_order(self, client, redis):
+        client._set_l1("k2", "https://img/k2", time.time() + 60)
+        fetch = _fetcher()
+        with patch.object(client, "_fetch_urls", fetch):
+            urls = await client.resolve_images(
+                [("k1", "m1"), ("k2", "m1"), ("k3", "m1")]
+            )
+
+        # 调用方按返回顺序为图片编号（【图片N】），不能因缓存命中而改变
+        assert list(urls.items()) == [
+            ("k1", "https://img/k1"),
+            ("k2", "https://img/k2"),
+            ("k3", "https://img/k3"),
+        ]
+
+    async def test_failures_not_cached(self, client, redis):
+        fetch = _fetcher(fail={"bad"})
+        with patch.object(client, "_fetch_urls", fetch):
+            assert await client.process_image("bad", None) is None
+            assert await client.process_image("bad", None) is None
+
+        assert fetch.await_count == 2
+        assert redis.store == {}
+
+
+class TestBatchFallback:
+    async def test_404_falls_back_to_single_requests(self, client):
+        client.base_url = "http://main-server"
+        not_found = httpx.HTTPStatusError(
+            "404",
+            request=httpx.Request("POST", "http://main-server"),
+            response=httpx.Response(404),
+        )
+        response = MagicMock(raise_for_status=MagicMock(side_effect=not_found))
+        http = MagicMock()
+        http.post = AsyncMock(return_value=response)
+
+        with (
+            patch.object(image_client_module.http_clients, "get", return_value=http),
+            patch.object(
+                client,
+                "_fetch_url",
+                AsyncMock(side_effect=lambda k, m, app: f"https://img/{k}"),
+            ) as single,
+        ):
+            urls = await client._fetch_urls([("a", None), ("b", None)], "bot")
+
+        assert urls == {"a": "https://img/a", "b": "https://img/b"}
+        assert single.await_count == 2
@@ -0,0 +1,322 @@
+"""test_qdrant_schema.py — Qdrant 集合 schema 同步测试
+
+场景覆盖：
+- 集合不存在时按声明创建（向量、HNSW、量化、on_disk_payload、payload 索引）
+- 线上配置与声明一致时无差异
+- 索引缺失 / 参数不一致、HNSW、量化、on_disk_payload 差异可迁移
+- 缺少命名向量、未声明的索引只报告
+- migrate=False 时只报告不修改
+- messages_recall 按 chat_id 分租户，已有集合迁移时先重建租户索引再修改 HNSW
+"""
+
+from dataclasses import replace
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Disabled,
+    IntegerIndexParams,
+    IntegerIndexType,
+    KeywordIndexParams,
+    KeywordIndexType,
+    PayloadIndexInfo,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
+
+from app.services import qdrant_schema
+from app.services.qdrant_schema import (
+    TENANT_FIELD,
+    CollectionSchema,
+    declared_collections,
+    diff_collection,
+    sync_collection,
+    sync_collections,
+)
+
+pytestmark = pytest.mark.unit
+
+_TIMESTAMP_INDEX = IntegerIndexParams(
+    type=IntegerIndexType.INTEGER, lookup=False, range=True
+)
+
+SCHEMA = CollectionSchema(
+    name="recall",
+    dense_size=8,
+    dense_vectors=("dense", "dense_v2"),
+    sparse_vectors=("sparse", "sparse_v2"),
+    payload_indexes={
+        "chat_id": PayloadSchemaType.KEYWORD,
+        "timestamp": _TIMESTAMP_INDEX,
+    },
+    hnsw_m=16,
+    hnsw_ef_construct=100,
+    quantization="scalar",
+    on_disk_payload=True,
+)
+
+
+def _info(
+    dense=("dense", "dense_v2"),
+    sparse=("sparse", "sparse_v2"),
+    indexes=None,
+    m=16,
+    quantization="scalar",
+    on_disk_payload=True,
+):
+    """构造 get_collection 返回的线上配置（默认与 SCHEMA 一致）"""
+    if indexes is None:
+        indexes = {
+            "chat_id": PayloadIndexInfo(data_type=PayloadSchemaType.KEYWORD, points=0),
+            "timestamp": PayloadIndexInfo(
+                data_type=PayloadSchemaType.INTEGER, params=_TIMESTAMP_INDEX, points=0
+            ),
+        }
+    return SimpleNamespace(
+        config=SimpleNamespace(
+            params=SimpleNamespace(
+                vectors={
+                    name: VectorParams(size=8, distance="Cosine") for name in dense
+                },
+                sparse_vectors=dict.fromkeys(sparse, {}),
+                on_disk_payload=on_disk_payload,
+            ),
+            hnsw_config=SimpleNamespace(m=m, ef_construct=100),
+            quantization_config=(
+                ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8, always_ram=True
+                    )
+                )
+                if quantization == "scalar"
+                else None
+            ),
+        ),
+        payload_schema=indexes,
+    )
+
+
+def _client(info=None) -> AsyncMock:
+    client = AsyncMock()
+    client.collection_exists.return_value = info is not None
+    client.get_collection.return_value = info
+    client.update_collection.return_value = True
+    return client
+
+
+def _items(drifts) -> dict:
+    return {d.item: d for d in drifts}
+
+
+def test_in_sync_has_no_drift():
+    assert diff_collection(SCHEMA, _info()) == []
+
+
+def test_diff_reports_each_item():
+    info = _info(
+        dense=("dense",),
+        sparse=("sparse",),
+        indexes={
+            # 参数与声明不一致（缺少 range）
+            "timestamp": PayloadIndexInfo(
+                data_type=PayloadSchemaType.INTEGER, params=None, points=0
+            ),
+            "user_id": PayloadIndexInfo(data_type=PayloadSchemaType.KEYWORD, points=0),
+        },
+        m=32,
+        quantization="none",
+        on_disk_payload=False,
+    )
+
+    drifts = _items(diff_collection(SCHEMA, info))
+
+    assert set(drifts) == {
+        "vectors.dense_v2",
+        "vectors.sparse_v2",
+        "payload_index.chat_id",
+        "payload_index.timestamp",
+        "payload_index.user_id",
+        "hnsw",
+        "quantization",
+        "on_disk_payload",
+    }
+    assert drifts["payload_index.chat_id"].live == "missing"
+    assert drifts["hnsw"].live == "m=32, ef_construct=100"
+    assert drifts["quantization"].declared == "scalar(always_ram=True)"
+    not_migratable = {item for item, d in drifts.items() if not d.migratable}
+    assert not_migratable == {
+        "vectors.dense_v2",
+        "vectors.sparse_v2",
+        "payload_index.user_id",
+    }
+
+
+def test_unnamed_vector_size_mismatch():
+    schema = CollectionSchema(name="cluster", dense_size=1024)
+    info = _info(indexes={})
+    info.config.params.vectors = VectorParams(size=8, distance="Cosine")
+
+    drifts = _items(diff_collection(schema, info))
+
+    assert drifts["vectors.default"].live == "dense(8)"
+    assert not drifts["vectors.default"].migratable
+
+
+async def test_creates_missing_collection():
+    client = _client()
+
+    drifts = await sync_collection(client, SCHEMA)
+
+    assert [(d.item, d.migrated) for d in drifts] == [("collection", True)]
+    kwargs = client.create_collection.await_args.kwargs
+    assert set(kwargs["vectors_config"]) == {"dense", "dense_v2"}
+    assert set(kwargs["sparse_vectors_config"]) == {"sparse", "sparse_v2"}
+    assert kwargs["hnsw_config"].m == 16
+    assert isinstance(kwargs["quantization_config"], ScalarQuantization)
+    assert kwargs["on_disk_payload"] is True
+    indexed = {c.args[1] for c in client.create_payload_index.await_args_list}
+    assert indexed == {"chat_id", "timestamp"}
+
+
+async def test_creates_collection_in_local_mode():
+    client = AsyncQdrantClient(location=":memory:")
+    try:
+        await sync_collection(client, SCHEMA)
+        info = await client.get_collection("recall")
+        assert set(info.config.params.vectors) == {"dense", "dense_v2"}
+        assert set(info.config.params.sparse_vectors) == {"sparse", "sparse_v2"}
+    finally:
+        await client.close()
+
+
+async def test_migrates_drifted_items():
+    info = _info(
+        indexes={
+            "timestamp": PayloadIndexInfo(
+                data_type=PayloadSchemaType.KEYWORD, points=0
+            ),
+        },
+        m=32,
+        quantization="none",
+        on_disk_payload=False,
+    )
+    client = _client(info)
+
+    drifts = await sync_collection(client, SCHEMA)
+
+    assert all(d.migrated for d in drifts)
+    # 类型不一致的索引先删除再重建，缺失的直接创建
+    client.delete_payload_index.assert_awaited_once_with("recall", "timestamp")
+    created = {c.args[1]: c.kwargs for c in client.create_payload_index.await_args_list}
+    assert created["timestamp"]["field_schema"] == _TIMESTAMP_INDEX
+    assert created["chat_id"]["field_schema"] == PayloadSchemaType.KEYWORD
+    update = client.update_collection.await_args.kwargs
+    assert update["hnsw_config"].m == 16
+    assert isinstance(update["quantization_config"], ScalarQuantization)
+    assert update["collection_params"].on_disk_payload is True
+
+
+async def test_disables_quantization():
+    schema = CollectionSchema(
+        name="recall",
+        dense_size=8,
+        dense_vectors=SCHEMA.dense_vectors,
+        sparse_vectors=SCHEMA.sparse_vectors,
+        payload_indexes=SCHEMA.payload_indexes,
+        quantization="none",
+    )
+    client = _client(_info())
+
+    await sync_collection(client, schema)
+
+    update = client.update_collection.await_args.kwargs
+    assert update == {"quantization_config": Disabled.DISABLED}
+
+
+async def test_non_migratable_drift_is_only_reported():
+    client = _client(_info(dense=("dense",)))
+
+    drifts = await sync_collection(client, SCHEMA)
+
+    assert [(d.item, d.migrated) for d in drifts] == [("vectors.dense_v2", False)]
+    client.update_collection.assert_not_awaited()
+    client.create_payload_index.assert_not_awaited()
+
+
+async def test_dry_run_does_not_modify():
+    missing = _client()
+    drifted = _client(_info(m=32))
+    drifted.collection_exists.return_value = True
+
+    assert not (await sync_collection(missing, SCHEMA, migrate=False))[0].migrated
+    missing.create_collection.assert_not_awaited()
+
+    drifts = await sync_collections(drifted, [SCHEMA], migrate=False)
+    assert [(d.item, d.migrated) for d in drifts] == [("hnsw", False)]
+    drifted.update_collection.assert_not_awaited()
+
+
+async def test_failure_in_one_collection_does_not_stop_others():
+    client = _client(_info())
+    client.get_collection.side_effect = [RuntimeError("boom"), _info()]
+
+    drifts = await sync_collections(client, [SCHEMA, SCHEMA], migrate=True)
+
+    assert drifts == []
+    assert client.get_collection.await_count == 2
+
+
+class TestTenantPartition:
+    def test_recall_declared_per_chat(self):
+        with patch.object(
+            qdrant_schema.settings, "qdrant_recall_tenant_partition", True
+        ):
+            recall, cluster = declared_collections()
+
+        assert (recall.hnsw_m, recall.hnsw_payload_m) == (0, 16)
+        assert recall.payload_indexes[TENANT_FIELD].is_tenant is True
+        # 聚类集合不分区
+        assert cluster.hnsw_m == 16 and cluster.hnsw_payload_m is None
+        assert cluster.payload_indexes[TENANT_FIELD] == PayloadSchemaType.KEYWORD
+
+    def test_partition_disabled_keeps_global_graph(self):
+        with patch.object(
+            qdrant_schema.settings, "qdrant_recall_tenant_partition", False
+        ):
+            recall, _ = declared_collections()
+
+        assert recall.hnsw_m == 16 and recall.hnsw_payload_m is None
+
+    async def test_migrates_existing_collection(self):
+        tenant_index = KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True)
+        schema = replace(
+            SCHEMA,
+            hnsw_m=0,
+            hnsw_payload_m=16,
+            payload_indexes={**SCHEMA.payload_indexes, TENANT_FIELD: tenant_index},
+        )
+        # 分区前：普通 keyword 索引 + 全局 HNSW 图
+        client = _client(_info())
+        calls = MagicMock()
+        client.delete_payload_index.side_effect = lambda *a: calls("delete", *a)
+        client.create_payload_index.side_effect = lambda *a, **kw: calls("create", *a)
+        client.update_collection.side_effect = lambda *a, **kw: calls("update") or True
+
+        drifts = _items(await sync_collection(client, schema))
+
+        assert drifts["payload_index.chat_id"].declared == "keyword(is_tenant=True)"
+        assert drifts["hnsw"].live == "m=16, ef_construct=100, payload_m=None"
+        assert all(d.migrated for d in drifts.values())
+        # 先重建租户索引，再修改 HNSW（按租户建图依赖该索引）
+        assert [c.args for c in calls.call_args_list] == [
+            ("delete", "recall", TENANT_FIELD),
+            ("create", "recall", TENANT_FIELD),
+            ("update",),
+        ]
+        update = client.update_collection.call_args.kwargs["hnsw_config"]
+        assert (update.m, update.payload_m) == (0, 16)
@@ -0,0 +1,205 @@
+"""test_qdrant_service.py — QdrantService 异步实现测试（Qdrant local 模式）"""
+
+import uuid
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    Fusion,
+    MatchValue,
+    PointVectors,
+    SearchParams,
+    SparseVector,
+)
+
+from app.services.qdrant import QdrantService
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture()
+async def service():
+    svc = QdrantService(AsyncQdrantClient(location=":memory:"))
+    yield svc
+    await svc.close()
+
+
+def _dense(seed: int) -> list[float]:
+    return [float((seed * 7 + i) % 11) + 1.0 for i in range(8)]
+
+
+class TestHybridCollection:
+    async def test_upsert_and_hybrid_search(self, service):
+        assert await service.create_hybrid_collection("recall", dense_size=8)
+
+        for i in range(5):
+            ok = await service.upsert_hybrid_vectors(
+                collection_name="recall",
+                point_id=str(uuid.uuid5(uuid.NAMESPACE_DNS, f"msg-{i}")),
+                dense_vector=_dense(i),
+                sparse_indices=[i, 100 + i],
+                sparse_values=[1.0, 0.5],
+                payload={"message_id": f"msg-{i}", "chat_id": f"chat-{i % 2}"},
+            )
+            assert ok
+
+        results = await service.hybrid_search(
+            collection_name="recall",
+            dense_vector=_dense(2),
+            sparse_indices=[2],
+            sparse_values=[1.0],
+            query_filter=Filter(
+                must=[FieldCondition(key="chat_id", match=MatchValue(value="chat-0"))]
+            ),
+            limit=3,
+        )
+
+        assert results
+        assert results[0]["payload"]["message_id"] == "msg-2"
+        assert all(r["payload"]["chat_id"] == "chat-0" for r in results)
+
+    async def test_hybrid_search_with_params_and_dbsf(self, service):
+        assert await service.create_hybrid_collection("recall", dense_size=8)
+        for i in range(3):
+            assert await service.upsert_hybrid_vectors(
+                collection_name="recall",
+                point_id=str(uuid.uuid5(uuid.NAMESPACE_DNS, f"msg-{i}")),
+                dense_vector=_dense(i),
+                sparse_indices=[i],
+                sparse_values=[1.0],
+                payload={"message_id": f"msg-{i}"},
+            )
+
+        results = await service.hybrid_search(
+            collection_name="recall",
+            dense_vector=_dense(1),
+            sparse_indices=[1],
+            sparse_values=[1.0],
+            limit=2,
+            search_params=SearchParams(exact=True),
+            fusion=Fusion.DBSF,
+        )
+
+        assert results[0]["payload"]["message_id"] == "msg-1"
+
+    async def test_routes_by_chat_id(self, service):
+        assert await service.create_hybrid_collection("recall", dense_size=8)
+        for i in range(4):
+            assert await service.upsert_hybrid_vectors(
+                collection_name="recall",
+                point_id=str(uuid.uuid5(uuid.NAMESPACE_DNS, f"msg-{i}")),
+                dense_vector=_dense(i),
+                sparse_indices=[i],
+                sparse_values=[1.0],
+                payload={"message_id": f"msg-{i}", "user_id": f"user-{i % 2}"},
+                chat_id=f"chat-{i // 2}",
+            )
+
+        results = await service.hybrid_search(
+            collection_name="recall",
+            dense_vector=_dense(0),
+            sparse_indices=[0],
+            sparse_values=[1.0],
+            chat_id="chat-1",
+        )
+        assert {r["payload"]["message_id"] for r in results} == {"msg-2", "msg-3"}
+
+        # 租户条件与调用方的过滤条件同时生效
+        results = await service.hybrid_search(
+            collection_name="recall",
+            dense_vector=_dense(0),
+            sparse_indices=[0],
+            sparse_values=[1.0],
+            query_filter=Filter(
+                must=[FieldCondition(key="user_id", match=MatchValue(value="user-1"))]
+            ),
+            chat_id="chat-1",
+        )
+        assert [r["payload"]["message_id"] for r in results] == ["msg-3"]
+
+    async def test_search_failure_raises_on_request(self, service):
+        kwargs = {
+            "collection_name": "missing",
+            "dense_vector": _dense(0),
+            "sparse_indices": [0],
+            "sparse_values": [1.0],
+        }
+        assert await service.hybrid_search(**kwargs) == []
+        with pytest.raises(ValueError):
+            await service.hybrid_search(**kwargs, raise_errors=True)
+
+    async def test_create_existing_collection_returns_false(self, service):
+        assert await service.create_hybrid_collection("recall", dense_size=8)
+        assert await service.create_hybrid_collection("recall", dense_size=8) is False
+
+
+class TestVersionedVectors:
+    async def test_update_vectors_keeps_other_versions(self, service):
+        names = [("dense", "sparse"), ("dense_v2", "sparse_v2")]
+        assert await service.create_hybrid_collection(
+            "recall", dense_size=8, vector_names=names
+        )
+        assert await service.missing_vectors("recall", ["dense_v2", "dense_v3"]) == [
+            "dense_v3"
+        ]
+
+        point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, "msg-0"))
+        assert await service.upsert_hybrid_vectors(
+            collection_name="recall",
+            point_id=point_id,
+            dense_vector=_dense(0),
+            sparse_indices=[0],
+            sparse_values=[1.0],
+            payload={"message_id": "msg-0"},
+        )
+        assert await service.update_vectors(
+            "recall",
+            [
+                PointVectors(
+                    id=point_id,
+                    vector={
+                        "dense_v2": _dense(3),
+                        "sparse_v2": SparseVector(indices=[3], values=[1.0]),
+                    },
+                )
+            ],
+        )
+
+        for dense, sparse, seed in [
+            ("dense", "sparse", 0),
+            ("dense_v2", "sparse_v2", 3),
+        ]:
+            results = await service.hybrid_search(
+                collection_name="recall",
+                dense_vector=_dense(seed),
+                sparse_indices=[seed],
+                sparse_values=[1.0],
+                dense_using=dense,
+                sparse_using=sparse,
+            )
+            assert results[0]["payload"]["message_id"] == "msg-0"
+
+        missing_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, "msg-9"))
+        assert await service.existing_ids("recall", [point_id, missing_id]) == {
+            point_id
+        }
+
+
+class TestDenseCollection:
+    async def test_upsert_and_search_vectors(self, service):
+        assert await service.create_collection("cluster", vector_size=8)
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        assert await service.upsert_vectors(
+            collection="cluster",
+            vectors=[_dense(i) for i in range(3)],
+            ids=ids,
+            payloads=[{"n": i} for i in range(3)],
+        )
+
+        results = await service.search_vectors("cluster", _dense(1), limit=1)
+        assert results[0]["id"] == ids[1]
+
+    async def test_search_failure_returns_empty(self, service):
+        assert await service.search_vectors("missing", _dense(0)) == []
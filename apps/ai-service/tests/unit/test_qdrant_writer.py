@@ -0,0 +1,116 @@
+"""test_qdrant_writer.py — Qdrant 写入缓冲测试（Qdrant local 模式）
+
+场景覆盖：
+- 并发写入合并为每个集合一次 upsert，write 返回时点已可查
+- 攒满 max_points 立即 flush，不等时间窗口
+- flush 失败时所有调用方收到 QdrantFlushError
+- ack-after-flush：向量写入失败时 process_message 不 ACK
+"""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import PointStruct
+
+from app.services.qdrant import QdrantService
+from app.services.qdrant_writer import QdrantFlushError, QdrantWriteBuffer
+from app.workers import vectorize_worker
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture()
+async def service():
+    svc = QdrantService(AsyncQdrantClient(location=":memory:"))
+    assert await svc.create_collection("recall", vector_size=4)
+    assert await svc.create_collection("cluster", vector_size=4)
+    yield svc
+    await svc.close()
+
+
+def _point(n: int) -> PointStruct:
+    return PointStruct(
+        id=str(uuid.uuid5(uuid.NAMESPACE_DNS, f"msg-{n}")),
+        vector=[1.0, float(n), 0.5, 0.25],
+        payload={"n": n},
+    )
+
+
+async def test_concurrent_writes_share_one_upsert(service):
+    writer = QdrantWriteBuffer(service, max_points=100, flush_interval_ms=5)
+
+    with patch.object(service, "upsert_points", wraps=service.upsert_points) as spy:
+        await asyncio.gather(
+            *(
+                writer.write({"recall": [_point(i)], "cluster": [_point(i)]})
+                for i in range(5)
+            )
+        )
+
+    assert spy.await_count == 2
+    assert (await service.client.count("recall")).count == 5
+    assert (await service.client.count("cluster")).count == 5
+    assert writer.stats["flushes"] == 1
+
+
+async def test_full_buffer_flushes_immediately(service):
+    writer = QdrantWriteBuffer(service, max_points=2, flush_interval_ms=10_000)
+
+    await asyncio.wait_for(
+        asyncio.gather(
+            writer.write({"recall": [_point(1)]}),
+            writer.write({"recall": [_point(2)]}),
+        ),
+        timeout=1,
+    )
+
+    assert (await service.client.count("recall")).count == 2
+
+
+async def test_flush_failure_raises_for_every_writer(service):
+    writer = QdrantWriteBuffer(service, max_points=100, flush_interval_ms=5)
+
+    results = await asyncio.gather(
+        writer.write({"recall": [_point(1)]}),
+        writer.write({"missing": [_point(2)]}),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, QdrantFlushError) for r in results)
+    assert writer.stats["errors"] == 1
+
+
+async def test_process_message_does_not_ack_when_flush_fails():
+    message = MagicMock(message_id="msg-1", vector_status="pending")
+    # pipeline 的排队命令是同步调用，只有 execute 需要 await
+    pipe = MagicMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    pipe.execute = AsyncMock()
+    redis = MagicMock(xack=AsyncMock(), pipeline=MagicMock(return_value=pipe))
+
+    with (
+        patch.object(vectorize_worker, "filter_done", AsyncMock(return_value=set())),
+        patch.object(vectorize_worker, "mark_done", AsyncMock()),
+        patch.object(
+            vectorize_worker,
+            "get_messages_by_ids",
+            AsyncMock(return_value={"msg-1": message}),
+        ),
+        patch.object(
+            vectorize_worker,
+            "vectorize_message",
+            AsyncMock(side_effect=QdrantFlushError("down")),
+        ),
+        patch.object(vectorize_worker, "update_vector_statuses", AsyncMock()) as status,
+    ):
+        await vectorize_worker.process_message(redis, "1-0", "msg-1")
+
+    redis.xack.assert_not_awaited()
+    status.assert_awaited_once_with({"msg-1": "failed"})
+    # 失败原因写入 Redis，供转入死信时读取
+    pipe.set.assert_called_once()
+    pipe.execute.assert_awaited_once()
@@ -0,0 +1,195 @@
+"""test_recall_backfill.py — 召回向量版本与回填任务测试
+
+场景覆盖：
+- 版本命名：v1 沿用 dense / sparse，其他版本带后缀
+- 回填按页推进游标，只写目标版本的命名向量，空内容 / 失败分别计数
+- Qdrant 中不存在的点计入 skipped，不做 embedding，也不影响同页其他点的写入
+- 单步时间用尽时 COMMIT，范围处理完时 DONE
+- 集合未声明目标版本的命名向量时直接 FAILED
+- 向量化只写入集合已声明命名向量的版本，查询失败时按配置写入
+- 令牌桶限速
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.long_tasks import TaskStatus
+from app.services import vector_schema
+from app.utils.rate_limiter import AsyncRateLimiter
+from app.workers import recall_backfill, vectorize_worker
+from app.workers.recall_backfill import RecallBackfillTask
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def versions():
+    with patch.object(
+        vector_schema.settings,
+        "recall_vector_models",
+        {"v1": "embedding-model", "v2": "embedding-model-v2"},
+    ):
+        yield
+
+
+def test_version_vector_names():
+    v1 = vector_schema.get_recall_version("v1")
+    v2 = vector_schema.get_recall_version("v2")
+    assert (v1.dense, v1.sparse) == ("dense", "sparse")
+    assert (v2.dense, v2.sparse, v2.model_id) == (
+        "dense_v2",
+        "sparse_v2",
+        "embedding-model-v2",
+    )
+    with pytest.raises(KeyError):
+        vector_schema.get_recall_version("v9")
+
+
+def _message(i: int) -> MagicMock:
+    return MagicMock(message_id=f"m{i}", create_time=1000 + i)
+
+
+@pytest.fixture()
+def backend():
+    messages = [_message(i) for i in range(5)]
+
+    async def fetch(params, cursor, limit):
+        start = 0 if cursor is None else cursor[0] - 1000 + 1
+        return messages[start : start + limit]
+
+    async def prepare(message):
+        if message.message_id == "m1":
+            return None
+        if message.message_id == "m2":
+            raise RuntimeError("图片下载失败")
+        return "text", []
+
+    async def embed(text, images, versions):
+        return {name: [0.1] for v in versions for name in (v.dense, v.sparse)}
+
+    qdrant = MagicMock()
+    qdrant.missing_vectors = AsyncMock(return_value=[])
+    qdrant.existing_ids = AsyncMock(side_effect=lambda collection, ids: set(ids))
+    qdrant.update_vectors = AsyncMock(return_value=True)
+    with (
+        patch.object(recall_backfill, "fetch_backfill_page", side_effect=fetch),
+        patch.object(
+            recall_backfill, "count_backfill_messages", AsyncMock(return_value=5)
+        ),
+        patch.object(recall_backfill, "prepare_embedding_input", side_effect=prepare),
+        patch.object(recall_backfill, "embed_recall_vectors", side_effect=embed),
+        patch.object(recall_backfill, "qdrant_service", qdrant),
+        patch.object(recall_backfill.settings, "recall_backfill_page_size", 2),
+        patch.object(recall_backfill.settings, "recall_backfill_qps", 1000),
+    ):
+        yield qdrant
+
+
+async def test_backfill_runs_to_done(backend):
+    result, status = await RecallBackfillTask(version="v2").execute()
+
+    assert status == TaskStatus.DONE
+    assert result["cursor"] == [1004, "m4"]
+    assert (result["total"], result["processed"]) == (5, 5)
+    assert (result["updated"], result["skipped"], result["failed"]) == (3, 1, 1)
+    assert result["failed_ids"] == ["m2"]
+
+    points = [p for c in backend.update_vectors.await_args_list for p in c.args[1]]
+    assert len(points) == 3
+    assert all(set(p.vector) == {"dense_v2", "sparse_v2"} for p in points)
+
+
+async def test_backfill_skips_points_missing_from_collection(backend):
+    missing = recall_backfill._point_id("m3")
+    backend.existing_ids.side_effect = lambda collection, ids: set(ids) - {missing}
+
+    with patch.object(
+        recall_backfill, "embed_recall_vectors", AsyncMock(return_value={})
+    ) as embed:
+        result, status = await RecallBackfillTask(version="v2").execute()
+
+    assert status == TaskStatus.DONE
+    assert (result["updated"], result["skipped"], result["failed"]) == (2, 2, 1)
+    assert embed.await_count == 2
+    points = [p for c in backend.update_vectors.await_args_list for p in c.args[1]]
+    assert missing not in {p.id for p in points}
+
+
+async def test_backfill_commits_when_step_budget_used(backend):
+    with patch.object(recall_backfill.settings, "recall_backfill_step_seconds", 0):
+        result, status = await RecallBackfillTask(version="v2").execute()
+    assert status == TaskStatus.COMMIT
+    assert result["processed"] == 0
+
+    # 下一轮从提交的结果继续执行
+    result, status = await RecallBackfillTask(**result).execute()
+    assert status == TaskStatus.DONE
+    assert result["processed"] == 5
+
+
+async def test_backfill_resumes_from_cursor(backend):
+    result, status = await RecallBackfillTask(
+        version="v2", total=5, processed=2, cursor=[1001, "m1"]
+    ).execute()
+
+    assert status == TaskStatus.DONE
+    assert result["processed"] == 5
+    assert result["skipped"] == 0
+
+
+async def test_backfill_fails_without_declared_vectors(backend):
+    backend.missing_vectors.return_value = ["dense_v2", "sparse_v2"]
+
+    result, status = await RecallBackfillTask(version="v2").execute()
+
+    assert status == TaskStatus.FAILED
+    assert "dense_v2" in result["error"]
+    backend.update_vectors.assert_not_awaited()
+
+
+async def test_backfill_write_failure_raises_for_retry(backend):
+    backend.update_vectors.return_value = False
+
+    with pytest.raises(RuntimeError):
+        await RecallBackfillTask(version="v2").execute()
+
+
+class TestLiveWriteVersions:
+    @pytest.fixture(autouse=True)
+    def write_v1_v2(self):
+        with (
+            patch.object(
+                vector_schema.settings, "recall_vector_write_versions", ["v1", "v2"]
+            ),
+            patch.object(vectorize_worker, "_live_write_versions", None),
+        ):
+            yield
+
+    async def test_skips_versions_missing_from_collection(self):
+        qdrant = MagicMock(
+            missing_vectors=AsyncMock(return_value=["dense_v2", "sparse_v2"])
+        )
+        with patch.object(vectorize_worker, "qdrant_service", qdrant):
+            first = await vectorize_worker.live_write_recall_versions()
+            second = await vectorize_worker.live_write_recall_versions()
+
+        assert [v.name for v in first] == [v.name for v in second] == ["v1"]
+        qdrant.missing_vectors.assert_awaited_once()
+
+    async def test_lookup_failure_falls_back_to_config(self):
+        qdrant = MagicMock(missing_vectors=AsyncMock(side_effect=ConnectionError()))
+        with patch.object(vectorize_worker, "qdrant_service", qdrant):
+            versions = await vectorize_worker.live_write_recall_versions()
+
+        assert [v.name for v in versions] == ["v1", "v2"]
+
+
+async def test_rate_limiter_spaces_requests():
+    limiter = AsyncRateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+    # 首个令牌立即可用，其余 5 个按 20ms 间隔发放
+    assert time.monotonic() - start >= 0.09
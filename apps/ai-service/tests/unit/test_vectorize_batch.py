@@ -0,0 +1,141 @@
+"""test_vectorize_batch.py — 向量化 worker 批处理测试
+
+场景覆盖：
+- 整批一次 IN 查询、一次状态 UPDATE、一次 XACK
+- Redis 已处理集合命中的条目直接 ACK，不访问 PG
+- 失败的条目标记 failed 且不 ACK
+- 状态写回失败时整批不 ACK
+- 批量 UPDATE 编译为 UPDATE ... FROM (VALUES ...)
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.workers import vectorize_worker
+
+pytestmark = pytest.mark.unit
+
+
+class FakeRedis:
+    """只实现批处理用到的命令"""
+
+    def __init__(self, done: set[str] | None = None):
+        self.done = set(done or ())
+        self.xack = AsyncMock()
+
+    def pipeline(self, transaction=True):
+        redis = self
+        results: list = []
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.smismember.side_effect = lambda key, ids: results.append(
+            [int(i in redis.done) for i in ids]
+        )
+        pipe.sadd.side_effect = lambda key, *ids: redis.done.update(ids)
+        pipe.execute = AsyncMock(side_effect=lambda: list(results))
+        return pipe
+
+
+def _message(message_id: str, status: str = "pending") -> MagicMock:
+    return MagicMock(message_id=message_id, vector_status=status)
+
+
+@pytest.fixture()
+def db():
+    messages = {
+        "m1": _message("m1"),
+        "m2": _message("m2"),
+        "m3": _message("m3", status="completed"),
+    }
+    with (
+        patch.object(
+            vectorize_worker,
+            "get_messages_by_ids",
+            AsyncMock(
+                side_effect=lambda ids: {i: messages[i] for i in ids if i in messages}
+            ),
+        ) as fetch,
+        patch.object(vectorize_worker, "update_vector_statuses", AsyncMock()) as update,
+    ):
+        yield fetch, update
+
+
+async def test_batch_uses_single_round_trips(db):
+    fetch, update = db
+    redis = FakeRedis()
+
+    async def vectorize(message):
+        if message.message_id == "m2":
+            raise RuntimeError("embedding 失败")
+        return True
+
+    with patch.object(vectorize_worker, "vectorize_message", side_effect=vectorize):
+        await vectorize_worker.process_batch(
+            redis, [("1-0", "m1"), ("1-1", "m2"), ("1-2", "m3"), ("1-3", "gone")]
+        )
+
+    fetch.assert_awaited_once()
+    assert sorted(fetch.await_args.args[0]) == ["gone", "m1", "m2", "m3"]
+    update.assert_awaited_once_with({"m1": "completed", "m2": "failed"})
+    redis.xack.assert_awaited_once()
+    acked = redis.xack.await_args.args[2:]
+    assert sorted(acked) == ["1-0", "1-2", "1-3"]
+    assert redis.done == {"m1", "m3"}
+
+
+async def test_done_set_short_circuits_pg(db):
+    fetch, update = db
+    redis = FakeRedis(done={"m1"})
+
+    with patch.object(vectorize_worker, "vectorize_message", AsyncMock()) as vec:
+        await vectorize_worker.process_batch(redis, [("1-0", "m1")])
+
+    fetch.assert_not_awaited()
+    vec.assert_not_awaited()
+    update.assert_not_awaited()
+    assert redis.xack.await_args.args[2:] == ("1-0",)
+
+
+async def test_status_write_failure_acks_nothing(db):
+    _, update = db
+    update.side_effect = ConnectionError("pg down")
+    redis = FakeRedis()
+
+    with patch.object(
+        vectorize_worker, "vectorize_message", AsyncMock(return_value=True)
+    ):
+        await vectorize_worker.process_batch(redis, [("1-0", "m1")])
+
+    redis.xack.assert_not_awaited()
+    assert redis.done == set()
+
+
+async def test_bulk_update_compiles_to_update_from_values():
+    captured = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt):
+            captured.append(stmt)
+
+        async def commit(self):
+            pass
+
+    with patch.object(vectorize_worker, "AsyncSessionLocal", Session):
+        await vectorize_worker.update_vector_statuses({"a": "completed", "b": "failed"})
+
+    sql = str(
+        captured[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "FROM (VALUES ('a', 'completed'), ('b', 'failed'))" in sql
+    assert "SET vector_status=v.status" in sql
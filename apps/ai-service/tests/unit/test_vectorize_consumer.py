@@ -0,0 +1,270 @@
+"""test_vectorize_consumer.py — 向量化 worker 连续流式消费测试
+
+场景覆盖：
+- 慢消息只占一个槽位，其余槽位持续补充
+- 每次 XREADGROUP 的 count 不超过空闲槽位数，处理中的消息数不超过并发上限
+- 退出时等待处理中的消息完成并全部 ACK
+- XREADGROUP 阻塞期间回收仍按间隔执行，认领的条目得到处理
+- XAUTOCLAIM 认领后超过最大重试次数的条目带失败原因转入死信
+- 死信重放回主 stream
+- 消费者名包含主机名与 PID
+"""
+
+import asyncio
+import os
+import socket
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.workers import vectorize_worker
+from app.workers.vectorize_worker import StreamConsumer
+
+pytestmark = pytest.mark.unit
+
+
+class StreamRedis:
+    """只实现消费循环用到的命令：从内存列表中按 count 读出条目"""
+
+    def __init__(self, entries: list[tuple[str, str]]):
+        self.entries = list(entries)
+        self.read_counts: list[int] = []
+        self.acked: list[str] = []
+
+    async def xreadgroup(self, group, consumer, streams, count, block):
+        self.read_counts.append(count)
+        batch, self.entries = self.entries[:count], self.entries[count:]
+        if not batch:
+            await asyncio.sleep(0.01)
+            return []
+        return [
+            (vectorize_worker.STREAM_NAME, [(s, {"message_id": m}) for s, m in batch])
+        ]
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id, count):
+        return ["0-0", [], []]
+
+    async def xtrim(self, stream, **kwargs):
+        return 0
+
+    async def xack(self, stream, group, *ids):
+        self.acked.extend(ids)
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.execute = AsyncMock(
+            side_effect=lambda: [
+                [0] * len(c.args[1]) for c in pipe.smismember.mock_calls
+            ]
+        )
+        return pipe
+
+
+def _pipe() -> MagicMock:
+    pipe = MagicMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    pipe.execute = AsyncMock()
+    return pipe
+
+
+@pytest.fixture()
+def db():
+    with (
+        patch.object(
+            vectorize_worker,
+            "get_messages_by_ids",
+            AsyncMock(
+                side_effect=lambda ids: {
+                    i: MagicMock(message_id=i, vector_status="pending") for i in ids
+                }
+            ),
+        ),
+        patch.object(vectorize_worker, "update_vector_statuses", AsyncMock()) as update,
+    ):
+        yield update
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.005)
+
+
+async def test_slow_message_does_not_block_refill(db):
+    entries = [("1-0", "slow")] + [(f"1-{i}", f"m{i}") for i in range(1, 9)]
+    redis = StreamRedis(entries)
+    release = asyncio.Event()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def vectorize(message):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            if message.message_id == "slow":
+                await release.wait()
+            else:
+                await asyncio.sleep(0.01)
+            return True
+        finally:
+            in_flight -= 1
+
+    consumer = StreamConsumer(
+        redis,  # type: ignore[arg-type]
+        consumer_name="c",
+        concurrency=2,
+    )
+    stop = False
+
+    with patch.object(vectorize_worker, "vectorize_message", side_effect=vectorize):
+        task = asyncio.create_task(consumer.run(should_run=lambda: not stop))
+
+        # 慢消息仍在处理时，其余 8 条已经通过另一个槽位处理完
+        await _wait_for(lambda: consumer.processed == 8)
+        assert not release.is_set()
+
+        release.set()
+        await _wait_for(lambda: consumer.processed == 9)
+        stop = True
+        await task
+
+    assert max_in_flight == 2
+    assert max(redis.read_counts) <= 2
+    assert sorted(redis.acked) == sorted(s for s, _ in entries)
+    statuses = {k: v for c in db.await_args_list for k, v in c.args[0].items()}
+    assert statuses == {m: "completed" for _, m in entries}
+
+
+async def test_shutdown_waits_for_in_flight(db):
+    redis = StreamRedis([("1-0", "m1")])
+    started = asyncio.Event()
+
+    async def vectorize(message):
+        started.set()
+        await asyncio.sleep(0.05)
+        return True
+
+    consumer = StreamConsumer(
+        redis,  # type: ignore[arg-type]
+        consumer_name="c",
+        concurrency=4,
+    )
+    stop = False
+
+    with patch.object(vectorize_worker, "vectorize_message", side_effect=vectorize):
+        task = asyncio.create_task(consumer.run(should_run=lambda: not stop))
+        await started.wait()
+        stop = True
+        await task
+
+    assert consumer.processed == 1
+    assert redis.acked == ["1-0"]
+
+
+async def test_reclaim_runs_while_reads_block(db):
+    redis = StreamRedis([])
+    blocking_reads = 0
+
+    async def xreadgroup(group, consumer, streams, count, block):
+        nonlocal blocking_reads
+        blocking_reads += 1
+        # 模拟 BLOCK：没有新消息，读满阻塞时间才返回
+        await asyncio.sleep(block / 1000 / 100)
+        return []
+
+    redis.xreadgroup = xreadgroup  # type: ignore[method-assign]
+    redis.xautoclaim = AsyncMock(  # type: ignore[method-assign]
+        side_effect=[["0-0", [("1-0", {"message_id": "m1"})], []]]
+        + [["0-0", [], []]] * 100
+    )
+    redis.xpending_range = AsyncMock(  # type: ignore[attr-defined]
+        return_value=[{"message_id": "1-0", "times_delivered": 2}]
+    )
+
+    consumer = StreamConsumer(
+        redis,  # type: ignore[arg-type]
+        consumer_name="c",
+        concurrency=2,
+    )
+    stop = False
+
+    with (
+        patch.object(vectorize_worker, "RECLAIM_INTERVAL_SEC", 0.02),
+        patch.object(
+            vectorize_worker, "vectorize_message", AsyncMock(return_value=True)
+        ),
+    ):
+        task = asyncio.create_task(consumer.run(should_run=lambda: not stop))
+        await _wait_for(
+            lambda: redis.xautoclaim.await_count >= 3 and blocking_reads >= 3
+        )
+        stop = True
+        await task
+
+    assert consumer.processed == 1
+    assert redis.acked == ["1-0"]
+    # 回收认领时能用上全部空闲槽位
+    assert redis.xautoclaim.await_args_list[0].kwargs["count"] == 2
+
+
+async def test_claim_dead_letters_exhausted_entries():
+    redis = MagicMock()
+    redis.xautoclaim = AsyncMock(
+        return_value=[
+            "0-0",
+            [("1-0", {"message_id": "m1"}), ("1-1", {"message_id": "m2"})],
+            ["0-9"],
+        ]
+    )
+    redis.xpending_range = AsyncMock(
+        return_value=[
+            {"message_id": "1-0", "times_delivered": 2},
+            {"message_id": "1-1", "times_delivered": vectorize_worker.MAX_RETRIES + 2},
+        ]
+    )
+    redis.mget = AsyncMock(return_value=["TimeoutError: embedding 超时"])
+    pipe = _pipe()
+    redis.pipeline.return_value = pipe
+
+    consumer = StreamConsumer(redis, consumer_name="c")
+    retry = await consumer._claim(10)
+
+    assert retry == [("1-0", "m1")]
+    assert redis.xautoclaim.await_args.kwargs["count"] == 10
+    stream, fields = pipe.xadd.call_args.args
+    assert stream == vectorize_worker.DEAD_LETTER_STREAM
+    assert fields["message_id"] == "m2"
+    assert fields["stream_id"] == "1-1"
+    assert fields["reason"] == "TimeoutError: embedding 超时"
+    pipe.xack.assert_called_once_with(
+        vectorize_worker.STREAM_NAME, vectorize_worker.GROUP_NAME, "1-1"
+    )
+
+
+async def test_replay_dead_letters():
+    redis = MagicMock()
+    redis.xrange = AsyncMock(
+        return_value=[
+            ("5-0", {"message_id": "m1", "reason": "x"}),
+            ("5-1", {"message_id": "m2", "reason": "y"}),
+        ]
+    )
+    pipe = _pipe()
+    redis.pipeline.return_value = pipe
+
+    assert await vectorize_worker.replay_dead_letters(redis, count=10) == 2
+
+    assert [c.args for c in pipe.xadd.call_args_list] == [
+        (vectorize_worker.STREAM_NAME, {"message_id": "m1"}),
+        (vectorize_worker.STREAM_NAME, {"message_id": "m2"}),
+    ]
+    pipe.xdel.assert_called_once_with(vectorize_worker.DEAD_LETTER_STREAM, "5-0", "5-1")
+
+
+def test_consumer_name_is_unique_per_host_and_process():
+    assert socket.gethostname() in vectorize_worker.CONSUMER_NAME
+    assert str(os.getpid()) in vectorize_worker.CONSUMER_NAME
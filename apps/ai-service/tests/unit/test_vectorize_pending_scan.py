@@ -0,0 +1,101 @@
+"""test_vectorize_pending_scan.py — pending 消息重扫测试
+
+场景覆盖：
+- keyset 分页：按 (create_time, message_id) 倒序，翻页条件为行值比较，无 OFFSET
+- 已在 stream 中等待处理的消息不重复推送
+- 每批一次 pipeline XADD，受单次推送总数上限约束
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.workers import vectorize_worker
+
+pytestmark = pytest.mark.unit
+
+
+class _Session:
+    def __init__(self, captured: list, rows: list):
+        self.captured = captured
+        self.rows = rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.captured.append(stmt)
+        return MagicMock(fetchall=MagicMock(return_value=self.rows))
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+async def test_fetch_pending_page_uses_keyset():
+    captured: list = []
+    with patch.object(
+        vectorize_worker, "AsyncSessionLocal", lambda: _Session(captured, [])
+    ):
+        await vectorize_worker.fetch_pending_page(0, None, 10)
+        await vectorize_worker.fetch_pending_page(0, (123, "m9"), 10)
+
+    first, second = (_sql(s) for s in captured)
+    assert "OFFSET" not in first and "OFFSET" not in second
+    assert "ORDER BY conversation_messages.create_time DESC, " in first
+    assert "conversation_messages.message_id DESC" in first
+    assert (
+        "(conversation_messages.create_time, conversation_messages.message_id) <"
+        in second
+    )
+
+
+async def test_scan_skips_queued_and_pipelines_xadd():
+    pages = [
+        [(300, "m3"), (200, "m2")],
+        [(100, "m1")],
+    ]
+    fetch = AsyncMock(side_effect=pages)
+    pipe = MagicMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    pipe.execute = AsyncMock()
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+
+    with (
+        patch.object(vectorize_worker, "PENDING_SCAN_BATCH_SIZE", 2),
+        patch.object(vectorize_worker, "fetch_pending_page", fetch),
+        patch.object(
+            vectorize_worker, "get_queued_message_ids", AsyncMock(return_value={"m2"})
+        ),
+        patch.object(
+            vectorize_worker.AsyncRedisClient, "get_instance", return_value=redis
+        ),
+    ):
+        pushed = await vectorize_worker.scan_pending_messages()
+
+    assert pushed == 2
+    assert fetch.await_args_list[1].args[1] == (200, "m2")
+    assert [c.args[1]["message_id"] for c in pipe.xadd.call_args_list] == ["m3", "m1"]
+    assert pipe.execute.await_count == 2
+
+
+async def test_queued_ids_start_from_oldest_pending():
+    redis = MagicMock()
+    redis.xinfo_groups = AsyncMock(
+        return_value=[
+            {"name": vectorize_worker.GROUP_NAME, "last-delivered-id": "9-0"},
+        ]
+    )
+    redis.xpending = AsyncMock(return_value={"pending": 2, "min": "5-0"})
+    redis.xrange = AsyncMock(
+        return_value=[("5-0", {"message_id": "a"}), ("10-0", {"message_id": "b"})]
+    )
+
+    assert await vectorize_worker.get_queued_message_ids(redis) == {"a", "b"}
+    assert redis.xrange.await_args.kwargs["min"] == "5-0"
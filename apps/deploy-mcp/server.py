@@ -11,6 +11,7 @@ import json
 import os
 import subprocess
 import time
+from contextlib import asynccontextmanager
 
 import httpx
 import uvicorn
@@ -310,32 +311,49 @@ async def _get_container_status(env: str = "prod") -> list[dict]:
     return containers
 
 
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared client for health checks, so repeated polls reuse connections.
+
+    Closed by the app lifespan (see bottom of this file).
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=5,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+async def _check_service_health(name: str, url: str) -> dict:
+    try:
+        r = await _get_http_client().get(url)
+        try:
+            body = r.json()
+        except Exception:
+            body = r.text[:500]
+        return {"service": name, "status": r.status_code, "body": body}
+    except Exception as e:
+        return {
+            "service": name,
+            "status": "unreachable",
+            "error": str(e),
+        }
+
+
 async def _check_services_health(env: str = "prod") -> list[dict]:
     """Call health endpoints of all application services and return their status."""
     cfg = get_env_config(env)
     endpoints = cfg["health_endpoints"]
 
-    results = []
-    async with httpx.AsyncClient(timeout=5) as client:
-        for name, url in endpoints:
-            try:
-                r = await client.get(url)
-                try:
-                    body = r.json()
-                except Exception:
-                    body = r.text[:500]
-                results.append(
-                    {"service": name, "status": r.status_code, "body": body}
-                )
-            except Exception as e:
-                results.append(
-                    {
-                        "service": name,
-                        "status": "unreachable",
-                        "error": str(e),
-                    }
-                )
-    return results
+    return list(
+        await asyncio.gather(
+            *(_check_service_health(name, url) for name, url in endpoints)
+        )
+    )
 
 
 @mcp.tool()
@@ -490,6 +508,19 @@ if DEPLOY_MCP_TOKEN:
     middlewares.append(Middleware(BearerAuthMiddleware))
 
 app = mcp.http_app(transport="sse", middleware=middlewares)
+_mcp_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    """Run FastMCP's lifespan, then release the shared HTTP client on shutdown."""
+    async with _mcp_lifespan(app) as state:
+        yield state
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+app.router.lifespan_context = _lifespan
 
 if __name__ == "__main__":
     port = int(os.environ.get("DEPLOY_MCP_PORT", "9099"))
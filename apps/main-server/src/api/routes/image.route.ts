@@ -6,11 +6,13 @@ import { botContextMiddleware } from '@middleware/bot-context';
 import {
     validateBody,
     imageProcessValidationRules,
+    imageProcessBatchValidationRules,
     base64ImageUploadValidationRules,
 } from '@middleware/validation';
 import {
     imageProcessor,
     ImageProcessRequest,
+    ImageProcessBatchRequest,
     ImageProcessError,
     Base64ImageUploadRequest,
 } from '@core/services/media/image-processor';
@@ -41,6 +43,23 @@ router.post('/process',
     }
 );
 
+/**
+ * 批量图片处理API - 一次请求处理多张图片
+ * POST /api/image/process-batch
+ * Body: { items: [{ message_id?: string, file_key: string }] }
+ */
+router.post('/process-batch',
+    validateBody(imageProcessBatchValidationRules),
+    async (ctx: Context) => {
+        try {
+            const request = ctx.request.body as ImageProcessBatchRequest;
+            ctx.body = await imageProcessor.processImages(request);
+        } catch (error) {
+            handleImageProcessError(ctx, error);
+        }
+    }
+);
+
 /**
  * base64图片上传API - 上传到飞书获取image_key
  * POST /api/image/upload-base64
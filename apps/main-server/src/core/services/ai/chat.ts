@@ -34,7 +34,7 @@ export async function sseChat(options: SSEChatOptions): Promise<() => void> {
             'X-Trace-Id': context.getTraceId(),
             'X-App-Name': context.getBotName(),
         },
-        body: options.req,
+        body: { stream_mode: 'delta', ...options.req },
         retries: 5, // 增加重试次数以处理504等网络错误
         retryDelay: 2000, // 增加重试延迟
         autoReconnect: true,
@@ -57,13 +57,32 @@ export async function sseChat(options: SSEChatOptions): Promise<() => void> {
         onEnd: options.onEnd,
     });
 
+    // delta 模式: 按 seq 拼接出完整内容后再交给状态机
+    let assembled = '';
+    let lastSeq = -1;
+
     const onMessage = async (message: ChatResponse) => {
         try {
             const previousState = stateMachine.getCurrentState();
 
+            let content = 'content' in message ? message.content : undefined;
+            if ('seq' in message) {
+                if (message.seq === 0) {
+                    // 重连后服务端重新生成, 从头拼接
+                    assembled = '';
+                    lastSeq = -1;
+                }
+                if (message.seq <= lastSeq) {
+                    return;
+                }
+                lastSeq = message.seq;
+                assembled = message.replace ? message.delta : assembled + message.delta;
+                content = assembled;
+            }
+
             const stateData = {
                 step: message.step,
-                content: 'content' in message ? message.content : undefined,
+                content,
                 reason_content: 'reason_content' in message ? message.reason_content : undefined,
                 status_message: 'status_message' in message ? message.status_message : undefined,
             };
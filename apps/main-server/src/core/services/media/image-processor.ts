@@ -14,6 +14,28 @@ export interface ImageProcessRequest {
     file_key: string;
 }
 
+/**
+ * 批量图片处理请求接口
+ */
+export interface ImageProcessBatchRequest {
+    items: ImageProcessRequest[];
+}
+
+/**
+ * 批量图片处理响应接口（单张失败不影响其他图片，url 为 null）
+ */
+export interface ImageProcessBatchResponse {
+    success: boolean;
+    data: {
+        results: Array<{
+            file_key: string;
+            url: string | null;
+            error_code?: string;
+        }>;
+    };
+    message: string;
+}
+
 /**
  * base64 图片上传请求接口
  */
@@ -115,6 +137,32 @@ export class ImageProcessorService {
         }
     }
 
+    /**
+     * 批量处理图片：逐张走 processImage（各自的缓存与上传锁），并发执行
+     */
+    async processImages(request: ImageProcessBatchRequest): Promise<ImageProcessBatchResponse> {
+        const settled = await Promise.allSettled(
+            request.items.map((item) => this.processImage(item)),
+        );
+
+        const results = settled.map((outcome, i) => {
+            const file_key = request.items[i].file_key;
+            if (outcome.status === 'fulfilled' && outcome.value.data) {
+                return { file_key, url: outcome.value.data.url };
+            }
+            const error =
+                outcome.status === 'rejected' ? this.handleError(outcome.reason) : undefined;
+            return { file_key, url: null, error_code: error?.code ?? 'PROCESSING_ERROR' };
+        });
+
+        const failed = results.filter((r) => r.url === null).length;
+        return {
+            success: true,
+            data: { results },
+            message: `批量图片处理完成: ${results.length - failed} 成功, ${failed} 失败`,
+        };
+    }
+
     /**
      * 处理 base64 图片上传到飞书
      */
@@ -1,10 +1,16 @@
-import { Entity, PrimaryColumn, Column } from 'typeorm';
+import { Entity, PrimaryColumn, Column, Index } from 'typeorm';
 
 /**
  * 会话消息实体
  * 用于存储用户和机器人的对话消息
  */
 @Entity('conversation_messages')
+// 部分索引：向量化 pending 扫描按 (create_time, message_id) keyset 分页
+@Index('idx_conversation_messages_pending', ['create_time', 'message_id'], {
+    where: "vector_status = 'pending'",
+})
+// 群聊历史检索按 (chat_id, create_time) 范围查询上下文
+@Index('idx_conversation_messages_chat_time', ['chat_id', 'create_time'])
 export class ConversationMessage {
     @PrimaryColumn({ length: 100 })
     message_id!: string;
@@ -41,6 +41,45 @@ export const imageProcessValidationRules = {
     },
 };
 
+/**
+ * 批量图片处理请求验证规则
+ * Body: { items: [{ message_id?: string, file_key: string }] }
+ */
+export const IMAGE_PROCESS_BATCH_MAX_ITEMS = 50;
+
+export const imageProcessBatchValidationRules = {
+    items: {
+        required: true,
+        custom: (value: unknown) => {
+            if (!Array.isArray(value) || value.length === 0) {
+                return 'items 必须是非空数组';
+            }
+            if (value.length > IMAGE_PROCESS_BATCH_MAX_ITEMS) {
+                return `items 最多 ${IMAGE_PROCESS_BATCH_MAX_ITEMS} 个`;
+            }
+            for (const item of value) {
+                const { message_id, file_key } = (item ?? {}) as Record<string, unknown>;
+                const fileKeyRule = imageProcessValidationRules.file_key;
+                if (typeof file_key !== 'string' || !fileKeyRule.pattern.test(file_key)) {
+                    return 'items[].file_key 格式不正确';
+                }
+                if (file_key.length > fileKeyRule.maxLength) {
+                    return 'items[].file_key 过长';
+                }
+                if (
+                    message_id !== undefined &&
+                    message_id !== null &&
+                    (typeof message_id !== 'string' ||
+                        !imageProcessValidationRules.message_id.pattern.test(message_id))
+                ) {
+                    return 'items[].message_id 格式不正确';
+                }
+            }
+            return true;
+        },
+    },
+};
+
 /**
  * base64图片上传验证规则
  */
@@ -149,6 +149,7 @@ export class HttpServerManager {
         console.info('  - /api/health (health check)');
         console.info('  - /api/prompts (prompt management)');
         console.info('  - /api/image/process (image processing)');
+        console.info('  - /api/image/process-batch (batch image processing)');
         console.info('  - /api/image/upload-base64 (base64 image upload)');
 
         const httpBots = multiBotManager.getBotsByInitType('http', true);
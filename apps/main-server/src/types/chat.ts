@@ -70,6 +70,7 @@ export interface ChatRequest {
     message_id: string; // 消息id / Message ID
     session_id?: string; // 会话追踪 ID
     is_canary?: boolean; // 是否开启灰度
+    stream_mode?: 'snapshot' | 'delta'; // SSE 推送模式, 默认 snapshot
 }
 
 /**
@@ -129,6 +130,31 @@ interface ChatProcessResponse {
     content?: string;
 }
 
+/**
+ * delta 模式下的增量响应
+ */
+export interface ChatDeltaResponse {
+    /**
+     * 步骤
+     */
+    step: Step.SEND;
+
+    /**
+     * 序号, 从 0 递增
+     */
+    seq: number;
+
+    /**
+     * 追加文本
+     */
+    delta: string;
+
+    /**
+     * 为 true 时 delta 是完整内容, 替换此前内容
+     */
+    replace?: boolean;
+}
+
 interface ChatNormalResponse {
     /**
      * 步骤
@@ -148,7 +174,11 @@ interface ChatStatusResponse {
     status_message: string;
 }
 
-export type ChatResponse = ChatProcessResponse | ChatNormalResponse | ChatStatusResponse;
+export type ChatResponse =
+    | ChatProcessResponse
+    | ChatDeltaResponse
+    | ChatNormalResponse
+    | ChatStatusResponse;
 
 export interface StoreRobotMessageRequest {
     message: ChatMessage;